@@ -14,6 +14,8 @@ LOG_DIR = "logs"
 MAX_PARALLEL_ANALYZERS = 2
 #ANALYZER_SCRIPT = "analyzers/post_ssmt.py"
 ANALYZER_SCRIPT = "analyzers/post_analysis.py"
+# local directory of downloaded simulation output files shared by the analyzers (post_analysis.py only); None disables
+DOWNLOAD_CACHE_DIR = None
 
 running = {}
 
@@ -39,13 +41,16 @@ def launch_analyzer(exp_id, exp_name, exp_type):
     print(f"Log for analyzer with {exp_id} at {str(log_path)}")
     log_file = open(log_path, "w", encoding="utf-8")
     os.environ["NO_COLOR"] = "1"  # disable color in subprocess's log
+    cmd = [
+        sys.executable, ANALYZER_SCRIPT,
+        "--exp-id", exp_id,
+        "--type", exp_type,
+        "--name", exp_name
+    ]
+    if DOWNLOAD_CACHE_DIR and "ssmt" not in ANALYZER_SCRIPT:
+        cmd += ["--download-cache-dir", DOWNLOAD_CACHE_DIR]
     proc = subprocess.Popen(
-        [
-            sys.executable, ANALYZER_SCRIPT,
-            "--exp-id", exp_id,
-            "--type", exp_type,
-            "--name", exp_name
-        ],
+        cmd,
         stdout=log_file,
         stderr=subprocess.STDOUT,
         text=True
@@ -2,6 +2,7 @@
 # 1) python post_analysis.py --exp-id 0c947c48-1764-f011-9f17-b88303912b51 --type "to_present" --name "example_to_present"
 # 2) python post_analysis.py --exp-id c3b0861e-1764-f011-9f17-b88303912b51 --type "future_projections" --name "example_projection_v3"
 import argparse
+import os
 from datetime import datetime
 
 from idmtools.analysis.analyze_manager import AnalyzeManager
@@ -13,6 +14,12 @@ from snt.analyzers.analyze_helpers import (
     MonthlyNewInfectionsAnalyzer_withU5, monthlyUsageLLIN
 )
 from snt.analyzers.analyze_vector_numbers import VectorNumbersAnalyzer
+from snt.analyzers.analyze_bundle import AnalyzerBundle
+from snt.analyzers.map_cache import CachedAnalyzer, MapResultCache
+from snt.analyzers.download_cache import CachedDownloadPlatform, FileDownloadCache
+from snt.analyzers.incremental_analysis import IncrementalAnalysis
+from snt.analyzers.results_store import ResultsStore
+from snt.analyzers.simulation_prefilter import SimulationPrefilter, analyzer_filenames
 from idmtools.core.platform_factory import Platform
 
 if __name__ == "__main__":
@@ -21,7 +28,26 @@ if __name__ == "__main__":
     parser.add_argument("--exp-id", required=True, help="Experiment ID to analyze")
     parser.add_argument("--type", required=True, help="Experiment type: 'to_present' or 'future_projections'")
     parser.add_argument("--name", required=True, help="Experiment name (used for logging and metadata)")
+    parser.add_argument("--results-store", default=None,
+                        help="SQLite results store (see snt.analyzers.results_store) to ingest the outputs into")
+    parser.add_argument("--map-cache-dir", default=None,
+                        help="Directory of cached per-simulation map results; re-runs only map new or changed simulations")
+    parser.add_argument("--download-cache-dir", default=None,
+                        help="Directory of cached simulation output files, shared by analyses of the same experiments")
+    parser.add_argument("--no-prefilter", action="store_true",
+                        help="Analyze without first skipping failed simulations and simulations missing output files")
+    parser.add_argument("--status-cache-dir", default=None,
+                        help="Directory of cached simulation output listings used by the prefilter")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Analyze simulations as they succeed while the experiment runs (needs --map-cache-dir)")
+    parser.add_argument("--poll-interval", type=int, default=300,
+                        help="Seconds between checks of the simulation states with --incremental")
+    parser.add_argument("--ready-flag", default=None,
+                        help="With --incremental, flag file enqueueing the experiment for the analyzer queue manager "
+                             "if the incremental analysis fails")
     args = parser.parse_args()
+    if args.incremental and not args.map_cache_dir:
+        parser.error("--incremental needs --map-cache-dir to keep the map results between passes")
 
     exp_id = args.exp_id
     expt_name = args.name
@@ -96,9 +122,47 @@ if __name__ == "__main__":
                 MonthlyNewInfectionsAnalyzer_withU5(**args_new_infect_withU5)
             ]
 
-        manager = AnalyzeManager(
-            ids=[(exp_id, ItemType.EXPERIMENT)],
-            analyzers=analyzers,
-            max_workers=10
-        )
-        manager.analyze()
+        if args.download_cache_dir:
+            platform = CachedDownloadPlatform(platform, FileDownloadCache(args.download_cache_dir))
+        if args.incremental:
+            # analyze simulations as they succeed, with provisional outputs in provisional/<expt_name>, until the
+            # experiment finishes
+            incremental = IncrementalAnalysis(platform, exp_id, analyzers, MapResultCache(args.map_cache_dir),
+                                              poll_interval=args.poll_interval, status_cache_dir=args.status_cache_dir,
+                                              max_workers=10)
+            try:
+                incremental.run().write(expt_name)
+            except Exception:
+                if args.ready_flag:
+                    # leave the experiment to the analyzer queue manager, as if analyzed after it finished
+                    os.makedirs(os.path.dirname(args.ready_flag), exist_ok=True)
+                    with open(args.ready_flag, "w") as f:
+                        f.write(f"{exp_id},{expt_name},{exp_type}\n")
+                    print(f"Incremental analysis failed; enqueued experiment for analyzer: {args.ready_flag}")
+                raise
+        else:
+            # bundle the analyzers so each simulation's output files are parsed once
+            bundle = AnalyzerBundle(analyzers)
+            # skip failed simulations and simulations missing output files, instead of stopping the analysis
+            exclude_ids = []
+            if not args.no_prefilter:
+                prefilter = SimulationPrefilter(platform, cache_dir=args.status_cache_dir)
+                prefilter_result = prefilter.check_experiment(exp_id, analyzer_filenames([bundle]))
+                prefilter_result.print_summary()
+                prefilter_result.write(expt_name)
+                exclude_ids = prefilter_result.exclude_ids
+            if args.map_cache_dir:
+                bundle = CachedAnalyzer(bundle, MapResultCache(args.map_cache_dir), namespace=exp_id)
+            manager = AnalyzeManager(
+                platform=platform,
+                ids=[(exp_id, ItemType.EXPERIMENT)],
+                analyzers=[bundle],
+                exclude_ids=exclude_ids,
+                partial_analyze_ok=not args.no_prefilter,
+                max_workers=10
+            )
+            manager.analyze()
+
+    if args.results_store:
+        with ResultsStore(args.results_store) as store:
+            store.ingest(expt_name, expt_name, metadata={'experiment_id': exp_id, 'experiment_type': exp_type})
@@ -2,6 +2,7 @@
 # 1) python post_ssmt.py --exp-id 0c947c48-1764-f011-9f17-b88303912b51 --type "to_present" --name "example_to_present"
 # 2) python post_ssmt.py --exp-id c3b0861e-1764-f011-9f17-b88303912b51 --type "future_projections" --name "example_projection_v3"
 import argparse
+import os
 from datetime import datetime
 
 from idmtools.analysis.platform_anaylsis import PlatformAnalysis
@@ -13,6 +14,13 @@ from snt.analyzers.analyze_helpers import (
     MonthlyNewInfectionsAnalyzer_withU5, monthlyUsageLLIN
 )
 from snt.analyzers.analyze_vector_numbers import VectorNumbersAnalyzer
+from snt.analyzers.analyze_bundle import AnalyzerBundle
+from snt.analyzers.aggregate_outputs import OutputSummaryAnalyzer, TABLE_SUMMARIES, load_admin_population
+from snt.analyzers.burden_adjustments import BurdenAdjustmentAnalyzer
+from snt.analyzers.burden_comparison import BURDEN_FILENAME
+from snt.analyzers.download_cache import CachedDownloadPlatform, FileDownloadCache
+from snt.analyzers.output_files import output_path
+from snt.analyzers.results_store import ResultsStore
 from idmtools.core.platform_factory import Platform
 
 if __name__ == "__main__":
@@ -21,6 +29,10 @@ if __name__ == "__main__":
     parser.add_argument("--exp-id", required=True, help="Experiment ID to analyze")
     parser.add_argument("--type", required=True, help="Experiment type: 'to_present' or 'future_projections'")
     parser.add_argument("--name", required=True, help="Experiment name (used for logging and metadata)")
+    parser.add_argument("--results-store", default=None,
+                        help="SQLite results store (see snt.analyzers.results_store) to ingest the outputs into")
+    parser.add_argument("--download-cache-dir", default=None,
+                        help="Directory of cached output files, so downloads of unchanged outputs are read from disk")
     args = parser.parse_args()
 
     exp_id = args.exp_id
@@ -37,6 +49,16 @@ if __name__ == "__main__":
 
     itn_comparison_flag = False
     climate_only_flag = False
+    output_format = 'csv'  # 'parquet' for smaller, typed outputs (read with snt.analyzers.output_files.read_output)
+    # aggregate_on_server: also summarize the outputs in the work item (annual and cumulative totals by admin and
+    # state, across seeds) and download the summaries; with download_raw_outputs = False, only the summaries are
+    # downloaded (the R scripts that read the per-run csvs then need the raw outputs from elsewhere)
+    aggregate_on_server = False
+    download_raw_outputs = True
+    admin_pop_csv = None  # path to admin_pop_archetype.csv for the state summaries (admin summaries only if None)
+    # arguments of BurdenAdjustmentAnalyzer except expt_name (IPTp coverage and MiP parameters) to also write
+    # malariaBurden_withAdjustments.csv in the work item; no mortality/MiP adjustment if None
+    burden_adjustment_args = None
     wi_name_base = "ssmt_analyzer_"
     wi_name = '%s_%s' % (wi_name_base, expt_name)
 
@@ -54,7 +76,8 @@ if __name__ == "__main__":
             'sweep_variables': sweep_variables,
             'working_dir': '.',
             'start_year': start_year,
-            'end_year': end_year
+            'end_year': end_year,
+            'output_format': output_format
         }
         args_new_infect = {
             **args_each,
@@ -75,32 +98,18 @@ if __name__ == "__main__":
         else:
             args_treat_case = args_each
         if end_year > 2022:
+            # bundle the analyzers so each simulation's output files are parsed once
             analyzers = [
-                monthlyU1PfPRAnalyzer,
-                monthlyU5PfPRAnalyzer,
-                monthlyTreatedCasesAnalyzer,  # sharon note: no ['Received_Treatment', 'Received_Severe_Treatment'], change to 'Received_Vaccine'
-                monthlySevereTreatedByAgeAnalyzer,
-                monthlyUsageLLIN,
-                monthlyEventAnalyzer,
-                MonthlyNewInfectionsAnalyzer,
-                MonthlyNewInfectionsAnalyzer_withU5,
-                VectorNumbersAnalyzer
+                (monthlyU1PfPRAnalyzer, args_each),
+                (monthlyU5PfPRAnalyzer, args_each),
+                (monthlyTreatedCasesAnalyzer, args_treat_case),  # sharon note: no ['Received_Treatment', 'Received_Severe_Treatment'], change to 'Received_Vaccine'
+                (monthlySevereTreatedByAgeAnalyzer, args_each),
+                (monthlyUsageLLIN, args_each),
+                (monthlyEventAnalyzer, args_each),
+                (MonthlyNewInfectionsAnalyzer, args_new_infect),
+                (MonthlyNewInfectionsAnalyzer_withU5, args_new_infect_withU5),
+                (VectorNumbersAnalyzer, args_each)
             ]
-            analysis = PlatformAnalysis(platform=platform,
-                                        experiment_ids=[exp_id],
-                                        analyzers=analyzers,
-                                        analyzers_args=[
-                                            args_each,
-                                            args_each,
-                                            args_treat_case,
-                                            args_each,
-                                            args_each,
-                                            args_each,
-                                            args_new_infect,
-                                            args_new_infect_withU5,
-                                            args_each
-                                        ],
-                                        analysis_name=wi_name)
             download_filenames = [
                 f"{expt_name}/U1_PfPR_ClinicalIncidence.csv",
                 f"{expt_name}/U5_PfPR_ClinicalIncidence.csv",
@@ -115,29 +124,19 @@ if __name__ == "__main__":
                 f"{expt_name}/vector_numbers_monthly.csv"
             ]
             local_output_path = "ssmt_{}".format(expt_name)
+            if burden_adjustment_args is not None:
+                # listed after the analyzers whose outputs it adjusts
+                analyzers.append((BurdenAdjustmentAnalyzer, {**burden_adjustment_args, 'expt_name': expt_name}))
         else:
             analyzers = [
-                monthlyU5PfPRAnalyzer,
-                # monthlyTreatedCasesAnalyzer,  # sharon note: no Received_Treatment
-                # monthlySevereTreatedByAgeAnalyzer,
-                # monthlyUsageLLIN,   # sharon note: no Bednet_Using
-                monthlyEventAnalyzer,
-                MonthlyNewInfectionsAnalyzer,
-                MonthlyNewInfectionsAnalyzer_withU5
+                (monthlyU5PfPRAnalyzer, args_each),
+                # (monthlyTreatedCasesAnalyzer, args_treat_case),  # sharon note: no Received_Treatment
+                # (monthlySevereTreatedByAgeAnalyzer, args_no_u1),
+                # (monthlyUsageLLIN, args_each),   # sharon note: no Bednet_Using
+                (monthlyEventAnalyzer, args_each),
+                (MonthlyNewInfectionsAnalyzer, args_new_infect),
+                (MonthlyNewInfectionsAnalyzer_withU5, args_new_infect_withU5)
             ]
-            analysis = PlatformAnalysis(platform=platform,
-                                        experiment_ids=[exp_id],
-                                        analyzers=analyzers,
-                                        analyzers_args=[
-                                            args_each,
-                                            #args_treat_case,
-                                            #args_no_u1,
-                                            # args_each,
-                                            args_each,
-                                            args_new_infect,
-                                            args_new_infect_withU5,
-                                        ],
-                                        analysis_name=wi_name)
             download_filenames = [
                 f"{expt_name}/U5_PfPR_ClinicalIncidence.csv",
                 #f"{expt_name}/All_Age_monthly_Cases.csv",
@@ -149,7 +148,38 @@ if __name__ == "__main__":
                 f"{expt_name}/newInfections_PfPR_cases_monthly_byAgeGroup_withU5.csv"
             ]
             local_output_path = "ssmt_{}".format(expt_name)
+        if aggregate_on_server:
+            args_summary = {
+                'expt_name': expt_name,
+                'sweep_variables': sweep_variables,
+                'start_year': start_year,
+                'end_year': end_year,
+                'tables': [fname.split('/')[-1] for fname in download_filenames
+                           if fname.split('/')[-1] in TABLE_SUMMARIES],
+                'admin_pop': load_admin_population(admin_pop_csv) if admin_pop_csv else None
+            }
+            # listed last, so it summarizes the outputs written by the other analyzers' reduce
+            analyzers.append((OutputSummaryAnalyzer, args_summary))
+            summary_filenames = OutputSummaryAnalyzer(**args_summary).summary_filenames()
+        download_filenames = [output_path(fname, output_format) for fname in download_filenames]
+        if aggregate_on_server:
+            download_filenames = summary_filenames + (download_filenames if download_raw_outputs else [])
+        if burden_adjustment_args is not None and end_year > 2022:
+            download_filenames.append(f"{expt_name}/{BURDEN_FILENAME}")
+        analysis = PlatformAnalysis(platform=platform,
+                                    experiment_ids=[exp_id],
+                                    analyzers=[AnalyzerBundle],
+                                    analyzers_args=[{'analyzers': analyzers}],
+                                    analysis_name=wi_name)
         analysis.analyze()
         wi = analysis.get_work_item()
         #wi = platform.get_item("f3e00bd4-5d64-f011-9f17-b88303912b51", item_type=ItemType.WORKFLOW_ITEM)  #local debug download
-        platform.get_files_by_id(wi.id, ItemType.WORKFLOW_ITEM, download_filenames, local_output_path)
+        download_platform = platform
+        if args.download_cache_dir:
+            download_platform = CachedDownloadPlatform(platform, FileDownloadCache(args.download_cache_dir))
+        download_platform.get_files_by_id(wi.id, ItemType.WORKFLOW_ITEM, download_filenames, local_output_path)
+
+    if args.results_store:
+        with ResultsStore(args.results_store) as store:
+            store.ingest(expt_name, os.path.join(local_output_path, expt_name),
+                         metadata={'experiment_id': exp_id, 'experiment_type': exp_type})
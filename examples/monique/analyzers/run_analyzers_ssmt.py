@@ -1,9 +1,11 @@
+import os
 from idmtools.core.platform_factory import Platform
-from idmtools.analysis.platform_anaylsis import PlatformAnalysis
 from snt.analyzers.analyze_helpers import monthlyU1PfPRAnalyzer, monthlyU5PfPRAnalyzer, monthlyTreatedCasesAnalyzer, \
     monthlySevereTreatedByAgeAnalyzer, MonthlyNewInfectionsAnalyzer, monthlyEventAnalyzer, \
     MonthlyNewInfectionsAnalyzer_withU5, monthlyUsageLLIN
 from snt.analyzers.analyze_vector_numbers import VectorNumbersAnalyzer
+from snt.analyzers.analysis_runner import AnalysisRunner, ExperimentAnalysis
+from snt.analyzers.simulation_prefilter import SimulationPrefilter, analyzer_filenames
 from snt.utility.comps_functions import get_most_recent_experiment_id_by_name
 
 wi_name_base = "ssmt_analyzer_"
@@ -46,10 +48,17 @@ experiments = {
 
 itn_comparison_flag = False
 climate_only_flag = False
+# check simulation states and output files before submitting each analysis (listings cached in status_cache_dir)
+prefilter_simulations = True
+status_cache_dir = os.path.join(working_dir, 'simulation_status')
+# number of experiments analyzed at a time; the state of each analysis is tracked in analysis_state_file
+max_parallel_analyses = 8
+analysis_state_file = os.path.join(working_dir, 'analysis_state.csv')
 
 if __name__ == "__main__":
 
     platform = Platform('Calculon')
+    prefilter = SimulationPrefilter(platform, cache_dir=status_cache_dir)
 
     if not bool(experiments):
         for ee in range(len(experiment_numbers)):
@@ -80,6 +89,7 @@ if __name__ == "__main__":
             MonthlyNewInfectionsAnalyzer_withU5,
         ]
 
+    analyses = []
     for expt_name, exp_id in experiments.items():
         wi_name = '%s_%s' % (wi_name_base, expt_name)
 
@@ -130,33 +140,41 @@ if __name__ == "__main__":
         else:
             args_treat_case = args_each
         if end_year > 2022:
-            analysis = PlatformAnalysis(platform=platform,
-                                        experiment_ids=[exp_id],
-                                        analyzers=analyzers,
-                                        analyzers_args=[
-                                            args_each,
-                                            args_each,
-                                            args_treat_case,
-                                            args_each,
-                                            args_each,
-                                            args_each,
-                                            args_new_infect,
-                                            args_new_infect_withU5,
-                                            args_each
-                                        ],
-                                        analysis_name=wi_name)
+            analyzers_args = [
+                args_each,
+                args_each,
+                args_treat_case,
+                args_each,
+                args_each,
+                args_each,
+                args_new_infect,
+                args_new_infect_withU5,
+                args_each
+            ]
         else:
-            analysis = PlatformAnalysis(platform=platform,
-                                        experiment_ids=[exp_id],
-                                        analyzers=analyzers,
-                                        analyzers_args=[
-                                            args_each,
-                                            args_treat_case,
-                                            args_no_u1,
-                                            args_each,
-                                            args_each,
-                                            args_new_infect,
-                                            args_new_infect_withU5,
-                                        ],
-                                        analysis_name=wi_name)
-        analysis.analyze()
+            analyzers_args = [
+                args_each,
+                args_treat_case,
+                args_no_u1,
+                args_each,
+                args_each,
+                args_new_infect,
+                args_new_infect_withU5,
+            ]
+
+        # skip failed simulations and simulations missing output files, instead of failing the work item
+        extra_args = None
+        if prefilter_simulations:
+            filenames = analyzer_filenames([analyzer(**args) for analyzer, args in zip(analyzers, analyzers_args)])
+            prefilter_result = prefilter.check_experiment(exp_id, filenames)
+            print('%s:' % expt_name)
+            prefilter_result.print_summary()
+            prefilter_result.write(os.path.join(working_dir, expt_name))
+            extra_args = {'exclude_ids': prefilter_result.exclude_ids, 'partial_analyze_ok': True}
+
+        analyses.append(ExperimentAnalysis(expt_name, exp_id, list(zip(analyzers, analyzers_args)),
+                                           extra_args=extra_args, analysis_name=wi_name))
+
+    # submit the analyses of all experiments, running up to max_parallel_analyses work items at a time
+    runner = AnalysisRunner(platform, max_parallel=max_parallel_analyses, state_file=analysis_state_file)
+    runner.run(analyses)
@@ -10,6 +10,7 @@ from idmtools.builders import SimulationBuilder
 from idmtools.entities.simulation import Simulation
 from emodpy_malaria.reporters.builtin import add_report_event_counter
 from snt.helpers_add_interventions import add_all_interventions
+from snt.intervention_tables import InterventionTable
 from snt.helpers_sim_setup import load_master_csv, habitat_scales, set_up_hfca, get_burnin_exp
 from snt.utility.sweeping import set_param, ItvFn, CfgFn
 
@@ -123,6 +124,10 @@ def get_sweep_builders(**kwargs):
             os.path.join(project_path, 'simulation_inputs', '%s.csv' % scen_df.at[scen_index, 'vacc_filename']))
     else:
         vacc_df = pd.DataFrame()
+    # index the intervention tables by admin and seed once, rather than filtering them for every simulation
+    hs_df, itn_df, itn_anc_df, itn_epi_df, itn_chw_annual_df, irs_df, smc_df, pmc_df, vacc_df = \
+        [InterventionTable(df) for df in [hs_df, itn_df, itn_anc_df, itn_epi_df, itn_chw_annual_df, irs_df, smc_df,
+                                          pmc_df, vacc_df]]
 
     # FOR CONFIGURING ADMINS
     master_df = load_master_csv(project_path=project_path)
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+
+COUNTRY = 'country'  # roll-up level combining all admins
+
+
+class AdminRollup:
+    """
+    Rescale analyzer outputs from the simulated to the true admin population (admin_pop_archetype.csv) and roll admins
+    up to states, other groupings of admins (e.g., Archetype), and the country. The admin index, true population
+    vector, and group codes of each admin are set up once; each output is then matched to them by converting its
+    admin_name column to integer positions, and aggregated with np.bincount instead of merges and group-bys on names.
+    """
+
+    def __init__(self, admin_pop, levels=('State',)):
+        """
+        Args:
+            admin_pop: data frame with admin_name, pop_size, and a column for each level (e.g., from
+                load_admin_population)
+            levels: columns of admin_pop grouping admins; the admin and country levels are always available
+        """
+        admin_pop = admin_pop.drop_duplicates('admin_name').reset_index(drop=True)
+        self.admins = pd.Index(admin_pop['admin_name'])
+        self.pop_size = admin_pop['pop_size'].to_numpy(dtype=np.float64)
+        # level -> (group labels, group position of each admin)
+        self.groups = {'admin_name': (list(self.admins), np.arange(len(self.admins))),
+                       COUNTRY: ([COUNTRY], np.zeros(len(self.admins), dtype=np.int64))}
+        for level in levels:
+            codes, labels = pd.factorize(admin_pop[level], sort=True)
+            self.groups[level] = (list(labels), codes)
+
+    @property
+    def levels(self):
+        return list(self.groups)
+
+    def mapping(self, level):
+        """
+        Group of each admin at a level, as a dict (e.g., for LabeledArray.rollup).
+        """
+        labels, codes = self.groups[level]
+        return {admin: labels[code] for admin, code in zip(self.admins, codes)}
+
+    def admin_index(self, admin_names):
+        """
+        Position of each admin name in admin_pop, or -1 for admins not in admin_pop. Names are matched once per
+        distinct name rather than once per row.
+        """
+        names = pd.Categorical(admin_names)
+        positions = self.admins.get_indexer(names.categories)
+        return np.where(names.codes >= 0, positions[names.codes], -1)
+
+    def scale_vector(self, sim_population):
+        """
+        Factor rescaling each admin from its simulated to its true population.
+        Args:
+            sim_population: simulated population of every admin (e.g., the population_size of the simulations), or a
+                mapping/Series of admin_name -> simulated population
+
+        Returns:
+            array aligned with the admins of admin_pop (NaN for admins without a simulated population)
+        """
+        if np.isscalar(sim_population):
+            return self.pop_size / sim_population
+        sim_population = pd.Series(sim_population, dtype=np.float64)
+        return self.pop_size / sim_population.reindex(self.admins).to_numpy()
+
+    def row_scale(self, adf, sim_population, admin_index=None):
+        """
+        Factor rescaling each row of an output to the true population of its admin.
+        Args:
+            adf: analyzer output with an admin_name column
+            sim_population: name of a column of adf with the simulated population of each row (e.g., 'Statistical
+                Population'), a numpy array of it aligned with the rows, or a per-admin value as in scale_vector
+            admin_index: admin_index of adf's rows, if already computed
+
+        Returns:
+            array aligned with the rows of adf (NaN for admins not in admin_pop)
+        """
+        if admin_index is None:
+            admin_index = self.admin_index(adf['admin_name'])
+        valid = admin_index >= 0
+        scale = np.full(len(adf), np.nan)
+        if isinstance(sim_population, (str, np.ndarray)):
+            sim_values = adf[sim_population] if isinstance(sim_population, str) else sim_population
+            sim_values = np.asarray(sim_values, dtype=np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scale[valid] = self.pop_size[admin_index[valid]] / sim_values[valid]
+        else:
+            scale[valid] = self.scale_vector(sim_population)[admin_index[valid]]
+        return scale
+
+    def rescale(self, adf, columns, sim_population):
+        """
+        Copy of an output with the given count (or population) columns rescaled to the true admin populations. Rows
+        of admins not in admin_pop are dropped.
+        """
+        admin_index = self.admin_index(adf['admin_name'])
+        scale = self.row_scale(adf, sim_population, admin_index)
+        adf = adf[admin_index >= 0].copy()
+        scale = scale[admin_index >= 0]
+        for col in columns:
+            adf[col] = adf[col].to_numpy(dtype=np.float64) * scale
+        return adf
+
+    def rollup(self, adf, level, by=(), counts=(), population=None, rates=(), sim_population=None, admin_index=None):
+        """
+        Combine the rows of an output within each group of admins at a level and each combination of the by columns:
+        counts and the population column are summed, rates are averaged weighted by the population column (unweighted
+        without one). With sim_population, counts, population, and rate weights are first rescaled to the true admin
+        populations (see row_scale). Rows of admins not in admin_pop are left out.
+        Args:
+            adf: analyzer output with an admin_name column
+            level: 'admin_name', COUNTRY, or one of the levels given to the constructor
+            by: other columns to group by (e.g., Run_Number, year, month, AgeGroup)
+            counts: columns summed
+            population: population column, or None
+            rates: columns averaged
+            sim_population: simulated population for rescaling (see row_scale), or None to keep simulated numbers
+            admin_index: admin_index of adf's rows, if already computed
+
+        Returns:
+            data frame with the level's column (except for COUNTRY), the by columns, and the value columns
+        """
+        by = list(by)
+        counts = list(counts)
+        rates = list(rates)
+        if admin_index is None:
+            admin_index = self.admin_index(adf['admin_name'])
+        valid = admin_index >= 0
+        labels, admin_groups = self.groups[level]
+        scale = self.row_scale(adf, sim_population, admin_index)[valid] if sim_population is not None else None
+
+        # compact integer key of each (group, by columns) combination
+        key_codes = [admin_groups[admin_index[valid]]]
+        key_labels = [np.asarray(labels, dtype=object)]
+        for col in by:
+            codes, uniques = pd.factorize(adf[col].to_numpy()[valid], sort=True, use_na_sentinel=False)
+            key_codes.append(codes)
+            key_labels.append(np.asarray(uniques))
+        shape = tuple(len(x) for x in key_labels)
+        flat = np.ravel_multi_index(key_codes, shape)
+        if np.prod(shape) <= 4 * len(flat):
+            # few possible combinations: index the ones present directly instead of sorting the keys
+            present = np.bincount(flat, minlength=np.prod(shape)) > 0
+            flat_keys = np.flatnonzero(present)
+            inverse = (np.cumsum(present) - 1)[flat]
+        else:
+            flat_keys, inverse = np.unique(flat, return_inverse=True)
+            inverse = inverse.reshape(-1)
+
+        def total(values):
+            # missing values are skipped, as in a group-by sum
+            return np.bincount(inverse, weights=np.where(np.isnan(values), 0, values), minlength=len(flat_keys))
+
+        def values_of(col):
+            values = adf[col].to_numpy(dtype=np.float64)[valid]
+            return values * scale if scale is not None else values
+
+        result = {}
+        for level_col, codes, col_labels in zip([level] + by, np.unravel_index(flat_keys, shape), key_labels):
+            if level_col != COUNTRY:
+                result[level_col] = col_labels[codes]
+        for col in counts:
+            result[col] = total(values_of(col))
+        weights = values_of(population) if population else np.ones(valid.sum())
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight_totals = total(weights)
+            for col in rates:
+                result[col] = total(adf[col].to_numpy(dtype=np.float64)[valid] * weights) / weight_totals
+        if population:
+            result[population] = weight_totals
+        return pd.DataFrame(result)
+
+    def rollup_levels(self, adf, levels=('admin_name', 'State', COUNTRY), **kwargs):
+        """
+        Roll an output up to several levels at once (e.g., admin -> state -> country), sharing the arguments of
+        rollup.
+
+        Returns:
+            dict of level -> data frame
+        """
+        admin_index = self.admin_index(adf['admin_name'])
+        return {level: self.rollup(adf, level, admin_index=admin_index, **kwargs) for level in levels}
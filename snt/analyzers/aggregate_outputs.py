@@ -0,0 +1,305 @@
+import os
+import numpy as np
+import pandas as pd
+from idmtools.entities import IAnalyzer
+from snt.analyzers.admin_rollup import AdminRollup, COUNTRY
+from snt.analyzers.output_files import read_output, write_output
+
+# how the columns of each analyzer output are combined over months, admins, and seeds:
+#   counts: summed over months and over admins (rescaled to the admin population)
+#   population: averaged over months, summed over admins (rescaled to the admin population)
+#   rates: averaged over months and admins, weighted by the population column (unweighted without one)
+# counts=None takes every column that is not a sweep variable, AgeGroup, year, month, or date.
+TABLE_SUMMARIES = {
+    'U1_PfPR_ClinicalIncidence.csv': {'counts': [], 'population': 'Pop U1',
+                                      'rates': ['PfPR U1', 'Cases U1', 'Severe cases U1']},
+    'U5_PfPR_ClinicalIncidence.csv': {'counts': [], 'population': 'Pop U5',
+                                      'rates': ['PfPR U5', 'Cases U5', 'Severe cases U5']},
+    'All_Age_monthly_Cases.csv': {'counts': None, 'population': 'Statistical Population',
+                                  'rates': ['PfHRP2 Prevalence']},
+    'monthly_Event_Count.csv': {'counts': None, 'population': None, 'rates': []},
+    'newInfections_PfPR_cases_monthly_byAgeGroup.csv': {'counts': ['New Infections', 'Clinical cases',
+                                                                   'Severe cases'],
+                                                        'population': 'Pop', 'rates': ['PfPR']},
+    'newInfections_PfPR_cases_monthly_byAgeGroup_withU5.csv': {'counts': ['New Infections', 'Clinical cases',
+                                                                          'Severe cases'],
+                                                               'population': 'Pop', 'rates': ['PfPR']},
+}
+# simulated all-age population used to rescale each admin to its true population (summed over age groups)
+POPULATION_TABLE = ('newInfections_PfPR_cases_monthly_byAgeGroup.csv', 'Pop')
+DEFAULT_QUANTILES = (0.025, 0.25, 0.75, 0.975)
+SUMMARY_DIR = 'summaries'
+PERIODS = ('annual', 'cumulative')
+LEVELS = ('admin', 'state')
+# AdminRollup level and filename suffix of each summary level ('state' and 'country' need the admin populations)
+LEVEL_ROLLUPS = {'admin': ('admin_name', 'Admin'), 'state': ('State', 'State'), 'country': (COUNTRY, 'Country')}
+
+
+def load_admin_population(path, pop_column='pop_size', state_column='State', extra_columns=()):
+    """
+    Read the admin populations and states from admin_pop_archetype.csv, with admin names normalized as in
+    load_master_csv.
+    Args:
+        path: path of admin_pop_archetype.csv
+        pop_column: column with the true admin population
+        state_column: column with the state of each admin
+        extra_columns: other columns to keep, e.g., ['Archetype'] to roll admins up by archetype (see AdminRollup)
+
+    Returns:
+        data frame with columns admin_name, State, and pop_size (and extra_columns)
+    """
+    adf = pd.read_csv(path, encoding='latin')
+    adf['admin_name'] = adf['admin_name'].str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
+    adf = adf[['admin_name', state_column, pop_column] + list(extra_columns)]
+    return adf.rename(columns={state_column: 'State', pop_column: 'pop_size'})
+
+
+def summary_filename(table, period, level, start_year=None, end_year=None):
+    """
+    Name of a summary of an analyzer output, e.g., ('U5_PfPR_ClinicalIncidence.csv', 'cumulative', 'state', 2022,
+    2029) -> 'U5_PfPR_ClinicalIncidence_cumulative_2022_2029_byState.csv'.
+    """
+    base = os.path.splitext(table)[0]
+    if period == 'cumulative':
+        base = '%s_cumulative_%d_%d' % (base, start_year, end_year)
+    else:
+        base = '%s_annual' % base
+    return '%s_by%s.csv' % (base, LEVEL_ROLLUPS[level][1])
+
+
+def with_year_month(adf):
+    """
+    Add year and month columns from the date column of outputs that only have a date (e.g., monthly_Event_Count).
+    """
+    if 'year' not in adf.columns and 'date' in adf.columns:
+        dates = pd.to_datetime(adf['date'])
+        adf = adf.assign(year=dates.dt.year, month=dates.dt.month)
+    return adf
+
+
+def table_columns(adf, spec, id_columns):
+    """
+    Get the (counts, population, rates) columns of an output from its entry in TABLE_SUMMARIES, keeping only the
+    columns present in adf.
+    """
+    population = spec.get('population')
+    if population not in adf.columns:
+        population = None
+    rates = [col for col in spec.get('rates', []) if col in adf.columns]
+    if spec.get('counts') is None:
+        excluded = set(id_columns) | {'year', 'month', 'date', population} | set(rates)
+        counts = [col for col in adf.columns if col not in excluded and pd.api.types.is_numeric_dtype(adf[col])]
+    else:
+        counts = [col for col in spec['counts'] if col in adf.columns]
+    return counts, population, rates
+
+
+def combine_rows(adf, by, counts, population, rates, scale=None):
+    """
+    Combine rows within groups: counts are summed, rates are averaged weighted by the population column, and the
+    population column is averaged (over time; scale=None) or summed after multiplying by scale (over admins, where
+    scale rescales each row to the true population and also applies to the counts and rate weights).
+    """
+    adf = adf[by + counts + ([population] if population else []) + rates].copy()
+    if scale is not None:
+        for col in counts + ([population] if population else []):
+            adf[col] = adf[col] * scale
+    if population:
+        weights = adf[population].to_numpy(dtype=np.float64)
+        for col in rates:
+            adf[col] = adf[col] * weights
+        adf['_weight'] = weights
+    else:
+        adf['_weight'] = 1.0
+    grouped = adf.groupby(by, sort=True, observed=True)
+    result = grouped[counts + rates + ['_weight']].sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for col in rates:
+            result[col] = result[col] / result['_weight']
+    if population:
+        result[population] = grouped[population].sum() if scale is not None else grouped[population].mean()
+    return result.drop(columns='_weight').reset_index()
+
+
+def across_runs(adf, value_columns, quantiles=DEFAULT_QUANTILES):
+    """
+    Mean, median, and quantiles of each value column across Run_Number, within each combination of the other
+    columns. Output columns are named <column>_mean, <column>_median, and <column>_q<percent> (e.g., _q2.5). Without
+    other columns (e.g., a cumulative country total), the result is a single row over all runs.
+    """
+    by = [col for col in adf.columns if col not in value_columns and col != 'Run_Number']
+    # statistics of each group, or of the whole frame (one value per column) when there is nothing to group by
+    grouped = adf.groupby(by, sort=True, observed=True)[value_columns] if by else adf[value_columns]
+    summaries = [grouped.mean().add_suffix('_mean'), grouped.median().add_suffix('_median')]
+    for q in quantiles:
+        summaries.append(grouped.quantile(q).add_suffix('_q%g' % (100 * q)))
+    result = pd.concat(summaries, axis=1) if by else pd.concat(summaries).to_frame().T
+    # interleave the statistics of each column
+    ordered = [col + suffix for col in value_columns
+               for suffix in ['_mean', '_median'] + ['_q%g' % (100 * q) for q in quantiles]]
+    return result[ordered].reset_index(drop=not by)
+
+
+def summarize_output(adf, spec, sweep_variables, start_year, end_year, periods=PERIODS, levels=LEVELS,
+                     sim_pop=None, admin_pop=None, seed_summary=True, quantiles=DEFAULT_QUANTILES):
+    """
+    Summarize one analyzer output over months (annual and/or cumulative totals), optionally roll admins up to
+    states, and summarize across seeds.
+    Args:
+        adf: analyzer output data frame
+        spec: entry of TABLE_SUMMARIES
+        sweep_variables: sweep variables of the output (including Run_Number and admin_name)
+        start_year: first year of the cumulative period
+        end_year: last year of the cumulative period
+        periods: 'annual' (by year) and/or 'cumulative' (over start_year to end_year)
+        levels: 'admin', 'state', and/or 'country'
+        sim_pop: data frame from simulated_population, needed for the state and country levels
+        admin_pop: data frame from load_admin_population, or an AdminRollup of it, needed for the state and country
+            levels
+        seed_summary: whether to summarize across Run_Number (otherwise one row per seed is kept)
+        quantiles: quantiles across seeds
+
+    Returns:
+        dict of (period, level) -> summary data frame
+    """
+    adf = with_year_month(adf)
+    sweep_variables = [col for col in sweep_variables if col in adf.columns]
+    id_columns = sweep_variables + (['AgeGroup'] if 'AgeGroup' in adf.columns else [])
+    counts, population, rates = table_columns(adf, spec, id_columns)
+    value_columns = counts + ([population] if population else []) + rates
+
+    if any(level != 'admin' for level in levels) and not isinstance(admin_pop, AdminRollup):
+        admin_pop = AdminRollup(admin_pop)
+
+    summaries = {}
+    for period in periods:
+        if period == 'annual':
+            time_columns = ['year']
+            period_df = adf
+        else:
+            time_columns = []
+            period_df = adf[(adf['year'] >= start_year) & (adf['year'] <= end_year)]
+        # over months, within each admin and seed
+        totals = combine_rows(period_df, id_columns + time_columns, counts, population, rates)
+        for level in levels:
+            if level == 'admin':
+                result = totals
+            else:
+                # rescale each admin and seed by its true over its average simulated population in the period
+                keys = sweep_variables + time_columns
+                period_pop = sim_pop if period == 'annual' else \
+                    sim_pop[(sim_pop['year'] >= start_year) & (sim_pop['year'] <= end_year)]
+                period_pop = period_pop.groupby(keys, observed=True)['sim_pop'].mean().reset_index()
+                totals_pop = totals.merge(period_pop, on=keys, how='left')
+                by = [col for col in id_columns if col != 'admin_name'] + time_columns
+                result = admin_pop.rollup(totals_pop, LEVEL_ROLLUPS[level][0], by=by, counts=counts,
+                                          population=population, rates=rates,
+                                          sim_population=totals_pop['sim_pop'].to_numpy(dtype=np.float64))
+            if seed_summary and 'Run_Number' in result.columns:
+                result = across_runs(result, value_columns, quantiles)
+            summaries[(period, level)] = result
+    return summaries
+
+
+def simulated_population(adf, sweep_variables, population_column):
+    """
+    Simulated all-age population of each admin and seed by year and month, summing population_column over age
+    groups.
+    """
+    adf = with_year_month(adf)
+    by = [col for col in sweep_variables if col in adf.columns] + ['year', 'month']
+    sim_pop = adf.groupby(by, sort=False, observed=True)[population_column].sum().rename('sim_pop')
+    return sim_pop.reset_index()
+
+
+class OutputSummaryAnalyzer(IAnalyzer):
+    """
+    Aggregation stage for the outputs of the other analyzers in an AnalyzerBundle: listed last in the bundle, it
+    reads the outputs written by the earlier reduces and writes small summary tables (annual and cumulative totals,
+    by admin and rolled up to states, summarized across seeds) into <expt_name>/summaries. Run inside the
+    PlatformAnalysis work item, only the summaries then need to be downloaded (see summary_filenames). It reads no
+    simulation files.
+    """
+
+    def __init__(self, expt_name, tables=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 admin_pop=None, periods=PERIODS, levels=LEVELS, seed_summary=True, quantiles=DEFAULT_QUANTILES,
+                 population_table=POPULATION_TABLE, table_summaries=None):
+        """
+        Args:
+            expt_name: experiment name (output directory of the other analyzers)
+            tables: output filenames to summarize (default: all in table_summaries); missing outputs are skipped
+            sweep_variables: sweep variables of the outputs
+            working_dir: working directory of the other analyzers
+            start_year: first year of the cumulative period
+            end_year: last year of the cumulative period
+            admin_pop: data frame from load_admin_population (required for the state and country levels). It is
+                passed with the analyzer arguments, so admin_pop_archetype.csv does not need to be on the server.
+            periods: 'annual' and/or 'cumulative'
+            levels: 'admin', 'state', and/or 'country'
+            seed_summary: whether to summarize across seeds (mean, median, quantiles) or keep one row per seed
+            quantiles: quantiles across seeds
+            population_table: (output filename, population column) giving the simulated all-age population
+            table_summaries: column roles of each output (default: TABLE_SUMMARIES)
+        """
+        super(OutputSummaryAnalyzer, self).__init__(working_dir=working_dir, filenames=[])
+        self.expt_name = expt_name
+        self.table_summaries = table_summaries or TABLE_SUMMARIES
+        self.tables = list(tables or self.table_summaries.keys())
+        self.sweep_variables = sweep_variables or ["Run_Number", "admin_name"]
+        self.start_year = start_year
+        self.end_year = end_year
+        self.admin_pop = admin_pop
+        self.periods = list(periods)
+        self.levels = [level for level in levels if level == 'admin' or admin_pop is not None]
+        self.seed_summary = seed_summary
+        self.quantiles = quantiles
+        self.population_table = population_table
+
+    def filter(self, simulation):
+        # nothing to read from the simulations; reduce works on the outputs of the other analyzers
+        return False
+
+    def map(self, data, simulation):
+        return None
+
+    def summary_filenames(self):
+        """
+        Paths (relative to working_dir) of the summary files, e.g., to download them from the work item.
+        """
+        return ['%s/%s/%s' % (self.expt_name, SUMMARY_DIR, summary_filename(table, period, level, self.start_year,
+                                                                           self.end_year))
+                for table in self.tables for period in self.periods for level in self.levels]
+
+    def reduce(self, all_data):
+
+        output_dir = os.path.join(self.working_dir, self.expt_name)
+        summary_dir = os.path.join(output_dir, SUMMARY_DIR)
+        os.makedirs(summary_dir, exist_ok=True)
+
+        sim_pop = None
+        admin_rollup = None
+        levels = self.levels
+        if any(level != 'admin' for level in levels):
+            admin_rollup = AdminRollup(self.admin_pop)
+            population_file, population_column = self.population_table
+            try:
+                sim_pop = simulated_population(read_output(os.path.join(output_dir, population_file)),
+                                               self.sweep_variables, population_column)
+            except FileNotFoundError:
+                print("No %s to rescale admins to their population... Skipping state and country summaries"
+                      % population_file)
+                levels = [level for level in levels if level == 'admin']
+
+        for table in self.tables:
+            try:
+                adf = read_output(os.path.join(output_dir, table))
+            except FileNotFoundError:
+                print("No %s to summarize... Skipping" % table)
+                continue
+            summaries = summarize_output(adf, self.table_summaries[table], self.sweep_variables, self.start_year,
+                                         self.end_year, periods=self.periods, levels=levels, sim_pop=sim_pop,
+                                         admin_pop=admin_rollup, seed_summary=self.seed_summary,
+                                         quantiles=self.quantiles)
+            for (period, level), summary in summaries.items():
+                write_output(summary, os.path.join(summary_dir, summary_filename(table, period, level,
+                                                                                 self.start_year, self.end_year)))
@@ -0,0 +1,235 @@
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import pandas as pd
+from idmtools.analysis.analyze_manager import AnalyzeManager
+from idmtools.analysis.platform_anaylsis import PlatformAnalysis
+from idmtools.core import ItemType
+from snt.analyzers.analyze_bundle import AnalyzerBundle
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DOWNLOADING = 'downloading'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+STATE_COLUMNS = ['name', 'experiment_id', 'state', 'work_item_id', 'submitted', 'finished', 'message']
+
+
+def log(msg):
+    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {msg}")
+
+
+class ExperimentAnalysis:
+    """
+    Analysis of one experiment: the analyzers to run (bundled, see AnalyzerBundle) and the outputs to download.
+    """
+
+    def __init__(self, name, exp_id, analyzers, download_filenames=(), local_output_path=None, extra_args=None,
+                 analysis_name=None):
+        """
+        Args:
+            name: experiment name (unique among the analyses of a run)
+            exp_id: experiment id
+            analyzers: list of (analyzer class, dict of arguments) pairs
+            download_filenames: outputs to download from the SSMT work item, e.g.,
+                '<expt_name>/U5_PfPR_ClinicalIncidence.csv'
+            local_output_path: directory the outputs are downloaded to (default: ssmt_<name>)
+            extra_args: dict of extra AnalyzeManager arguments, e.g., exclude_ids and partial_analyze_ok from
+                SimulationPrefilter
+            analysis_name: name of the SSMT work item (default: ssmt_analyzer_<name>)
+        """
+        self.name = name
+        self.exp_id = str(exp_id)
+        self.analyzers = list(analyzers)
+        self.download_filenames = list(download_filenames)
+        self.local_output_path = local_output_path or 'ssmt_%s' % name
+        self.extra_args = dict(extra_args or {})
+        self.analysis_name = analysis_name or 'ssmt_analyzer_%s' % name
+
+
+class AnalysisRunner:
+    """
+    Analyze several experiments concurrently, at most max_parallel at a time, instead of one after another. Analyzing
+    a suite of scenarios then takes about as long as its slowest experiments rather than the sum of all of them.
+
+    With mode='ssmt', each analysis is submitted as an SSMT work item (PlatformAnalysis without waiting); the work
+    items are polled and the outputs of each are downloaded as soon as it succeeds, while the others keep running.
+    With mode='local', each analysis runs an AnalyzeManager in this process (on its own pool of max_workers map
+    processes).
+
+    The state of each analysis (queued, running, downloading, succeeded, failed) is kept in state_file, written after
+    every change, so progress can be followed while the runner works and a rerun with the same state_file skips the
+    analyses that already succeeded. A failed analysis is recorded and does not stop the others.
+
+    Example:
+        analyses = [ExperimentAnalysis(name, exp_id, [(monthlyU5PfPRAnalyzer, args), ...], download_filenames)
+                    for name, exp_id in experiments.items()]
+        AnalysisRunner(platform, max_parallel=8, state_file='analysis_state.csv').run(analyses)
+    """
+
+    def __init__(self, platform, max_parallel=4, mode='ssmt', poll_interval=30, state_file=None, max_workers=None,
+                 on_complete=None):
+        """
+        Args:
+            platform: idmtools platform
+            max_parallel: largest number of analyses running at a time
+            mode: 'ssmt' or 'local'
+            poll_interval: seconds between checks of the running analyses
+            state_file: csv file of the analysis states, or None to keep them in memory only
+            max_workers: map processes of each analysis (AnalyzeManager max_workers); default from the platform
+            on_complete: optional function called with each ExperimentAnalysis once its outputs are available, e.g.,
+                to ingest them into a ResultsStore
+        """
+        if mode not in ('ssmt', 'local'):
+            raise ValueError("mode must be 'ssmt' or 'local', not %s" % mode)
+        self.platform = platform
+        self.max_parallel = max_parallel
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.on_complete = on_complete
+        self.states = pd.DataFrame(columns=STATE_COLUMNS)
+
+    def _load_states(self):
+        if self.state_file is not None and os.path.exists(self.state_file):
+            states = pd.read_csv(self.state_file, dtype=str, keep_default_na=False)
+            return {row['name']: row for row in states.to_dict('records')}
+        return {}
+
+    def _save_states(self, states, other_states=()):
+        self.states = pd.DataFrame(list(states.values()), columns=STATE_COLUMNS)
+        if self.state_file is None:
+            return
+        # analyses of earlier runs that are not part of this run are kept in the file
+        file_states = pd.DataFrame(list(other_states) + list(states.values()), columns=STATE_COLUMNS)
+        state_dir = os.path.dirname(os.path.abspath(self.state_file))
+        os.makedirs(state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=state_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', newline='') as f:
+            file_states.to_csv(f, index=False)
+        os.replace(tmp_path, self.state_file)
+
+    def _submit(self, analysis):
+        # submit an SSMT work item without waiting for it, and return the work item
+        extra_args = dict(analysis.extra_args)
+        if self.max_workers is not None:
+            extra_args.setdefault('max_workers', self.max_workers)
+        platform_analysis = PlatformAnalysis(platform=self.platform,
+                                             experiment_ids=[analysis.exp_id],
+                                             analyzers=[AnalyzerBundle],
+                                             analyzers_args=[{'analyzers': analysis.analyzers}],
+                                             analysis_name=analysis.analysis_name,
+                                             extra_args=extra_args,
+                                             wait_till_done=False)
+        platform_analysis.analyze()
+        return platform_analysis.get_work_item()
+
+    def _download(self, analysis, work_item):
+        if analysis.download_filenames:
+            self.platform.get_files_by_id(work_item.id, ItemType.WORKFLOW_ITEM, analysis.download_filenames,
+                                          analysis.local_output_path)
+        if self.on_complete is not None:
+            self.on_complete(analysis)
+
+    def _analyze_locally(self, analysis):
+        manager = AnalyzeManager(platform=self.platform,
+                                 ids=[(analysis.exp_id, ItemType.EXPERIMENT)],
+                                 analyzers=[AnalyzerBundle(analysis.analyzers)],
+                                 max_workers=self.max_workers,
+                                 **analysis.extra_args)
+        if not manager.analyze():
+            raise RuntimeError('AnalyzeManager did not complete the analysis of %s' % analysis.name)
+        if self.on_complete is not None:
+            self.on_complete(analysis)
+
+    def run(self, analyses):
+        """
+        Run the analyses and wait until all have succeeded or failed.
+        Args:
+            analyses: list of ExperimentAnalysis
+
+        Returns:
+            data frame of the final state of each analysis (see STATE_COLUMNS)
+        """
+        names = [analysis.name for analysis in analyses]
+        if len(set(names)) != len(names):
+            raise ValueError('Experiment names of the analyses must be unique')
+        previous = self._load_states()
+        other_states = [row for name, row in previous.items() if name not in names]
+        states = {}
+        pending = deque()
+        for analysis in analyses:
+            row = previous.get(analysis.name)
+            if row is not None and row['state'] == SUCCEEDED and row['experiment_id'] == analysis.exp_id:
+                log(f"Skipping {analysis.name}: already analyzed")
+                states[analysis.name] = row
+                continue
+            states[analysis.name] = {'name': analysis.name, 'experiment_id': analysis.exp_id, 'state': QUEUED,
+                                     'work_item_id': '', 'submitted': '', 'finished': '', 'message': ''}
+            pending.append(analysis)
+        self._save_states(states, other_states)
+
+        def set_state(analysis, state, **fields):
+            states[analysis.name].update(state=state, **fields)
+            if state in (SUCCEEDED, FAILED):
+                states[analysis.name]['finished'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self._save_states(states, other_states)
+            log(f"{analysis.name}: {state} {fields.get('message', '')}".rstrip())
+
+        work_items = {}  # name -> (analysis, work item) of the submitted SSMT analyses
+        futures = {}  # future -> analysis of the local analyses and downloads in progress
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+            while pending or work_items or futures:
+                # start analyses up to the parallelism cap
+                while pending and len(work_items) + (len(futures) if self.mode == 'local' else 0) < self.max_parallel:
+                    analysis = pending.popleft()
+                    submitted = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                    if self.mode == 'local':
+                        futures[executor.submit(self._analyze_locally, analysis)] = analysis
+                        set_state(analysis, RUNNING, submitted=submitted)
+                        continue
+                    try:
+                        work_item = self._submit(analysis)
+                    except Exception as e:
+                        set_state(analysis, FAILED, message='submission failed: %s' % e)
+                        continue
+                    work_items[analysis.name] = (analysis, work_item)
+                    set_state(analysis, RUNNING, submitted=submitted, work_item_id=str(work_item.id))
+
+                # download the outputs of the work items that finished
+                for name, (analysis, work_item) in list(work_items.items()):
+                    try:
+                        self.platform.refresh_status(work_item)
+                    except Exception as e:
+                        log(f"{name}: could not refresh the work item status ({e})")
+                        continue
+                    if not work_item.done:
+                        continue
+                    del work_items[name]
+                    if work_item.succeeded:
+                        futures[executor.submit(self._download, analysis, work_item)] = analysis
+                        set_state(analysis, DOWNLOADING)
+                    else:
+                        set_state(analysis, FAILED, message='work item %s' % work_item.status.name.lower())
+
+                # record the local analyses and downloads that finished
+                for future in [future for future in futures if future.done()]:
+                    analysis = futures.pop(future)
+                    if future.exception() is not None:
+                        set_state(analysis, FAILED, message=str(future.exception()))
+                    else:
+                        set_state(analysis, SUCCEEDED)
+
+                if work_items or futures:
+                    if futures:
+                        wait(list(futures), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    else:
+                        time.sleep(self.poll_interval)
+
+        counts = self.states['state'].value_counts()
+        log('Analyses succeeded: %d, failed: %d' % (counts.get(SUCCEEDED, 0), counts.get(FAILED, 0)))
+        return self.states
@@ -0,0 +1,68 @@
+from idmtools.entities import IAnalyzer
+from idmtools.utils.file_parser import FileParser
+
+
+class AnalyzerBundle(IAnalyzer):
+    """
+    Run several analyzers in a single pass over the simulations, so that each output file is downloaded and parsed
+    once per simulation and then shared by every analyzer that needs it.
+
+    The bundle requests the union of the analyzers' filenames. In map, each analyzer receives only its own files
+    (the same parsed objects are shared, so analyzer maps must not modify their input data in place). In reduce,
+    the analyzers are reduced in the order given, so analyzers that read another analyzer's output (e.g.,
+    monthlySevereTreatedByAgeAnalyzer reading the U1/U5 PfPR csvs) should be listed after it.
+
+    If any analyzer reads raw files (parse=False, e.g., to extract selected report channels), the bundle requests raw
+    files and parses each file at most once for the analyzers that need parsed data.
+    """
+
+    def __init__(self, analyzers, working_dir="."):
+        """
+        Args:
+            analyzers: list of analyzer instances or of (analyzer class, dict of arguments) pairs. The pairs form
+                can be passed through PlatformAnalysis, which takes the bundle arguments rather than instances.
+            working_dir: working directory of the bundle; each analyzer keeps its own working_dir
+        """
+        self.analyzers = [analyzer if isinstance(analyzer, IAnalyzer) else analyzer[0](**analyzer[1])
+                          for analyzer in analyzers]
+        filenames = []
+        for analyzer in self.analyzers:
+            filenames.extend([fname for fname in analyzer.filenames if fname not in filenames])
+        super(AnalyzerBundle, self).__init__(working_dir=working_dir, filenames=filenames,
+                                             parse=all(analyzer.parse for analyzer in self.analyzers))
+
+    def initialize(self):
+        for analyzer in self.analyzers:
+            analyzer.initialize()
+
+    def per_group(self, items):
+        # e.g., CachedAnalyzer records the simulations to analyze and their output fingerprints here
+        for analyzer in self.analyzers:
+            analyzer.per_group(items)
+
+    def filter(self, simulation):
+        return any(analyzer.filter(simulation) for analyzer in self.analyzers)
+
+    def map(self, data, simulation):
+        # results keyed by the position of the analyzer in the bundle
+        results = {}
+        parsed = {}
+        for aa, analyzer in enumerate(self.analyzers):
+            if analyzer.filter(simulation):
+                if analyzer.parse and not self.parse:
+                    for fname in analyzer.filenames:
+                        if fname not in parsed:
+                            parsed[fname] = FileParser.parse(fname, data[fname])
+                    analyzer_data = {fname: parsed[fname] for fname in analyzer.filenames}
+                else:
+                    analyzer_data = {fname: data[fname] for fname in analyzer.filenames}
+                results[aa] = analyzer.map(analyzer_data, simulation)
+        return results
+
+    def reduce(self, all_data):
+        for aa, analyzer in enumerate(self.analyzers):
+            analyzer.reduce({sim: results[aa] for sim, results in all_data.items() if aa in results})
+
+    def destroy(self):
+        for analyzer in self.analyzers:
+            analyzer.destroy()
@@ -1,128 +1,84 @@
 import os
 import re
-import datetime
+import json
+import shutil
+import tempfile
+from io import BytesIO
 import pandas as pd
-import numpy as np
 from idmtools.entities import IAnalyzer
-
-
-class combineSimOutputAnalyzer1(IAnalyzer):
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir="."):
-        super(combineSimOutputAnalyzer1, self).__init__(working_dir=working_dir,
-                                                       filenames=["output/U5_PfPR_ClinicalIncidence_severeTreatment.csv",
-                                                                  # "output/U1_PfPR_ClinicalIncidence_severeTreatment.csv",
-                                                                  # "output/newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv",
-                                                                  # "output/All_Age_monthly_Cases.csv"
-                                                                  ]
-                                                       )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-
-
-    def map(self, data, simulation):
-        adf = data[self.filenames[0]]
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                adf[sweep_var] = simulation.tags[sweep_var]
-        return adf
-
-    def reduce(self, all_data):
-
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("No data have been returned... Exiting...")
-            return
-
-        output_dir = os.path.join(self.working_dir, self.expt_name)
-        os.makedirs(output_dir, exist_ok=True)
-
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, re.sub(r"^output/", "", self.filenames[0]))), index=False)
-
-
-class combineSimOutputAnalyzer2(IAnalyzer):
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir="."):
-        super(combineSimOutputAnalyzer2, self).__init__(working_dir=working_dir,
-                                                       filenames=[
-                                                                  "output/U1_PfPR_ClinicalIncidence_severeTreatment.csv"]
-                                                       )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
-
-
-    def map(self, data, simulation):
-        adf = data[self.filenames[0]]
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                adf[sweep_var] = simulation.tags[sweep_var]
-        return adf
-
-    def reduce(self, all_data):
-
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("No data have been returned... Exiting...")
-            return
-
-        output_dir = os.path.join(self.working_dir, self.expt_name)
-        os.makedirs(output_dir, exist_ok=True)
-
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, re.sub(r"^output/", "", self.filenames[0]))), index=False)
-
-
-class combineSimOutputAnalyzer3(IAnalyzer):
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir="."):
-        super(combineSimOutputAnalyzer3, self).__init__(working_dir=working_dir,
-                                                        filenames=[
-                                                            "output/newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv"]
-                                                        )
+from snt.analyzers.output_files import output_path
+from snt.analyzers.analyze_streaming import append_csv, append_parquet
+
+# per-simulation tables written by the on-node post-processing (snt/dtk_post_processing)
+DEFAULT_COMBINE_FILENAMES = ["output/U5_PfPR_ClinicalIncidence_severeTreatment.csv",
+                             "output/U1_PfPR_ClinicalIncidence_severeTreatment.csv",
+                             "output/newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv",
+                             "output/All_Age_monthly_Cases.csv"]
+# dtypes of the key columns of the per-simulation tables; other columns are parsed as numbers
+COMBINE_DTYPES = {'year': 'int64', 'month': 'int64', 'date': 'str', 'AgeGroup': 'category'}
+
+
+def manifest_filenames(manifest):
+    """
+    Get the analyzer filenames of the tables listed in an on-node post-processing manifest
+    (post_processing_manifest.json, as a dict or path), e.g., downloaded from one simulation of the experiment.
+    """
+    if not isinstance(manifest, dict):
+        with open(manifest, 'r') as f:
+            manifest = json.load(f)
+    return ['output/%s' % table['file'] for table in manifest['tables']]
+
+
+def read_sim_table(fname, content, dtypes=None):
+    """
+    Parse a per-simulation csv or Parquet table from its raw contents, with the given dtypes for the columns present.
+    """
+    if fname.endswith('.parquet'):
+        return pd.read_parquet(BytesIO(content))
+    dtypes = COMBINE_DTYPES if dtypes is None else dtypes
+    columns = pd.read_csv(BytesIO(content), nrows=0, skipinitialspace=True).columns
+    return pd.read_csv(BytesIO(content), skipinitialspace=True,
+                       dtype={col: dtype for col, dtype in dtypes.items() if col in columns})
+
+
+class combineSimOutputAnalyzer(IAnalyzer):
+    """
+    Combine per-simulation output tables (e.g., from the on-node post-processing) into one table per file for the
+    experiment, with the simulations' sweep variables added as (categorical) columns. All files are fetched in one
+    pass. In map, each simulation's tables are written to part files on disk, so only their locations are kept in
+    memory; reduce appends the parts into the outputs one simulation at a time.
+    """
+
+    def __init__(self, expt_name, filenames=None, sweep_variables=None, working_dir=".", dtypes=None,
+                 output_format='csv'):
+        super(combineSimOutputAnalyzer, self).__init__(working_dir=working_dir, parse=False,
+                                                       filenames=filenames or DEFAULT_COMBINE_FILENAMES)
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
+        self.dtypes = dtypes
+        self.parts_dir = None
 
-    def map(self, data, simulation):
-        adf = data[self.filenames[0]]
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                adf[sweep_var] = simulation.tags[sweep_var]
-        return adf
-
-    def reduce(self, all_data):
-
-        selected = [data for sim, data in all_data.items()]
-        if len(selected) == 0:
-            print("No data have been returned... Exiting...")
-            return
-
+    def initialize(self):
         output_dir = os.path.join(self.working_dir, self.expt_name)
         os.makedirs(output_dir, exist_ok=True)
-
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, re.sub(r"^output/", "", self.filenames[0]))), index=False)
-
-
-class combineSimOutputAnalyzer4(IAnalyzer):
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir="."):
-        super(combineSimOutputAnalyzer4, self).__init__(working_dir=working_dir,
-                                                        filenames=[
-                                                            # "output/U5_PfPR_ClinicalIncidence_severeTreatment.csv",
-                                                            # "output/U1_PfPR_ClinicalIncidence_severeTreatment.csv",
-                                                            # "output/newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv",
-                                                            "output/All_Age_monthly_Cases.csv"]
-                                                        )
-        self.sweep_variables = sweep_variables or ["Run_Number"]
-        self.expt_name = expt_name
+        self.parts_dir = tempfile.mkdtemp(prefix='combine_parts_', dir=output_dir)
 
     def map(self, data, simulation):
-        adf = data[self.filenames[0]]
-        for sweep_var in self.sweep_variables:
-            if sweep_var in simulation.tags.keys():
-                adf[sweep_var] = simulation.tags[sweep_var]
-        return adf
+        parts = {}
+        for fname in self.filenames:
+            adf = read_sim_table(fname, data[fname], self.dtypes)
+            for sweep_var in self.sweep_variables:
+                if sweep_var in simulation.tags.keys():
+                    adf[sweep_var] = pd.Categorical([simulation.tags[sweep_var]] * len(adf))
+            part_dir = os.path.join(self.parts_dir, str(self.filenames.index(fname)))
+            os.makedirs(part_dir, exist_ok=True)
+            parts[fname] = output_path(os.path.join(part_dir, '%s.csv' % simulation.id), self.output_format)
+            if self.output_format == 'parquet':
+                adf.to_parquet(parts[fname], index=False)
+            else:
+                adf.to_csv(parts[fname], index=False)
+        return parts
 
     def reduce(self, all_data):
 
@@ -134,8 +90,22 @@ class combineSimOutputAnalyzer4(IAnalyzer):
         output_dir = os.path.join(self.working_dir, self.expt_name)
         os.makedirs(output_dir, exist_ok=True)
 
-        adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, re.sub(r"^output/", "", self.filenames[0]))), index=False)
+        writers = {}
+        try:
+            for fname in self.filenames:
+                out_fname = output_path(os.path.join(output_dir, re.sub(r"^output/", "", fname)), self.output_format)
+                if os.path.exists(out_fname):
+                    os.remove(out_fname)
+                for parts in selected:
+                    if self.output_format == 'parquet':
+                        append_parquet(parts[fname], out_fname, writers)
+                    else:
+                        append_csv(parts[fname], out_fname)
+                    os.remove(parts[fname])
+        finally:
+            for writer in writers.values():
+                writer.close()
+        shutil.rmtree(self.parts_dir, ignore_errors=True)
 
 
 if __name__ == "__main__":
@@ -160,18 +130,10 @@ if __name__ == "__main__":
         print('running expt %s' % expname)
 
         analyzers = [
-            combineSimOutputAnalyzer1(expt_name=expname,
-                                  sweep_variables=["Run_Number", "admin_name"],
-                                  working_dir=working_dir),
-            combineSimOutputAnalyzer2(expt_name=expname,
-                                      sweep_variables=["Run_Number", "admin_name"],
-                                      working_dir=working_dir),
-            combineSimOutputAnalyzer3(expt_name=expname,
-                                      sweep_variables=["Run_Number", "admin_name"],
-                                      working_dir=working_dir),
-            combineSimOutputAnalyzer4(expt_name=expname,
-                                      sweep_variables=["Run_Number", "admin_name"],
-                                      working_dir=working_dir),
+            combineSimOutputAnalyzer(expt_name=expname,
+                                     filenames=DEFAULT_COMBINE_FILENAMES,
+                                     sweep_variables=["Run_Number", "admin_name"],
+                                     working_dir=working_dir),
         ]
         am = AnalyzeManager(platform=platform, ids=[(expid, ItemType.EXPERIMENT)], analyzers=analyzers,
                             analyze_failed_items=True)
@@ -1,19 +1,28 @@
 import os
-import datetime
 import pandas as pd
 import numpy as np
 from idmtools.entities import IAnalyzer
+from snt.analyzers.summary_report import parse_summary_reports, get_summary_reports, drop_final_interval, \
+    monthly_counts, sum_bins, pop_weighted_mean, age_group_channels, monthly_frame, monthly_age_group_frame, \
+    AgeGroupAggregator, AGE_GROUPS_WITH_U1U5
+from snt.analyzers.severe_treatment import reconcile_severe_treatment
+from snt.analyzers.sim_calendar import month_start_dates, monthly_channel_frame
+from snt.analyzers.output_files import write_output, read_output
+from snt.analyzers.report_channels import read_report_channels
+from snt.analyzers.event_recorder import count_events_by_month_and_age
 
 
 class monthlyU1PfPRAnalyzer(IAnalyzer):
 
-    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
+    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
         super(monthlyU1PfPRAnalyzer, self).__init__(working_dir=working_dir,
                                                     filenames=["output/MalariaSummaryReport_Monthly%d.json" % x
                                                                for x in range(start_year, end_year)]
                                                     )
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -22,27 +31,18 @@ class monthlyU1PfPRAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year), self.filenames):
-            pop_all = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-            pop = [x[0] for x in pop_all]
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-            pfpr = [x[0] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]
-            pfpr_rdt = [x[0] for x in d]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-            clinical_cases = [d[yy][0] * pop_all[yy][0] * 30 / 365 for yy in range(12)]
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-            severe_cases = [d[yy][0] * pop_all[yy][0] * 30 / 365 for yy in range(12)]
-
-            simdata = pd.DataFrame({'month': range(1, 13),
-                                    'PfPR U1': pfpr,
-                                    'PfPR RDT U1': pfpr_rdt,
-                                    'Cases U1': clinical_cases,
-                                    'Severe cases U1': severe_cases,
-                                    'Pop U1': pop})
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
+        arrays = parse_summary_reports(get_summary_reports(data, self.filenames),
+                                       ['Average Population by Age Bin', 'PfPR by Age Bin', 'PfPR by Age Bin-HRP2',
+                                        'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin'])
+        pop = drop_final_interval(arrays['Average Population by Age Bin'])
+        adf = monthly_frame({'PfPR U1': drop_final_interval(arrays['PfPR by Age Bin'])[..., 0],
+                             'PfPR RDT U1': drop_final_interval(arrays['PfPR by Age Bin-HRP2'])[..., 0],
+                             'Cases U1': monthly_counts(drop_final_interval(
+                                 arrays['Annual Clinical Incidence by Age Bin']), pop)[..., 0],
+                             'Severe cases U1': monthly_counts(drop_final_interval(
+                                 arrays['Annual Severe Incidence by Age Bin']), pop)[..., 0],
+                             'Pop U1': pop[..., 0]},
+                            years=range(self.start_year, self.end_year))
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -60,18 +60,21 @@ class monthlyU1PfPRAnalyzer(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, 'U1_PfPR_ClinicalIncidence.csv')), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'U1_PfPR_ClinicalIncidence.csv'),
+                     self.output_format)
 
 
 class monthlyU5PfPRAnalyzer(IAnalyzer):
 
-    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
+    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
         super(monthlyU5PfPRAnalyzer, self).__init__(working_dir=working_dir,
                                                     filenames=["output/MalariaSummaryReport_Monthly%d.json" % x
                                                                for x in range(start_year, end_year + 1)]
                                                     )
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -80,35 +83,21 @@ class monthlyU5PfPRAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year + 1), self.filenames):
-            # use weighted average for combined age groups
-            # population size
-            pop_all = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-            pop = [sum(x[:2]) for x in pop_all]
-            # PfPR
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-            pfpr = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) / (pop_all[yy][0] + pop_all[yy][1]) for yy in range(12)]
-            # RDT PfPR
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]  # remove final five days: assume final five days have same average as rest of month
-            pfpr_rdt = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) / (pop_all[yy][0] + pop_all[yy][1]) for yy in range(12)]
-            # clinical cases
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-            # adjust the per-person annualized number (the reported value) to get the total number of clinical cases in that age group in a month
-            clinical_cases = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) * 30 / 365 for yy in range(12)]
-            # severe cases
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-            # adjust the per-person annualized number (the reported value) to get the total number of severe cases in that age group in a month
-            severe_cases = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) * 30 / 365 for yy in range(12)]
-
-            simdata = pd.DataFrame({'month': range(1, 13),
-                                    'PfPR U5': pfpr,
-                                    'PfPR RDT U5': pfpr_rdt,
-                                    'Cases U5': clinical_cases,
-                                    'Severe cases U5': severe_cases,
-                                    'Pop U5': pop})
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
+        arrays = parse_summary_reports(get_summary_reports(data, self.filenames),
+                                       ['Average Population by Age Bin', 'PfPR by Age Bin', 'PfPR by Age Bin-HRP2',
+                                        'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin'])
+        # use weighted average for combined age groups
+        u5_bins = [0, 1]
+        pop = drop_final_interval(arrays['Average Population by Age Bin'])
+        adf = monthly_frame({'PfPR U5': pop_weighted_mean(drop_final_interval(arrays['PfPR by Age Bin']), pop, u5_bins),
+                             'PfPR RDT U5': pop_weighted_mean(drop_final_interval(arrays['PfPR by Age Bin-HRP2']), pop,
+                                                              u5_bins),
+                             'Cases U5': sum_bins(monthly_counts(drop_final_interval(
+                                 arrays['Annual Clinical Incidence by Age Bin']), pop), u5_bins),
+                             'Severe cases U5': sum_bins(monthly_counts(drop_final_interval(
+                                 arrays['Annual Severe Incidence by Age Bin']), pop), u5_bins),
+                             'Pop U5': sum_bins(pop, u5_bins)},
+                            years=range(self.start_year, self.end_year + 1))
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -126,7 +115,8 @@ class monthlyU5PfPRAnalyzer(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, 'U5_PfPR_ClinicalIncidence.csv')), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'U5_PfPR_ClinicalIncidence.csv'),
+                     self.output_format)
 
 
 
@@ -134,15 +124,9 @@ class monthlyU5PfPRAnalyzer(IAnalyzer):
 
 class monthlyTreatedCasesAnalyzer(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
-        super(monthlyTreatedCasesAnalyzer, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
+        super(monthlyTreatedCasesAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                           filenames=["output/ReportEventCounter.json",
                                                                      "output/ReportMalariaFiltered.json"]
                                                           )
@@ -153,6 +137,7 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
             self.channels = channels
         self.inset_channels = ['Statistical Population', 'New Clinical Cases', 'New Severe Cases', 'PfHRP2 Prevalence']
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -162,24 +147,16 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        channels_in_expt = [x for x in self.channels if x in data[self.filenames[0]]['Channels'].keys()]
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in channels_in_expt})
-        simdata['Time'] = simdata.index
-
-        d = pd.DataFrame({x: data[self.filenames[1]]['Channels'][x]['Data'] for x in self.inset_channels})
-        d['Time'] = d.index
-
-        if len(channels_in_expt) > 0:
-            simdata = pd.merge(left=simdata, right=d, on='Time')
-        else:
-            simdata = d
+        channel_data = read_report_channels(data[self.filenames[0]], self.channels, missing_ok=True)
+        channels_in_expt = [x for x in self.channels if x in channel_data]
+        channel_data.update(read_report_channels(data[self.filenames[1]], self.inset_channels))
+        # reduce daily values to monthly sums and means (matching the aggregation in reduce)
+        simdata = monthly_channel_frame(channel_data, self.start_year,
+                                        sum_channels=channels_in_expt + ['New Clinical Cases', 'New Severe Cases'],
+                                        mean_channels=['Statistical Population', 'PfHRP2 Prevalence'])
         for missing_channel in [x for x in self.channels if x not in channels_in_expt]:
             simdata[missing_channel] = 0
 
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
-
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
                 simdata[sweep_var] = simulation.tags[sweep_var]
@@ -196,7 +173,7 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf['date'] = adf.apply(lambda x: datetime.date(x['year'], x['month'], 1), axis=1)
+        adf['date'] = month_start_dates(adf['year'], adf['month'])
 
         sum_channels = self.channels + ['New Clinical Cases', 'New Severe Cases']
         mean_channels = ['Statistical Population', 'PfHRP2 Prevalence']
@@ -207,7 +184,8 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
         adf = pd.merge(left=pdf, right=df, on=['admin_name', 'date', 'Run_Number'])
         output_dir = os.path.join(self.working_dir, self.expt_name)
         os.makedirs(output_dir, exist_ok=True)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'All_Age_monthly_Cases.csv'), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'All_Age_monthly_Cases.csv'),
+                     self.output_format)
 
 
 
@@ -337,23 +315,17 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
 
 class monthlySevereTreatedByAgeAnalyzer(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
     def __init__(self, expt_name, event_name='Received_Severe_Treatment', agebins=None,
-                 sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
+                 sweep_variables=None, working_dir=".", start_year=2020, end_year=2026, output_format='csv'):
 
-        super(monthlySevereTreatedByAgeAnalyzer, self).__init__(working_dir=working_dir,
+        super(monthlySevereTreatedByAgeAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                                 filenames=["output/ReportEventRecorder.csv"]
                                                                 )
         self.sweep_variables = sweep_variables or ["admin_name", "Run_Number"]
         self.event_name = event_name
         self.agebins = agebins or [1, 5, 200]
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -362,45 +334,26 @@ class monthlySevereTreatedByAgeAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        output_data = data[self.filenames[0]]
-        output_data = output_data[output_data['Event_Name'] == self.event_name]
-
-        simdata = pd.DataFrame()
-        if len(output_data) > 0:  # there are events of this type
-            # output_data['Day'] = output_data['Time'] % 365
-            # output_data['month'] = output_data['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-            # output_data['year'] = output_data['Time'].apply(lambda x: int(x / 365) + self.start_year)
-            # output_data['age in years'] = output_data['Age'] / 365
-            output_data = output_data.copy()  # ensure it's not a view
-
-            output_data.loc[:, 'Day'] = output_data['Time'] % 365
-            output_data.loc[:, 'month'] = output_data['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-            output_data.loc[:, 'year'] = output_data['Time'] // 365 + self.start_year
-            output_data.loc[:, 'age in years'] = output_data['Age'] / 365
-            for agemax in self.agebins:
-                if agemax < 200:
-                    agelabel = 'U%d' % agemax
-                else:
-                    agelabel = 'all_ages'
-                agemin = 0
-                d = output_data[(output_data['age in years'] < agemax) & (output_data['age in years'] > agemin)]
-                g = d.groupby(['year', 'month'])['Event_Name'].agg(len).reset_index()
-                g = g.rename(columns={'Event_Name': 'Num_%s_Received_Severe_Treatment' % agelabel})
-                if simdata.empty:
-                    simdata = g
-                else:
-                    if not g.empty:
-                        simdata = pd.merge(left=simdata, right=g, on=['year', 'month'], how='outer')
-                        simdata = simdata.fillna(0)
-
-            for sweep_var in self.sweep_variables:
-                if sweep_var in simulation.tags.keys():
-                    simdata[sweep_var] = simulation.tags[sweep_var]
-        else:
-            simdata = pd.DataFrame(columns=['year', 'month',
-                                            'Num_U1_Received_Severe_Treatment',
-                                            'Num_U5_Received_Severe_Treatment',
-                                            'Num_all_ages_Received_Severe_Treatment'] + self.sweep_variables)
+        age_groups = {}
+        for agemax in self.agebins:
+            if agemax < 200:
+                agelabel = 'U%d' % agemax
+            else:
+                agelabel = 'all_ages'
+            agemin = 0
+            age_groups[agelabel] = (agemin, agemax)
+        years, months, counts = count_events_by_month_and_age(data[self.filenames[0]], self.event_name,
+                                                              self.start_year, age_groups)
+
+        # keep the months with at least one event in an age group
+        has_events = np.any([group_counts > 0 for group_counts in counts.values()], axis=0)
+        simdata = pd.DataFrame({'year': years[has_events], 'month': months[has_events]})
+        for agelabel, group_counts in counts.items():
+            simdata['Num_%s_Received_Severe_Treatment' % agelabel] = group_counts[has_events]
+
+        for sweep_var in self.sweep_variables:
+            if sweep_var in simulation.tags.keys():
+                simdata[sweep_var] = simulation.tags[sweep_var]
         return simdata
 
     def reduce(self, all_data):
@@ -415,8 +368,8 @@ class monthlySevereTreatedByAgeAnalyzer(IAnalyzer):
 
         adf = pd.concat(selected).reset_index(drop=True)
         adf = adf.fillna(0)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'Treated_Severe_Monthly_Cases_By_Age.csv'),
-                   index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'Treated_Severe_Monthly_Cases_By_Age.csv'),
+                     self.output_format)
 
         included_child_bins = ['U%i' % x for x in self.agebins if x < 20]
         for agelabel in included_child_bins:
@@ -426,7 +379,7 @@ class monthlySevereTreatedByAgeAnalyzer(IAnalyzer):
             severe_treat_df = severe_treat_df.astype({'month': 'int64', 'year': 'int64', 'Run_Number': 'int64'})
 
             # combine with existing columns of the U5 clinical incidence and PfPR dataframe
-            incidence_df = pd.read_csv(
+            incidence_df = read_output(
                 os.path.join(self.working_dir, self.expt_name, '%s_PfPR_ClinicalIncidence.csv' % agelabel))
             merged_df = pd.merge(left=incidence_df, right=severe_treat_df,
                                  on=['admin_name', 'year', 'month', 'Run_Number'],
@@ -435,51 +388,13 @@ class monthlySevereTreatedByAgeAnalyzer(IAnalyzer):
 
             # fix any excess treated cases!
             merged_df['num severe cases %s' % agelabel] = merged_df['Severe cases %s' % agelabel]
-            merged_df['excess sev treat %s' % agelabel] = merged_df['Num_%s_Received_Severe_Treatment' % agelabel] - \
-                                                          merged_df['num severe cases %s' % agelabel]
-
-            for (rn, admin_name), rdf in merged_df.groupby(['Run_Number', 'admin_name']):
-                for r, row in rdf.iterrows():
-                    if row['excess sev treat %s' % agelabel] < 1:
-                        continue
-                    # fix Jan 2020 (start of sim) excess treated severe cases
-                    if row['year'] == self.start_year and row['month'] == 1:
-                        merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                merged_df['Run_Number'] == rn) & (merged_df['admin_name'] == admin_name),
-                                      'Num_%s_Received_Severe_Treatment' % agelabel] = np.sum(
-                            merged_df[(merged_df['year'] == self.start_year) &
-                                      (merged_df['month'] == 1) &
-                                      (merged_df['Run_Number'] == rn) &
-                                      (merged_df['admin_name'] == admin_name)]['num severe cases %s' % agelabel])
-                    else:
-                        # figure out which is previous month
-                        newyear = row['year']
-                        newmonth = row['month'] - 1
-                        if newmonth < 1:
-                            newyear -= 1
-                        excess = row['excess sev treat %s' % agelabel]
-                        merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                merged_df['Run_Number'] == rn) & (merged_df[
-                                                                      'admin_name'] == admin_name), 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df['admin_name'] == admin_name),
-                                          'Num_%s_Received_Severe_Treatment' % agelabel] - excess
-                        merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                merged_df['Run_Number'] == rn) & (merged_df[
-                                                                      'admin_name'] == admin_name), 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                            merged_df.loc[(merged_df['year'] == self.start_year) & (merged_df['month'] == 1) & (
-                                    merged_df['Run_Number'] == rn) & (merged_df['admin_name'] == admin_name),
-                                          'Num_%s_Received_Severe_Treatment' % agelabel] + excess
-            merged_df['excess sev treat %s' % agelabel] = merged_df['Num_%s_Received_Severe_Treatment' % agelabel] - \
-                                                          merged_df['num severe cases %s' % agelabel]
-            merged_df.loc[
-                merged_df['excess sev treat %s' % agelabel] > 0.5, 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                merged_df.loc[merged_df['excess sev treat %s' % agelabel] > 0.5, 'num severe cases %s' % agelabel]
-
+            reconcile_severe_treatment(merged_df, 'Num_%s_Received_Severe_Treatment' % agelabel,
+                                       'num severe cases %s' % agelabel, self.start_year,
+                                       group_cols=['Run_Number', 'admin_name'])
             del merged_df['num severe cases %s' % agelabel]
-            del merged_df['excess sev treat %s' % agelabel]
-            merged_df.to_csv(os.path.join(self.working_dir, self.expt_name,
-                                          '%s_PfPR_ClinicalIncidence_severeTreatment.csv' % agelabel), index=False)
+            write_output(merged_df, os.path.join(self.working_dir, self.expt_name,
+                                                 '%s_PfPR_ClinicalIncidence_severeTreatment.csv' % agelabel),
+                         self.output_format)
 
 
 
@@ -488,7 +403,8 @@ class MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5(IAnalyzer):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
                  input_filename_base='MalariaSummaryReport_Monthly',
-                 output_filename='newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv'):
+                 output_filename='newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv',
+                 age_groups=AGE_GROUPS_WITH_U1U5, output_format='csv'):
 
         super(MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5, self).__init__(working_dir=working_dir,
                                                                   filenames=[
@@ -497,108 +413,26 @@ class MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5(IAnalyzer):
                                                                   )
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
         self.output_filename = output_filename
+        self.aggregator = AgeGroupAggregator(age_groups)
 
     # def filter(self, simulation):
     #     return simulation.status.name == 'Succeeded'
 
     def map(self, data, simulation):
 
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year + 1), self.filenames):
-            # from the 30-day reporting interval, all months have 30 days, plus a final 'month' at the end of the year with 5 days
-
-            # population size
-            pop = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][
-                  :12]  # remove final five days: assume final five days have same average as rest of month
-            pop_Under1 = [x[0] for x in pop]
-            pop_Under5 = [sum(x[:2]) for x in pop]
-            pop_5to15 = [x[2] for x in pop]
-            pop_15to30 = [x[3] for x in pop]
-            pop_30to50 = [x[4] for x in pop]
-            pop_50plus = [x[5] for x in pop]
-            pop_allAges = [sum(x[:6]) for x in pop]
-
-            # new infections
-            d = data[fname]['DataByTimeAndAgeBins']['New Infections by Age Bin'][:13]
-            d[11] = [sum(x) for x in zip(d[11], d[12])]  # add final five days to last month
-            del d[-1]  # remove final five days
-            new_infections_Under1 = [x[0] for x in d]
-            new_infections_Under5 = [sum(x[:2]) for x in d]
-            new_infections_5to15 = [x[2] for x in d]
-            new_infections_15to30 = [x[3] for x in d]
-            new_infections_30to50 = [x[4] for x in d]
-            new_infections_50plus = [x[5] for x in d]
-            new_infections_allAges = [sum(x[:6]) for x in d]
-
-            # PfPR
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-            # use weighted average for combined age groups
-            pfpr_Under1 = [x[0] for x in d]
-            pfpr_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) / (pop[yy][0] + pop[yy][1]) for yy in range(12)]
-            pfpr_5to15 = [x[2] for x in d]
-            pfpr_15to30 = [x[3] for x in d]
-            pfpr_30to50 = [x[4] for x in d]
-            pfpr_50plus = [x[5] for x in d]
-            pfpr_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                             (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) /
-                            (pop[yy][0] + pop[yy][1] + pop[yy][2] + pop[yy][3] + pop[yy][4] + pop[yy][5]) for yy in range(12)]
-
-            # RDT PfPR
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]  # remove final five days: assume final five days have same average as rest of month
-            # use weighted average for combined age groups
-            pfpr_rdt_Under1 = [x[0] for x in d]
-            pfpr_rdt_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) / (pop[yy][0] + pop[yy][1]) for yy in range(12)]
-            pfpr_rdt_5to15 = [x[2] for x in d]
-            pfpr_rdt_15to30 = [x[3] for x in d]
-            pfpr_rdt_30to50 = [x[4] for x in d]
-            pfpr_rdt_50plus = [x[5] for x in d]
-            pfpr_rdt_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                             (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) /
-                            (pop[yy][0] + pop[yy][1] + pop[yy][2] + pop[yy][3] + pop[yy][4] + pop[yy][5]) for yy in range(12)]
-
-            # clinical cases
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-            # adjust the per-person annualized number (the reported value) to get the total number of clinical cases in that age group in a month
-            clinical_cases_Under1 = [d[yy][0] * pop[yy][0] * 30 / 365 for yy in range(12)]
-            clinical_cases_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) * 30 / 365 for yy in range(12)]
-            clinical_cases_5to15 = [d[yy][2] * pop[yy][2] * 30 / 365 for yy in range(12)]
-            clinical_cases_15to30 = [d[yy][3] * pop[yy][3] * 30 / 365 for yy in range(12)]
-            clinical_cases_30to50 = [d[yy][4] * pop[yy][4] * 30 / 365 for yy in range(12)]
-            clinical_cases_50plus = [d[yy][5] * pop[yy][5] * 30 / 365 for yy in range(12)]
-            clinical_cases_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                                       (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) *
-                                      30 / 365 for yy in range(12)]
-
-            # severe cases
-            d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][
-                :12]  # remove final five days: assume final five days have same average as rest of month
-            # adjust the per-person annualized number (the reported value) to get the total number of severe cases in that age group in a month
-            severe_cases_Under1 = [d[yy][0] * pop[yy][0] * 30 / 365 for yy in range(12)]
-            severe_cases_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) * 30 / 365 for yy
-                                   in range(12)]
-            severe_cases_5to15 = [d[yy][2] * pop[yy][2] * 30 / 365 for yy in range(12)]
-            severe_cases_15to30 = [d[yy][3] * pop[yy][3] * 30 / 365 for yy in range(12)]
-            severe_cases_30to50 = [d[yy][4] * pop[yy][4] * 30 / 365 for yy in range(12)]
-            severe_cases_50plus = [d[yy][5] * pop[yy][5] * 30 / 365 for yy in range(12)]
-            severe_cases_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                                     (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) *
-                                    30 / 365 for yy in range(12)]
-
-            # order is [under1, under5, 5-15, 15-30, 30-50, over 50]
-            simdata = pd.DataFrame({'month': list(range(1, 13)) * 7,  # cycle through months for each age range
-                                    'AgeGroup': np.repeat(['Under1', 'Under5', '5to15', '15to30', '30to50', '50plus', 'allAges'], 12),
-                                    'Pop': (pop_Under1 + pop_Under5 + pop_5to15 + pop_15to30 + pop_30to50 + pop_50plus + pop_allAges),
-                                    'New Infections': (new_infections_Under1 + new_infections_Under5 + new_infections_5to15 + new_infections_15to30 + new_infections_30to50 + new_infections_50plus + new_infections_allAges),
-                                    'PfPR': (pfpr_Under1 + pfpr_Under5 + pfpr_5to15 + pfpr_15to30 + pfpr_30to50 + pfpr_50plus + pfpr_allAges),
-                                    'PfPR RDT': (pfpr_rdt_Under1 + pfpr_rdt_Under5 + pfpr_rdt_5to15 + pfpr_rdt_15to30 + pfpr_rdt_30to50 + pfpr_rdt_50plus + pfpr_rdt_allAges),
-                                    'Clinical cases': (clinical_cases_Under1 + clinical_cases_Under5 + clinical_cases_5to15 + clinical_cases_15to30 + clinical_cases_30to50 + clinical_cases_50plus + clinical_cases_allAges),
-                                    'Severe cases': (severe_cases_Under1 + severe_cases_Under5 + severe_cases_5to15 + severe_cases_15to30 + severe_cases_30to50 + severe_cases_50plus + severe_cases_allAges)
-                                    })
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
+        arrays = parse_summary_reports(get_summary_reports(data, self.filenames),
+                                       ['Average Population by Age Bin', 'New Infections by Age Bin', 'PfPR by Age Bin',
+                                        'PfPR by Age Bin-HRP2', 'Annual Clinical Incidence by Age Bin',
+                                        'Annual Severe Incidence by Age Bin'])
+        age_bins = data[self.filenames[0]]['Metadata']['Age Bins']
+        # from the 30-day reporting interval, all months have 30 days, plus a final 'month' at the end of the year with 5 days
+        columns = age_group_channels(arrays, age_bins, self.aggregator, days_in_month=30, include_rdt=True)
+        adf = monthly_age_group_frame(columns, years=range(self.start_year, self.end_year + 1),
+                                      age_groups=self.aggregator.group_names(age_bins))
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -616,7 +450,7 @@ class MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, self.output_filename)), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, self.output_filename), self.output_format)
 
 
 #
@@ -761,7 +595,7 @@ class MonthlyNewInfectionsAnalyzerByAge(IAnalyzer):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
                  input_filename_base='MalariaSummaryReport_Monthly',
-                 output_filename='newInfections_PfPR_cases_monthly_byAgeGroup.csv'):
+                 output_filename='newInfections_PfPR_cases_monthly_byAgeGroup.csv', output_format='csv'):
 
         super(MonthlyNewInfectionsAnalyzerByAge, self).__init__(working_dir=working_dir,
                                                                 filenames=["output/%s%d.json" % (input_filename_base, x)
@@ -769,65 +603,27 @@ class MonthlyNewInfectionsAnalyzerByAge(IAnalyzer):
                                                                 )
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
         self.output_filename = output_filename
+        # each age bin in the report is its own age group
+        self.aggregator = AgeGroupAggregator()
 
     # def filter(self, simulation):
     #     return simulation.status.name == 'Succeeded'
 
     def map(self, data, simulation):
 
-        adf = pd.DataFrame()
-        for year, fname in zip(range(self.start_year, self.end_year + 1), self.filenames):
-            # from the 30-day reporting interval, all months have 30 days, plus a final 'month' at the end of the year with 5 days
-
-
-            # iterate through age bins, extracting the monthly values of each metric and then appending into data frame
-            simdata_allAges = pd.DataFrame()
-
-            for aa in range(len(data[fname]['Metadata']['Age Bins'])):
-                # population size
-                pop = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-                pop_monthly = [x[aa] for x in pop]
-
-                # new infections
-                d = data[fname]['DataByTimeAndAgeBins']['New Infections by Age Bin'][:13]
-                d[11] = [sum(x) for x in zip(d[11], d[12])]  # add final five days to last month
-                del d[-1]  # remove final five days
-                new_infections_monthly = [x[aa] for x in d]
-
-                # PfPR
-                d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-                pfpr_monthly = [x[aa] for x in d]
-
-                # RDT PfPR
-                d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]  # remove final five days: assume final five days have same average as rest of month
-                pfpr_rdt_monthly = [x[aa] for x in d]
-
-                # clinical cases
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-                # adjust the per-person annualized number (the reported value) to get the total number of clinical cases in that age group in a month
-                clinical_cases_monthly = [d[yy][aa] * pop[yy][aa] * 30 / 365 for yy in range(12)]
-
-                # severe cases
-                d = data[fname]['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-                # adjust the per-person annualized number (the reported value) to get the total number of severe cases in that age group in a month
-                severe_cases_monthly = [d[yy][aa] * pop[yy][aa] * 30 / 365 for yy in range(12)]
-
-                # order is [under 15, 15-30, 30-50, over 50]
-                simdata = pd.DataFrame({'month': list(range(1, 13)),
-                                        'AgeGroup': np.repeat([data[fname]['Metadata']['Age Bins'][aa]], 12),
-                                        'Pop': pop_monthly,
-                                        'New Infections': new_infections_monthly,
-                                        'PfPR': pfpr_monthly,
-                                        'PfPR RDT': pfpr_rdt_monthly,
-                                        'Clinical cases': clinical_cases_monthly,
-                                        'Severe cases': severe_cases_monthly
-                                        })
-                simdata['year'] = year
-                simdata_allAges = pd.concat([simdata_allAges, simdata])
-            adf = pd.concat([adf, simdata_allAges])
+        arrays = parse_summary_reports(get_summary_reports(data, self.filenames),
+                                       ['Average Population by Age Bin', 'New Infections by Age Bin', 'PfPR by Age Bin',
+                                        'PfPR by Age Bin-HRP2', 'Annual Clinical Incidence by Age Bin',
+                                        'Annual Severe Incidence by Age Bin'])
+        age_bins = data[self.filenames[0]]['Metadata']['Age Bins']
+        # from the 30-day reporting interval, all months have 30 days, plus a final 'month' at the end of the year with 5 days
+        columns = age_group_channels(arrays, age_bins, self.aggregator, days_in_month=30, include_rdt=True)
+        adf = monthly_age_group_frame(columns, years=range(self.start_year, self.end_year + 1),
+                                      age_groups=self.aggregator.group_names(age_bins))
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -845,7 +641,7 @@ class MonthlyNewInfectionsAnalyzerByAge(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf.to_csv((os.path.join(self.working_dir, self.expt_name, self.output_filename)), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, self.output_filename), self.output_format)
 
 
 if __name__ == "__main__":
@@ -1,21 +1,17 @@
 import os
-import datetime
 import pandas as pd
 import numpy as np
 from idmtools.entities import IAnalyzer
+from snt.analyzers.sim_calendar import month_start_dates, monthly_channel_frame
+from snt.analyzers.output_files import write_output
+from snt.analyzers.report_channels import read_report_channels
 
 
 class monthlyEventAnalyzerITN(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026, output_file_suffix=''):
-        super(monthlyEventAnalyzerITN, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_file_suffix='', output_format='csv'):
+        super(monthlyEventAnalyzerITN, self).__init__(working_dir=working_dir, parse=False,
                                                    filenames=["output/ReportEventCounter.json"]
                                                    )
         self.sweep_variables = sweep_variables or ["admin_name", "Run_Number"]
@@ -27,6 +23,7 @@ class monthlyEventAnalyzerITN(IAnalyzer):
         else:
             self.channels = channels
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
         self.output_file_suffix = output_file_suffix
@@ -36,14 +33,10 @@ class monthlyEventAnalyzerITN(IAnalyzer):
 
     def map(self, data, simulation):
 
-        channels_in_expt = [x for x in self.channels if x in data[self.filenames[0]]['Channels'].keys()]
-
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in channels_in_expt})
-        simdata['Time'] = simdata.index + 1
-
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        channel_data = read_report_channels(data[self.filenames[0]], self.channels, missing_ok=True)
+        channels_in_expt = [x for x in self.channels if x in channel_data]
+        # reduce daily event counts to monthly sums (matching the aggregation in reduce)
+        simdata = monthly_channel_frame(channel_data, self.start_year, sum_channels=channels_in_expt, first_time=1)
 
         for missing_channel in [x for x in self.channels if x not in channels_in_expt]:
             simdata[missing_channel] = 0
@@ -64,24 +57,19 @@ class monthlyEventAnalyzerITN(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True, )
-        adf['date'] = adf.apply(lambda x: datetime.date(x['year'], x['month'], 1), axis=1)
+        adf['date'] = month_start_dates(adf['year'], adf['month'])
 
         df = adf.groupby(['admin_name', 'date', 'Run_Number'])[self.channels].agg(np.sum).reset_index()
-        df.to_csv(os.path.join(self.working_dir, self.expt_name, 'monthly_Event_Count%s.csv' % self.output_file_suffix), index=False)
+        write_output(df, os.path.join(self.working_dir, self.expt_name, 'monthly_Event_Count%s.csv' % self.output_file_suffix),
+                     self.output_format)
 
 
 
 class monthlyEventAnalyzer(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026, output_file_suffix=''):
-        super(monthlyEventAnalyzer, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_file_suffix='', output_format='csv'):
+        super(monthlyEventAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                    filenames=["output/ReportEventCounter.json"]
                                                    )
         self.sweep_variables = sweep_variables or ["admin_name", "Run_Number"]
@@ -93,6 +81,7 @@ class monthlyEventAnalyzer(IAnalyzer):
         else:
             self.channels = channels
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
         self.output_file_suffix = output_file_suffix
@@ -102,14 +91,10 @@ class monthlyEventAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        channels_in_expt = [x for x in self.channels if x in data[self.filenames[0]]['Channels'].keys()]
-
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in channels_in_expt})
-        simdata['Time'] = simdata.index
-
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        channel_data = read_report_channels(data[self.filenames[0]], self.channels, missing_ok=True)
+        channels_in_expt = [x for x in self.channels if x in channel_data]
+        # reduce daily event counts to monthly sums (matching the aggregation in reduce)
+        simdata = monthly_channel_frame(channel_data, self.start_year, sum_channels=channels_in_expt)
 
         for missing_channel in [x for x in self.channels if x not in channels_in_expt]:
             simdata[missing_channel] = 0
@@ -130,23 +115,18 @@ class monthlyEventAnalyzer(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True, )
-        adf['date'] = adf.apply(lambda x: datetime.date(x['year'], x['month'], 1), axis=1)
+        adf['date'] = month_start_dates(adf['year'], adf['month'])
 
         df = adf.groupby(['admin_name', 'date', 'Run_Number'])[self.channels].agg(np.sum).reset_index()
-        df.to_csv(os.path.join(self.working_dir, self.expt_name, 'monthly_Event_Count%s.csv' % self.output_file_suffix), index=False)
+        write_output(df, os.path.join(self.working_dir, self.expt_name, 'monthly_Event_Count%s.csv' % self.output_file_suffix),
+                     self.output_format)
 
 
 class monthlyUsageLLIN(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
-        super(monthlyUsageLLIN, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
+        super(monthlyUsageLLIN, self).__init__(working_dir=working_dir, parse=False,
                                                filenames=["output/ReportEventCounter.json",
                                                           "output/ReportMalariaFiltered.json"]
                                                )
@@ -157,6 +137,7 @@ class monthlyUsageLLIN(IAnalyzer):
             self.channels = channels
         self.inset_channels = ['Statistical Population']
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -166,24 +147,15 @@ class monthlyUsageLLIN(IAnalyzer):
 
     def map(self, data, simulation):
 
-        channels_in_expt = [x for x in self.channels if x in data[self.filenames[0]]['Channels'].keys()]
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in channels_in_expt})
-        simdata['Time'] = simdata.index
-
-        d = pd.DataFrame({x: data[self.filenames[1]]['Channels'][x]['Data'] for x in self.inset_channels})
-        d['Time'] = d.index
-
-        if len(channels_in_expt) > 0:
-            simdata = pd.merge(left=simdata, right=d, on='Time')
-        else:
-            simdata = d
+        channel_data = read_report_channels(data[self.filenames[0]], self.channels, missing_ok=True)
+        channels_in_expt = [x for x in self.channels if x in channel_data]
+        channel_data.update(read_report_channels(data[self.filenames[1]], self.inset_channels))
+        # reduce daily values to monthly means (matching the aggregation in reduce)
+        simdata = monthly_channel_frame(channel_data, self.start_year,
+                                        mean_channels=channels_in_expt + self.inset_channels)
         for missing_channel in [x for x in self.channels if x not in channels_in_expt]:
             simdata[missing_channel] = 0
 
-        simdata['day_of_year'] = simdata['Time'] % 365
-        simdata['month'] = simdata['day_of_year'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
-
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
                 simdata[sweep_var] = simulation.tags[sweep_var]
@@ -200,11 +172,11 @@ class monthlyUsageLLIN(IAnalyzer):
         os.makedirs(output_dir, exist_ok=True)
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf['date'] = adf.apply(lambda x: datetime.date(x['year'], x['month'], 1), axis=1)
+        adf['date'] = month_start_dates(adf['year'], adf['month'])
 
         mean_channels = self.channels + ['Statistical Population']
         adf = adf.groupby(['admin_name', 'date', 'Run_Number'])[mean_channels].agg(np.mean).reset_index()
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'MonthlyUsageLLIN.csv'), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'MonthlyUsageLLIN.csv'), self.output_format)
 
 
 
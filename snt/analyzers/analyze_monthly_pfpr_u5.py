@@ -1,14 +1,18 @@
 import os
 import pandas as pd
 import numpy as np
-import datetime
 from idmtools.entities import IAnalyzer
+from snt.analyzers.summary_report import parse_summary_reports, get_summary_reports, drop_final_interval, \
+    monthly_frame
+from snt.analyzers.sim_calendar import add_calendar_columns
+from snt.analyzers.output_files import write_output
+from snt.analyzers.report_channels import read_report_channels
 
 
 class MonthlyPfPRU5Analyzer(IAnalyzer):
 
     def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2010, end_year=2016,
-                 input_filename_base='MalariaSummaryReport_Monthly'):
+                 input_filename_base='MalariaSummaryReport_Monthly', output_format='csv'):
         super(MonthlyPfPRU5Analyzer, self).__init__(working_dir=working_dir,
                                                     filenames=["output/%s%d.json" % (input_filename_base, x)
                                                                for x in range(start_year, (1 + end_year))]
@@ -16,29 +20,19 @@ class MonthlyPfPRU5Analyzer(IAnalyzer):
         self.sweep_variables = sweep_variables or ["Run_Number"]
         self.mult_param = 'Habitat_Multiplier'
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
     def map(self, data, simulation):
 
-        adf = pd.DataFrame()
         aa = 1  # index for the 0.5-5 year age group
-        for year, fname in zip(range(self.start_year, (self.end_year + 1)), self.filenames):
-            # population size
-            pop = data[fname]['DataByTimeAndAgeBins']['Average Population by Age Bin'][
-                  :12]  # remove final five days: assume final five days have same average as rest of month
-            pop_monthly = [x[aa] for x in pop]
-            # PfPR
-            d = data[fname]['DataByTimeAndAgeBins']['PfPR by Age Bin'][
-                :12]  # remove final five days: assume final five days have same average as rest of month
-            pfpr_monthly = [x[aa] for x in d]
-            # combine in data frame
-            simdata = pd.DataFrame({'month': list(range(1, 13)),
-                                    'Pop': pop_monthly,
-                                    'PfPR U5': pfpr_monthly,
-                                    })
-            simdata['year'] = year
-            adf = pd.concat([adf, simdata])
+        arrays = parse_summary_reports(get_summary_reports(data, self.filenames),
+                                       ['Average Population by Age Bin', 'PfPR by Age Bin'])
+        # remove final five days: assume final five days have same average as rest of month
+        adf = monthly_frame({'Pop': drop_final_interval(arrays['Average Population by Age Bin'])[..., aa],
+                             'PfPR U5': drop_final_interval(arrays['PfPR by Age Bin'])[..., aa]},
+                            years=range(self.start_year, self.end_year + 1))
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -60,28 +54,23 @@ class MonthlyPfPRU5Analyzer(IAnalyzer):
         # don't take average across runs; calculate the best xLH for each seed (each of which uses different quantile)
         # all_df = all_df.groupby([self.mult_param, 'month', 'admin_name'])[['PfPR U5', 'Pop']].agg(np.mean).reset_index()
         # all_df = all_df.sort_values(by=[self.mult_param, 'month', 'archetype', 'DS_Name_for_ITN'])
-        all_df.to_csv(os.path.join(self.working_dir, 'monthly_U5_PfPR.csv'), index=False)
+        write_output(all_df, os.path.join(self.working_dir, 'monthly_U5_PfPR.csv'), self.output_format)
 
 
 
 
 class monthlyU5PrevalenceAnalyzer(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
-        super(monthlyU5PrevalenceAnalyzer, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
+        super(monthlyU5PrevalenceAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                         filenames=["output/ReportMalariaFiltered__RDT_mic_PfPR_U5.json"]
                                                         )
         self.sweep_variables = sweep_variables or ["admin_name", "Run_Number"]
         self.inset_channels = ['Statistical Population', 'New Clinical Cases', 'True Prevalence',
                                'PCR Parasite Prevalence', 'Blood Smear Parasite Prevalence', 'PfHRP2 Prevalence']
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -90,12 +79,10 @@ class monthlyU5PrevalenceAnalyzer(IAnalyzer):
     #     return simulation.status.name == 'Succeeded'
 
     def map(self, data, simulation):
-        d = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.inset_channels})
+        d = pd.DataFrame(read_report_channels(data[self.filenames[0]], self.inset_channels))
         d['Time'] = d.index
         simdata = d
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        simdata = add_calendar_columns(simdata, self.start_year)
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -123,7 +110,8 @@ class monthlyU5PrevalenceAnalyzer(IAnalyzer):
         pdf = adf.groupby(['year', 'month']+self.sweep_variables)[mean_channels].agg(np.mean).reset_index()
 
         adf = pd.merge(left=pdf, right=df, on=['year', 'month']+self.sweep_variables)
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'monthly_U5_PfPR_mic_RDT.csv'), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'monthly_U5_PfPR_mic_RDT.csv'),
+                     self.output_format)
 
 
 
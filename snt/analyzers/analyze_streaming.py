@@ -0,0 +1,156 @@
+import os
+import shutil
+import tempfile
+from urllib.parse import quote
+import pandas as pd
+from idmtools.entities import IAnalyzer
+
+
+def write_partitions(adf, dataset_dir, partition_col, name):
+    """
+    Append a data frame to an on-disk dataset partitioned by partition_col, as one Parquet file per partition value
+    (dataset_dir/<partition_col>=<value>/<name>.parquet). Requires pyarrow (or fastparquet).
+    """
+    if partition_col in adf.columns:
+        groups = adf.groupby(partition_col, sort=False, dropna=False)
+    else:
+        groups = [('', adf)]
+    for value, pdf in groups:
+        partition_dir = os.path.join(dataset_dir, '%s=%s' % (partition_col, quote(str(value), safe='')))
+        os.makedirs(partition_dir, exist_ok=True)
+        pdf.to_parquet(os.path.join(partition_dir, '%s.parquet' % name), index=False)
+
+
+def iter_partitions(dataset_dir):
+    """
+    Yield (partition directory name, data frame) for each partition of a dataset written by write_partitions,
+    loading one partition at a time.
+    """
+    for partition in sorted(os.listdir(dataset_dir)):
+        partition_dir = os.path.join(dataset_dir, partition)
+        fnames = sorted(f for f in os.listdir(partition_dir) if f.endswith('.parquet'))
+        if fnames:
+            yield partition, pd.concat([pd.read_parquet(os.path.join(partition_dir, f)) for f in fnames],
+                                       ignore_index=True)
+
+
+def append_csv(src, dst, chunksize=100000):
+    """
+    Append the rows of csv file src to csv file dst, reading src in chunks. If dst does not exist it is created with
+    src's header; if the headers differ, src's columns are aligned to dst's header.
+    """
+    if not os.path.exists(dst):
+        shutil.copyfile(src, dst)
+        return
+    with open(dst, 'r') as f:
+        dst_header = f.readline().rstrip('\r\n')
+    with open(src, 'r') as f:
+        src_header = f.readline().rstrip('\r\n')
+        if src_header == dst_header:
+            with open(dst, 'a') as out:
+                shutil.copyfileobj(f, out)
+            return
+    columns = pd.read_csv(dst, nrows=0).columns
+    for chunk in pd.read_csv(src, chunksize=chunksize):
+        chunk.reindex(columns=columns).to_csv(dst, mode='a', header=False, index=False)
+
+
+def append_parquet(src, dst, writers):
+    """
+    Append the rows of Parquet file src to Parquet file dst, keeping dst open for writing in writers (a dict of
+    path -> pyarrow.parquet.ParquetWriter, closed by the caller). Rows are cast to the schema of the first file.
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(src)
+    if dst not in writers:
+        writers[dst] = pq.ParquetWriter(dst, table.schema, compression='zstd')
+    writers[dst].write_table(table.cast(writers[dst].schema))
+
+
+class StreamingReduceAnalyzer(IAnalyzer):
+    """
+    Run an analyzer with bounded memory in reduce. In map, each simulation's mapped data frame is written to a
+    partitioned Parquet dataset (partitioned by admin_name by default) and only the file location is kept in memory.
+    In reduce, the wrapped analyzer's reduce is run on one partition at a time and the csv or Parquet files it writes
+    are appended into the final outputs in the wrapped analyzer's working directory.
+
+    This gives the same rows as a normal reduce for analyzers whose reduce concatenates the simulations' data frames
+    or groups by the partition column (e.g., the admin_name, date, Run_Number aggregations). Analyzers whose reduce
+    aggregates across partitions or reads other analyzers' outputs should not be streamed.
+    """
+
+    def __init__(self, analyzer, partition_col='admin_name', dataset_dir=None, keep_dataset=False):
+        """
+        Args:
+            analyzer: analyzer instance, or (analyzer class, dict of arguments) pair as for AnalyzerBundle
+            partition_col: column of the mapped data frames used to partition the on-disk dataset
+            dataset_dir: directory for the partitioned dataset; defaults to a temporary directory in the analyzer's
+                working directory
+            keep_dataset: whether to keep the partitioned dataset after reduce
+        """
+        self.analyzer = analyzer if isinstance(analyzer, IAnalyzer) else analyzer[0](**analyzer[1])
+        super(StreamingReduceAnalyzer, self).__init__(working_dir=self.analyzer.working_dir,
+                                                      parse=self.analyzer.parse, filenames=self.analyzer.filenames)
+        self.partition_col = partition_col
+        self.dataset_dir = dataset_dir
+        self.keep_dataset = keep_dataset
+
+    def initialize(self):
+        self.analyzer.initialize()
+        if self.dataset_dir is None:
+            os.makedirs(self.analyzer.working_dir, exist_ok=True)
+            self.dataset_dir = tempfile.mkdtemp(prefix='stream_%s_' % type(self.analyzer).__name__,
+                                                dir=self.analyzer.working_dir)
+
+    def per_group(self, items):
+        self.analyzer.per_group(items)
+
+    def filter(self, simulation):
+        return self.analyzer.filter(simulation)
+
+    def map(self, data, simulation):
+        adf = self.analyzer.map(data, simulation)
+        if adf is None or len(adf) == 0:
+            return None
+        write_partitions(adf, self.dataset_dir, self.partition_col, str(simulation.id))
+        return self.dataset_dir
+
+    def reduce(self, all_data):
+        if not any(result is not None for result in all_data.values()):
+            print("No data have been returned... Exiting...")
+            return
+
+        working_dir = self.analyzer.working_dir
+        written = set()
+        parquet_writers = {}
+        try:
+            for partition, pdf in iter_partitions(self.dataset_dir):
+                # run the wrapped reduce on this partition only, writing into a scratch directory
+                partition_out = tempfile.mkdtemp(dir=self.dataset_dir)
+                self.analyzer.working_dir = partition_out
+                self.analyzer.reduce({partition: pdf})
+                for root, dirs, files in os.walk(partition_out):
+                    for fname in files:
+                        src = os.path.join(root, fname)
+                        dst = os.path.join(working_dir, os.path.relpath(src, partition_out))
+                        os.makedirs(os.path.dirname(dst), exist_ok=True)
+                        if dst not in written and os.path.exists(dst):
+                            os.remove(dst)  # replace outputs from any earlier run
+                        if fname.endswith('.csv'):
+                            append_csv(src, dst)
+                        elif fname.endswith('.parquet'):
+                            append_parquet(src, dst, parquet_writers)
+                        else:
+                            shutil.copyfile(src, dst)
+                        written.add(dst)
+                shutil.rmtree(partition_out)
+        finally:
+            for writer in parquet_writers.values():
+                writer.close()
+            self.analyzer.working_dir = working_dir
+            if not self.keep_dataset:
+                shutil.rmtree(self.dataset_dir, ignore_errors=True)
+
+    def destroy(self):
+        self.analyzer.destroy()
@@ -1,25 +1,22 @@
 import os
-import datetime
 import pandas as pd
 import numpy as np
 from idmtools.entities import IAnalyzer
+from snt.analyzers.sim_calendar import month_start_dates, monthly_channel_frame
+from snt.analyzers.output_files import write_output
+from snt.analyzers.report_channels import read_report_channels
 
 
 class VectorNumbersAnalyzer(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
-        super(VectorNumbersAnalyzer, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
+        super(VectorNumbersAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                     filenames=["output/ReportMalariaFiltered.json"])
         self.sweep_variables = sweep_variables or ["admin_name", "Run_Number"]
         self.inset_channels = ['Adult Vectors']
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -29,12 +26,9 @@ class VectorNumbersAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.inset_channels})
-        simdata['Time'] = simdata.index
-
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        channel_data = read_report_channels(data[self.filenames[0]], self.inset_channels)
+        # reduce daily values to monthly means (matching the aggregation in reduce)
+        simdata = monthly_channel_frame(channel_data, self.start_year, mean_channels=self.inset_channels)
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -52,9 +46,10 @@ class VectorNumbersAnalyzer(IAnalyzer):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf['date'] = adf.apply(lambda x: datetime.date(x['year'], x['month'], 1), axis=1)
+        adf['date'] = month_start_dates(adf['year'], adf['month'])
 
         mean_channels = ['Adult Vectors']
 
         adf = adf.groupby(['admin_name', 'date', 'Run_Number'])[mean_channels].agg(np.mean).reset_index()
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'vector_numbers_monthly.csv'), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'vector_numbers_monthly.csv'),
+                     self.output_format)
@@ -0,0 +1,465 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from idmtools.entities import IAnalyzer
+from snt.analyzers.aggregate_outputs import with_year_month
+from snt.analyzers.burden_comparison import BURDEN_FILENAME
+from snt.analyzers.output_files import read_output
+
+# Python version of r_utilities/IPTp_mortality_postprocessing: malaria-in-pregnancy (MiP) and IPTp adjustments
+# (calculate_MiP_numbers, adjust_sim_output_for_MiP) followed by the mortality adjustment (adjust_sim_output_mortality).
+# Each admin and seed is a (run, admin, month) array slice, so runs and admins are processed together rather than in
+# loops; large experiments are processed in chunks of admins.
+INFECTIONS_FILENAME = 'newInfections_PfPR_cases_monthly_byAgeGroup.csv'
+ALL_AGE_FILENAME = 'All_Age_monthly_Cases.csv'
+AGE_FILENAME = '%s_PfPR_ClinicalIncidence_severeTreatment.csv'
+AGE_GROUPS = ('Under15', '15to30', '30to50', '50plus')
+DAYS_IN_SIM_MONTH = np.array([30] * 11 + [35])  # each month is 30 days except December, which has the extra 5
+PREGNANCY_MONTHS = 9
+KEY_COLUMNS = ['admin_name', 'Run_Number', 'month', 'year']
+MIP_COLUMNS = ['PfPR_MiP_adjusted', 'PfPR_unadjusted', 'severe_maternal', 'severe_total', 'severe_maternal_treated',
+               'severe_total_treated', 'mLBW_births', 'mLBW_deaths', 'MiP_stillbirths', 'MiP_stillbirths_noIPTp',
+               'num_all_births']
+
+
+def monthly_grid(adf, columns, admins, run_numbers, first_year, num_months):
+    """
+    Arrange monthly values into arrays by (Run_Number, admin_name, month of simulation), with NaN where a
+    combination has no row.
+    Args:
+        adf: data frame with admin_name, Run_Number, year, and month columns
+        columns: columns to arrange
+        admins: admin names along the admin axis
+        run_numbers: sorted run numbers along the run axis
+        first_year: year of the first month along the month axis
+        num_months: length of the month axis
+
+    Returns:
+        dict of column -> array
+    """
+    admin_index = pd.Categorical(adf['admin_name'], categories=admins).codes
+    run_numbers = np.asarray(run_numbers)
+    run_index = np.searchsorted(run_numbers, adf['Run_Number'].to_numpy())
+    run_index = np.minimum(run_index, len(run_numbers) - 1)
+    month_index = (adf['year'].to_numpy(dtype=np.int64) - first_year) * 12 + adf['month'].to_numpy(dtype=np.int64) - 1
+    valid = ((admin_index >= 0) & (run_numbers[run_index] == adf['Run_Number'].to_numpy())
+             & (month_index >= 0) & (month_index < num_months))
+    index = (run_index[valid], admin_index[valid], month_index[valid])
+    grids = {}
+    for col in columns:
+        grid = np.full((len(run_numbers), len(admins), num_months), np.nan)
+        grid[index] = adf[col].to_numpy(dtype=np.float64)[valid]
+        grids[col] = grid
+    return grids
+
+
+def prob_no_infection(new_infections, pop, pfpr, month_days):
+    """
+    Probability that an individual escapes infection across all days of a month, assuming uniform risk within the
+    age group: the daily number of new infections is relative to the uninfected population, at most one.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        daily = np.minimum(new_infections / month_days / (pop * (1 - pfpr)), 1)
+    return (1 - daily) ** month_days
+
+
+def prob_infected_in_pregnancy(no_infection, history_months=12):
+    """
+    Probability of infection during the nine months of a pregnancy ending in each month, from the monthly
+    probabilities of escaping infection (last axis is the month). The first history_months months, which have no
+    full preceding year of simulation, are NaN as in calculate_MiP_numbers.
+    """
+    prob = np.full(no_infection.shape, np.nan)
+    if no_infection.shape[-1] >= PREGNANCY_MONTHS:
+        windows = np.lib.stride_tricks.sliding_window_view(no_infection, PREGNANCY_MONTHS, axis=-1)
+        prob[..., PREGNANCY_MONTHS - 1:] = 1 - windows.prod(axis=-1)
+    prob[..., :history_months] = np.nan
+    return prob
+
+
+def iptp_coverage_long(iptp_coverage_df):
+    """
+    Reshape IPTp coverage (fraction of pregnant individuals receiving >=1 dose) from one row per admin and one column
+    per year (any column name containing the year, e.g., 'X2018' or 'IPTp_2018') to admin_name, year, coverage rows.
+    """
+    year_columns = {col: int(m.group(1)) for col in iptp_coverage_df.columns
+                    if (m := re.search(r'((?:19|20)\d{2})', str(col)))}
+    coverage = iptp_coverage_df.melt(id_vars='admin_name', value_vars=list(year_columns), var_name='year',
+                                     value_name='coverage')
+    coverage['year'] = coverage['year'].map(year_columns)
+    coverage['admin_name'] = coverage['admin_name'].str.upper()
+    return coverage.drop_duplicates(['admin_name', 'year'])
+
+
+def iptp_dose_fractions(iptp_coverage_df, admins, first_year, num_months, frac_iptp_1, frac_iptp_2, frac_iptp_3,
+                        frac_iptp_years):
+    """
+    Fraction of pregnancies with 0, 1, 2, or 3 IPTp doses for each admin and month, joining the coverage table on
+    (admin, year) in one step. Admin names are matched case-insensitively; admins or years without coverage are NaN.
+    Args:
+        iptp_coverage_df: coverage by admin (row) and year (column), see iptp_coverage_long
+        admins: admin names along the admin axis
+        first_year: year of the first month along the month axis
+        num_months: length of the month axis
+        frac_iptp_1: fraction of individuals with >=1 IPTp dose who receive 1 dose in each year
+        frac_iptp_2: fraction of individuals with >=1 IPTp dose who receive 2 doses in each year
+        frac_iptp_3: fraction of individuals with >=1 IPTp dose who receive 3 doses in each year
+        frac_iptp_years: years corresponding to each entry of the frac_iptp_i values
+
+    Returns:
+        array by (admin, month, dose)
+    """
+    month_years = first_year + np.arange(num_months) // 12
+    grid = pd.MultiIndex.from_product([[a.upper() for a in admins], month_years], names=['admin_name', 'year'])
+    coverage = iptp_coverage_long(iptp_coverage_df).set_index(['admin_name', 'year'])['coverage']
+    coverage = coverage.reindex(grid).to_numpy(dtype=np.float64).reshape(len(admins), num_months)
+
+    dose_fractions = pd.DataFrame({1: frac_iptp_1, 2: frac_iptp_2, 3: frac_iptp_3}, index=list(frac_iptp_years))
+    dose_fractions = dose_fractions.reindex(month_years).to_numpy(dtype=np.float64)
+    return np.concatenate([(1 - coverage)[..., np.newaxis],
+                           coverage[..., np.newaxis] * dose_fractions[np.newaxis]], axis=-1)
+
+
+def calculate_mip_numbers(pop, new_infections, pfpr, f_iptp, month_days, pm_LBW_iptp, pm_still_iptp, d0, d1,
+                          births_per_person_per_month, non_mal_stillbirth_fraction, frac_preg_under_30,
+                          frac_first_second_birth, prob_severe_from_MiP=0.57, reduced_prob_severe_IPTp=0.61,
+                          prob_severe_MiP_treated=0.5, weeks_protection_each_dose=10, history_months=12):
+    """
+    Malaria-in-pregnancy outcomes and IPTp-adjusted PfPR (calculate_MiP_numbers, calc_mStill_mLBW_death, and
+    adjust_sim_output_for_MiP) as array operations.
+    Args:
+        pop: population by (run, admin, month, age group in AGE_GROUPS)
+        new_infections: new infections, same shape as pop
+        pfpr: PfPR, same shape as pop
+        f_iptp: fraction of pregnancies with 0-3 IPTp doses by (admin, month, dose), from iptp_dose_fractions
+        month_days: days in each month of the month axis
+        pm_LBW_iptp: probability of a mLBW infant given that the mother was infected with malaria in her first or
+            second pregnancy - 0, 1, 2, or 3 IPTp doses
+        pm_still_iptp: probability of a stillborn infant given that the mother was infected with malaria in her first
+            or second pregnancy - 0, 1, 2, or 3 IPTp doses
+        d0: probability of death in the first year for a normal birth weight infant
+        d1: probability of death in the first year for a LBW infant
+        births_per_person_per_month: number of births per person per month
+        non_mal_stillbirth_fraction: fraction of pregnancies ending in a stillbirth not caused by malaria
+        frac_preg_under_30: fraction of pregnancies among 15-30 year olds (the rest are among 30-50 year olds)
+        frac_first_second_birth: fraction of births that are first or second births
+        prob_severe_from_MiP: probability of severe anemia attributable to MiP for first and second pregnancies
+        reduced_prob_severe_IPTp: multiplies prob_severe_from_MiP to give probability of severe malaria with IPTp
+        prob_severe_MiP_treated: probability a woman with severe disease from MiP gets treatment
+        weeks_protection_each_dose: weeks of complete protection from the first dose (each later dose adds 4 weeks)
+        history_months: leading months without a full preceding year, where pregnancy outcomes are NaN
+
+    Returns:
+        dict of MiP_COLUMNS (except the columns combined with the All_Age output) -> array by (run, admin, month)
+    """
+    f_iptp = f_iptp[np.newaxis]  # broadcast over runs
+    coverage = 1 - f_iptp[..., 0]
+    pm_LBW_iptp = np.asarray(pm_LBW_iptp, dtype=np.float64)
+    pm_still_iptp = np.asarray(pm_still_iptp, dtype=np.float64)
+    u15, a1530, a3050, o50 = range(len(AGE_GROUPS))
+
+    no_infection = prob_no_infection(new_infections[..., [a1530, a3050]], pop[..., [a1530, a3050]],
+                                     pfpr[..., [a1530, a3050]], month_days[:, np.newaxis])
+    prob_1530 = prob_infected_in_pregnancy(no_infection[..., 0], history_months)
+    prob_3050 = prob_infected_in_pregnancy(no_infection[..., 1], history_months)
+
+    # number of pregnancies ending in each month, including and excluding non-malaria stillbirths
+    total_preg = pop.sum(axis=-1) * births_per_person_per_month
+    total_preg[..., :history_months] = np.nan
+    preg_1530 = total_preg * frac_preg_under_30
+    preg_3050 = total_preg * (1 - frac_preg_under_30)
+    preg_woNM_1530 = preg_1530 * (1 - non_mal_stillbirth_fraction)
+    preg_woNM_3050 = preg_3050 * (1 - non_mal_stillbirth_fraction)
+    num_1or2_preg = total_preg * frac_first_second_birth
+
+    # malaria-attributable stillbirths with the estimated IPTp coverage and without IPTp
+    still_1530 = preg_woNM_1530 * prob_1530 * (f_iptp * pm_still_iptp).sum(axis=-1)
+    still_3050 = preg_woNM_3050 * prob_3050 * (f_iptp * pm_still_iptp).sum(axis=-1)
+    still_noIPTp = (preg_woNM_1530 * prob_1530 + preg_woNM_3050 * prob_3050) * pm_still_iptp[0]
+    # mLBW among first and second live births, and mLBW infants who die in their first year
+    num_1or2_livebirth = ((preg_woNM_1530 - still_1530) + (preg_woNM_3050 - still_3050)) * frac_first_second_birth
+    mLBW_births = num_1or2_livebirth * prob_1530 * (f_iptp * pm_LBW_iptp).sum(axis=-1)
+
+    # PfPR in the 15-30 and 30-50 age groups is reduced while pregnant individuals are protected by IPTp: 10 weeks for
+    # one dose, 10+4 weeks for two, 10+8 weeks for three, out of 9*4 weeks of pregnancy
+    frac_time_unprotected = np.concatenate([[1], 1 - (weeks_protection_each_dose + 4 * np.arange(3)) / (9 * 4)])
+    unprotected = (f_iptp * frac_time_unprotected).sum(axis=-1)
+    pfpr_adjusted = pfpr.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # pregnancies last nine months, so about nine times the pregnancies ending each month are ongoing
+        for age_group, preg in ((a1530, preg_1530), (a3050, preg_3050)):
+            frac_preg = preg * PREGNANCY_MONTHS / pop[..., age_group]
+            pfpr_adjusted[..., age_group] = ((1 - frac_preg) * pfpr[..., age_group]
+                                             + frac_preg * pfpr[..., age_group] * unprotected)
+        total_pop = pop.sum(axis=-1)
+        pfpr_mip_adjusted = (pfpr_adjusted * pop).sum(axis=-1) / total_pop
+        pfpr_unadjusted = (pfpr * pop).sum(axis=-1) / total_pop
+
+    severe_maternal = num_1or2_preg * prob_1530 * ((1 - coverage) * prob_severe_from_MiP
+                                                   + coverage * prob_severe_from_MiP * reduced_prob_severe_IPTp)
+    return {'PfPR_MiP_adjusted': pfpr_mip_adjusted,
+            'PfPR_unadjusted': pfpr_unadjusted,
+            'severe_maternal': severe_maternal,
+            'severe_maternal_treated': severe_maternal * prob_severe_MiP_treated,
+            'mLBW_births': mLBW_births,
+            'mLBW_deaths': mLBW_births * (d1 - d0),
+            'MiP_stillbirths': still_1530 + still_3050,
+            'MiP_stillbirths_noIPTp': still_noIPTp,
+            'num_all_births': preg_1530 + preg_3050}
+
+
+def adjust_for_mip(all_age_df, infections_df, iptp_coverage_df, frac_iptp_1, frac_iptp_2, frac_iptp_3,
+                   frac_iptp_years, previous_infections_df=None, **mip_params):
+    """
+    Add the MiP and IPTp columns (MIP_COLUMNS) to the All_Age_monthly_Cases rows of the same admins and runs, as
+    adjust_sim_output_for_MiP.
+    Args:
+        all_age_df: All_Age_monthly_Cases output
+        infections_df: newInfections_PfPR_cases_monthly_byAgeGroup output (age groups AGE_GROUPS)
+        iptp_coverage_df: IPTp coverage by admin (row) and year (column)
+        frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years: see iptp_dose_fractions
+        previous_infections_df: newInfections_PfPR_cases_monthly_byAgeGroup output of the simulations that precede
+            these (e.g., to-present simulations before future projections). Its final year is used so pregnancies
+            ending in the first year of these simulations have outcomes.
+        **mip_params: parameters of calculate_mip_numbers
+
+    Returns:
+        All_Age_monthly_Cases data frame with the additional columns; rows after the last year of infections_df are
+        dropped
+    """
+    missing = [col for col in ('New Severe Cases', 'Received_Severe_Treatment') if col not in all_age_df.columns]
+    if missing:
+        raise ValueError('All_Age_monthly_Cases is missing the %s column(s) needed for the MiP adjustment'
+                         % ', '.join(missing))
+    all_age_df = with_year_month(all_age_df)
+    infections_df = infections_df[infections_df['AgeGroup'].isin(AGE_GROUPS)]
+    last_year = int(infections_df['year'].max())
+    history_months = 12
+    if previous_infections_df is not None:
+        first_year = int(infections_df['year'].min())
+        previous = previous_infections_df[(previous_infections_df['year'] == first_year - 1)
+                                          & previous_infections_df['AgeGroup'].isin(AGE_GROUPS)
+                                          & previous_infections_df['Run_Number'].isin(infections_df['Run_Number'])]
+        if len(previous) > 0:
+            infections_df = pd.concat([previous, infections_df], ignore_index=True)
+        else:
+            print('No %d values in the previous simulations... MiP outcomes start a year later' % (first_year - 1))
+    first_year = int(infections_df['year'].min())
+    num_months = (last_year - first_year + 1) * 12
+    admins = list(pd.unique(infections_df['admin_name']))
+    run_numbers = np.unique(infections_df['Run_Number'].to_numpy())
+
+    grids = {col: [] for col in ('Pop', 'New Infections', 'PfPR')}
+    for age_group in AGE_GROUPS:
+        age_grids = monthly_grid(infections_df[infections_df['AgeGroup'] == age_group], grids.keys(), admins,
+                                 run_numbers, first_year, num_months)
+        for col in grids:
+            grids[col].append(age_grids[col])
+    grids = {col: np.stack(values, axis=-1) for col, values in grids.items()}
+    f_iptp = iptp_dose_fractions(iptp_coverage_df, admins, first_year, num_months, frac_iptp_1, frac_iptp_2,
+                                 frac_iptp_3, frac_iptp_years)
+    month_days = DAYS_IN_SIM_MONTH[np.arange(num_months) % 12]
+    mip = calculate_mip_numbers(grids['Pop'], grids['New Infections'], grids['PfPR'], f_iptp, month_days,
+                                history_months=history_months, **mip_params)
+
+    # one row per (run, admin, month), joined to the All_Age rows
+    runs, admin_index, month_index = np.meshgrid(run_numbers, np.arange(len(admins)), np.arange(num_months),
+                                                 indexing='ij')
+    mip_df = pd.DataFrame({'admin_name': np.asarray(admins, dtype=object)[admin_index.ravel()],
+                           'Run_Number': runs.ravel(),
+                           'year': first_year + month_index.ravel() // 12,
+                           'month': month_index.ravel() % 12 + 1})
+    for col, values in mip.items():
+        mip_df[col] = values.ravel()
+    all_age_df = all_age_df[all_age_df['year'] <= last_year].drop(columns=MIP_COLUMNS, errors='ignore')
+    all_age_df = all_age_df.assign(year=all_age_df['year'].astype(np.int64),
+                                   month=all_age_df['month'].astype(np.int64))
+    adf = pd.merge(all_age_df, mip_df, on=KEY_COLUMNS, how='left')
+    adf['severe_total'] = adf['severe_maternal'] + adf['New Severe Cases']
+    adf['severe_total_treated'] = adf['severe_maternal_treated'] + adf['Received_Severe_Treatment']
+    return adf
+
+
+def indirect_death_probability(starting_prob, age_shape_param, min_age, max_age):
+    """
+    Mean probability of an indirect malaria death per clinical case over ages min_age-max_age (Ross et al.).
+    """
+    ages = np.round(np.arange(min_age, max_age + 0.05, 0.1), 10)
+    return np.mean(starting_prob / (1 + ages / age_shape_param))
+
+
+def adjust_for_mortality(all_age_df, u5_df, u1_df=None, cfr_severe_treated=0.097, cfr_severe_untreated_1=0.539,
+                         cfr_severe_untreated_2=0.177, starting_prob_1=0.037, starting_prob_2=0.01,
+                         age_shape_param=0.117, cases_are_rates=True):
+    """
+    Direct, indirect, and total malaria mortality (lower '_1' and upper '_2' CFR estimates and their mean) for all
+    ages, U5, and U1, as adjust_sim_output_mortality.
+    Args:
+        all_age_df: All_Age_monthly_Cases with the MiP columns (from adjust_for_mip)
+        u5_df: U5_PfPR_ClinicalIncidence_severeTreatment output
+        u1_df: U1_PfPR_ClinicalIncidence_severeTreatment output, if available
+        cfr_severe_treated: case fatality rate for severe, treated cases
+        cfr_severe_untreated_1: case fatality rate for severe, untreated cases (upper estimate)
+        cfr_severe_untreated_2: case fatality rate for severe, untreated cases (lower estimate)
+        starting_prob_1: QD from Ross et al, upper value
+        starting_prob_2: QD from Ross et al, lower value
+        age_shape_param: aF* from Ross et al
+        cases_are_rates: whether the 'Cases U5' and 'Severe cases U5' columns (and U1) are annualized per-person
+            incidences, as written by monthlyU5PfPRAnalyzer and monthlyU1PfPRAnalyzer, converted to monthly counts
+            with the population (x Pop x 30/365) as in adjust_sim_output_mortality. False if they are already
+            monthly counts.
+
+    Returns:
+        merged data frame, with spaces in column names replaced by underscores
+    """
+    age_dfs = [('U5', u5_df, 0, 5)] + ([('U1', u1_df, 0, 1)] if u1_df is not None else [])
+    adf = with_year_month(all_age_df)
+    for agelabel, age_df, _, _ in age_dfs:
+        shared = [col for col in age_df.columns if col in adf.columns and col not in KEY_COLUMNS]
+        adf = pd.merge(adf, age_df.drop(columns=shared), on=KEY_COLUMNS, how='outer')
+        treated_col = 'Num_%s_Received_Severe_Treatment' % agelabel
+        adf[treated_col] = adf[treated_col].fillna(0)
+        if cases_are_rates:
+            adf = adf.rename(columns={'Severe cases %s' % agelabel: 'severe_case_%s_rate' % agelabel})
+
+    cfr_untreated = {'1': cfr_severe_untreated_1, '2': cfr_severe_untreated_2}
+    starting_prob = {'1': starting_prob_1, '2': starting_prob_2}
+    columns = {}
+    for agelabel, _, min_age, max_age in age_dfs:
+        if cases_are_rates:
+            pop = adf['Pop %s' % agelabel]
+            cases = adf['Cases %s' % agelabel] * pop * 30 / 365
+            severe = columns['Severe_cases_%s' % agelabel] = adf['severe_case_%s_rate' % agelabel] * pop * 30 / 365
+        else:
+            # 'Severe cases U5' becomes Severe_cases_U5 when the columns are renamed
+            cases = adf['Cases %s' % agelabel]
+            severe = adf['Severe cases %s' % agelabel]
+        columns['New_clinical_cases_%s' % agelabel] = cases
+        treated = adf['Num_%s_Received_Severe_Treatment' % agelabel]
+        for k in ('1', '2'):
+            direct = treated * cfr_severe_treated + (severe - treated).clip(lower=0) * cfr_untreated[k]
+            indirect = cases * indirect_death_probability(starting_prob[k], age_shape_param, min_age, max_age)
+            columns['direct_mortality_nonMiP_%s_%s' % (agelabel, k)] = direct
+            columns['indirect_mortality_nonMiP_%s_%s' % (agelabel, k)] = indirect
+            columns['total_mortality_%s_%s' % (agelabel, k)] = direct + indirect + adf['mLBW_deaths']
+    untreated = adf['New Severe Cases'] + adf['severe_maternal'] - adf['severe_total_treated']
+    for k in ('1', '2'):
+        direct = adf['severe_total_treated'] * cfr_severe_treated + untreated.clip(lower=0) * cfr_untreated[k]
+        indirect = (columns['indirect_mortality_nonMiP_U5_%s' % k]
+                    + (adf['New Clinical Cases'] - columns['New_clinical_cases_U5'])
+                    * indirect_death_probability(starting_prob[k], age_shape_param, 5, 80))
+        columns['direct_mortality_nonMiP_%s' % k] = direct
+        columns['indirect_mortality_nonMiP_%s' % k] = indirect
+        columns['total_mortality_%s' % k] = direct + indirect + adf['mLBW_deaths']
+    for agelabel in [''] + ['%s_' % agelabel for agelabel, _, _, _ in age_dfs]:
+        for measure in ('direct_mortality_nonMiP_', 'indirect_mortality_nonMiP_', 'total_mortality_'):
+            name = measure + agelabel
+            columns[name + 'mean'] = (columns[name + '1'] + columns[name + '2']) / 2
+    adf = pd.concat([adf, pd.DataFrame(columns, index=adf.index)], axis=1)
+
+    if adf.duplicated(KEY_COLUMNS).any():
+        print('Warning: multiple rows for at least one admin-year-month-run combination in the adjusted burden')
+    return adf.rename(columns=lambda col: re.sub(r'[ .]', '_', col))
+
+
+def adjust_burden_outputs(output_dir, iptp_coverage_df, frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years,
+                          previous_output_dir=None, output_filename=BURDEN_FILENAME, admin_chunk_size=100,
+                          mortality_params=None, **mip_params):
+    """
+    Write malariaBurden_withAdjustments.csv for an experiment from the outputs of its analyzers, processing chunks of
+    admins at a time so large experiments fit in memory.
+    Args:
+        output_dir: directory of the experiment's analyzer outputs
+        iptp_coverage_df: IPTp coverage by admin (row) and year (column)
+        frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years: see iptp_dose_fractions
+        previous_output_dir: analyzer outputs of the simulations that precede these (see adjust_for_mip)
+        output_filename: name of the adjusted burden output
+        admin_chunk_size: number of admins processed at a time
+        mortality_params: parameters of adjust_for_mortality
+        **mip_params: parameters of calculate_mip_numbers
+
+    Returns:
+        path of the written file
+    """
+    infections_df = read_output(os.path.join(output_dir, INFECTIONS_FILENAME))
+    all_age_df = read_output(os.path.join(output_dir, ALL_AGE_FILENAME))
+    u5_df = read_output(os.path.join(output_dir, AGE_FILENAME % 'U5'))
+    try:
+        u1_df = read_output(os.path.join(output_dir, AGE_FILENAME % 'U1'))
+    except FileNotFoundError:
+        u1_df = None
+    previous_df = None
+    if previous_output_dir is not None:
+        previous_df = read_output(os.path.join(previous_output_dir, INFECTIONS_FILENAME))
+
+    path = os.path.join(output_dir, output_filename)
+    if os.path.exists(path):
+        os.remove(path)
+    admins = list(pd.unique(all_age_df['admin_name']))
+    for start in range(0, len(admins), admin_chunk_size):
+        chunk = admins[start:start + admin_chunk_size]
+        adf = adjust_for_mip(all_age_df[all_age_df['admin_name'].isin(chunk)],
+                             infections_df[infections_df['admin_name'].isin(chunk)], iptp_coverage_df,
+                             frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years,
+                             previous_infections_df=(previous_df[previous_df['admin_name'].isin(chunk)]
+                                                     if previous_df is not None else None),
+                             **mip_params)
+        adf = adjust_for_mortality(adf, u5_df[u5_df['admin_name'].isin(chunk)],
+                                   u1_df[u1_df['admin_name'].isin(chunk)] if u1_df is not None else None,
+                                   **(mortality_params or {}))
+        adf.to_csv(path, mode='a', header=(start == 0), index=False)
+    return path
+
+
+class BurdenAdjustmentAnalyzer(IAnalyzer):
+    """
+    Mortality and MiP/IPTp adjustment stage for the outputs of the other analyzers in an AnalyzerBundle: listed after
+    the analyzers writing the newInfections by age group, All_Age_monthly_Cases, and U1/U5 severe treatment outputs,
+    its reduce writes malariaBurden_withAdjustments.csv in the experiment's output directory. It reads no simulation
+    files.
+    """
+
+    def __init__(self, expt_name, iptp_coverage_df, frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years,
+                 mip_params, mortality_params=None, previous_expt_name=None, working_dir=".", admin_chunk_size=100):
+        """
+        Args:
+            expt_name: experiment name (output directory of the other analyzers)
+            iptp_coverage_df: IPTp coverage by admin (row) and year (column)
+            frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years: see iptp_dose_fractions
+            mip_params: dict of parameters of calculate_mip_numbers (pm_LBW_iptp, pm_still_iptp, d0, d1,
+                births_per_person_per_month, non_mal_stillbirth_fraction, frac_preg_under_30,
+                frac_first_second_birth, and optionally the severe MiP parameters)
+            mortality_params: dict of parameters of adjust_for_mortality, if not the defaults
+            previous_expt_name: output directory (in working_dir) of the simulations that precede these, if any
+            working_dir: working directory of the other analyzers
+            admin_chunk_size: number of admins processed at a time
+        """
+        super(BurdenAdjustmentAnalyzer, self).__init__(working_dir=working_dir, filenames=[])
+        self.expt_name = expt_name
+        self.iptp_coverage_df = iptp_coverage_df
+        self.frac_iptp = (frac_iptp_1, frac_iptp_2, frac_iptp_3, frac_iptp_years)
+        self.mip_params = mip_params
+        self.mortality_params = mortality_params
+        self.previous_expt_name = previous_expt_name
+        self.admin_chunk_size = admin_chunk_size
+
+    def filter(self, simulation):
+        # nothing to read from the simulations; reduce works on the outputs of the other analyzers
+        return False
+
+    def map(self, data, simulation):
+        return None
+
+    def reduce(self, all_data):
+
+        output_dir = os.path.join(self.working_dir, self.expt_name)
+        previous_output_dir = None
+        if self.previous_expt_name is not None:
+            previous_output_dir = os.path.join(self.working_dir, self.previous_expt_name)
+        try:
+            adjust_burden_outputs(output_dir, self.iptp_coverage_df, *self.frac_iptp,
+                                  previous_output_dir=previous_output_dir, admin_chunk_size=self.admin_chunk_size,
+                                  mortality_params=self.mortality_params, **self.mip_params)
+        except FileNotFoundError as e:
+            print("Missing analyzer output for the burden adjustments (%s)... Exiting..." % e)
@@ -0,0 +1,267 @@
+import os
+import numpy as np
+import pandas as pd
+from snt.analyzers.admin_rollup import AdminRollup
+from snt.analyzers.output_files import read_output
+from snt.analyzers.result_tensor import LabeledArray
+
+BURDEN_FILENAME = 'malariaBurden_withAdjustments.csv'
+# monthly quantities summed within each (admin, seed, year), as in get_cumulative_burden: name -> (column,
+# multiplier). Counts are rescaled to the true admin population by pop_size / Statistical_Population ('scale');
+# quantities whose column is missing from an experiment's output are left out.
+BURDEN_QUANTITIES = {
+    'pop_all': (None, 'pop_size'),
+    'pop_U5': ('Pop_U5', 'scale'),
+    'positives_all': ('PfPR_MiP_adjusted', 'pop_size'),
+    'positives_U5': ('PfPR_U5', 'pop_U5'),
+    'cases_all': ('New_Clinical_Cases', 'scale'),
+    'cases_U5': ('New_clinical_cases_U5', 'scale'),
+    'severe_all': ('severe_total', 'scale'),
+    'severe_U5': ('Severe_cases_U5', 'scale'),
+    'direct_deaths_1_all': ('direct_mortality_nonMiP_1', 'scale'),
+    'direct_deaths_2_all': ('direct_mortality_nonMiP_2', 'scale'),
+    'all_deaths_1_all': ('total_mortality_1', 'scale'),
+    'all_deaths_2_all': ('total_mortality_2', 'scale'),
+    'direct_deaths_1_U5': ('direct_mortality_nonMiP_U5_1', 'scale'),
+    'direct_deaths_2_U5': ('direct_mortality_nonMiP_U5_2', 'scale'),
+    'all_deaths_1_U5': ('total_mortality_U5_1', 'scale'),
+    'all_deaths_2_U5': ('total_mortality_U5_2', 'scale'),
+    'mLBW': ('mLBW_births', 'scale'),
+    'mStill': ('MiP_stillbirths', 'scale'),
+    'num_values': (None, None),
+}
+
+
+def burden_metrics(sums, num_years):
+    """
+    Cumulative burden metrics of get_cumulative_burden(_by_state) from summed quantities.
+    Args:
+        sums: dict of quantity name -> array of sums over the months of the period
+        num_years: number of years in the period
+
+    Returns:
+        dict of metric name (as in the R outputs) -> array
+    """
+    metrics = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # mean population over the months of the period, in thousands of person-years per year
+        person_years = {age: sums['pop_%s' % age] / 12 / 1000 for age in ['all', 'U5'] if 'pop_%s' % age in sums}
+        for age in person_years:
+            if 'cases_%s' % age in sums:
+                metrics['cases_%s_sum' % age] = sums['cases_%s' % age]
+                metrics['incidence_%s' % age] = sums['cases_%s' % age] / person_years[age]
+            if 'severe_%s' % age in sums:
+                metrics['severe_%s_sum' % age] = sums['severe_%s' % age]
+                metrics['severe_incidence_%s' % age] = sums['severe_%s' % age] / person_years[age]
+            if 'positives_%s' % age in sums:
+                metrics['average_PfPR_%s' % age] = sums['positives_%s' % age] / sums['pop_%s' % age]
+            for death_type in ['direct', 'all']:
+                rates = []
+                for estimate in ['1', '2']:
+                    name = '%s_deaths_%s_%s' % (death_type, estimate, age)
+                    if name in sums:
+                        metrics[name + '_sum'] = sums[name]
+                        rates.append(sums[name] / person_years[age])
+                        metrics['%s_death_rate_%s_%s' % (death_type, estimate, age)] = rates[-1]
+                if len(rates) == 2:
+                    metrics['%s_death_rate_mean_%s' % (death_type, age)] = (rates[0] + rates[1]) / 2
+        for name in ['mLBW', 'mStill']:
+            if name in sums:
+                metrics['%s_sum' % name] = sums[name]
+                metrics['annual_num_%s' % name] = sums[name] / num_years
+    return metrics
+
+
+class BurdenComparison:
+    """
+    Cumulative, relative, and difference burden across many experiments (the Python counterpart of
+    get_cumulative_burden(_by_state/_by_admin), get_relative_burden(_by_state), and get_difference_burden(_by_state)
+    in process_sim_output_functions.R).
+
+    Each experiment's burden output is read once and reduced to an array of monthly sums by (quantity, admin_name,
+    Run_Number, year), rescaled to the true admin population; the arrays are kept in memory (and re-read if the file
+    changes). Experiments are aligned on common admins, seeds, and years, so the comparisons of all scenario pairs
+    are array operations over an experiment axis.
+    """
+
+    def __init__(self, sim_output_filepath, admin_pop, filename=BURDEN_FILENAME):
+        """
+        Args:
+            sim_output_filepath: directory with a subdirectory of outputs for each experiment
+            admin_pop: data frame with admin_name, State, and pop_size (e.g., from load_admin_population)
+            filename: burden output of each experiment
+        """
+        self.sim_output_filepath = sim_output_filepath
+        self.filename = filename
+        self.admin_rollup = AdminRollup(admin_pop)
+        self.admins = list(self.admin_rollup.admins)
+        self.states = self.admin_rollup.mapping('State')
+        self._loaded = {}  # experiment name -> (file modification time, LabeledArray of sums)
+
+    def experiment_path(self, experiment_name):
+        return os.path.join(self.sim_output_filepath, experiment_name, self.filename)
+
+    def load_experiment(self, experiment_name):
+        """
+        Monthly quantities of an experiment summed by (quantity, admin_name, Run_Number, year), from the cache if the
+        output has not changed since it was read.
+        """
+        path = self.experiment_path(experiment_name)
+        mtime = os.path.getmtime(path)
+        if experiment_name in self._loaded and self._loaded[experiment_name][0] == mtime:
+            return self._loaded[experiment_name][1]
+
+        adf = read_output(path)
+        admin_index = self.admin_rollup.admin_index(adf['admin_name'])
+        adf = adf[admin_index >= 0]
+        admin_index = admin_index[admin_index >= 0]
+        run_numbers, run_index = np.unique(adf['Run_Number'].to_numpy(), return_inverse=True)
+        years, year_index = np.unique(adf['year'].to_numpy(), return_inverse=True)
+        shape = (len(self.admins), len(run_numbers), len(years))
+        flat_index = np.ravel_multi_index((admin_index, run_index, year_index), shape)
+
+        multipliers = {'pop_size': self.admin_rollup.pop_size[admin_index],
+                       'scale': self.admin_rollup.row_scale(adf, 'Statistical_Population', admin_index)}
+        if 'Pop_U5' in adf.columns:
+            multipliers['pop_U5'] = adf['Pop_U5'].to_numpy(dtype=np.float64) * multipliers['scale']
+        quantities = []
+        sums = []
+        for name, (column, multiplier) in BURDEN_QUANTITIES.items():
+            if column is not None and column not in adf.columns:
+                continue
+            values = np.ones(len(adf)) if column is None else adf[column].to_numpy(dtype=np.float64)
+            if multiplier is not None:
+                values = values * multipliers[multiplier]
+            quantities.append(name)
+            sums.append(np.bincount(flat_index, weights=values, minlength=np.prod(shape)).reshape(shape))
+        summed = LabeledArray(np.stack(sums), ('quantity', 'admin_name', 'Run_Number', 'year'),
+                              {'quantity': quantities, 'admin_name': self.admins,
+                               'Run_Number': run_numbers.tolist(), 'year': years.tolist()})
+        self._loaded[experiment_name] = (mtime, summed)
+        return summed
+
+    def load(self, experiment_names):
+        """
+        Monthly sums of several experiments aligned into one array by (experiment, quantity, admin_name, Run_Number,
+        year), with the quantities common to all experiments, the union of seeds and years, and NaN where an
+        experiment has no values.
+        """
+        loaded = [self.load_experiment(name) for name in experiment_names]
+        quantities = [name for name in loaded[0].coords['quantity'] if all(name in x.coords['quantity'] for x in loaded)]
+        run_numbers = sorted(set().union(*[x.coords['Run_Number'] for x in loaded]))
+        years = sorted(set().union(*[x.coords['year'] for x in loaded]))
+        data = np.full((len(loaded), len(quantities), len(self.admins), len(run_numbers), len(years)), np.nan)
+        for ee, summed in enumerate(loaded):
+            rr = np.searchsorted(run_numbers, summed.coords['Run_Number'])
+            yy = np.searchsorted(years, summed.coords['year'])
+            values = summed.sel(quantity=quantities).data
+            # admin/seed/year combinations without any output rows stay missing
+            values = np.where(summed.sel(quantity='num_values').data > 0, values, np.nan)
+            data[ee][np.ix_(range(len(quantities)), range(len(self.admins)), rr, yy)] = values
+        return LabeledArray(data, ('experiment', 'quantity', 'admin_name', 'Run_Number', 'year'),
+                            {'experiment': list(experiment_names), 'quantity': quantities,
+                             'admin_name': self.admins, 'Run_Number': run_numbers, 'year': years})
+
+    def cumulative_sums(self, experiment_names, start_year, end_year, level='admin', cur_admins='all'):
+        """
+        Sums of the monthly quantities over start_year to end_year by (experiment, quantity, unit, Run_Number), where
+        the unit is the admin ('admin'), the state ('state'), or all included admins together ('all').
+        """
+        loaded = self.load(experiment_names)
+        years = [year for year in loaded.coords['year'] if start_year <= year <= end_year]
+        summed = LabeledArray(np.nansum(loaded.sel(year=years).data, axis=-1), loaded.dims[:-1], loaded.coords)
+        if cur_admins != 'all':
+            summed = summed.sel(admin_name=[admin for admin in self.admins if admin in set(cur_admins)])
+        if level == 'state':
+            summed = summed.rollup('admin_name', self.states)
+        elif level == 'all':
+            summed = summed.rollup('admin_name', {admin: 'all' for admin in summed.coords['admin_name']})
+        # units and seeds without any values in the period are missing rather than zero
+        has_values = summed.sel(quantity='num_values').data > 0
+        return LabeledArray(np.where(has_values[:, None], summed.data, np.nan), summed.dims, summed.coords)
+
+    def cumulative_burden_arrays(self, experiment_names, start_year, end_year, level='admin', cur_admins='all',
+                                 mean_across_seeds=False):
+        sums = self.cumulative_sums(experiment_names, start_year, end_year, level, cur_admins)
+        metrics = burden_metrics({name: sums.sel(quantity=name).data for name in sums.coords['quantity']},
+                                 num_years=end_year - start_year + 1)
+        if mean_across_seeds:
+            with np.errstate(invalid='ignore'):
+                metrics = {name: np.nanmean(values, axis=-1, keepdims=True) for name, values in metrics.items()}
+        return sums.coords, metrics
+
+    def _to_frame(self, labels, metrics, level, mean_across_seeds, experiment_dims):
+        unit = {'admin': 'admin_name', 'state': 'State', 'all': None}[level]
+        index_dims = list(experiment_dims) + ([unit] if unit else []) + ([] if mean_across_seeds else ['Run_Number'])
+        coords = [labels[dim] for dim in experiment_dims] + \
+                 ([labels['admin_name']] if unit else []) + ([] if mean_across_seeds else [labels['Run_Number']])
+        index = pd.MultiIndex.from_product(coords, names=index_dims)
+        adf = pd.DataFrame({name: np.reshape(values, -1) for name, values in metrics.items()}, index=index)
+        return adf.reset_index()
+
+    def cumulative_burden(self, experiment_names, start_year, end_year, level='admin', cur_admins='all',
+                          mean_across_seeds=False):
+        """
+        Cumulative burden over start_year to end_year of each experiment (get_cumulative_burden,
+        get_cumulative_burden_by_state, and get_cumulative_burden_by_admin for several experiments at once).
+        Args:
+            experiment_names: experiments (subdirectories of sim_output_filepath)
+            start_year: first year included
+            end_year: last year included
+            level: 'admin', 'state', or 'all' (all included admins together)
+            cur_admins: admins included, or 'all'
+            mean_across_seeds: whether to average the metrics across seeds
+
+        Returns:
+            data frame with experiment, admin_name/State, Run_Number (unless mean_across_seeds), and burden metrics
+        """
+        labels, metrics = self.cumulative_burden_arrays(experiment_names, start_year, end_year, level, cur_admins,
+                                                        mean_across_seeds)
+        return self._to_frame({**labels, 'experiment': list(experiment_names)}, metrics, level,
+                              mean_across_seeds, ['experiment'])
+
+    def compare(self, reference_names, comparison_names, start_year, end_year, comparison='relative', level='admin',
+                cur_admins='all', align_seeds=True):
+        """
+        Relative ((reference - comparison) / reference) or difference (reference - comparison) burden of every
+        (reference, comparison) pair, as get_relative_burden(_by_state) and get_difference_burden(_by_state).
+        Args:
+            reference_names: reference experiments
+            comparison_names: comparison experiments; pass the same list as reference_names for all pairs
+            start_year: first year included
+            end_year: last year included
+            comparison: 'relative' or 'difference'
+            level: 'admin', 'state', or 'all'
+            cur_admins: admins included, or 'all'
+            align_seeds: compare each seed with the same seed of the other experiment (otherwise compare the means
+                across seeds)
+
+        Returns:
+            data frame with reference, scenario (comparison experiment), admin_name/State, Run_Number (if
+            align_seeds), and the compared burden metrics
+        """
+        experiment_names = list(dict.fromkeys(list(reference_names) + list(comparison_names)))
+        labels, metrics = self.cumulative_burden_arrays(experiment_names, start_year, end_year, level, cur_admins,
+                                                        mean_across_seeds=not align_seeds)
+        ref = [experiment_names.index(name) for name in reference_names]
+        comp = [experiment_names.index(name) for name in comparison_names]
+        compared = {}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, values in metrics.items():
+                # (reference, comparison, unit, seed), broadcasting all pairs at once
+                ref_values = values[ref][:, None]
+                difference = ref_values - values[comp][None, :]
+                compared[name] = difference / ref_values if comparison == 'relative' else difference
+        return self._to_frame({**labels, 'reference': list(reference_names),
+                               'scenario': list(comparison_names)},
+                              compared, level, not align_seeds, ['reference', 'scenario'])
+
+    def relative_burden(self, reference_names, comparison_names, start_year, end_year, level='admin',
+                        cur_admins='all', align_seeds=True):
+        return self.compare(reference_names, comparison_names, start_year, end_year, 'relative', level, cur_admins,
+                            align_seeds)
+
+    def difference_burden(self, reference_names, comparison_names, start_year, end_year, level='admin',
+                          cur_admins='all', align_seeds=True):
+        return self.compare(reference_names, comparison_names, start_year, end_year, 'difference', level,
+                            cur_admins, align_seeds)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import tempfile
+from snt.analyzers.simulation_prefilter import output_file_info
+
+# bytes written to the cache by a process between checks of the cache size against its budget
+_EVICT_CHECK_FRACTION = 0.05
+
+
+class FileDownloadCache:
+    """
+    Local content-addressed cache of simulation output files, so repeated analyses of an experiment read the files
+    from disk instead of downloading them again.
+
+    File contents are stored once per distinct content, in cache_dir/blobs/<sha256 of content>, and an index entry
+    per (simulation id, relative path) points to the content. Blobs and index entries are written to a temporary file
+    and renamed into place, so several analyzer processes (e.g., launched by watcher.py or analyzer_queue_manager.py)
+    can share one cache directory. When the cache is larger than max_bytes, the least recently used files are deleted;
+    a process that finds its entry deleted downloads the file again.
+
+    The output files of a simulation are assumed not to change after it finishes, unless a version (e.g., a size or
+    checksum reported by the platform) is passed to get and put. Use invalidate to drop the files of rerun simulations.
+    """
+
+    def __init__(self, cache_dir, max_bytes=50 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._bytes_since_evict = 0
+
+    @staticmethod
+    def _index_key(sim_id, path):
+        return hashlib.sha1(('%s/%s' % (sim_id, path.replace('\\', '/'))).encode('utf-8')).hexdigest()
+
+    def _index_path(self, sim_id, path):
+        return os.path.join(self.cache_dir, 'index', str(sim_id), self._index_key(sim_id, path))
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, 'blobs', digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def get(self, sim_id, path, version=None):
+        """
+        Read a cached file.
+        Args:
+            sim_id: simulation id
+            path: path of the file relative to the simulation directory, e.g., 'output/InsetChart.json'
+            version: optional size or checksum of the file reported by the platform; a cached file stored with a
+                different version is not returned
+
+        Returns:
+            file contents as bytes, or None if the file is not in the cache
+        """
+        try:
+            with open(self._index_path(sim_id, path), 'r') as f:
+                digest, cached_version = f.read().split('\n', 1)
+            if version is not None and cached_version != str(version):
+                return None
+            blob_path = self._blob_path(digest)
+            with open(blob_path, 'rb') as f:
+                content = f.read()
+            os.utime(blob_path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return content
+
+    def put(self, sim_id, path, content, version=None):
+        """
+        Add a downloaded file to the cache (see get for the arguments).
+        """
+        content = bytes(content)
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if os.path.exists(blob_path):
+            os.utime(blob_path)
+        else:
+            self._write_atomic(blob_path, content)
+            self._bytes_since_evict += len(content)
+        index_entry = '%s\n%s' % (digest, '' if version is None else version)
+        self._write_atomic(self._index_path(sim_id, path), index_entry.encode('utf-8'))
+        if self._bytes_since_evict > self.max_bytes * _EVICT_CHECK_FRACTION:
+            self.evict()
+
+    def invalidate(self, sim_ids=None):
+        """
+        Delete the index entries of the given simulations, or of all simulations. Their contents are deleted by evict
+        once they are the least recently used.
+        """
+        index_dir = os.path.join(self.cache_dir, 'index')
+        if not os.path.isdir(index_dir):
+            return
+        for sim_id in (os.listdir(index_dir) if sim_ids is None else [str(sim_id) for sim_id in sim_ids]):
+            sim_index_dir = os.path.join(index_dir, sim_id)
+            if not os.path.isdir(sim_index_dir):
+                continue
+            for fname in os.listdir(sim_index_dir):
+                try:
+                    os.remove(os.path.join(sim_index_dir, fname))
+                except FileNotFoundError:
+                    pass
+
+    def evict(self):
+        """
+        Delete the least recently used file contents until the cache is within max_bytes.
+        """
+        self._bytes_since_evict = 0
+        entries = []
+        for root, dirs, files in os.walk(os.path.join(self.cache_dir, 'blobs')):
+            for fname in files:
+                try:
+                    stat = os.stat(os.path.join(root, fname))
+                except FileNotFoundError:  # deleted by another process
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, fname)))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # deleted by another process, or open on Windows
+                continue
+            total -= size
+
+
+class CachedDownloadPlatform:
+    """
+    Platform wrapper that serves get_files (and get_files_by_id) from a FileDownloadCache and downloads (and caches)
+    only the files that are missing. Files are cached with the size and checksum (or modification time) the platform
+    reports for them (see output_file_info), listed once per item, so the outputs of rerun simulations are downloaded
+    again; items whose outputs cannot be listed are downloaded without the cache. All other attributes are those of
+    the wrapped platform, so it can be passed to AnalyzeManager in place of the platform:
+
+        with Platform("CALCULON") as platform:
+            manager = AnalyzeManager(platform=CachedDownloadPlatform(platform, FileDownloadCache(cache_dir)), ...)
+    """
+
+    def __init__(self, platform, cache):
+        """
+        Args:
+            platform: idmtools platform
+            cache: FileDownloadCache, or the cache directory
+        """
+        self.platform = platform
+        self.cache = cache if isinstance(cache, FileDownloadCache) else FileDownloadCache(cache)
+
+    def __getattr__(self, name):
+        # only called for attributes not set on the wrapper; dunder lookups (e.g., from pickle) are not delegated
+        if name.startswith('__') or 'platform' not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.platform, name)
+
+    def __getstate__(self):
+        return self.__dict__
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def file_versions(self, item, files):
+        """
+        Version (size and checksum or modification time) of each file of an item, or None if the item's outputs
+        cannot be listed.
+        """
+        try:
+            info = output_file_info(item, files, platform=self.platform)
+        except Exception as e:
+            print('Cannot list the output files of %s (%s)... Downloading without the cache' % (item.id, e))
+            return None
+        return {fname: '%s:%s' % version for fname, version in info.items()}
+
+    def get_files(self, item, files, output=None, **kwargs):
+        versions = self.file_versions(item, files) if getattr(item, 'id', None) is not None else None
+        if versions is None:
+            return self.platform.get_files(item, files, output=output, **kwargs)
+        ret = {}
+        missing = []
+        for fname in files:
+            # files the listing does not report are downloaded (and the platform raises if they do not exist)
+            content = self.cache.get(item.id, fname, version=versions[fname]) if fname in versions else None
+            if content is None:
+                missing.append(fname)
+            else:
+                ret[fname] = content
+        if missing:
+            downloaded = self.platform.get_files(item, missing, **kwargs)
+            for fname, content in downloaded.items():
+                if fname in versions:
+                    self.cache.put(item.id, fname, content, version=versions[fname])
+            ret.update(downloaded)
+        if output:
+            # as IPlatform.get_files, save the files to output/<item id>/<file>
+            for fname, content in ret.items():
+                file_path = os.path.join(output, str(getattr(item, 'uid', item.id)), fname)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                with open(file_path, 'wb') as f:
+                    f.write(content)
+        return ret
+
+    def get_files_by_id(self, item_id, item_type, files, output=None):
+        if item_id is None or item_id == "":
+            raise ValueError("item_id cannot be None or empty")
+        return self.get_files(self.platform.get_item(item_id, item_type, raw=True), files, output)
@@ -0,0 +1,68 @@
+from io import BytesIO, StringIO
+import numpy as np
+import pandas as pd
+from snt.analyzers.sim_calendar import DAYS_PER_YEAR, MONTH_OF_DAY
+
+# the only ReportEventRecorder.csv columns needed to count events by month and age
+EVENT_RECORDER_DTYPES = {'Time': np.float64, 'Age': np.float64, 'Event_Name': 'category'}
+
+
+def iter_event_chunks(source, event_name, chunksize=500000):
+    """
+    Read the Time and Age (in days) of the events named event_name from a ReportEventRecorder.csv, in chunks.
+    Only the Time, Age, and Event_Name columns are read and rows of other events are dropped from each chunk as it is
+    read, so memory use depends on chunksize and not on the size of the file.
+    Args:
+        source: path to the file, raw file contents (bytes or str, as passed to analyzers created with parse=False),
+            or an already parsed data frame
+        event_name: name of the event to keep
+        chunksize: number of rows read at a time
+
+    Returns:
+        iterator of (time, age) float arrays
+    """
+    if isinstance(source, pd.DataFrame):
+        chunks = [source]
+    else:
+        if isinstance(source, bytes):
+            source = BytesIO(source)
+        elif isinstance(source, str) and '\n' in source:
+            source = StringIO(source)
+        chunks = pd.read_csv(source, usecols=list(EVENT_RECORDER_DTYPES), dtype=EVENT_RECORDER_DTYPES,
+                             skipinitialspace=True, chunksize=chunksize)
+    for chunk in chunks:
+        matched = (chunk['Event_Name'] == event_name).to_numpy()
+        if matched.any():
+            yield chunk['Time'].to_numpy(dtype=np.float64)[matched], chunk['Age'].to_numpy(dtype=np.float64)[matched]
+
+
+def count_events_by_month_and_age(source, event_name, start_year, age_groups, chunksize=500000):
+    """
+    Count the events named event_name in each simulation month and age group, reading the ReportEventRecorder.csv in
+    chunks (see iter_event_chunks) and adding each chunk into per-month counters.
+    Args:
+        source: path, raw contents, or parsed data frame of the ReportEventRecorder.csv
+        event_name: name of the event to count
+        start_year: calendar year of simulation day 0
+        age_groups: dict of age group label -> (agemin, agemax); events with agemin < age in years < agemax are counted
+        chunksize: number of rows read at a time
+
+    Returns:
+        tuple of (years, months, counts), where counts is a dict of age group label -> int array, all with one entry
+        per month from the start of the simulation to the month of the last event
+    """
+    counts = {label: np.zeros(0, dtype=np.int64) for label in age_groups}
+    for time, age in iter_event_chunks(source, event_name, chunksize):
+        time = time.astype(np.int64)
+        month_index = (time // DAYS_PER_YEAR) * 12 + MONTH_OF_DAY[time % DAYS_PER_YEAR] - 1
+        age_years = age / 365
+        for label, (agemin, agemax) in age_groups.items():
+            in_group = (age_years < agemax) & (age_years > agemin)
+            chunk_counts = np.bincount(month_index[in_group])
+            if len(chunk_counts) > len(counts[label]):
+                counts[label] = np.pad(counts[label], (0, len(chunk_counts) - len(counts[label])))
+            counts[label][:len(chunk_counts)] += chunk_counts
+    num_months = max([len(group_counts) for group_counts in counts.values()], default=0)
+    counts = {label: np.pad(group_counts, (0, num_months - len(group_counts))) for label, group_counts in counts.items()}
+    month_index = np.arange(num_months)
+    return month_index // 12 + start_year, month_index % 12 + 1, counts
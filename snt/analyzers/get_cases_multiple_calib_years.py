@@ -1,21 +1,17 @@
 import os
-import datetime
 import pandas as pd
 import numpy as np
 from idmtools.entities import IAnalyzer
+from snt.analyzers.sim_calendar import month_start_dates, monthly_channel_frame
+from snt.analyzers.output_files import write_output
+from snt.analyzers.report_channels import read_report_channels
 
 
 class monthlyTreatedCasesAnalyzer(IAnalyzer):
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
-    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026):
-        super(monthlyTreatedCasesAnalyzer, self).__init__(working_dir=working_dir,
+    def __init__(self, expt_name, channels=None, sweep_variables=None, working_dir=".", start_year=2020, end_year=2026,
+                 output_format='csv'):
+        super(monthlyTreatedCasesAnalyzer, self).__init__(working_dir=working_dir, parse=False,
                                                           filenames=["output/ReportEventCounter.json",
                                                                      "output/ReportMalariaFiltered.json"]
                                                           )
@@ -26,6 +22,7 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
             self.channels = channels
         self.inset_channels = ['Statistical Population', 'New Clinical Cases', 'New Severe Cases', 'PfHRP2 Prevalence']
         self.expt_name = expt_name
+        self.output_format = output_format
         self.start_year = start_year
         self.end_year = end_year
 
@@ -39,19 +36,12 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
 
     def map(self, data, simulation):
 
-        simdata = pd.DataFrame({x: data[self.filenames[0]]['Channels'][x]['Data'] for x in self.channels})
-        simdata['Time'] = simdata.index
-
-        d = pd.DataFrame({x: data[self.filenames[1]]['Channels'][x]['Data'] for x in self.inset_channels})
-        d['Time'] = d.index
-
-        if len(self.channels) > 0:
-            simdata = pd.merge(left=simdata, right=d, on='Time')
-        else:
-            simdata = d
-        simdata['Day'] = simdata['Time'] % 365
-        simdata['month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
-        simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + self.start_year)
+        channel_data = read_report_channels(data[self.filenames[0]], self.channels)
+        channel_data.update(read_report_channels(data[self.filenames[1]], self.inset_channels))
+        # reduce daily values to monthly sums and means (matching the aggregation in reduce)
+        simdata = monthly_channel_frame(channel_data, self.start_year,
+                                        sum_channels=self.channels + ['New Clinical Cases', 'New Severe Cases'],
+                                        mean_channels=['Statistical Population', 'PfHRP2 Prevalence'])
 
         for sweep_var in self.sweep_variables:
             if sweep_var in simulation.tags.keys():
@@ -69,7 +59,7 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
             os.mkdir(os.path.join(self.working_dir, self.expt_name))
 
         adf = pd.concat(selected).reset_index(drop=True)
-        adf['date'] = adf.apply(lambda x: datetime.date(int(x['year']), int(x['month']), 1), axis=1)
+        adf['date'] = month_start_dates(adf['year'], adf['month'])
 
         sum_channels = self.channels + ['New Clinical Cases', 'New Severe Cases']
         mean_channels = ['Statistical Population', 'PfHRP2 Prevalence']
@@ -78,7 +68,8 @@ class monthlyTreatedCasesAnalyzer(IAnalyzer):
         pdf = adf.groupby(['__sample_index__', 'date', 'Run_Number'])[mean_channels].agg(np.mean).reset_index()
 
         adf = pd.merge(left=pdf, right=df, on=['__sample_index__', 'date', 'Run_Number'])
-        adf.to_csv(os.path.join(self.working_dir, self.expt_name, 'All_Age_monthly_Cases.csv'), index=False)
+        write_output(adf, os.path.join(self.working_dir, self.expt_name, 'All_Age_monthly_Cases.csv'),
+                     self.output_format)
 
 
 if __name__ == "__main__":
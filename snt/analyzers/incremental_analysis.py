@@ -0,0 +1,120 @@
+import os
+import time
+from datetime import datetime
+from idmtools.analysis.analyze_manager import AnalyzeManager
+from idmtools.core import ItemType
+from snt.analyzers.analyze_bundle import AnalyzerBundle
+from snt.analyzers.map_cache import CachedAnalyzer, MapResultCache
+from snt.analyzers.simulation_prefilter import SUCCEEDED, SimulationPrefilter, simulation_status
+
+PROVISIONAL_DIR = 'provisional'
+DONE_STATES = (SUCCEEDED, 'FAILED')
+
+
+def log(msg):
+    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - {msg}")
+
+
+class IncrementalAnalysis:
+    """
+    Analyze an experiment while it runs: simulations are mapped as they succeed and their map results are kept in a
+    MapResultCache, so each pass only downloads and maps the simulations that succeeded since the previous pass. Each
+    pass also reduces all map results so far into provisional outputs, written to <working_dir>/provisional/ of each
+    analyzer. Once every simulation has finished, a final pass maps the last simulations and writes the outputs to the
+    analyzers' working_dir, as a single analysis of the finished experiment would.
+
+    Simulations are selected with SimulationPrefilter, so failed simulations and simulations missing output files are
+    left out of every pass (see the PrefilterResult returned by run).
+
+    Example:
+        incremental = IncrementalAnalysis(platform, exp_id, analyzers, MapResultCache('map_cache'))
+        incremental.run().write(expt_name)
+    """
+
+    def __init__(self, platform, exp_id, analyzers, map_cache, poll_interval=300, min_new_simulations=1,
+                 status_cache_dir=None, max_workers=None):
+        """
+        Args:
+            platform: idmtools platform
+            exp_id: experiment id
+            analyzers: list of analyzer instances or (analyzer class, dict of arguments) pairs, run as an AnalyzerBundle
+            map_cache: MapResultCache, or its directory
+            poll_interval: seconds between checks of the simulation states
+            min_new_simulations: number of newly succeeded simulations that triggers a provisional pass
+            status_cache_dir: directory of the SimulationPrefilter file listings, or None
+            max_workers: map processes of each pass (AnalyzeManager max_workers)
+        """
+        self.platform = platform
+        self.exp_id = str(exp_id)
+        self.bundle = AnalyzerBundle(analyzers)
+        self.map_cache = map_cache if isinstance(map_cache, MapResultCache) else MapResultCache(map_cache)
+        # working_dir is not part of the cache key, so provisional and final passes share the cached map results
+        self.analyzer = CachedAnalyzer(self.bundle, self.map_cache, namespace=self.exp_id)
+        self.poll_interval = poll_interval
+        self.min_new_simulations = min_new_simulations
+        self.prefilter = SimulationPrefilter(platform, cache_dir=status_cache_dir)
+        self.max_workers = max_workers
+        self.working_dirs = [analyzer.working_dir for analyzer in self.bundle.analyzers]
+
+    def _set_output_dirs(self, provisional):
+        for analyzer, working_dir in zip(self.bundle.analyzers, self.working_dirs):
+            analyzer.working_dir = os.path.join(working_dir, PROVISIONAL_DIR) if provisional else working_dir
+
+    def analyze_pass(self, exclude_ids, provisional):
+        """
+        Map the simulations not in exclude_ids that are not cached yet, and reduce all map results.
+
+        Returns:
+            True if the analysis succeeded
+        """
+        self._set_output_dirs(provisional)
+        try:
+            manager = AnalyzeManager(platform=self.platform,
+                                     ids=[(self.exp_id, ItemType.EXPERIMENT)],
+                                     analyzers=[self.analyzer],
+                                     exclude_ids=list(exclude_ids),
+                                     partial_analyze_ok=True,
+                                     max_workers=self.max_workers)
+            return manager.analyze()
+        finally:
+            self._set_output_dirs(False)
+
+    def run(self):
+        """
+        Analyze the experiment until all of its simulations have finished, then write the final outputs.
+
+        Returns:
+            PrefilterResult of the final pass
+        """
+        analyzed = set()
+        while True:
+            simulations = self.platform.get_children(self.exp_id, ItemType.EXPERIMENT, force=True)
+            done = all(simulation_status(simulation) in DONE_STATES for simulation in simulations)
+            # while simulations are running, the few that finished may all be missing files; only the final pass
+            # requires simulations to analyze
+            result = self.prefilter.check(simulations, self.bundle.filenames, namespace=self.exp_id,
+                                          require_included=done)
+            new = set(result.included) - analyzed
+            if done:
+                log('All %d simulations finished; final analysis of %d simulations (%d new)'
+                    % (len(simulations), len(result.included), len(new)))
+                result.print_summary()
+                if not result.included:
+                    print('No simulations to analyze for experiment %s... Exiting' % self.exp_id)
+                elif not self.analyze_pass(result.exclude_ids, provisional=False):
+                    print('Final analysis of experiment %s failed' % self.exp_id)
+                return result
+            if len(new) >= self.min_new_simulations:
+                log('%d of %d simulations succeeded; analyzing %d new simulations'
+                    % (len(result.included), len(simulations), len(new)))
+                try:
+                    succeeded = self.analyze_pass(result.exclude_ids, provisional=True)
+                except Exception as e:
+                    # provisional outputs are optional; the simulations are analyzed again in a later pass
+                    log('Provisional analysis failed (%s)... Retrying in the next pass' % e)
+                    succeeded = False
+                if succeeded:
+                    analyzed |= new
+                    log('Provisional outputs written to %s'
+                        % ', '.join(sorted(set(os.path.join(d, PROVISIONAL_DIR) for d in self.working_dirs))))
+            time.sleep(self.poll_interval)
@@ -0,0 +1,139 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from idmtools.utils.file_parser import FileParser
+
+
+class LocalSimulation:
+    """
+    Simulation whose output files are on local or shared disk, standing in for the idmtools Simulation passed to
+    analyzer filter and map (id and tags). Analyzer filenames (e.g., 'output/InsetChart.json') are relative to
+    sim_dir.
+    """
+
+    def __init__(self, id, tags, sim_dir):
+        self.id = id
+        self.uid = id
+        self.tags = tags
+        self.sim_dir = sim_dir
+
+    def __repr__(self):
+        return 'LocalSimulation(%s)' % self.id
+
+
+def discover_simulations(experiment_dir=None, tags_csv=None, tags_filename='tags.json', id_col='simid',
+                         path_col='outpath'):
+    """
+    Find the simulation directories of an experiment and their tags.
+    Args:
+        experiment_dir: directory with one subdirectory per simulation. Without tags_csv, every subdirectory that has
+            an output folder or a tags sidecar file is a simulation, with tags read from the sidecar (if present).
+        tags_csv: path to (or data frame of) a table with one row per simulation, e.g., saved from
+            platform.create_sim_directory_df. Its path_col gives the simulation directory (relative paths are joined
+            to experiment_dir), id_col the simulation id, and the other columns the tags.
+        tags_filename: name of the json sidecar file with the tags of each simulation
+        id_col: simulation id column of tags_csv
+        path_col: simulation directory column of tags_csv
+
+    Returns:
+        list of LocalSimulation
+    """
+    simulations = []
+    if tags_csv is not None:
+        tag_df = tags_csv if isinstance(tags_csv, pd.DataFrame) else pd.read_csv(tags_csv)
+        tag_cols = [col for col in tag_df.columns if col not in [id_col, path_col]]
+        for row in tag_df.to_dict('records'):
+            sim_dir = row[path_col]
+            if experiment_dir is not None and not os.path.isabs(sim_dir):
+                sim_dir = os.path.join(experiment_dir, sim_dir)
+            sim_id = row[id_col] if id_col in row else os.path.basename(os.path.normpath(sim_dir))
+            simulations.append(LocalSimulation(sim_id, {col: row[col] for col in tag_cols}, sim_dir))
+        return simulations
+
+    for name in sorted(os.listdir(experiment_dir)):
+        sim_dir = os.path.join(experiment_dir, name)
+        tags_path = os.path.join(sim_dir, tags_filename)
+        if os.path.isfile(tags_path):
+            with open(tags_path, 'r') as f:
+                tags = json.load(f)
+        elif os.path.isdir(os.path.join(sim_dir, 'output')):
+            tags = {}
+        else:
+            continue
+        simulations.append(LocalSimulation(name, tags, sim_dir))
+    return simulations
+
+
+def _map_simulations(analyzers, simulations, skip_missing):
+    """
+    Run the map of each analyzer on a chunk of simulations (in a worker process). Each file is read once per
+    simulation, and parsed at most once for the analyzers with parse=True.
+
+    Returns:
+        list of (position of simulation in the chunk, dict of analyzer index -> map result)
+    """
+    results = []
+    for ss, simulation in enumerate(simulations):
+        raw = {}
+        parsed = {}
+        sim_results = {}
+        try:
+            for aa, analyzer in enumerate(analyzers):
+                if not analyzer.filter(simulation):
+                    continue
+                data = {}
+                for fname in analyzer.filenames:
+                    if fname not in raw:
+                        with open(os.path.join(simulation.sim_dir, fname), 'rb') as f:
+                            raw[fname] = f.read()
+                    if analyzer.parse:
+                        if fname not in parsed:
+                            parsed[fname] = FileParser.parse(fname, raw[fname])
+                        data[fname] = parsed[fname]
+                    else:
+                        data[fname] = raw[fname]
+                sim_results[aa] = analyzer.map(data, simulation)
+        except FileNotFoundError as e:
+            if not skip_missing:
+                raise
+            print('Skipping simulation %s: %s' % (simulation.id, e))
+            continue
+        results.append((ss, sim_results))
+    return results
+
+
+def run_local_analysis(analyzers, simulations, max_workers=None, chunksize=16, skip_missing=True):
+    """
+    Run analyzers over simulation directories on local or shared disk, without a platform. The analyzers' maps are
+    run in a process pool over chunks of simulations, then each analyzer's reduce is called with the map results of
+    all simulations, as AnalyzeManager would.
+    Args:
+        analyzers: list of analyzer instances (e.g., from snt.analyzers), which must be picklable
+        simulations: list of LocalSimulation, e.g., from discover_simulations
+        max_workers: number of worker processes; 1 runs the maps in this process
+        chunksize: number of simulations sent to a worker at a time
+        skip_missing: skip simulations with missing output files instead of raising an error
+    """
+    for analyzer in analyzers:
+        analyzer.initialize()
+        # as AnalyzeManager, pass the simulations to analyze before running the maps
+        analyzer.per_group(items={simulation.id: simulation for simulation in simulations})
+
+    chunks = [simulations[ii:ii + chunksize] for ii in range(0, len(simulations), chunksize)]
+    if max_workers == 1:
+        chunk_results = [_map_simulations(analyzers, chunk, skip_missing) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_map_simulations, analyzers, chunk, skip_missing) for chunk in chunks]
+            chunk_results = [future.result() for future in futures]
+
+    all_data = [{} for _ in analyzers]
+    for chunk, results in zip(chunks, chunk_results):
+        for ss, sim_results in results:
+            for aa, result in sim_results.items():
+                all_data[aa][chunk[ss]] = result
+
+    for aa, analyzer in enumerate(analyzers):
+        analyzer.reduce(all_data[aa])
+        analyzer.destroy()
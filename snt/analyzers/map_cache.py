@@ -0,0 +1,254 @@
+import hashlib
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from idmtools.entities import IAnalyzer
+from snt.analyzers.simulation_prefilter import output_file_info
+
+# analyzer attributes that do not change map results
+_UNKEYED_ATTRIBUTES = ('uid', 'working_dir', 'results')
+
+
+def _stable_repr(value):
+    """
+    Representation of an analyzer parameter that is the same across runs (objects are represented by their class and
+    public attributes rather than their memory address).
+    """
+    if isinstance(value, dict):
+        return '{%s}' % ', '.join('%r: %s' % (key, _stable_repr(value[key])) for key in sorted(value, key=repr))
+    if isinstance(value, (list, tuple)):
+        return '[%s]' % ', '.join(_stable_repr(item) for item in value)
+    if isinstance(value, type):
+        return '%s.%s' % (value.__module__, value.__qualname__)
+    if hasattr(value, '__dict__'):
+        return '%s(%s)' % (_stable_repr(type(value)),
+                           _stable_repr({key: item for key, item in vars(value).items()
+                                         if not key.startswith('_') and key not in _UNKEYED_ATTRIBUTES}))
+    return repr(value)
+
+
+def analyzer_key(analyzer):
+    """
+    Hash of the analyzer class and parameters (its attributes other than uid, working_dir, and private caches).
+    """
+    return hashlib.sha1(_stable_repr(analyzer).encode('utf-8')).hexdigest()[:16]
+
+
+def input_fingerprint(simulation, filenames, platform=None):
+    """
+    Fingerprint of a simulation's input files that is available without downloading them: the size and checksum
+    (COMPS) or modification time (simulations on disk) of each file, from one listing of the simulation's outputs (see
+    output_file_info), so simulations that are rerun or whose outputs are replaced are mapped again.
+
+    Returns:
+        list of (filename, size, checksum or modification time), with None for missing files; None if the outputs
+        could not be listed
+    """
+    try:
+        info = output_file_info(simulation, filenames, platform)
+    except Exception as e:
+        print('Cannot list the outputs of simulation %s (%s); its map result is not cached' % (simulation.id, e))
+        return None
+    return [(fname,) + info.get(fname, (None, None)) for fname in filenames]
+
+
+class CachedSimulation:
+    """
+    Key of a cached map result in the data passed to reduce, in place of the idmtools Simulation.
+    """
+
+    def __init__(self, id):
+        self.id = id
+        self.uid = id
+
+    def __repr__(self):
+        return 'CachedSimulation(%s)' % self.id
+
+
+class MapResultCache:
+    """
+    Persistent cache of analyzer map results, stored as one compressed pickle per simulation in
+    cache_dir/<namespace>/<analyzer key>/<simulation id>.pkl.z. Entries are written atomically, so map workers in
+    several processes can write to the same cache. When the cache is larger than max_bytes, the least recently used
+    entries are deleted.
+    """
+
+    def __init__(self, cache_dir, max_bytes=20 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, namespace, key):
+        return os.path.join(self.cache_dir, str(namespace), key)
+
+    def entry_path(self, namespace, key, sim_id):
+        return os.path.join(self.entry_dir(namespace, key), '%s.pkl.z' % sim_id)
+
+    def put(self, namespace, key, sim_id, fingerprint, result):
+        entry_dir = self.entry_dir(namespace, key)
+        os.makedirs(entry_dir, exist_ok=True)
+        # the fingerprint is stored ahead of the result so it can be checked without loading the result
+        header = zlib.compress(pickle.dumps(fingerprint, protocol=pickle.HIGHEST_PROTOCOL))
+        payload = zlib.compress(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, self.entry_path(namespace, key, sim_id))
+
+    @staticmethod
+    def _read_fingerprint(f):
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        return pickle.loads(zlib.decompress(f.read(header_size)))
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            self._read_fingerprint(f)
+            result = pickle.loads(zlib.decompress(f.read()))
+        os.utime(path)  # mark as recently used
+        return result
+
+    def is_current(self, namespace, key, sim_id, fingerprint):
+        """
+        Check whether there is a cached entry for the simulation with the given input fingerprint.
+        """
+        if fingerprint is None:
+            return False
+        path = self.entry_path(namespace, key, sim_id)
+        try:
+            with open(path, 'rb') as f:
+                return self._read_fingerprint(f) == fingerprint
+        except (OSError, EOFError, struct.error, zlib.error, pickle.UnpicklingError):
+            return False
+
+    def items(self, namespace, key, simulation_ids=None):
+        """
+        Iterate over (simulation id, map result) of the cached entries of an analyzer, all of them or those of the
+        given simulation ids.
+        """
+        entry_dir = self.entry_dir(namespace, key)
+        if not os.path.isdir(entry_dir):
+            return
+        for fname in sorted(os.listdir(entry_dir)):
+            sim_id = fname[:-len('.pkl.z')]
+            if fname.endswith('.pkl.z') and (simulation_ids is None or sim_id in simulation_ids):
+                yield sim_id, self.load(os.path.join(entry_dir, fname))
+
+    def invalidate(self, namespace=None, analyzer=None, simulation_ids=None):
+        """
+        Delete cached entries. Without arguments the whole cache is cleared; otherwise only the entries matching all
+        of the given namespace, analyzer (instance), and simulation ids are deleted.
+        """
+        key = analyzer_key(analyzer) if analyzer is not None else None
+        namespaces = [str(namespace)] if namespace is not None else \
+            (os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else [])
+        for ns in namespaces:
+            keys = [key] if key is not None else \
+                (os.listdir(os.path.join(self.cache_dir, ns)) if os.path.isdir(os.path.join(self.cache_dir, ns)) else [])
+            for kk in keys:
+                if simulation_ids is None:
+                    shutil.rmtree(self.entry_dir(ns, kk), ignore_errors=True)
+                else:
+                    for sim_id in simulation_ids:
+                        if os.path.exists(self.entry_path(ns, kk, sim_id)):
+                            os.remove(self.entry_path(ns, kk, sim_id))
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is within max_bytes.
+        """
+        entries = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for fname in files:
+                path = os.path.join(root, fname)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+class CachedAnalyzer(IAnalyzer):
+    """
+    Run an analyzer with its map results cached per simulation, so a re-run only downloads and maps the simulations
+    that are new or whose outputs changed (see input_fingerprint), and takes the other map results from the cache.
+
+    Entries are keyed by namespace (e.g., the experiment id), the analyzer class and parameters, and simulation id.
+    reduce receives the fresh map results together with the cached results of the other simulations of this analysis
+    (those passed to per_group, i.e., without the simulations left out by exclude_ids), so cached results of
+    simulations that are not analyzed are not included. Invalidate the cache (MapResultCache.invalidate) if the
+    analyzer's map code changes.
+    """
+
+    def __init__(self, analyzer, cache, namespace='default', max_workers=16):
+        """
+        Args:
+            analyzer: analyzer instance, or (analyzer class, dict of arguments) pair as for AnalyzerBundle
+            cache: MapResultCache, or the cache directory
+            namespace: name separating the entries of different experiments, e.g., the experiment id
+            max_workers: number of simulations whose outputs are listed at a time to fingerprint them
+        """
+        self.analyzer = analyzer if isinstance(analyzer, IAnalyzer) else analyzer[0](**analyzer[1])
+        super(CachedAnalyzer, self).__init__(working_dir=self.analyzer.working_dir, parse=self.analyzer.parse,
+                                             filenames=self.analyzer.filenames)
+        self.cache = cache if isinstance(cache, MapResultCache) else MapResultCache(cache)
+        self.namespace = namespace
+        self.key = analyzer_key(self.analyzer)
+        self.max_workers = max_workers
+        self._item_ids = None
+        self._fingerprints = {}
+
+    def initialize(self):
+        self.analyzer.initialize()
+
+    def per_group(self, items):
+        # called once with the items to analyze, before map; list their outputs here (in this process, where the
+        # platform is available) so filter and map in the workers use the same fingerprints
+        self.analyzer.per_group(items)
+        items = list(items.values()) if isinstance(items, dict) else list(items)
+        self._item_ids = set(str(item.id) for item in items)
+
+        def fingerprint(item):
+            return str(item.id), input_fingerprint(item, self.filenames, getattr(item, 'platform', None))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self._fingerprints = dict(executor.map(fingerprint, items))
+
+    def _fingerprint(self, simulation):
+        sim_id = str(simulation.id)
+        if sim_id not in self._fingerprints:
+            self._fingerprints[sim_id] = input_fingerprint(simulation, self.filenames)
+        return self._fingerprints[sim_id]
+
+    def filter(self, simulation):
+        if not self.analyzer.filter(simulation):
+            return False
+        # skip downloading and mapping simulations with an up-to-date cached result
+        return not self.cache.is_current(self.namespace, self.key, simulation.id, self._fingerprint(simulation))
+
+    def map(self, data, simulation):
+        result = self.analyzer.map(data, simulation)
+        self.cache.put(self.namespace, self.key, simulation.id, self._fingerprint(simulation), result)
+        return result
+
+    def reduce(self, all_data):
+        mapped_ids = set(str(simulation.id) for simulation in all_data)
+        # cached results of the analyzed simulations that were not mapped again
+        cached_ids = (self._item_ids or set()) - mapped_ids
+        combined = dict(all_data)
+        for sim_id, result in self.cache.items(self.namespace, self.key, simulation_ids=cached_ids):
+            combined[CachedSimulation(sim_id)] = result
+        print('Using %d cached and %d new map results' % (len(combined) - len(all_data), len(all_data)))
+        reduced = self.analyzer.reduce(combined)
+        self.cache.evict()
+        return reduced
+
+    def destroy(self):
+        self.analyzer.destroy()
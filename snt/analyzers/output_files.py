@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pandas as pd
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+# columns stored as categoricals and as integers in Parquet outputs; all other float columns are stored as float32
+CATEGORICAL_COLUMNS = ('admin_name', 'AgeGroup')
+INTEGER_COLUMNS = ('year', 'month', 'Run_Number')
+
+
+def output_path(path, output_format='csv'):
+    """
+    Get the path of an analyzer output in the given format, replacing the extension of path (e.g., 'x.csv' ->
+    'x.parquet').
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError('Unknown output format %s, expected one of %s' % (output_format, OUTPUT_FORMATS))
+    return os.path.splitext(path)[0] + '.' + output_format
+
+
+def typed_output_frame(adf):
+    """
+    Get a copy of an analyzer output data frame with compact column types: categorical admin_name and AgeGroup,
+    integer year, month, and Run_Number (where they have no missing or fractional values), and float32 metrics.
+    """
+    adf = adf.copy()
+    for col in adf.columns:
+        values = adf[col]
+        if col in CATEGORICAL_COLUMNS:
+            adf[col] = values.astype('category')
+        elif col in INTEGER_COLUMNS and pd.api.types.is_numeric_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64)
+            if np.all(np.isfinite(numbers)) and np.all(numbers == np.round(numbers)):
+                adf[col] = numbers.astype(np.int32)
+        elif pd.api.types.is_float_dtype(values):
+            adf[col] = values.astype(np.float32)
+    return adf
+
+
+def write_output(adf, path, output_format='csv'):
+    """
+    Write an analyzer output data frame.
+    Args:
+        adf: data frame to write
+        path: output path, with a .csv extension that is replaced for other formats
+        output_format: 'csv', or 'parquet' for a compressed Parquet file with compact column types (see
+            typed_output_frame). Writing Parquet requires pyarrow.
+
+    Returns:
+        path of the written file
+    """
+    path = output_path(path, output_format)
+    if output_format == 'parquet':
+        typed_output_frame(adf).to_parquet(path, index=False, compression='zstd')
+    else:
+        adf.to_csv(path, index=False)
+    return path
+
+
+def read_output(path, **kwargs):
+    """
+    Read an analyzer output written by write_output. If path does not exist, the same output in the other format
+    is read instead, so downstream code can keep referring to the .csv names.
+    """
+    if not os.path.exists(path):
+        for output_format in OUTPUT_FORMATS:
+            if os.path.exists(output_path(path, output_format)):
+                path = output_path(path, output_format)
+                break
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, **kwargs)
+    return pd.read_csv(path, **kwargs)
@@ -0,0 +1,92 @@
+import json
+import re
+import numpy as np
+
+_CHANNELS_KEY = re.compile(rb'"Channels"\s*:\s*\{')
+_DATA_KEY = re.compile(rb'"Data"\s*:\s*\[')
+# JSON strings and the brackets delimiting objects and arrays
+_JSON_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+
+
+def _channel_key(channel):
+    return re.compile(re.escape(json.dumps(channel).encode('utf-8')) + rb'\s*:\s*\{')
+
+
+def _find_data(content, start):
+    """
+    Match of the "Data" key of the JSON object whose contents start at start (a channel), or None if the object has no
+    such key. Strings, nested values, and later objects are skipped, so another channel's Data is never returned.
+    """
+    depth = 0
+    for token in _JSON_TOKEN.finditer(content, start):
+        value = token.group()
+        if value in (b'{', b'['):
+            depth += 1
+        elif value in (b'}', b']'):
+            depth -= 1
+            if depth < 0:  # end of the channel object
+                return None
+        elif depth == 0 and value == b'"Data"':
+            data_match = _DATA_KEY.match(content, token.start())
+            if data_match is not None:
+                return data_match
+    return None
+
+
+def _parse_numbers(text):
+    """
+    Parse the comma-separated numbers of a flat JSON array (without brackets) into a float array.
+    """
+    if not text.strip():
+        return np.zeros(0)
+    values = np.fromstring(text.decode('ascii'), sep=',')
+    if len(values) != text.count(b',') + 1:
+        # fall back to the json parser for anything fromstring does not read (e.g., NaN or Infinity)
+        values = np.asarray(json.loads(b'[' + text + b']'), dtype=np.float64)
+    return values
+
+
+def read_report_channels(content, channels, missing_ok=False):
+    """
+    Extract selected channels from a channel report (e.g., ReportMalariaFiltered.json, ReportEventCounter.json, or
+    InsetChart.json) as float arrays.
+
+    If content is the raw file (as passed to map by analyzers created with parse=False), only the 'Data' arrays of
+    the requested channels are located and parsed; the rest of the report is skipped without being parsed into Python
+    objects. Already parsed reports (dicts) are also accepted, e.g., when the analyzer runs in a bundle with
+    analyzers that need the parsed file.
+
+    Args:
+        content: raw report contents (bytes or str) or parsed report (dict)
+        channels: list of channel names to extract
+        missing_ok: if True, channels not in the report (or without Data) are left out of the result instead of
+            raising a KeyError
+
+    Returns:
+        dict of channel name -> array of daily values
+    """
+    if isinstance(content, dict):
+        report_channels = content['Channels']
+        return {channel: np.asarray(report_channels[channel]['Data'], dtype=np.float64) for channel in channels
+                if not (missing_ok and 'Data' not in report_channels.get(channel, {}))}
+
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    channels_match = _CHANNELS_KEY.search(content)
+    if channels_match is None:
+        raise ValueError('Report does not have a Channels section')
+    channel_data = {}
+    for channel in channels:
+        channel_match = _channel_key(channel).search(content, channels_match.end())
+        if channel_match is None:
+            if missing_ok:
+                continue
+            raise KeyError(channel)
+        data_match = _find_data(content, channel_match.end())
+        if data_match is None:
+            if missing_ok:
+                continue
+            raise KeyError('Channel %s has no Data' % channel)
+        data_end = content.index(b']', data_match.end())
+        channel_data[channel] = _parse_numbers(content[data_match.end():data_end])
+    return channel_data
@@ -0,0 +1,277 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from idmtools.entities import IAnalyzer
+from snt.analyzers.summary_report import parse_summary_reports, get_summary_reports, age_group_channels, \
+    AgeGroupAggregator, AGE_GROUPS_UNDER15, NUM_MONTHS
+from snt.analyzers.output_files import write_output
+
+# dimensions of the experiment result tensor, in order
+TENSOR_DIMS = ('admin_name', 'Run_Number', 'year', 'month', 'AgeGroup', 'channel')
+SUMMARY_REPORT_CHANNELS = ('Pop', 'New Infections', 'PfPR', 'Clinical cases', 'Severe cases')
+
+
+class LabeledArray:
+    """
+    Array with a list of labels (coordinates) along each named dimension, with xarray-style selection (sel) and
+    reductions over dimensions (sum, mean, quantile, rollup). Reductions skip missing (NaN) values.
+    """
+
+    def __init__(self, data, dims, coords):
+        self.data = data
+        self.dims = tuple(dims)
+        self.coords = {dim: list(coords[dim]) for dim in self.dims}
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def axis(self, dim):
+        return self.dims.index(dim)
+
+    def index(self, dim, labels):
+        """
+        Positions of labels (a label or a list of labels) along dim.
+        """
+        positions = {label: ii for ii, label in enumerate(self.coords[dim])}
+        if isinstance(labels, (list, tuple, np.ndarray, pd.Index, range)):
+            return [positions[label] for label in labels]
+        return positions[labels]
+
+    def sel(self, **selectors):
+        """
+        Select labels along dimensions, e.g., sel(year=[2022, 2023], channel='PfPR'). A single label drops the
+        dimension; a list of labels keeps it. Returns a view of the data where possible (single labels and ranges).
+        """
+        data = self.data
+        dims = list(self.dims)
+        coords = dict(self.coords)
+        for dim, labels in selectors.items():
+            axis = dims.index(dim)
+            positions = self.index(dim, labels)
+            if isinstance(positions, list):
+                coords[dim] = [coords[dim][ii] for ii in positions]
+                if positions and positions == list(range(positions[0], positions[-1] + 1)):
+                    positions = slice(positions[0], positions[-1] + 1)
+                data = data[(slice(None),) * axis + (positions,)]
+            else:
+                data = data[(slice(None),) * axis + (positions,)]
+                dims.pop(axis)
+                del coords[dim]
+        return LabeledArray(data, dims, coords)
+
+    def transpose(self, *dims):
+        return LabeledArray(np.transpose(self.data, [self.axis(dim) for dim in dims]), dims, self.coords)
+
+    def _reduce(self, func, dims, **kwargs):
+        dims = [dims] if isinstance(dims, str) else list(dims)
+        axes = tuple(self.axis(dim) for dim in dims)
+        with np.errstate(invalid='ignore'):
+            data = func(np.asarray(self.data), axis=axes, **kwargs)
+        kept = [dim for dim in self.dims if dim not in dims]
+        return LabeledArray(data, kept, self.coords)
+
+    def sum(self, dims):
+        return self._reduce(np.nansum, dims)
+
+    def mean(self, dims):
+        return self._reduce(np.nanmean, dims)
+
+    def quantile(self, q, dims):
+        """
+        Quantile(s) q over dims. With a list of q, the result has a leading 'quantile' dimension.
+        """
+        result = self._reduce(np.nanquantile, dims, q=q)
+        if np.ndim(q):
+            return LabeledArray(result.data, ('quantile',) + result.dims, {'quantile': list(q), **result.coords})
+        return result
+
+    def rollup(self, dim, mapping):
+        """
+        Sum groups of labels along dim into new labels, e.g., admins into states with
+        rollup('admin_name', {admin: state}). Labels missing from mapping are dropped.
+        """
+        groups = list(dict.fromkeys(mapping[label] for label in self.coords[dim] if label in mapping))
+        weights = np.zeros((len(self.coords[dim]), len(groups)))
+        for ii, label in enumerate(self.coords[dim]):
+            if label in mapping:
+                weights[ii, groups.index(mapping[label])] = 1
+        axis = self.axis(dim)
+        data = np.moveaxis(np.nan_to_num(np.moveaxis(np.asarray(self.data), axis, -1)) @ weights, -1, axis)
+        return LabeledArray(data, self.dims, {**self.coords, dim: groups})
+
+    def to_frame(self, value_dim='channel', dropna=True):
+        """
+        Long data frame with one column per label of value_dim and one row per combination of the other dimensions
+        (the last dimension varying fastest). Rows where all values are missing are dropped if dropna.
+        """
+        other_dims = [dim for dim in self.dims if dim != value_dim]
+        data = np.moveaxis(np.asarray(self.data), self.axis(value_dim), -1)
+        values = data.reshape(-1, data.shape[-1])
+        index = pd.MultiIndex.from_product([self.coords[dim] for dim in other_dims], names=other_dims)
+        adf = pd.DataFrame(values, columns=self.coords[value_dim], index=index).reset_index()
+        if dropna:
+            adf = adf[~np.isnan(values).all(axis=1)].reset_index(drop=True)
+        return adf
+
+
+class ResultTensorStore(LabeledArray):
+    """
+    Experiment-level store of monthly results by (admin_name, Run_Number, year, month, AgeGroup, channel) in a
+    memory-mapped .npy file, preallocated from the sweep definition and filled with NaN. Each simulation's results are
+    written in place into its (admin_name, Run_Number) slice, so analyzer maps running in several processes can write
+    to the same store, and cross-seed or cross-admin summaries are array reductions rather than data frame groupbys.
+    """
+
+    def __init__(self, store_dir, mode='r'):
+        with open(os.path.join(store_dir, 'coords.json'), 'r') as f:
+            coords = json.load(f)
+        data = np.load(os.path.join(store_dir, 'data.npy'), mmap_mode=mode)
+        super(ResultTensorStore, self).__init__(data, TENSOR_DIMS, coords)
+        self.store_dir = store_dir
+
+    @staticmethod
+    def sweep_coords(admin_names, run_numbers, years, age_groups, channels=SUMMARY_REPORT_CHANNELS):
+        """
+        Coordinates of a store for the given sweep values (see create).
+        """
+        return {'admin_name': list(admin_names), 'Run_Number': [int(run) for run in run_numbers],
+                'year': [int(year) for year in years], 'month': list(range(1, NUM_MONTHS + 1)),
+                'AgeGroup': list(age_groups), 'channel': list(channels)}
+
+    @classmethod
+    def create(cls, store_dir, admin_names, run_numbers, years, age_groups, channels=SUMMARY_REPORT_CHANNELS,
+               dtype=np.float64):
+        """
+        Create (or overwrite) the store for an experiment.
+        Args:
+            store_dir: directory of the store
+            admin_names: admin_name values of the sweep
+            run_numbers: Run_Number values of the sweep
+            years: simulation years
+            age_groups: age group labels
+            channels: output channels
+            dtype: float type of the stored values
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        coords = cls.sweep_coords(admin_names, run_numbers, years, age_groups, channels)
+        shape = tuple(len(coords[dim]) for dim in TENSOR_DIMS)
+        data = np.lib.format.open_memmap(os.path.join(store_dir, 'data.npy'), mode='w+', dtype=dtype, shape=shape)
+        data[...] = np.nan
+        data.flush()
+        del data
+        with open(os.path.join(store_dir, 'coords.json'), 'w') as f:
+            json.dump(coords, f)
+        return cls(store_dir, mode='r+')
+
+    @classmethod
+    def open_or_create(cls, store_dir, admin_names, run_numbers, years, age_groups, channels=SUMMARY_REPORT_CHANNELS,
+                       dtype=np.float64):
+        """
+        Open the existing store of an experiment if it has the same coordinates and dtype, keeping the results
+        already written (e.g., of simulations whose map results are cached and not mapped again); otherwise create
+        it. Arguments as for create.
+        """
+        coords = cls.sweep_coords(admin_names, run_numbers, years, age_groups, channels)
+        try:
+            store = cls(store_dir, mode='r+')
+        except (OSError, ValueError):
+            store = None
+        if store is not None and store.coords == coords and store.data.dtype == np.dtype(dtype):
+            return store
+        del store
+        return cls.create(store_dir, admin_names, run_numbers, years, age_groups, channels, dtype)
+
+    def write(self, admin_name, run_number, columns):
+        """
+        Write one simulation's results in place.
+        Args:
+            admin_name: admin_name of the simulation
+            run_number: Run_Number of the simulation
+            columns: dict of channel -> array of shape (num_years, 12, num_age_groups), e.g., from age_group_channels
+        """
+        aa = self.index('admin_name', admin_name)
+        rr = self.index('Run_Number', int(run_number))
+        for channel, values in columns.items():
+            self.data[aa, rr, ..., self.index('channel', channel)] = values
+        self.data.flush()
+
+    def to_output_frame(self, sweep_variables=('Run_Number', 'admin_name'), simulations=None):
+        """
+        Data frame in the layout of the summary-report analyzers' outputs (e.g.,
+        newInfections_PfPR_cases_monthly_byAgeGroup.csv): month, AgeGroup, channels, year, then the sweep variables,
+        with rows ordered by admin_name, Run_Number, year, AgeGroup, and month, and rows of simulations that were not
+        written dropped.
+        Args:
+            sweep_variables: sweep variable columns, after the channels and year
+            simulations: (admin_name, Run_Number) pairs of the simulations to include (default: all written)
+        """
+        adf = self.transpose('admin_name', 'Run_Number', 'year', 'AgeGroup', 'month', 'channel').to_frame()
+        if simulations is not None:
+            keys = pd.MultiIndex.from_arrays([adf['admin_name'], adf['Run_Number']])
+            selected = pd.MultiIndex.from_tuples([(admin, int(run)) for admin, run in simulations])
+            adf = adf[keys.isin(selected)].reset_index(drop=True)
+        return adf[['month', 'AgeGroup'] + self.coords['channel'] + ['year'] + list(sweep_variables)]
+
+    def export(self, path, sweep_variables=('Run_Number', 'admin_name'), output_format='csv', simulations=None):
+        return write_output(self.to_output_frame(sweep_variables, simulations), path, output_format)
+
+
+class SummaryReportTensorAnalyzer(IAnalyzer):
+    """
+    Monthly summary-report burden outputs by age group (as MonthlyNewInfectionsAnalyzer), written into a
+    ResultTensorStore instead of being returned from map and concatenated in reduce. The admin_name and Run_Number
+    values of the sweep are needed up front to preallocate the store; reduce exports the slices of the simulations it
+    receives to output_filename. An existing store with the same coordinates is kept between runs, so the analyzer
+    can be wrapped in a CachedAnalyzer: simulations with cached map results keep the slices written when they were
+    mapped.
+    """
+
+    def __init__(self, expt_name, admin_names, run_numbers, working_dir=".", start_year=2020, end_year=2026,
+                 input_filename_base='MalariaSummaryReport_Monthly',
+                 output_filename='newInfections_PfPR_cases_monthly_byAgeGroup.csv', age_groups=AGE_GROUPS_UNDER15,
+                 store_name='result_tensor', output_format='csv'):
+
+        super(SummaryReportTensorAnalyzer, self).__init__(working_dir=working_dir,
+                                                          filenames=["output/%s%d.json" % (input_filename_base, x)
+                                                                     for x in range(start_year, end_year + 1)]
+                                                          )
+        self.expt_name = expt_name
+        self.output_format = output_format
+        self.admin_names = list(admin_names)
+        self.run_numbers = list(run_numbers)
+        self.start_year = start_year
+        self.end_year = end_year
+        self.output_filename = output_filename
+        self.age_groups = age_groups
+        self.aggregator = AgeGroupAggregator(age_groups)
+        self.store_dir = os.path.join(working_dir, expt_name, store_name)
+
+    def initialize(self):
+        ResultTensorStore.open_or_create(self.store_dir, self.admin_names, self.run_numbers,
+                                         range(self.start_year, self.end_year + 1), list(self.age_groups))
+
+    def map(self, data, simulation):
+
+        arrays = parse_summary_reports(get_summary_reports(data, self.filenames),
+                                       ['Average Population by Age Bin', 'New Infections by Age Bin', 'PfPR by Age Bin',
+                                        'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin'])
+        age_bins = data[self.filenames[0]]['Metadata']['Age Bins']
+        # from the 30 day reporting interval, imagine all months have 30 days, except December, which has 35
+        columns = age_group_channels(arrays, age_bins, self.aggregator, days_in_month=[30] * 11 + [35])
+        ResultTensorStore(self.store_dir, mode='r+').write(simulation.tags['admin_name'],
+                                                           simulation.tags['Run_Number'], columns)
+        return simulation.tags['admin_name'], simulation.tags['Run_Number']
+
+    def reduce(self, all_data):
+
+        if len(all_data) == 0:
+            print("No data have been returned... Exiting...")
+            return
+
+        store = ResultTensorStore(self.store_dir)
+        if self.output_filename:
+            store.export(os.path.join(self.working_dir, self.expt_name, self.output_filename),
+                         output_format=self.output_format, simulations=all_data.values())
+        return store
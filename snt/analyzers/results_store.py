@@ -0,0 +1,255 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+import pandas as pd
+from snt.analyzers.aggregate_outputs import SUMMARY_DIR, with_year_month
+from snt.analyzers.output_files import OUTPUT_FORMATS, read_output
+
+EXPERIMENTS_TABLE = 'experiments'
+# columns indexed in every output table (those present in the table), in this order
+INDEX_COLUMNS = ('experiment', 'admin_name', 'year', 'month', 'AgeGroup')
+
+
+def table_name(filename):
+    """
+    Name of the store table holding an analyzer output, e.g., 'U5_PfPR_ClinicalIncidence.csv' ->
+    'U5_PfPR_ClinicalIncidence'.
+    """
+    return os.path.splitext(os.path.basename(filename))[0]
+
+
+def _quote(name):
+    return '"%s"' % str(name).replace('"', '""')
+
+
+def _sql_value(value):
+    # numpy scalars as Python values, missing values as NULL
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ResultsStore:
+    """
+    Local SQLite database of the analyzer outputs of many experiments, so comparisons across experiments read only the
+    rows they need instead of every experiment's csv files.
+
+    Each analyzer output (e.g., U5_PfPR_ClinicalIncidence.csv) is one table holding the rows of all ingested
+    experiments, with an added experiment column and an index on (experiment, admin_name, year, month, AgeGroup).
+    The experiments table holds the metadata of each experiment (e.g., the row of the suite tracking file and a
+    scenario name), which queries can filter on. The database is one file, which several processes can read while
+    another ingests (write-ahead logging).
+
+    Example:
+        store = ResultsStore('results.db')
+        store.ingest_tracking('suite_tracking_future_projections.csv', 'simulation_output')
+        store.query('U5_PfPR_ClinicalIncidence', years=[2025], metadata={'experiment_type': 'future_projections'})
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS %s (experiment TEXT PRIMARY KEY, ingested_at TEXT)'
+                                % EXPERIMENTS_TABLE)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def tables(self):
+        """
+        Names of the output tables in the store.
+        """
+        rows = self.connection.execute("SELECT name FROM sqlite_master WHERE type='table' AND name != ?",
+                                       (EXPERIMENTS_TABLE,)).fetchall()
+        return sorted(row[0] for row in rows)
+
+    def columns(self, table):
+        return [row[1] for row in self.connection.execute('PRAGMA table_info(%s)' % _quote(table)).fetchall()]
+
+    def experiments(self):
+        """
+        Metadata of the ingested experiments, one row per experiment.
+        """
+        return pd.read_sql_query('SELECT * FROM %s ORDER BY experiment' % EXPERIMENTS_TABLE, self.connection)
+
+    def _add_columns(self, table, adf):
+        existing = set(self.columns(table))
+        for col in adf.columns:
+            if col not in existing:
+                self.connection.execute('ALTER TABLE %s ADD COLUMN %s' % (_quote(table), _quote(col)))
+
+    def _create_indexes(self, table):
+        columns = [col for col in INDEX_COLUMNS if col in self.columns(table)]
+        self.connection.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)'
+                                % (_quote('idx_%s' % table), _quote(table), ', '.join(_quote(c) for c in columns)))
+
+    def set_metadata(self, experiment, metadata=None):
+        """
+        Add or update an experiment's row of the experiments table (new metadata fields are added as columns).
+        """
+        row = {key: (json.dumps(value) if isinstance(value, (list, dict)) else value)
+               for key, value in (metadata or {}).items() if key != 'experiment'}
+        row = pd.DataFrame([{'experiment': experiment, 'ingested_at': datetime.now().isoformat(timespec='seconds'),
+                             **row}])
+        self._add_columns(EXPERIMENTS_TABLE, row)
+        columns = ', '.join(_quote(c) for c in row.columns)
+        updates = ', '.join('%s=excluded.%s' % (_quote(c), _quote(c)) for c in row.columns if c != 'experiment')
+        self.connection.execute('INSERT INTO %s (%s) VALUES (%s) ON CONFLICT(experiment) DO UPDATE SET %s'
+                                % (EXPERIMENTS_TABLE, columns, ', '.join('?' * len(row.columns)), updates),
+                                [_sql_value(v) for v in row.iloc[0].tolist()])
+        self.connection.commit()
+
+    def ingest_output(self, experiment, adf, table, chunksize=100000):
+        """
+        Replace an experiment's rows of an output table with the rows of adf. Outputs with only a date column get
+        year and month columns.
+        """
+        adf = with_year_month(adf)
+        # categorical columns of Parquet outputs are stored as text
+        adf = adf.astype({col: object for col in adf.columns if isinstance(adf[col].dtype, pd.CategoricalDtype)})
+        adf = adf.drop(columns='experiment', errors='ignore')
+        adf.insert(0, 'experiment', experiment)
+        if table in self.tables():
+            self._add_columns(table, adf)
+            self.connection.execute('DELETE FROM %s WHERE experiment = ?' % _quote(table), (experiment,))
+        adf.to_sql(table, self.connection, if_exists='append', index=False, chunksize=chunksize)
+        self._create_indexes(table)
+        self.connection.commit()
+
+    def ingest(self, experiment, output_dir, filenames=None, metadata=None, include_summaries=True):
+        """
+        Ingest the analyzer outputs of an experiment, replacing any rows previously ingested for it.
+        Args:
+            experiment: experiment name
+            output_dir: directory with the experiment's analyzer outputs (csv or Parquet)
+            filenames: outputs to ingest (default: every output in output_dir)
+            metadata: dict of experiment metadata (e.g., experiment_id, experiment_type, scenario)
+            include_summaries: also ingest the summaries written by OutputSummaryAnalyzer in output_dir/summaries
+
+        Returns:
+            names of the tables ingested
+        """
+        paths = []
+        directories = [output_dir] + ([os.path.join(output_dir, SUMMARY_DIR)] if include_summaries else [])
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for fname in sorted(os.listdir(directory)):
+                if os.path.splitext(fname)[1][1:] in OUTPUT_FORMATS and \
+                        (filenames is None or table_name(fname) in {table_name(f) for f in filenames}):
+                    paths.append(os.path.join(directory, fname))
+        self.set_metadata(experiment, metadata)
+        ingested = []
+        for path in paths:
+            table = table_name(path)
+            self.ingest_output(experiment, read_output(path), table)
+            ingested.append(table)
+        return ingested
+
+    def ingest_tracking(self, tracking_file, output_root, metadata=None, filenames=None):
+        """
+        Ingest the outputs of every experiment of a suite tracking file (see update_suite_tracking) whose output
+        directory (output_root/<experiment_name>) exists, with the tracking row as the experiment's metadata.
+        Args:
+            tracking_file: e.g., suite_tracking_future_projections.csv
+            output_root: directory with one subdirectory of analyzer outputs per experiment name
+            metadata: dict of experiment_name -> additional metadata (e.g., {'scenario': ...})
+            filenames: outputs to ingest (default: every output)
+
+        Returns:
+            names of the experiments ingested
+        """
+        tracking = pd.read_csv(tracking_file).dropna(subset=['experiment_name'])
+        ingested = []
+        for row in tracking.drop_duplicates('experiment_name', keep='last').to_dict('records'):
+            experiment = row['experiment_name']
+            output_dir = os.path.join(output_root, experiment)
+            if not os.path.isdir(output_dir):
+                print('No outputs for %s in %s... Skipping' % (experiment, output_root))
+                continue
+            row_metadata = {key: value for key, value in row.items() if key != 'experiment_name' and pd.notna(value)}
+            self.ingest(experiment, output_dir, filenames=filenames,
+                        metadata={**row_metadata, **(metadata or {}).get(experiment, {})})
+            ingested.append(experiment)
+        return ingested
+
+    def remove(self, experiment):
+        """
+        Delete an experiment's rows from every table.
+        """
+        for table in self.tables():
+            self.connection.execute('DELETE FROM %s WHERE experiment = ?' % _quote(table), (experiment,))
+        self.connection.execute('DELETE FROM %s WHERE experiment = ?' % EXPERIMENTS_TABLE, (experiment,))
+        self.connection.commit()
+
+    def query(self, table, columns=None, experiments=None, admins=None, years=None, months=None, age_groups=None,
+              metadata=None, with_metadata=False, where=None, params=()):
+        """
+        Read the rows of an output table matching the given filters (None means no filter).
+        Args:
+            table: output table (e.g., 'U5_PfPR_ClinicalIncidence' or 'U5_PfPR_ClinicalIncidence.csv')
+            columns: columns to return (default: all); the experiment column is always included
+            experiments: experiment names
+            admins: admin names
+            years: years
+            months: months
+            age_groups: AgeGroup values
+            metadata: dict of experiment metadata column -> value or list of values, e.g.,
+                {'experiment_type': 'future_projections'}
+            with_metadata: add the experiments' metadata columns to the rows
+            where: additional SQL condition on the table's columns, with ? placeholders for params
+            params: values of the placeholders in where
+
+        Returns:
+            data frame
+        """
+        table = table_name(table)
+        conditions = []
+        values = []
+
+        def add_condition(column, selected, source=None):
+            if selected is None:
+                return
+            selected = list(selected) if isinstance(selected, (list, tuple, set, range, pd.Index, pd.Series)) \
+                else [selected]
+            prefix = '%s.' % source if source else 't.'
+            conditions.append('%s%s IN (%s)' % (prefix, _quote(column), ', '.join('?' * len(selected))))
+            values.extend(_sql_value(v) for v in selected)
+
+        add_condition('experiment', experiments)
+        add_condition('admin_name', admins)
+        add_condition('year', years)
+        add_condition('month', months)
+        add_condition('AgeGroup', age_groups)
+        for key, selected in (metadata or {}).items():
+            add_condition(key, selected, source='e')
+        if where:
+            conditions.append('(%s)' % where)
+            values.extend(params)
+
+        select = 't.*' if columns is None else \
+            ', '.join('t.%s' % _quote(col) for col in ['experiment'] + [c for c in columns if c != 'experiment'])
+        if with_metadata:
+            select += ', ' + ', '.join('e.%s' % _quote(col) for col in self.columns(EXPERIMENTS_TABLE)
+                                       if col != 'experiment')
+        sql = 'SELECT %s FROM %s AS t' % (select, _quote(table))
+        if metadata or with_metadata:
+            sql += ' LEFT JOIN %s AS e ON e.experiment = t.experiment' % EXPERIMENTS_TABLE
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return pd.read_sql_query(sql, self.connection, params=values)
+
+    def sql(self, query, params=()):
+        """
+        Run a SQL query on the store (output tables are named as by table_name) and return the result.
+        """
+        return pd.read_sql_query(query, self.connection, params=list(params))
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+
+def reconcile_severe_treatment(merged_df, treated_col, severe_col, start_year, group_cols=None):
+    """
+    Fix months where more severe cases were treated than the number of severe cases in the simulation.
+
+    Within each group (e.g., each Run_Number and admin_name), if the first month of the simulation (January of
+    start_year) has at least one excess treated severe case, its treated severe cases are set to the total number of
+    severe cases in that month. Then any month with more than 0.5 excess treated severe cases has its treated severe
+    cases set to the number of severe cases.
+
+    Args:
+        merged_df: data frame with year, month, treated_col, severe_col, and group_cols columns. Modified in place.
+        treated_col: column with the number of treated severe cases
+        severe_col: column with the number of severe cases
+        start_year: first year of the simulation
+        group_cols: list of columns identifying each simulation's rows; None if merged_df holds one simulation
+
+    Returns:
+        merged_df
+    """
+    treated = merged_df[treated_col].to_numpy(dtype=np.float64)
+    severe = merged_df[severe_col].to_numpy(dtype=np.float64)
+    is_start = ((merged_df['year'] == start_year) & (merged_df['month'] == 1)).to_numpy()
+    has_excess = ~(treated - severe < 1)
+
+    if group_cols:
+        # rows with a missing group value do not belong to any group
+        group = merged_df.groupby(list(group_cols), sort=False).ngroup().to_numpy()
+        fix_groups = np.unique(group[is_start & has_excess & (group >= 0)])
+        fix = is_start & np.isin(group, fix_groups)
+        start_severe = pd.Series(np.where(is_start, severe, 0)).groupby(group).transform('sum').to_numpy()
+    else:
+        fix = is_start & (is_start & has_excess).any()
+        start_severe = np.full(len(severe), np.nansum(severe[is_start]))
+    reconciled = np.where(fix, start_severe, treated)
+    reconciled = np.where(reconciled - severe > 0.5, severe, reconciled)
+    # only replace the column (as floats) if any value changed
+    if not np.array_equal(reconciled, treated):
+        merged_df[treated_col] = reconciled
+    return merged_df
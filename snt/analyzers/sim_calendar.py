@@ -0,0 +1,99 @@
+import datetime
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# simulation years have 365 days; simulation day 0 (of each year) is January 1
+DAYS_PER_YEAR = 365
+DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+MONTH_OF_DAY = np.repeat(np.arange(1, 13), DAYS_IN_MONTH)
+
+
+def month_of_day(day):
+    """
+    Calendar month (1-12) of each day of the simulation year (0-364). Same as the analyzers' former
+    monthparser((day + 1) % 365), without parsing a date for every day.
+    """
+    return MONTH_OF_DAY[np.asarray(day, dtype=np.int64) % DAYS_PER_YEAR]
+
+
+def add_calendar_columns(simdata, start_year, time_col='Time', day_col='Day', month_col='month', year_col='year'):
+    """
+    Add the day of year, month, and year of each simulation timestep to a data frame of daily outputs.
+    """
+    time = simdata[time_col].to_numpy(dtype=np.int64)
+    simdata[day_col] = time % DAYS_PER_YEAR
+    simdata[month_col] = MONTH_OF_DAY[time % DAYS_PER_YEAR]
+    simdata[year_col] = time // DAYS_PER_YEAR + start_year
+    return simdata
+
+
+def month_start_dates(years, months):
+    """
+    Get the datetime.date of the first day of each (year, month) pair, creating each distinct date only once.
+    """
+    keys = np.asarray(years, dtype=np.int64) * 12 + np.asarray(months, dtype=np.int64) - 1
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    dates = np.array([datetime.date(int(key // 12), int(key % 12) + 1, 1) for key in unique_keys], dtype=object)
+    return dates[inverse.reshape(-1)]
+
+
+class SimCalendar:
+    """
+    Lookup arrays from consecutive simulation timesteps to (year, month, month index) and the month boundaries used
+    to reduce daily channels to monthly values.
+    """
+
+    def __init__(self, start_year, num_days, first_time=0):
+        self.start_year = start_year
+        self.time = np.arange(first_time, first_time + num_days)
+        self.day = self.time % DAYS_PER_YEAR
+        self.month = MONTH_OF_DAY[self.day]
+        self.year = self.time // DAYS_PER_YEAR + start_year
+        # months since the start of the simulation
+        self.month_index = (self.year - start_year) * 12 + self.month - 1
+        self.month_starts = np.flatnonzero(np.diff(self.month_index, prepend=-1))
+        self.days_per_month = np.diff(np.append(self.month_starts, num_days))
+        self.month_years = self.year[self.month_starts]
+        self.month_months = self.month[self.month_starts]
+
+    def month_dates(self):
+        return month_start_dates(self.month_years, self.month_months)
+
+    def monthly_sum(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(self.month_starts) == 0:
+            return values[:0]
+        return np.add.reduceat(values[:len(self.time)], self.month_starts, axis=0)
+
+    def monthly_mean(self, values):
+        sums = self.monthly_sum(values)
+        return sums / self.days_per_month.reshape((-1,) + (1,) * (sums.ndim - 1))
+
+
+@lru_cache(maxsize=32)
+def get_calendar(start_year, num_days, first_time=0):
+    return SimCalendar(start_year, num_days, first_time)
+
+
+def monthly_channel_frame(channel_data, start_year, sum_channels=(), mean_channels=(), first_time=0):
+    """
+    Reduce daily channels of one simulation to monthly values.
+    Args:
+        channel_data: dict of channel name -> list of daily values. Only the days present in every channel are used.
+        start_year: calendar year of the first simulation day
+        sum_channels: channels summed within each month (e.g., event and case counts)
+        mean_channels: channels averaged within each month (e.g., population and prevalence)
+        first_time: simulation time of the first value in each channel
+
+    Returns:
+        data frame with year, month, and one column per channel, with one row per month
+    """
+    num_days = min([len(values) for values in channel_data.values()], default=0)
+    calendar = get_calendar(start_year, num_days, first_time)
+    adf = pd.DataFrame({'year': calendar.month_years, 'month': calendar.month_months})
+    for channel in sum_channels:
+        adf[channel] = calendar.monthly_sum(channel_data[channel])
+    for channel in mean_channels:
+        adf[channel] = calendar.monthly_mean(channel_data[channel])
+    return adf
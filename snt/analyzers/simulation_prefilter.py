@@ -0,0 +1,298 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from idmtools.core import ItemType
+
+SKIPPED_FILENAME = 'skipped_simulations.csv'
+SUCCEEDED = 'SUCCEEDED'
+
+
+def analyzer_filenames(analyzers):
+    """
+    Union of the files requested by a list of analyzers (bundles and cached analyzers already request the files of
+    the analyzers they wrap).
+    """
+    filenames = []
+    for analyzer in analyzers:
+        filenames.extend([fname for fname in analyzer.filenames if fname not in filenames])
+    return filenames
+
+
+def simulation_status(simulation):
+    """
+    Status of an idmtools Simulation as a name, e.g., 'SUCCEEDED' or 'FAILED'. Simulations without a status (e.g.,
+    LocalSimulation) are taken to have succeeded.
+    """
+    status = getattr(simulation, 'status', None)
+    if status is None:
+        return SUCCEEDED
+    return str(getattr(status, 'name', status)).upper()
+
+
+def _normalize_path(path):
+    return os.path.normpath(path).replace('\\', '/')
+
+
+def _output_metadata_path(metadata):
+    # path of a COMPS OutputFileMetadata relative to the simulation's working directory
+    directory = (metadata.path_from_root or '').replace('\\', '/').strip('/')
+    if directory in ('', '.'):
+        return _normalize_path(metadata.friendly_name)
+    if directory == metadata.friendly_name or directory.endswith('/' + metadata.friendly_name):
+        return _normalize_path(directory)
+    return _normalize_path(directory + '/' + metadata.friendly_name)
+
+
+def simulation_directory(simulation, platform=None):
+    """
+    Directory of a simulation on disk (LocalSimulation, or simulations of file-based platforms), or None.
+    """
+    sim_dir = getattr(simulation, 'sim_dir', None)
+    if sim_dir is None and platform is not None and hasattr(platform, 'get_directory'):
+        sim_dir = platform.get_directory(simulation)
+    return sim_dir
+
+
+def output_file_info(simulation, filenames, platform=None):
+    """
+    Size and checksum (or modification time) of the given output files of a simulation, from one listing of its
+    outputs: a directory listing for simulations on disk, otherwise the platform's output file metadata (COMPS
+    retrieve_output_file_info, one request for all outputs of the simulation). Unlike the simulation's assets, these
+    are the files the simulation wrote.
+    Args:
+        simulation: idmtools Simulation, platform simulation object (as passed to analyzers by AnalyzeManager), or
+            LocalSimulation
+        filenames: paths relative to the simulation directory, e.g., 'output/InsetChart.json'
+        platform: idmtools platform (needed for simulations of file-based platforms)
+
+    Returns:
+        dict of filename -> (size, checksum or modification time) of the files present
+    """
+    sim_dir = simulation_directory(simulation, platform)
+    info = {}
+    if sim_dir is not None:
+        for directory in sorted(set(os.path.dirname(fname) for fname in filenames)):
+            try:
+                entries = {entry.name: entry for entry in os.scandir(os.path.join(str(sim_dir), directory))}
+            except FileNotFoundError:
+                continue
+            for fname in filenames:
+                entry = entries.get(os.path.basename(fname))
+                if os.path.dirname(fname) == directory and entry is not None and entry.is_file():
+                    stat = entry.stat()
+                    info[fname] = (stat.st_size, stat.st_mtime_ns)
+        return info
+
+    platform_simulation = simulation
+    if not hasattr(simulation, 'retrieve_output_file_info') and hasattr(simulation, 'get_platform_object'):
+        platform_simulation = simulation.get_platform_object(platform=platform)
+    if not hasattr(platform_simulation, 'retrieve_output_file_info'):
+        raise NotImplementedError('Cannot list the output files of %s simulations' % type(platform_simulation).__name__)
+    requested = {_normalize_path(fname): fname for fname in filenames}
+    for metadata in platform_simulation.retrieve_output_file_info(None):
+        fname = requested.get(_output_metadata_path(metadata))
+        if fname is not None:
+            info[fname] = (metadata.length, metadata.md5_checksum)
+    return info
+
+
+class PrefilterResult:
+    """
+    Simulations of an experiment to analyze, and the simulations skipped with the reason (failed or not finished,
+    missing output files, or output files that could not be listed).
+    """
+
+    def __init__(self, included, skipped):
+        """
+        Args:
+            included: ids of the simulations to analyze
+            skipped: data frame with columns simid, status, reason, and missing_files
+        """
+        self.included = list(included)
+        self.skipped = skipped
+
+    @property
+    def exclude_ids(self):
+        """
+        Ids of the skipped simulations, e.g., for AnalyzeManager(exclude_ids=...).
+        """
+        return [str(sim_id) for sim_id in self.skipped['simid']]
+
+    def summary(self):
+        """
+        Number of skipped simulations by reason.
+        """
+        return self.skipped.groupby('reason').size().rename('simulations')
+
+    def print_summary(self):
+        if len(self.skipped) == 0:
+            print('Analyzing all %d simulations' % len(self.included))
+            return
+        print('Analyzing %d simulations, skipping %d:' % (len(self.included), len(self.skipped)))
+        for reason, count in self.summary().items():
+            print('  %s: %d' % (reason, count))
+
+    def write(self, output_dir, filename=SKIPPED_FILENAME):
+        """
+        Save the skipped simulations as a csv in output_dir (nothing is written if none were skipped).
+        """
+        if len(self.skipped) == 0:
+            return
+        os.makedirs(output_dir, exist_ok=True)
+        self.skipped.to_csv(os.path.join(output_dir, filename), index=False)
+
+
+class SimulationPrefilter:
+    """
+    Decide before analysis which simulations of an experiment can be analyzed, so that failed simulations and
+    simulations missing output files are left out instead of failing the map step or stopping AnalyzeManager (which
+    refuses to run on experiments with failed simulations unless partial_analyze_ok is set).
+
+    The states of all simulations of an experiment are fetched with one call to the platform. The output files of the
+    succeeded simulations are listed with one directory listing per output directory for simulations on disk (file
+    platforms or LocalSimulation) and otherwise with one output file listing per simulation (see output_file_info), in
+    parallel: COMPS reports output file metadata per simulation (Simulation.retrieve_output_file_info) and has no
+    query listing the output files of all simulations of an experiment, so these requests are overlapped rather than
+    combined. If every succeeded simulation would be excluded, check raises an error rather than leaving nothing to
+    analyze (unless require_included is False). Listings of succeeded simulations do not change, so complete listings
+    are cached in cache_dir/<experiment id>.json; later checks list only new simulations and those that were missing
+    files (e.g., rerun since the last analysis).
+
+    Example:
+        prefilter = SimulationPrefilter(platform, cache_dir='simulation_status')
+        result = prefilter.check_experiment(exp_id, analyzer_filenames(analyzers))
+        result.print_summary()
+        manager = AnalyzeManager(platform=platform, ids=[(exp_id, ItemType.EXPERIMENT)], analyzers=analyzers,
+                                 exclude_ids=result.exclude_ids, partial_analyze_ok=True)
+    """
+
+    def __init__(self, platform=None, cache_dir=None, max_workers=16):
+        """
+        Args:
+            platform: idmtools platform (not needed to check LocalSimulations)
+            cache_dir: directory of the cached file listings, or None to list the files on every check
+            max_workers: number of simulations listed at a time
+        """
+        self.platform = platform
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+
+    def _cache_path(self, namespace):
+        return os.path.join(self.cache_dir, '%s.json' % namespace)
+
+    def _load_listings(self, namespace):
+        if self.cache_dir is None or namespace is None:
+            return {}
+        try:
+            with open(self._cache_path(namespace), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_listings(self, namespace, listings):
+        if self.cache_dir is None or namespace is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(listings, f)
+        os.replace(tmp_path, self._cache_path(namespace))
+
+    def invalidate(self, namespace):
+        """
+        Drop the cached listings of an experiment, e.g., after simulations were rerun or outputs were deleted.
+        """
+        if self.cache_dir is not None and os.path.exists(self._cache_path(namespace)):
+            os.remove(self._cache_path(namespace))
+
+    def list_files(self, simulation, filenames):
+        """
+        Which of the given output files (paths relative to the simulation directory, e.g., 'output/InsetChart.json')
+        the simulation has (see output_file_info).
+
+        Returns:
+            sorted list of the files present
+        """
+        return sorted(output_file_info(simulation, filenames, self.platform))
+
+    def check(self, simulations, filenames, namespace=None, require_included=True):
+        """
+        Sort simulations into those to analyze (succeeded, with every requested file) and those to skip.
+        Args:
+            simulations: idmtools Simulations (e.g., from platform.get_children) or LocalSimulations
+            filenames: files every analyzed simulation needs (e.g., analyzer_filenames(analyzers))
+            namespace: name of the cached listings, e.g., the experiment id (None: no caching)
+            require_included: raise an error if every succeeded simulation is excluded; False while the experiment
+                is still running, when the first simulations to finish may all be missing files
+
+        Returns:
+            PrefilterResult
+        """
+        filenames = list(filenames)
+        cached = self._load_listings(namespace)
+        listings = {}
+        skipped = []
+        to_list = []
+        for simulation in simulations:
+            sim_id = str(simulation.id)
+            status = simulation_status(simulation)
+            if status != SUCCEEDED:
+                skipped.append({'simid': sim_id, 'status': status, 'reason': 'not succeeded', 'missing_files': ''})
+                continue
+            listed = cached.get(sim_id)
+            # cached listings hold the files found among the files requested then; list again for newly requested files
+            if listed is not None and set(filenames) <= set(listed['requested']):
+                listings[sim_id] = listed
+            else:
+                to_list.append(simulation)
+
+        def list_one(simulation):
+            try:
+                return simulation, self.list_files(simulation, filenames), None
+            except Exception as e:
+                return simulation, None, e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for simulation, present, error in executor.map(list_one, to_list):
+                sim_id = str(simulation.id)
+                if error is not None:
+                    skipped.append({'simid': sim_id, 'status': SUCCEEDED, 'reason': 'files could not be listed',
+                                    'missing_files': str(error)})
+                else:
+                    listings[sim_id] = {'requested': filenames, 'present': present}
+
+        included = []
+        complete = {}
+        for sim_id, listed in listings.items():
+            present = set(listed['present'])
+            missing = [fname for fname in filenames if fname not in present]
+            if missing:
+                skipped.append({'simid': sim_id, 'status': SUCCEEDED, 'reason': 'missing output files',
+                                'missing_files': ';'.join(missing)})
+            else:
+                included.append(sim_id)
+                complete[sim_id] = listed
+        if to_list:
+            self._save_listings(namespace, {**cached, **complete})
+        skipped = pd.DataFrame(skipped, columns=['simid', 'status', 'reason', 'missing_files'])
+        result = PrefilterResult(included, skipped)
+        succeeded = skipped['status'] == SUCCEEDED
+        if require_included and not included and succeeded.any():
+            # every simulation that ran to completion lacks output: the file names or the listing are wrong
+            result.print_summary()
+            raise RuntimeError('All %d succeeded simulations%s were excluded for missing or unlisted output files '
+                               '(e.g., %s: %s). Check the filenames requested by the analyzers, or analyze without '
+                               'the prefilter.'
+                               % (succeeded.sum(), '' if namespace is None else ' of %s' % namespace,
+                                  skipped.loc[succeeded, 'simid'].iloc[0],
+                                  skipped.loc[succeeded, 'missing_files'].iloc[0]))
+        return result
+
+    def check_experiment(self, exp_id, filenames):
+        """
+        Check all simulations of an experiment (see check), with their states fetched in one call to the platform.
+        """
+        simulations = self.platform.get_children(exp_id, ItemType.EXPERIMENT, force=True)
+        return self.check(simulations, filenames, namespace=exp_id)
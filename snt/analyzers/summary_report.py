@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+
+# MalariaSummaryReport with a 30-day reporting interval has 12 'months' of 30 days plus a final 13th interval of 5 days
+NUM_MONTHS = 12
+NUM_INTERVALS = 13
+
+
+def parse_summary_reports(reports, channels):
+    """
+    Stack the yearly MalariaSummaryReport payloads of one simulation into contiguous arrays.
+    Args:
+        reports: list of parsed MalariaSummaryReport_Monthly<year>.json dicts, one per year (in year order)
+        channels: list of 'DataByTimeAndAgeBins' channel names to extract
+
+    Returns:
+        dict of channel name -> float array of shape (num_years, 13, num_age_bins)
+    """
+    arrays = {}
+    for channel in channels:
+        arrays[channel] = np.ascontiguousarray(
+            np.stack([np.asarray(report['DataByTimeAndAgeBins'][channel][:NUM_INTERVALS], dtype=np.float64)
+                      for report in reports]))
+    return arrays
+
+
+def get_summary_reports(data, filenames):
+    """
+    Get the parsed report payloads in the order of filenames (e.g., from the data dict passed to an analyzer map).
+    """
+    return [data[fname] for fname in filenames]
+
+
+def fold_final_interval(values):
+    """
+    Convert a count channel to monthly values by adding the final five-day interval into December.
+    Args:
+        values: array of shape (num_years, 13, num_age_bins)
+
+    Returns:
+        array of shape (num_years, 12, num_age_bins)
+    """
+    monthly = values[:, :NUM_MONTHS].copy()
+    monthly[:, NUM_MONTHS - 1] += values[:, NUM_MONTHS]
+    return monthly
+
+
+def drop_final_interval(values):
+    """
+    Convert an average or rate channel to monthly values by dropping the final five-day interval
+    (assume final five days have same average as rest of December).
+    """
+    return values[:, :NUM_MONTHS]
+
+
+def monthly_counts(annual_incidence, pop, days_in_month=30):
+    """
+    Adjust the per-person annualized number (the reported value) to get the total number of events in each month.
+    Args:
+        annual_incidence: array of shape (num_years, 12, num_age_bins)
+        pop: population array with the same shape
+        days_in_month: number of days represented by each month, either a scalar or a sequence of length 12
+
+    Returns:
+        array of the same shape as annual_incidence
+    """
+    days_in_month = np.asarray(days_in_month, dtype=np.float64)
+    if days_in_month.ndim == 1:
+        days_in_month = days_in_month[:, None]
+    return annual_incidence * pop * days_in_month / 365
+
+
+def sum_bins(values, bins):
+    """
+    Sum values across the selected age bins (last axis).
+    """
+    return values[..., bins].sum(axis=-1)
+
+
+def pop_weighted_mean(values, pop, bins):
+    """
+    Population-weighted average of values across the selected age bins (last axis). Where the bins have no
+    population, fall back to the unweighted average across the bins (as AgeGroupAggregator.weighted_mean).
+    """
+    values = values[..., bins]
+    pop = pop[..., bins]
+    group_pop = pop.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted = (values * pop).sum(axis=-1) / group_pop
+    return np.where(group_pop > 0, weighted, values.mean(axis=-1))
+
+
+# age groups given as (exclusive lower, inclusive upper) age limits, matched against the upper edges in
+# the report's Metadata['Age Bins']
+AGE_GROUPS_UNDER15 = {'Under15': (0, 15), '15to30': (15, 30), '30to50': (30, 50), '50plus': (50, np.inf)}
+AGE_GROUPS_WITH_U5 = {'Under5': (0, 5), '5to15': (5, 15), '15to30': (15, 30), '30to50': (30, 50),
+                      '50plus': (50, np.inf), 'allAges': (0, np.inf)}
+AGE_GROUPS_WITH_U1U5 = {'Under1': (0, 1), 'Under5': (0, 5), '5to15': (5, 15), '15to30': (15, 30),
+                        '30to50': (30, 50), '50plus': (50, np.inf), 'allAges': (0, np.inf)}
+
+
+class AgeGroupAggregator:
+    """
+    Combine summary-report age bins into (possibly overlapping) age groups with one matrix multiply per channel.
+
+    Each age group is declared as a (lower, upper] range of ages; an age bin belongs to a group if its upper edge
+    (from the report's Metadata['Age Bins']) falls in that range. If age_groups is None, each age bin is its own
+    group, labelled by its upper edge. The bin-to-group weight matrix is built once per distinct set of age bins.
+    """
+
+    def __init__(self, age_groups=None):
+        self.age_groups = age_groups
+        self._weights = {}
+
+    def group_names(self, age_bins):
+        if self.age_groups is None:
+            return list(age_bins)
+        return list(self.age_groups.keys())
+
+    def weights(self, age_bins):
+        """
+        Get the (num_age_bins, num_age_groups) matrix with 1 where the age bin is included in the age group.
+        """
+        key = tuple(age_bins)
+        if key not in self._weights:
+            upper_edges = np.asarray(age_bins, dtype=np.float64)
+            if self.age_groups is None:
+                weights = np.eye(len(upper_edges))
+            else:
+                weights = np.zeros((len(upper_edges), len(self.age_groups)))
+                for gg, (group, (lower, upper)) in enumerate(self.age_groups.items()):
+                    weights[:, gg] = (upper_edges > lower) & (upper_edges <= upper)
+                    if not weights[:, gg].any():
+                        raise ValueError('Age group %s (%s, %s] does not include any of the age bins %s'
+                                         % (group, lower, upper, list(age_bins)))
+            self._weights[key] = weights
+        return self._weights[key]
+
+    def sum(self, values, age_bins):
+        """
+        Sum values of shape (..., num_age_bins) within each age group.
+        """
+        return values @ self.weights(age_bins)
+
+    def weighted_mean(self, values, pop, age_bins):
+        """
+        Population-weighted average of values within each age group. Where a group has no population, fall back
+        to the unweighted average across its age bins.
+        """
+        weights = self.weights(age_bins)
+        group_pop = pop @ weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weighted = (values * pop) @ weights / group_pop
+        return np.where(group_pop > 0, weighted, (values @ weights) / weights.sum(axis=0))
+
+
+def age_group_channels(arrays, age_bins, aggregator, days_in_month=30, include_rdt=False):
+    """
+    Combine the age bins of the summary report into age groups for the standard burden channels.
+    Args:
+        arrays: dict from parse_summary_reports including population, new infections, PfPR, clinical and severe
+            incidence channels (and 'PfPR by Age Bin-HRP2' if include_rdt)
+        age_bins: upper edges of the report age bins (Metadata['Age Bins'])
+        aggregator: AgeGroupAggregator defining the age groups
+        days_in_month: number of days represented by each month when converting annualized incidence to counts
+        include_rdt: whether to include the population-weighted 'PfPR RDT' channel
+
+    Returns:
+        dict of output column -> array of shape (num_years, 12, num_age_groups)
+    """
+    pop = drop_final_interval(arrays['Average Population by Age Bin'])
+    columns = {'Pop': aggregator.sum(pop, age_bins),
+               'New Infections': aggregator.sum(fold_final_interval(arrays['New Infections by Age Bin']), age_bins),
+               'PfPR': aggregator.weighted_mean(drop_final_interval(arrays['PfPR by Age Bin']), pop, age_bins)}
+    if include_rdt:
+        columns['PfPR RDT'] = aggregator.weighted_mean(drop_final_interval(arrays['PfPR by Age Bin-HRP2']), pop,
+                                                       age_bins)
+    columns['Clinical cases'] = aggregator.sum(monthly_counts(
+        drop_final_interval(arrays['Annual Clinical Incidence by Age Bin']), pop, days_in_month), age_bins)
+    columns['Severe cases'] = aggregator.sum(monthly_counts(
+        drop_final_interval(arrays['Annual Severe Incidence by Age Bin']), pop, days_in_month), age_bins)
+    return columns
+
+
+def monthly_frame(columns, years):
+    """
+    Create a data frame with one row per year and month from arrays of shape (num_years, 12).
+    Rows are ordered by year and then month.
+    """
+    years = np.asarray(years)
+    adf = pd.DataFrame({'month': np.tile(np.arange(1, NUM_MONTHS + 1), len(years))})
+    for col, values in columns.items():
+        adf[col] = np.asarray(values).reshape(-1)
+    adf['year'] = np.repeat(years, NUM_MONTHS)
+    return adf
+
+
+def monthly_age_group_frame(columns, years, age_groups):
+    """
+    Create a data frame with one row per year, age group, and month from arrays of shape
+    (num_years, 12, num_age_groups). Rows are ordered by year, then age group, then month.
+    """
+    years = np.asarray(years)
+    num_groups = len(age_groups)
+    adf = pd.DataFrame({'month': np.tile(np.arange(1, NUM_MONTHS + 1), len(years) * num_groups),
+                        'AgeGroup': np.tile(np.repeat(np.asarray(age_groups), NUM_MONTHS), len(years))})
+    for col, values in columns.items():
+        adf[col] = np.ascontiguousarray(np.swapaxes(np.asarray(values), 1, 2)).reshape(-1)
+    adf['year'] = np.repeat(years, NUM_MONTHS * num_groups)
+    return adf
@@ -1,11 +1,11 @@
 import os
-import datetime
 import logging
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from idmtools_calibra.utilities import ll_calculators
 from idmtools_calibra.analyzers.base_calibration_analyzer import BaseCalibrationAnalyzer
+from snt.analyzers.sim_calendar import month_of_day
 
 logger = logging.getLogger(__name__)
 
@@ -15,13 +15,6 @@ class ChannelByMultiYearSeasonCohortInsetAnalyzer(BaseCalibrationAnalyzer):
     Base class implementation for similar comparisons of age-binned reference data to simulation output.
     """
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
     def __init__(self, site, weight=1, compare_fn=ll_calculators.negative_square_diff_obs_sim, **kwargs):
         super().__init__(reference_data=site.get_reference_data('entomology_by_season'),
                          weight=weight,
@@ -53,7 +46,7 @@ class ChannelByMultiYearSeasonCohortInsetAnalyzer(BaseCalibrationAnalyzer):
         simdata = simdata[-365:].reset_index(drop=True)
         simdata['Time'] = simdata.index
         simdata['Day'] = simdata['Time'] % 365
-        simdata['Month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
+        simdata['Month'] = month_of_day(simdata['Day'])
 
         simdata = simdata.rename(columns={self.population_channel: 'Trials',
                                           self.comparison_channel: 'Observations'})
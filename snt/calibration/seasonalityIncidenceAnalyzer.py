@@ -1,9 +1,10 @@
 import os
-import datetime
 import logging
 import pandas as pd
 import numpy as np
 from idmtools.entities import IAnalyzer
+from snt.analyzers.sim_calendar import month_of_day
+from snt.analyzers.report_channels import read_report_channels
 
 logger = logging.getLogger(__name__)
 
@@ -13,16 +14,9 @@ class seasonalityIncidenceAnalyzer(IAnalyzer):
     Get incidence across months from simulations (to be compared against reference datasets)
     """
 
-    @classmethod
-    def monthparser(self, x):
-        if x == 0:
-            return 12
-        else:
-            return datetime.datetime.strptime(str(x), '%j').month
-
     def __init__(self, working_dir="."):
-        super().__init__(working_dir=working_dir, filenames=['output/ReportEventCounter.json',
-                                                             'output/ReportMalariaFiltered.json'])
+        super().__init__(working_dir=working_dir, parse=False, filenames=['output/ReportEventCounter.json',
+                                                                          'output/ReportMalariaFiltered.json'])
 
         self.population_channel = 'Statistical Population'
         self.case_channel = 'Received_Treatment'
@@ -37,10 +31,9 @@ class seasonalityIncidenceAnalyzer(IAnalyzer):
         """
 
         # Load data from simulation
-        simdata = {self.case_channel: data[self.filenames[0]]['Channels'][self.case_channel]['Data'][-365:],
-                   self.nmf_channel: data[self.filenames[0]]['Channels'][self.nmf_channel]['Data'][-365:],
-                   self.population_channel: data[self.filenames[1]]['Channels'][self.population_channel]['Data'][-365:],
-                   self.prev_channel: data[self.filenames[1]]['Channels'][self.prev_channel]['Data'][-365:]}
+        simdata = read_report_channels(data[self.filenames[0]], [self.case_channel, self.nmf_channel])
+        simdata.update(read_report_channels(data[self.filenames[1]], [self.population_channel, self.prev_channel]))
+        simdata = {channel: values[-365:] for channel, values in simdata.items()}
 
         simdata = pd.DataFrame(simdata)
         simdata[self.comparison_channel] = simdata[self.case_channel] + simdata[self.nmf_channel]
@@ -48,7 +41,7 @@ class seasonalityIncidenceAnalyzer(IAnalyzer):
         simdata = simdata[-365:].reset_index(drop=True)
         simdata['Time'] = simdata.index
         simdata['Day'] = simdata['Time'] % 365
-        simdata['Month'] = simdata['Day'].apply(lambda x: self.monthparser((x + 1) % 365))
+        simdata['Month'] = month_of_day(simdata['Day'])
 
         simdata = simdata.rename(columns={self.population_channel: 'Trials',
                                           self.comparison_channel: 'Observations'})
@@ -1,100 +1,167 @@
 import os
-import datetime
 import json
+import datetime
 import pandas as pd
 import numpy as np
 
-def monthlyU1PfPRAnalyzer(output_path, start_year, end_year):
-    adf = pd.DataFrame()
-    for year in range(start_year, (end_year+1)):
-        fname = os.path.join(output_path, "MalariaSummaryReport_Monthly%d.json" % year)
-        with open(fname, "r") as f:
-            data = json.load(f)
-        pop_all = data['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]
-        pop = [x[0] for x in pop_all]
-        d = data['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]
-        pfpr = [x[0] for x in d]
-        d = data['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]
-        pfpr_rdt = [x[0] for x in d]
-        d = data['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]
-        clinical_cases = [d[yy][0] * pop_all[yy][0] * 30 / 365 for yy in range(12)]
-        d = data['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]
-        severe_cases = [d[yy][0] * pop_all[yy][0] * 30 / 365 for yy in range(12)]
-
-        simdata = pd.DataFrame({'month': range(1, 13),
-                                'PfPR U1': pfpr,
-                                'PfPR RDT U1': pfpr_rdt,
-                                'Cases U1': clinical_cases,
-                                'Severe cases U1': severe_cases,
-                                'Pop U1': pop})
-        simdata['year'] = year
-        adf = pd.concat([adf, simdata])
-
-    adf.to_csv((os.path.join(output_path, 'U1_PfPR_ClinicalIncidence.csv')), index=False)
-
-
-def monthlyU5PfPRAnalyzer(output_path, start_year, end_year):
-    adf = pd.DataFrame()
-    for year in range(start_year, (end_year+1)):
-        fname = os.path.join(output_path, "MalariaSummaryReport_Monthly%d.json" % year)
-        with open(fname, "r") as f:
-            data = json.load(f)
-        # use weighted average for combined age groups
-        # population size
-        pop_all = data['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        pop = [sum(x[:2]) for x in pop_all]
-        # PfPR
-        d = data['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        pfpr = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) / (pop_all[yy][0] + pop_all[yy][1]) for yy in range(12)]
-        # RDT PfPR
-        d = data['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]  # remove final five days: assume final five days have same average as rest of month
-        pfpr_rdt = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) / (pop_all[yy][0] + pop_all[yy][1]) for yy in range(12)]
-        # clinical cases
-        d = data['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        # adjust the per-person annualized number (the reported value) to get the total number of clinical cases in that age group in a month
-        clinical_cases = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) * 30 / 365 for yy in range(12)]
-        # severe cases
-        d = data['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        # adjust the per-person annualized number (the reported value) to get the total number of severe cases in that age group in a month
-        severe_cases = [((d[yy][0] * pop_all[yy][0]) + (d[yy][1] * pop_all[yy][1])) * 30 / 365 for yy in range(12)]
-
-        simdata = pd.DataFrame({'month': range(1, 13),
-                                'PfPR U5': pfpr,
-                                'PfPR RDT U5': pfpr_rdt,
-                                'Cases U5': clinical_cases,
-                                'Severe cases U5': severe_cases,
-                                'Pop U5': pop})
-        simdata['year'] = year
-        adf = pd.concat([adf, simdata])
-
-    adf.to_csv((os.path.join(output_path, 'U5_PfPR_ClinicalIncidence.csv')), index=False)
-
-
-def monthparser(x):
-    if x == 0:
-        return 12
-    else:
-        return datetime.datetime.strptime(str(x), '%j').month
+# compact output format for the tables written on the compute node
+TABLE_FORMATS = {'csv': '.csv', 'parquet': '.parquet'}
+
 
+def write_table(adf, output_path, filename, output_format='csv'):
+    """
+    Write a table in the output format (the extension of filename is replaced by that of the format).
 
-def monthlyTreatedCasesAnalyzer(output_path, start_year):
+    Returns:
+        manifest entry of the table: its name, file, number of rows, and columns
+    """
+    name = os.path.splitext(filename)[0]
+    fname = name + TABLE_FORMATS[output_format]
+    if output_format == 'parquet':
+        adf.to_parquet(os.path.join(output_path, fname), index=False, compression='zstd')
+    else:
+        adf.to_csv(os.path.join(output_path, fname), index=False)
+    return {'name': name, 'file': fname, 'rows': len(adf), 'columns': [str(col) for col in adf.columns]}
+
+
+class SimulationOutputs:
+    """
+    Context of the post-processing of one simulation. Each report is read once, on first use, and shared by all the
+    table functions; tables are kept in memory (so later steps can use earlier tables without reading them back) and
+    written together by write(). Kept local so this file stays self-contained when run on the compute node.
+    """
+
+    def __init__(self, output_path, start_year, end_year, output_format='csv'):
+        self.output_path = output_path
+        self.start_year = start_year
+        self.end_year = end_year
+        self.output_format = output_format
+        self.years = list(range(start_year, (end_year+1)))
+        self.tables = {}  # output filename -> data frame, in the order the tables were created
+        self._summary_reports = None
+        self._channel_reports = {}
+
+    def _load_summary_reports(self):
+        if self._summary_reports is None:
+            reports = []
+            for year in self.years:
+                fname = os.path.join(self.output_path, "MalariaSummaryReport_Monthly%d.json" % year)
+                with open(fname, "r") as f:
+                    report = json.load(f)
+                reports.append({'Metadata': report['Metadata'],
+                                'DataByTimeAndAgeBins': report['DataByTimeAndAgeBins']})
+            self._summary_reports = reports
+        return self._summary_reports
+
+    def summary_report_arrays(self, channels):
+        """
+        Stack the requested channels of the yearly MalariaSummaryReport files into arrays of shape
+        (num_years, 13, num_age_bins).
+        """
+        reports = self._load_summary_reports()
+        return {channel: np.stack([np.asarray(report['DataByTimeAndAgeBins'][channel][:13], dtype=np.float64)
+                                   for report in reports])
+                for channel in channels}
+
+    def age_bins(self):
+        # upper edges of the summary report age bins
+        return np.asarray(self._load_summary_reports()[0]['Metadata']['Age Bins'], dtype=np.float64)
+
+    def report_channels(self, report_name, channels):
+        """
+        Daily values of the channels (those present) of a ReportEventCounter or ReportMalariaFiltered json, as lists.
+        """
+        if report_name not in self._channel_reports:
+            with open(os.path.join(self.output_path, report_name), "r") as f:
+                self._channel_reports[report_name] = json.load(f)['Channels']
+        data = self._channel_reports[report_name]
+        return {x: data[x]['Data'] for x in channels if x in data}
+
+    def add_table(self, adf, filename):
+        self.tables[filename] = adf
+
+    def table(self, filename):
+        return self.tables[filename]
+
+    def write(self):
+        """
+        Write all tables in the output format.
+
+        Returns:
+            manifest entries of the tables
+        """
+        return [write_table(adf, self.output_path, filename, self.output_format)
+                for filename, adf in self.tables.items()]
+
+
+def monthly_frame(columns, years):
+    # one row per year and month from arrays of shape (num_years, 12)
+    adf = pd.DataFrame({'month': np.tile(np.arange(1, 13), len(years))})
+    for col, values in columns.items():
+        adf[col] = np.asarray(values).reshape(-1)
+    adf['year'] = np.repeat(years, 12)
+    return adf
+
+
+def pop_weighted_mean(values, pop, bins):
+    # population-weighted average across the selected age bins (last axis); unweighted where the bins have no population
+    values = values[..., bins]
+    pop = pop[..., bins]
+    group_pop = pop.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted = (values * pop).sum(axis=-1) / group_pop
+    return np.where(group_pop > 0, weighted, values.mean(axis=-1))
+
+
+def monthlyU1PfPRAnalyzer(outputs):
+    arrays = outputs.summary_report_arrays(['Average Population by Age Bin', 'PfPR by Age Bin', 'PfPR by Age Bin-HRP2',
+                                            'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin'])
+    # remove final five days: assume final five days have same average as rest of month
+    pop = arrays['Average Population by Age Bin'][:, :12, 0]
+    adf = monthly_frame({'PfPR U1': arrays['PfPR by Age Bin'][:, :12, 0],
+                         'PfPR RDT U1': arrays['PfPR by Age Bin-HRP2'][:, :12, 0],
+                         'Cases U1': arrays['Annual Clinical Incidence by Age Bin'][:, :12, 0] * pop * 30 / 365,
+                         'Severe cases U1': arrays['Annual Severe Incidence by Age Bin'][:, :12, 0] * pop * 30 / 365,
+                         'Pop U1': pop},
+                        years=outputs.years)
+    outputs.add_table(adf, 'U1_PfPR_ClinicalIncidence.csv')
+
+
+def monthlyU5PfPRAnalyzer(outputs):
+    arrays = outputs.summary_report_arrays(['Average Population by Age Bin', 'PfPR by Age Bin', 'PfPR by Age Bin-HRP2',
+                                            'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin'])
+    # use weighted average for combined age groups (first two age bins)
+    # remove final five days: assume final five days have same average as rest of month
+    pop_all = arrays['Average Population by Age Bin'][:, :12, :2]
+    pop = pop_all.sum(axis=-1)
+    # adjust the per-person annualized number (the reported value) to get the total number of cases in that age group in a month
+    adf = monthly_frame({'PfPR U5': pop_weighted_mean(arrays['PfPR by Age Bin'][:, :12], pop_all, [0, 1]),
+                         'PfPR RDT U5': pop_weighted_mean(arrays['PfPR by Age Bin-HRP2'][:, :12], pop_all, [0, 1]),
+                         'Cases U5': (arrays['Annual Clinical Incidence by Age Bin'][:, :12, :2] * pop_all).sum(axis=-1) * 30 / 365,
+                         'Severe cases U5': (arrays['Annual Severe Incidence by Age Bin'][:, :12, :2] * pop_all).sum(axis=-1) * 30 / 365,
+                         'Pop U5': pop},
+                        years=outputs.years)
+    outputs.add_table(adf, 'U5_PfPR_ClinicalIncidence.csv')
+
+
+# calendar month of each day of the 365-day simulation year (day 0 is January 1)
+MONTH_OF_DAY = np.repeat(np.arange(1, 13), [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def monthlyTreatedCasesAnalyzer(outputs):
     channels = ['Received_Treatment', 'Received_Severe_Treatment', 'Received_NMF_Treatment',
                          'Received_Vaccine']
     inset_channels = ['Statistical Population', 'New Clinical Cases', 'New Severe Cases',
                            'PfHRP2 Prevalence', 'Blood Smear Parasite Prevalence']
 
-    fname0 = os.path.join(output_path, "ReportEventCounter.json")
-    with open(fname0, "r") as f:
-        data0 = json.load(f)
-    fname1 = os.path.join(output_path, "ReportMalariaFiltered.json")
-    with open(fname1, "r") as f:
-        data1 = json.load(f)
+    data0 = outputs.report_channels("ReportEventCounter.json", channels)
+    data1 = outputs.report_channels("ReportMalariaFiltered.json", inset_channels)
 
-    channels_in_expt = [x for x in channels if x in data0['Channels'].keys()]
-    simdata = pd.DataFrame({x: data0['Channels'][x]['Data'] for x in channels_in_expt})
+    channels_in_expt = [x for x in channels if x in data0]
+    simdata = pd.DataFrame({x: data0[x] for x in channels_in_expt})
     simdata['Time'] = simdata.index
 
-    d = pd.DataFrame({x: data1['Channels'][x]['Data'] for x in inset_channels})
+    d = pd.DataFrame({x: data1[x] for x in inset_channels})
     d['Time'] = d.index
 
     if len(channels_in_expt) > 0:
@@ -105,10 +172,10 @@ def monthlyTreatedCasesAnalyzer(output_path, start_year):
         simdata[missing_channel] = 0
 
     simdata['Day'] = simdata['Time'] % 365
-    simdata['month'] = simdata['Day'].apply(lambda x: monthparser((x + 1) % 365))
-    simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + start_year)
+    simdata['month'] = MONTH_OF_DAY[simdata['Day'].to_numpy()]
+    simdata['year'] = simdata['Time'] // 365 + outputs.start_year
     simdata = simdata.reset_index(drop=True)
-    simdata['date'] = simdata.apply(lambda x: datetime.date(int(x['year']), int(x['month']), 1), axis=1)
+    simdata['date'] = pd.to_datetime(simdata[['year', 'month']].assign(day=1)).dt.date
 
     sum_channels = channels + ['New Clinical Cases', 'New Severe Cases']
     mean_channels = ['Statistical Population', 'PfHRP2 Prevalence']
@@ -117,46 +184,56 @@ def monthlyTreatedCasesAnalyzer(output_path, start_year):
     pdf = simdata.groupby(['date'])[mean_channels].agg(np.mean).reset_index()
 
     adf = pd.merge(left=pdf, right=df, on=['date'])
-    adf.to_csv((os.path.join(output_path, 'All_Age_monthly_Cases.csv')), index=False)
-
-
-def monthlySevereTreatedByAgeAnalyzer(output_path, start_year):
+    outputs.add_table(adf, 'All_Age_monthly_Cases.csv')
+
+
+def count_events_by_month_and_age(fname, event_name, age_groups, chunksize=500000):
+    """
+    Count the events named event_name in each month since the start of the simulation and each age group
+    (agemin < age in years < agemax), reading only the Time, Age, and Event_Name columns of the ReportEventRecorder.csv
+    in chunks and dropping other events as they are read. Kept local so this file stays self-contained when run on
+    the compute node.
+    """
+    counts = {label: np.zeros(0, dtype=np.int64) for label in age_groups}
+    for chunk in pd.read_csv(fname, usecols=['Time', 'Age', 'Event_Name'], skipinitialspace=True, chunksize=chunksize,
+                             dtype={'Time': np.float64, 'Age': np.float64, 'Event_Name': 'category'}):
+        chunk = chunk[chunk['Event_Name'] == event_name]
+        time = chunk['Time'].to_numpy(dtype=np.int64)
+        month_index = (time // 365) * 12 + MONTH_OF_DAY[time % 365] - 1
+        age_years = chunk['Age'].to_numpy(dtype=np.float64) / 365
+        for label, (agemin, agemax) in age_groups.items():
+            chunk_counts = np.bincount(month_index[(age_years < agemax) & (age_years > agemin)])
+            if len(chunk_counts) > len(counts[label]):
+                counts[label] = np.pad(counts[label], (0, len(chunk_counts) - len(counts[label])))
+            counts[label][:len(chunk_counts)] += chunk_counts
+    num_months = max([len(group_counts) for group_counts in counts.values()], default=0)
+    return {label: np.pad(group_counts, (0, num_months - len(group_counts))) for label, group_counts in counts.items()}
+
+
+def monthlySevereTreatedByAgeAnalyzer(outputs):
     event_name = 'Received_Severe_Treatment'
     agebins = [1, 5, 200]
-    output_data = pd.read_csv(os.path.join(output_path, "ReportEventRecorder.csv"))
-    output_data = output_data[output_data['Event_Name'] == event_name]
-
-    simdata = pd.DataFrame()
-    if len(output_data) > 0:  # there are events of this type
-        output_data.loc[:, 'Day'] = output_data['Time'] % 365
-        output_data.loc[:, 'month'] = output_data['Day'].apply(lambda x: monthparser((x + 1) % 365))
-        output_data.loc[:, 'year'] = output_data['Time'] // 365 + start_year
-        output_data.loc[:, 'age in years'] = output_data['Age'] / 365
-        for agemax in agebins:
-            if agemax < 200:
-                agelabel = 'U%d' % agemax
-            else:
-                agelabel = 'all_ages'
-            agemin = 0
-            d = output_data[(output_data['age in years'] < agemax) & (output_data['age in years'] > agemin)]
-            g = d.groupby(['year', 'month'])['Event_Name'].agg(len).reset_index()
-            g = g.rename(columns={'Event_Name': 'Num_%s_Received_Severe_Treatment' % agelabel})
-            if g.empty:
-                g = pd.DataFrame({'year': [start_year], 'month': [1], ('Num_%s_Received_Severe_Treatment' % agelabel): [0]})
-            if simdata.empty:
-                simdata = g
-            else:
-                simdata = pd.merge(left=simdata, right=g, on=['year', 'month'], how='outer')
-                simdata = simdata.fillna(0)
-
-
+    age_groups = {('U%d' % agemax if agemax < 200 else 'all_ages'): (0, agemax) for agemax in agebins}
+    counts = count_events_by_month_and_age(os.path.join(outputs.output_path, "ReportEventRecorder.csv"), event_name,
+                                           age_groups)
+
+    num_months = len(counts['all_ages'])
+    if num_months > 0:  # there are events of this type
+        # keep months with at least one event, and the first month if an age group has no events
+        keep = np.any([group_counts > 0 for group_counts in counts.values()], axis=0)
+        if any(group_counts.sum() == 0 for group_counts in counts.values()):
+            keep[0] = True
+        month_index = np.flatnonzero(keep)
+        simdata = pd.DataFrame({'year': month_index // 12 + outputs.start_year, 'month': month_index % 12 + 1})
+        for agelabel, group_counts in counts.items():
+            simdata['Num_%s_Received_Severe_Treatment' % agelabel] = group_counts[month_index]
     else:
         simdata = pd.DataFrame(columns=['year', 'month',
                                         'Num_U1_Received_Severe_Treatment',
                                         'Num_U5_Received_Severe_Treatment',
                                         'Num_all_ages_Received_Severe_Treatment'])
     simdata = simdata.fillna(0)
-    simdata.to_csv(os.path.join(output_path, 'Treated_Severe_Monthly_Cases_By_Age.csv'), index=False)
+    outputs.add_table(simdata, 'Treated_Severe_Monthly_Cases_By_Age.csv')
 
     included_child_bins = ['U%i' % x for x in agebins if x < 20]
     for agelabel in included_child_bins:
@@ -164,8 +241,8 @@ def monthlySevereTreatedByAgeAnalyzer(output_path, start_year):
         # cast to int65 data type for merge with incidence df
         severe_treat_df = severe_treat_df.astype({'month': 'int64', 'year': 'int64'})
 
-        # combine with existing columns of the U5 clinical incidence and PfPR dataframe
-        incidence_df = pd.read_csv(os.path.join(output_path, '%s_PfPR_ClinicalIncidence.csv' % agelabel))
+        # combine with existing columns of the U5 clinical incidence and PfPR dataframe (created earlier)
+        incidence_df = outputs.table('%s_PfPR_ClinicalIncidence.csv' % agelabel)
         merged_df = pd.merge(left=incidence_df, right=severe_treat_df,
                              on=['year', 'month'],
                              how='left')
@@ -173,138 +250,149 @@ def monthlySevereTreatedByAgeAnalyzer(output_path, start_year):
 
         # fix any excess treated cases!
         merged_df['num severe cases %s' % agelabel] = merged_df['Severe cases %s' % agelabel]
-        merged_df['excess sev treat %s' % agelabel] = merged_df['Num_%s_Received_Severe_Treatment' % agelabel] - \
-                                                      merged_df['num severe cases %s' % agelabel]
-
-        for r, row in merged_df.iterrows():
-            if row['excess sev treat %s' % agelabel] < 1:
-                continue
-            # fix Jan 2020 (start of sim) excess treated severe cases
-            if row['year'] == start_year and row['month'] == 1:
-                merged_df.loc[(merged_df['year'] == start_year) & (merged_df['month'] == 1),
-                              'Num_%s_Received_Severe_Treatment' % agelabel] = np.sum(
-                    merged_df[(merged_df['year'] == start_year) &
-                              (merged_df['month'] == 1)]['num severe cases %s' % agelabel])
-            else:
-                # figure out which is previous month
-                newyear = row['year']
-                newmonth = row['month'] - 1
-                if newmonth < 1:
-                    newyear -= 1
-                excess = row['excess sev treat %s' % agelabel]
-                merged_df.loc[(merged_df['year'] == start_year) & (merged_df['month'] == 1), 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                    merged_df.loc[(merged_df['year'] == start_year) & (merged_df['month'] == 1),
-                                  'Num_%s_Received_Severe_Treatment' % agelabel] - excess
-                merged_df.loc[(merged_df['year'] == start_year) & (merged_df['month'] == 1), 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-                    merged_df.loc[(merged_df['year'] == start_year) & (merged_df['month'] == 1),
-                                  'Num_%s_Received_Severe_Treatment' % agelabel] + excess
-        merged_df['excess sev treat %s' % agelabel] = merged_df['Num_%s_Received_Severe_Treatment' % agelabel] - \
-                                                      merged_df['num severe cases %s' % agelabel]
-        merged_df.loc[
-            merged_df['excess sev treat %s' % agelabel] > 0.5, 'Num_%s_Received_Severe_Treatment' % agelabel] = \
-            merged_df.loc[merged_df['excess sev treat %s' % agelabel] > 0.5, 'num severe cases %s' % agelabel]
+        treated_col = 'Num_%s_Received_Severe_Treatment' % agelabel
+        severe = merged_df['num severe cases %s' % agelabel].to_numpy(dtype=np.float64)
+        is_start = ((merged_df['year'] == outputs.start_year) & (merged_df['month'] == 1)).to_numpy()
+        # fix Jan of start year (start of sim) excess treated severe cases
+        treated = merged_df[treated_col].to_numpy(dtype=np.float64, copy=True)
+        if (is_start & ~(treated - severe < 1)).any():
+            treated[is_start] = np.nansum(severe[is_start])
+        cap = treated - severe > 0.5
+        treated[cap] = severe[cap]
+        if not np.array_equal(treated, merged_df[treated_col].to_numpy(dtype=np.float64)):
+            merged_df[treated_col] = treated
 
         del merged_df['num severe cases %s' % agelabel]
-        del merged_df['excess sev treat %s' % agelabel]
-        merged_df.to_csv(os.path.join(output_path, '%s_PfPR_ClinicalIncidence_severeTreatment.csv' % agelabel), index=False)
-
-
-def MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5(output_path, start_year, end_year):
-    adf = pd.DataFrame()
-    for year in range(start_year, (end_year+1)):
-        fname = os.path.join(output_path, "MalariaSummaryReport_Monthly%d.json" % year)
-        with open(fname, "r") as f:
-            data = json.load(f)
-
-        # from the 30-day reporting interval, all months have 30 days, plus a final 'month' at the end of the year with 5 days
-
-        # population size
-        pop = data['DataByTimeAndAgeBins']['Average Population by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        pop_Under1 = [x[0] for x in pop]
-        pop_Under5 = [sum(x[:2]) for x in pop]
-        pop_5to15 = [x[2] for x in pop]
-        pop_15to30 = [x[3] for x in pop]
-        pop_30to50 = [x[4] for x in pop]
-        pop_50plus = [x[5] for x in pop]
-        pop_allAges = [sum(x[:6]) for x in pop]
-
-        # new infections
-        d = data['DataByTimeAndAgeBins']['New Infections by Age Bin'][:13]
-        d[11] = [sum(x) for x in zip(d[11], d[12])]  # add final five days to last month
-        del d[-1]  # remove final five days
-        new_infections_Under1 = [x[0] for x in d]
-        new_infections_Under5 = [sum(x[:2]) for x in d]
-        new_infections_5to15 = [x[2] for x in d]
-        new_infections_15to30 = [x[3] for x in d]
-        new_infections_30to50 = [x[4] for x in d]
-        new_infections_50plus = [x[5] for x in d]
-        new_infections_allAges = [sum(x[:6]) for x in d]
-
-        # PfPR
-        d = data['DataByTimeAndAgeBins']['PfPR by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        # use weighted average for combined age groups
-        pfpr_Under1 = [x[0] for x in d]
-        pfpr_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) / (pop[yy][0] + pop[yy][1]) for yy in range(12)]
-        pfpr_5to15 = [x[2] for x in d]
-        pfpr_15to30 = [x[3] for x in d]
-        pfpr_30to50 = [x[4] for x in d]
-        pfpr_50plus = [x[5] for x in d]
-        pfpr_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                         (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) /
-                        (pop[yy][0] + pop[yy][1] + pop[yy][2] + pop[yy][3] + pop[yy][4] + pop[yy][5]) for yy in range(12)]
-
-        # RDT PfPR
-        d = data['DataByTimeAndAgeBins']['PfPR by Age Bin-HRP2'][:12]  # remove final five days: assume final five days have same average as rest of month
-        # use weighted average for combined age groups
-        pfpr_rdt_Under1 = [x[0] for x in d]
-        pfpr_rdt_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) / (pop[yy][0] + pop[yy][1]) for yy in range(12)]
-        pfpr_rdt_5to15 = [x[2] for x in d]
-        pfpr_rdt_15to30 = [x[3] for x in d]
-        pfpr_rdt_30to50 = [x[4] for x in d]
-        pfpr_rdt_50plus = [x[5] for x in d]
-        pfpr_rdt_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                         (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) /
-                        (pop[yy][0] + pop[yy][1] + pop[yy][2] + pop[yy][3] + pop[yy][4] + pop[yy][5]) for yy in range(12)]
-
-        # clinical cases
-        d = data['DataByTimeAndAgeBins']['Annual Clinical Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        # adjust the per-person annualized number (the reported value) to get the total number of clinical cases in that age group in a month
-        clinical_cases_Under1 = [d[yy][0] * pop[yy][0] * 30 / 365 for yy in range(12)]
-        clinical_cases_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) * 30 / 365 for yy in range(12)]
-        clinical_cases_5to15 = [d[yy][2] * pop[yy][2] * 30 / 365 for yy in range(12)]
-        clinical_cases_15to30 = [d[yy][3] * pop[yy][3] * 30 / 365 for yy in range(12)]
-        clinical_cases_30to50 = [d[yy][4] * pop[yy][4] * 30 / 365 for yy in range(12)]
-        clinical_cases_50plus = [d[yy][5] * pop[yy][5] * 30 / 365 for yy in range(12)]
-        clinical_cases_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                                   (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) *
-                                  30 / 365 for yy in range(12)]
-
-        # severe cases
-        d = data['DataByTimeAndAgeBins']['Annual Severe Incidence by Age Bin'][:12]  # remove final five days: assume final five days have same average as rest of month
-        # adjust the per-person annualized number (the reported value) to get the total number of severe cases in that age group in a month
-        severe_cases_Under1 = [d[yy][0] * pop[yy][0] * 30 / 365 for yy in range(12)]
-        severe_cases_Under5 = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1])) * 30 / 365 for yy in range(12)]
-        severe_cases_5to15 = [d[yy][2] * pop[yy][2] * 30 / 365 for yy in range(12)]
-        severe_cases_15to30 = [d[yy][3] * pop[yy][3] * 30 / 365 for yy in range(12)]
-        severe_cases_30to50 = [d[yy][4] * pop[yy][4] * 30 / 365 for yy in range(12)]
-        severe_cases_50plus = [d[yy][5] * pop[yy][5] * 30 / 365 for yy in range(12)]
-        severe_cases_allAges = [((d[yy][0] * pop[yy][0]) + (d[yy][1] * pop[yy][1]) + (d[yy][2] * pop[yy][2]) +
-                                 (d[yy][3] * pop[yy][3]) + (d[yy][4] * pop[yy][4]) + (d[yy][5] * pop[yy][5])) *
-                                30 / 365 for yy in range(12)]
-
-        # order is [under1, under5, 5-15, 15-30, 30-50, over 50]
-        simdata = pd.DataFrame({'month': list(range(1, 13)) * 7,  # cycle through months for each age range
-                                'AgeGroup': np.repeat(['Under1', 'Under5', '5to15', '15to30', '30to50', '50plus', 'allAges'], 12),
-                                'Pop': (pop_Under1 + pop_Under5 + pop_5to15 + pop_15to30 + pop_30to50 + pop_50plus + pop_allAges),
-                                'New Infections': (new_infections_Under1 + new_infections_Under5 + new_infections_5to15 + new_infections_15to30 + new_infections_30to50 + new_infections_50plus + new_infections_allAges),
-                                'PfPR': (pfpr_Under1 + pfpr_Under5 + pfpr_5to15 + pfpr_15to30 + pfpr_30to50 + pfpr_50plus + pfpr_allAges),
-                                'PfPR RDT': (pfpr_rdt_Under1 + pfpr_rdt_Under5 + pfpr_rdt_5to15 + pfpr_rdt_15to30 + pfpr_rdt_30to50 + pfpr_rdt_50plus + pfpr_rdt_allAges),
-                                'Clinical cases': (clinical_cases_Under1 + clinical_cases_Under5 + clinical_cases_5to15 + clinical_cases_15to30 + clinical_cases_30to50 + clinical_cases_50plus + clinical_cases_allAges),
-                                'Severe cases': (severe_cases_Under1 + severe_cases_Under5 + severe_cases_5to15 + severe_cases_15to30 + severe_cases_30to50 + severe_cases_50plus + severe_cases_allAges)
-                                })
-        simdata['year'] = year
-        adf = pd.concat([adf, simdata])
-    adf = adf.reset_index(drop=True)
-    adf.to_csv(os.path.join(output_path, 'newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv'), index=False)
-
-
+        outputs.add_table(merged_df, '%s_PfPR_ClinicalIncidence_severeTreatment.csv' % agelabel)
+
+
+def MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5(outputs):
+    arrays = outputs.summary_report_arrays(['Average Population by Age Bin', 'New Infections by Age Bin',
+                                            'PfPR by Age Bin', 'PfPR by Age Bin-HRP2',
+                                            'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin'])
+    age_groups = {'Under1': [0], 'Under5': [0, 1], '5to15': [2], '15to30': [3], '30to50': [4], '50plus': [5],
+                  'allAges': [0, 1, 2, 3, 4, 5]}
+    years = outputs.years
+
+    # from the 30-day reporting interval, all months have 30 days, plus a final 'month' at the end of the year with 5 days
+    # remove final five days from averages and rates: assume final five days have same average as rest of month
+    pop = arrays['Average Population by Age Bin'][:, :12]
+    # add final five days of new infections to last month
+    new_infections = arrays['New Infections by Age Bin'][:, :12].copy()
+    new_infections[:, 11] += arrays['New Infections by Age Bin'][:, 12]
+    # adjust the per-person annualized number (the reported value) to get the total number of cases in that age group in a month
+    clinical_cases = arrays['Annual Clinical Incidence by Age Bin'][:, :12] * pop * 30 / 365
+    severe_cases = arrays['Annual Severe Incidence by Age Bin'][:, :12] * pop * 30 / 365
+
+    # arrays of shape (num_years, num_age_groups, 12); use weighted average for combined age groups
+    columns = {'Pop': [pop[..., bins].sum(axis=-1) for bins in age_groups.values()],
+               'New Infections': [new_infections[..., bins].sum(axis=-1) for bins in age_groups.values()]}
+    for col, channel in [('PfPR', 'PfPR by Age Bin'), ('PfPR RDT', 'PfPR by Age Bin-HRP2')]:
+        d = arrays[channel][:, :12]
+        columns[col] = [pop_weighted_mean(d, pop, bins) for bins in age_groups.values()]
+    columns['Clinical cases'] = [clinical_cases[..., bins].sum(axis=-1) for bins in age_groups.values()]
+    columns['Severe cases'] = [severe_cases[..., bins].sum(axis=-1) for bins in age_groups.values()]
+
+    # rows ordered by year, then age group, then month
+    adf = pd.DataFrame({'month': np.tile(np.arange(1, 13), len(years) * len(age_groups)),
+                        'AgeGroup': np.tile(np.repeat(list(age_groups.keys()), 12), len(years))})
+    for col, values in columns.items():
+        adf[col] = np.stack(values, axis=1).reshape(-1)
+    adf['year'] = np.repeat(years, 12 * len(age_groups))
+    outputs.add_table(adf, 'newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5.csv')
+
+
+def monthly_channel_frame(channel_data, start_year, sum_channels=(), mean_channels=(), first_time=0):
+    """
+    Reduce daily channels to one row per month (with the date of the first day of the month), summing or averaging
+    the days of each month. Only the days present in every channel are used.
+    """
+    num_days = min([len(values) for values in channel_data.values()], default=0)
+    time = np.arange(first_time, first_time + num_days)
+    month_index = (time // 365) * 12 + MONTH_OF_DAY[time % 365] - 1
+    month_starts = np.flatnonzero(np.diff(month_index, prepend=-1))
+    days_per_month = np.diff(np.append(month_starts, num_days))
+    adf = pd.DataFrame({'date': [datetime.date(int(mm // 12) + start_year, int(mm % 12) + 1, 1)
+                                 for mm in month_index[month_starts]]})
+    for channel in sum_channels:
+        values = np.asarray(channel_data[channel][:num_days], dtype=np.float64)
+        adf[channel] = np.add.reduceat(values, month_starts) if num_days else values
+    for channel in mean_channels:
+        values = np.asarray(channel_data[channel][:num_days], dtype=np.float64)
+        adf[channel] = np.add.reduceat(values, month_starts) / days_per_month if num_days else values
+    return adf
+
+
+def monthlyEventAnalyzer(outputs):
+    channels = ['Received_Treatment', 'Received_Severe_Treatment', 'Received_NMF_Treatment', 'Bednet_Using',
+                'Received_Campaign_Drugs', 'Received_IRS', 'Received_Vaccine', 'Received_PMC_VaccDrug']
+    channel_data = outputs.report_channels("ReportEventCounter.json", channels)
+    channels_in_expt = [x for x in channels if x in channel_data]
+    adf = monthly_channel_frame(channel_data, outputs.start_year, sum_channels=channels_in_expt)
+    for missing_channel in [x for x in channels if x not in channels_in_expt]:
+        adf[missing_channel] = 0
+    adf = adf[['date'] + channels]
+    outputs.add_table(adf, 'monthly_Event_Count.csv')
+
+
+def monthlyUsageLLIN(outputs):
+    channels = ['Bednet_Using']
+    inset_channels = ['Statistical Population']
+    channel_data = outputs.report_channels("ReportEventCounter.json", channels)
+    channels_in_expt = [x for x in channels if x in channel_data]
+    channel_data.update(outputs.report_channels("ReportMalariaFiltered.json", inset_channels))
+    adf = monthly_channel_frame(channel_data, outputs.start_year, mean_channels=channels_in_expt + inset_channels)
+    for missing_channel in [x for x in channels if x not in channels_in_expt]:
+        adf[missing_channel] = 0
+    adf = adf[['date'] + channels + inset_channels]
+    outputs.add_table(adf, 'MonthlyUsageLLIN.csv')
+
+
+def VectorNumbersAnalyzer(outputs):
+    channel_data = outputs.report_channels("ReportMalariaFiltered.json", ['Adult Vectors'])
+    adf = monthly_channel_frame(channel_data, outputs.start_year, mean_channels=['Adult Vectors'])
+    outputs.add_table(adf, 'vector_numbers_monthly.csv')
+
+
+# age groups given as (exclusive lower, inclusive upper) age limits, matched against the upper edges of the report's
+# age bins, as in snt.analyzers.summary_report
+AGE_GROUPS_UNDER15 = {'Under15': (0, 15), '15to30': (15, 30), '30to50': (30, 50), '50plus': (50, np.inf)}
+AGE_GROUPS_WITH_U5 = {'Under5': (0, 5), '5to15': (5, 15), '15to30': (15, 30), '30to50': (30, 50),
+                      '50plus': (50, np.inf), 'allAges': (0, np.inf)}
+
+
+def MonthlyNewInfectionsAnalyzer(outputs, age_groups=AGE_GROUPS_UNDER15,
+                                 output_filename='newInfections_PfPR_cases_monthly_byAgeGroup.csv'):
+    arrays = outputs.summary_report_arrays(['Average Population by Age Bin', 'New Infections by Age Bin',
+                                            'PfPR by Age Bin', 'Annual Clinical Incidence by Age Bin',
+                                            'Annual Severe Incidence by Age Bin'])
+    upper_edges = outputs.age_bins()
+    # (num_age_bins, num_age_groups) matrix with 1 where the age bin is in the age group
+    weights = np.stack([(upper_edges > lower) & (upper_edges <= upper) for lower, upper in age_groups.values()],
+                       axis=1).astype(np.float64)
+    years = outputs.years
+
+    # remove final five days from averages and rates, add final five days of new infections to December
+    pop = arrays['Average Population by Age Bin'][:, :12]
+    new_infections = arrays['New Infections by Age Bin'][:, :12].copy()
+    new_infections[:, 11] += arrays['New Infections by Age Bin'][:, 12]
+    # from the 30 day reporting interval, imagine all months have 30 days, except December, which has 35
+    days_in_month = np.asarray([30] * 11 + [35], dtype=np.float64)[:, None]
+    group_pop = pop @ weights
+    pfpr = arrays['PfPR by Age Bin'][:, :12]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weighted_pfpr = (pfpr * pop) @ weights / group_pop
+    # arrays of shape (num_years, 12, num_age_groups); population-weighted PfPR, unweighted where there is no population
+    columns = {'Pop': group_pop,
+               'New Infections': new_infections @ weights,
+               'PfPR': np.where(group_pop > 0, weighted_pfpr, (pfpr @ weights) / weights.sum(axis=0)),
+               'Clinical cases': (arrays['Annual Clinical Incidence by Age Bin'][:, :12] * pop * days_in_month / 365) @ weights,
+               'Severe cases': (arrays['Annual Severe Incidence by Age Bin'][:, :12] * pop * days_in_month / 365) @ weights}
+
+    # rows ordered by year, then age group, then month
+    adf = pd.DataFrame({'month': np.tile(np.arange(1, 13), len(years) * len(age_groups)),
+                        'AgeGroup': np.tile(np.repeat(list(age_groups.keys()), 12), len(years))})
+    for col, values in columns.items():
+        adf[col] = np.swapaxes(values, 1, 2).reshape(-1)
+    adf['year'] = np.repeat(years, 12 * len(age_groups))
+    outputs.add_table(adf, output_filename)
@@ -1,9 +1,61 @@
 import re
 import os
+import json
+import logging
 
-from dtk_get_burden_functions import monthlyU1PfPRAnalyzer, monthlyU5PfPRAnalyzer, monthlyTreatedCasesAnalyzer, monthlySevereTreatedByAgeAnalyzer, MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5
+from dtk_get_burden_functions import monthlyU1PfPRAnalyzer, monthlyU5PfPRAnalyzer, monthlyTreatedCasesAnalyzer, monthlySevereTreatedByAgeAnalyzer, MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5, \
+    MonthlyNewInfectionsAnalyzer, monthlyEventAnalyzer, monthlyUsageLLIN, VectorNumbersAnalyzer, AGE_GROUPS_WITH_U5, \
+    SimulationOutputs
 
-def application( output_path ):
+MANIFEST_FILENAME = 'post_processing_manifest.json'
+OUTPUT_FORMAT = 'csv'  # or 'parquet' for smaller files, if pyarrow is available on the compute node
+
+logger = logging.getLogger(__name__)
+
+
+def configured_reports(sim_dir):
+    """
+    Names of the reports the simulation is configured to write: ReportEventRecorder and InsetChart if enabled in
+    config.json, and the enabled reports of its custom reports file (e.g., ReportEventCounter). Returns None if the
+    configuration cannot be read, or if all custom reports are run.
+    """
+    try:
+        with open(os.path.join(sim_dir, 'config.json'), 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return None
+    params = config.get('parameters', config)
+    reports = set()
+    if params.get('Report_Event_Recorder', 0):
+        reports.add('ReportEventRecorder')
+    if params.get('Enable_Default_Reporting', 1):
+        reports.add('InsetChart')
+    custom_reports_filename = params.get('Custom_Reports_Filename', 'custom_reports.json')
+    if custom_reports_filename == 'RunAllCustomReports':
+        return None
+    if custom_reports_filename:
+        try:
+            with open(os.path.join(sim_dir, custom_reports_filename), 'r') as f:
+                custom_reports = json.load(f)
+        except FileNotFoundError:
+            custom_reports = {}
+        except (OSError, ValueError):
+            return None
+        # current format: list of reports with their class; older format: reports keyed by class
+        reports.update(report['class'] for report in custom_reports.get('Reports', [])
+                       if isinstance(report, dict) and 'class' in report and report.get('Enabled', 1))
+        reports.update(name for name, report in custom_reports.get('Custom_Reports', {}).items()
+                       if isinstance(report, dict) and report.get('Enabled', 1))
+    return reports
+
+
+def report_name(filename):
+    # report class of an output file, e.g., 'ReportEventRecorder.csv' -> 'ReportEventRecorder',
+    # 'MalariaSummaryReport_Monthly2020.json' -> 'MalariaSummaryReport'
+    return os.path.splitext(os.path.basename(filename))[0].split('_')[0]
+
+
+def application( output_path, output_format=OUTPUT_FORMAT ):
     # determine which years are available for MalariaSummaryReport
     pattern = re.compile(r"^MalariaSummaryReport_Monthly(\d{4})")  # specify the pattern for these files
     all_files = os.listdir(output_path)
@@ -15,11 +67,43 @@ def application( output_path ):
     ]
     start_year, end_year = min(all_years), max(all_years)
 
-    monthlyU1PfPRAnalyzer(output_path, start_year, end_year)
-    monthlyU5PfPRAnalyzer(output_path, start_year, end_year)
-    monthlyTreatedCasesAnalyzer(output_path, start_year)
-    monthlySevereTreatedByAgeAnalyzer(output_path, start_year)
-    MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5(output_path, start_year, end_year)
+    # each report is read once and shared by the table functions; the tables are written together at the end
+    outputs = SimulationOutputs(output_path, start_year, end_year, output_format)
+    # the severe treatment tables are merged with the U1 and U5 tables, so they are created last
+    table_functions = [
+        monthlyU1PfPRAnalyzer,
+        monthlyU5PfPRAnalyzer,
+        monthlyTreatedCasesAnalyzer,
+        MonthlyNewInfectionsAnalyzer_byAgeGroup_withU1U5,
+        MonthlyNewInfectionsAnalyzer,
+        lambda outputs: MonthlyNewInfectionsAnalyzer(
+            outputs, age_groups=AGE_GROUPS_WITH_U5,
+            output_filename='newInfections_PfPR_cases_monthly_byAgeGroup_withU5.csv'),
+        monthlyEventAnalyzer,
+        monthlyUsageLLIN,
+        VectorNumbersAnalyzer,
+        monthlySevereTreatedByAgeAnalyzer,
+    ]
+    reports = configured_reports(os.path.dirname(os.path.abspath(output_path)))
+    for table_function in table_functions:
+        try:
+            table_function(outputs)
+        except FileNotFoundError as e:
+            # leave out the tables of reports this simulation is not configured to write (e.g., no
+            # ReportEventRecorder); a missing report that should have been written is an error
+            report = report_name(e.filename) if e.filename else None
+            if reports is None or report is None or report in reports:
+                raise
+            logger.info('Skipping %s: %s is not configured for this simulation',
+                        getattr(table_function, '__name__', table_function), report)
+    tables = outputs.write()
+
+    # the manifest lists the tables written for this simulation, for the combiner to gather
+    manifest = {'start_year': start_year, 'end_year': end_year, 'format': output_format, 'tables': tables}
+    with open(os.path.join(output_path, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
 
 if __name__ == "__main__":
-    application( "output" )
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    application( "output" )
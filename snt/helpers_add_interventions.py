@@ -14,6 +14,7 @@ from emodpy_malaria.interventions.diag_survey import add_diagnostic_survey
 from snt.support_files.malaria_vaccdrug_campaigns import add_vaccdrug_campaign
 from emodpy_malaria.interventions.adherentdrug import adherent_drug
 from snt.helpers_sim_setup import update_smc_access_ips
+from snt.intervention_tables import admin_rows, as_frame
 from emodpy_malaria.interventions.vaccine import add_scheduled_vaccine, add_triggered_vaccine
 from emodpy_malaria.interventions.common import add_triggered_campaign_delay_event, add_campaign_event
 from emod_api.interventions.common import BroadcastEvent, PropertyValueChanger, DelayedIntervention, change_individual_property_scheduled
@@ -33,13 +34,11 @@ def tryread_intervention_csv_from_scen_df(project_path, scen_df, scen_index, int
 def add_hfca_hs(campaign, hs_df, hfca, seed_index=0):
     # df = hs_df[hs_df['repDS'] == hfca]
     if 'LGA' in hs_df.columns.values:
-        df = hs_df[hs_df['LGA'] == hfca]
+        df = admin_rows(hs_df, hfca, seed_index, column='LGA')
     elif 'repDS' in hs_df.columns.values:
-        df = hs_df[hs_df['repDS'] == hfca]
+        df = admin_rows(hs_df, hfca, seed_index, column='repDS')
     else:
-        df = hs_df[hs_df['admin_name'] == hfca]
-    if 'seed' in df.columns.values:
-        df = df[df['seed'] == seed_index]
+        df = admin_rows(hs_df, hfca, seed_index)
     for r, row in df.iterrows():
         add_hs_from_file(campaign, row)
 
@@ -75,9 +74,7 @@ def add_nmf_hs(campaign, hs_df, nmf_df, hfca, seed_index=0):
     nmf_row = nmf_df.iloc[0]
 
     # apply the health-seeking rate for clinical malaria to NMFs
-    df = hs_df[hs_df['admin_name'] == hfca]
-    if 'seed' in df.columns.values:
-        df = df[df['seed'] == seed_index]
+    df = admin_rows(hs_df, hfca, seed_index)
     for r, row in df.iterrows():
         add_nmf_hs_from_file(campaign, row, nmf_row)
 
@@ -120,9 +117,7 @@ def add_nmf_hs_from_file(campaign, row, nmf_row):
 
 
 def add_hfca_irs(campaign, irs_df, hfca, seed_index=0):
-    irs_df = irs_df[irs_df['admin_name'].str.upper() == hfca.upper()]
-    if 'seed' in irs_df.columns.values:
-        irs_df = irs_df[irs_df['seed'] == seed_index]
+    irs_df = admin_rows(irs_df, hfca, seed_index, case_sensitive=False)
     for r, row in irs_df.iterrows():
         add_scheduled_irs_housing_modification(campaign, start_day=row['simday'],
                                                demographic_coverage=row['effective_coverage'],
@@ -136,9 +131,7 @@ def add_hfca_irs(campaign, irs_df, hfca, seed_index=0):
 
 # larviciding
 def add_hfca_lsm(campaign, lsm_df, hfca, seed_index=0):
-    lsm_df = lsm_df[lsm_df['admin_name'].str.upper() == hfca.upper()]
-    if 'seed' in lsm_df.columns.values:
-        lsm_df = lsm_df[lsm_df['seed'] == seed_index]
+    lsm_df = admin_rows(lsm_df, hfca, seed_index, case_sensitive=False)
     for r, row in lsm_df.iterrows():
         # note that the add_larvicide() function has an error such that no matter what you specify for num_repetitions and timesteps_between_reps, it only delivers the intervention once,
         #   so will add each campaign separately here until that is fixed
@@ -160,9 +153,7 @@ def add_hfca_itns(campaign, itn_df, itn_anc_df, itn_anc_adult_birthday_years, it
     if not itn_anc_adult_birthday_years:
         itn_anc_adult_birthday_years = []
     if not itn_df.empty:
-        df = itn_df[itn_df['admin_name'].str.upper() == hfca.upper()]
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+        df = admin_rows(itn_df, hfca, seed_index, case_sensitive=False)
         df = df.drop_duplicates()
         nets = len(df)
         for r, row in df.iterrows():
@@ -171,42 +162,32 @@ def add_hfca_itns(campaign, itn_df, itn_anc_df, itn_anc_adult_birthday_years, it
         nets = 0
 
     if not itn_anc_df.empty:
-        df = itn_anc_df[itn_anc_df['admin_name'].str.upper() == hfca.upper()]
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+        df = admin_rows(itn_anc_df, hfca, seed_index, case_sensitive=False)
         df = df.drop_duplicates()
         add_itn_anc(campaign, df, itn_anc_adult_birthday_years, itn_use_seasonality, itn_decay_params)
         nets += len(df)
 
     if not itn_epi_df.empty:
-        df = itn_epi_df[itn_epi_df['admin_name'].str.upper() == hfca.upper()]
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+        df = admin_rows(itn_epi_df, hfca, seed_index, case_sensitive=False)
         df = df.drop_duplicates()
         add_birthday_routine_itn_from_file(campaign, df, itn_use_seasonality, itn_decay_params)
         nets += len(df)
 
     if not itn_cont_df.empty:
-        df = itn_cont_df[itn_cont_df['admin_name'].str.upper() == hfca.upper()]
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+        df = admin_rows(itn_cont_df, hfca, seed_index, case_sensitive=False)
         df = df.drop_duplicates()
         add_birthday_routine_itn_from_file(campaign, df, itn_use_seasonality, itn_decay_params)
         nets += len(df)
 
     if not itn_chw_df.empty:
-        df = itn_chw_df[itn_chw_df['admin_name'].str.upper() == hfca.upper()]
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+        df = admin_rows(itn_chw_df, hfca, seed_index, case_sensitive=False)
         df = df.drop_duplicates()
         nets += len(df)
         for r, row in df.iterrows():
             add_monthly_chw_dist(campaign, row, itn_use_seasonality, itn_decay_params)
 
     if not itn_chw_annual_df.empty:
-        df = itn_chw_annual_df[itn_chw_annual_df['admin_name'].str.upper() == hfca.upper()]
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+        df = admin_rows(itn_chw_annual_df, hfca, seed_index, case_sensitive=False)
         df = df.drop_duplicates()
         nets += len(df)
         for r, row in df.iterrows():
@@ -516,10 +497,7 @@ def add_annual_chw_dist(campaign, row, itn_use_seasonality, itn_decay_params):
 
 
 def add_hfca_vaccsmc(campaign, smc_df, hfca, effective_coverage_resistance_multiplier=1, seed_index=0):
-    df = smc_df[smc_df['admin_name'] == hfca]
-    if df.shape[0] > 0:
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
+    df = admin_rows(smc_df, hfca, seed_index)
 
     if len(df) == 0:
         return len(df)
@@ -583,10 +561,8 @@ def smc_adherent_configuration(campaign, adherence, sp_resist_day1_multiply):
 
 
 def add_hfca_smc(campaign, smc_df, hfca, adherence_multiplier=1, sp_resist_day1_multiply=1, seed_index=0):
-    df = smc_df[smc_df['admin_name'] == hfca]
+    df = admin_rows(smc_df, hfca, seed_index)
     if df.shape[0] > 0:
-        if 'seed' in df.columns.values:
-            df = df[df['seed'] == seed_index]
         if 'adherence' in smc_df.columns.values:
             adherent_drug_configs = smc_adherent_configuration(campaign,
                                                                adherence=df['adherence'].values[
@@ -870,7 +846,7 @@ def add_campaign_rtss(campaign, rtss_df):
 
 def add_ds_rtss(campaign, rtss_df, hfca):
     change_ips = False
-    rtss_df = rtss_df[rtss_df['admin_name'].str.upper() == hfca.upper()]
+    rtss_df = admin_rows(rtss_df, hfca, case_sensitive=False)
     # First, process EPI style distribution
     rtss_df1 = rtss_df[rtss_df['deploy_type'] == 'EPI']
     if len(rtss_df1) > 0:
@@ -890,11 +866,11 @@ def add_ds_rtss(campaign, rtss_df, hfca):
 
 
 def add_ds_vaccpmc(campaign, pmc_df, hfca):
-    df = pmc_df[pmc_df['admin_name'].str.upper() == hfca.upper()]
+    df = admin_rows(pmc_df, hfca, case_sensitive=False)
     if len(df) == 0:
         return 0
-    if "num_IIV_groups" in pmc_df:
-        num_iiv_groups = pmc_df['num_IIV_groups'].unique()[0]
+    if "num_IIV_groups" in pmc_df.columns:
+        num_iiv_groups = as_frame(pmc_df)['num_IIV_groups'].iloc[0]
     else:
         num_iiv_groups = 1
 
@@ -959,7 +935,8 @@ def add_triggered_vacc(campaign, vacc_char_df, my_ds=''):
     # set up vaccines to be distributed when triggered by the 'event_add_new_vaccine' event
     if my_ds != '':
         if 'admin_name' in vacc_char_df.columns:
-            vacc_char_df = vacc_char_df[vacc_char_df['admin_name'].str.upper() == my_ds.upper()]
+            vacc_char_df = admin_rows(vacc_char_df, my_ds, case_sensitive=False)
+    vacc_char_df = as_frame(vacc_char_df)
     if 'vacc_type' in vacc_char_df.columns:
         row_initial = vacc_char_df[vacc_char_df['vacc_type'] == 'initial'].iloc[0]
         row_boost = vacc_char_df[vacc_char_df['vacc_type'] == 'booster'].iloc[0]
@@ -1041,7 +1018,8 @@ def add_pkpd_vacc(campaign, vacc_df, my_ds='', cohort_month_shift=0):
     #  - on start_day+1, create a campaign which changes IP vaccine_selected to False (allowing new vaccines to be given) and broadcasts an event that triggers a node-level intervention where the new vaccine is distributed to these same individuals. The vaccine should have Disqualifying_Properties set to {“vaccine_selected”: “True”}. Also change VaccineStatus IP to ReceivedVaccine.
     if my_ds != '':
         if 'admin_name' in vacc_df.columns:
-            vacc_df = vacc_df[vacc_df['admin_name'].str.upper() == my_ds.upper()]
+            vacc_df = admin_rows(vacc_df, my_ds, case_sensitive=False)
+    vacc_df = as_frame(vacc_df)
 
     """Note: for cohort-EPI model, we use campaign-style deployment targeted to specific ages (since births disabled in cohort simulation)"""
     for r, row in vacc_df.iterrows():
@@ -1112,7 +1090,8 @@ def add_pkpd_epi_vacc(campaign, epi_vacc_df, hfca):
 
     if hfca != '':
         if 'admin_name' in epi_vacc_df.columns:
-            epi_vacc_df = epi_vacc_df[epi_vacc_df['admin_name'].str.upper() == hfca.upper()]
+            epi_vacc_df = admin_rows(epi_vacc_df, hfca, case_sensitive=False)
+    epi_vacc_df = as_frame(epi_vacc_df)
     if len(epi_vacc_df) == 0:
         return 0
 
@@ -65,6 +65,13 @@ def _post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs):
         log(f"Analyzer_log: {ssmt_log}")
 
 
+def _ready_flag_file(manifest, experiment):
+    """
+    Path of the flag file that enqueues an experiment for the analyzer queue manager.
+    """
+    return os.path.abspath(os.path.join(manifest.TRACKING_DIR, "analyzer_queue", f"exp_{experiment.id}.ready"))
+
+
 def post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs):
     """
     post_run is called after the experiment is done. It writes experiment name and id to a file for the analyzer manager to pick up.
@@ -85,9 +92,8 @@ def post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs):
         time_stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         update_suite_tracking(experiment, suite, params.experiment_type, tracking_file, time_stamp)
         # Signal to analyzer manager
-        queue_dir = os.path.join(manifest.TRACKING_DIR, "analyzer_queue")
-        os.makedirs(queue_dir, exist_ok=True)
-        flag_file = os.path.abspath(os.path.join(queue_dir, f"exp_{experiment.id}.ready"))
+        flag_file = _ready_flag_file(manifest, experiment)
+        os.makedirs(os.path.dirname(flag_file), exist_ok=True)
 
         with open(flag_file, "w") as f:
             f.write(f"{experiment.id},{experiment.name},{params.experiment_type}\n")
@@ -126,10 +132,54 @@ def _config_experiment(params, manifest, **kwargs):
     experiment = Experiment.from_template(ts, name=experiment_name)
     return experiment
 
-def run_experiment(platform, params, manifest, print_params_fn, suite_id, tracking_file, **kwargs):
+def _launch_incremental_analysis(params, manifest, experiment):
+    """
+    Launch the local analyzer in incremental mode in background, right after the experiment is submitted, so the
+    simulations are analyzed as they succeed (see snt.analyzers.incremental_analysis). Provisional outputs are
+    written while the experiment runs and the final outputs once all its simulations have finished.
+    Logs are written to logs/incremental_analyzer_{experiment_name}_{experiment_id}.log. If the incremental analysis
+    fails, it enqueues the experiment for the analyzer queue manager instead (see post_run).
+    Args:
+        params:
+        manifest:
+        experiment: idmtools Experiment (submitted)
+    Return:
+        the analyzer process
+    """
+    analyzer_script = os.path.join(manifest.CURRENT_DIR, "..", "analyzers", "post_analysis.py")
+    map_cache_dir = os.path.abspath(os.path.join(manifest.TRACKING_DIR, "..", "map_cache"))
+    log_dir = os.path.abspath(os.path.join(manifest.TRACKING_DIR, "..", "logs"))
+    os.makedirs(log_dir, exist_ok=True)
+    analyzer_log = os.path.join(log_dir, f"incremental_analyzer_{experiment.name}_{experiment.id}.log")
+
+    os.environ["NO_COLOR"] = "1"  # disable color in subprocess's log
+    with open(analyzer_log, "a+", encoding="utf-8") as log_file:
+        process = subprocess.Popen([
+            sys.executable,
+            analyzer_script,
+            "--exp-id", str(experiment.id),
+            "--type", str(params.experiment_type),
+            "--name", str(experiment.name),
+            "--incremental",
+            "--map-cache-dir", map_cache_dir,
+            "--ready-flag", _ready_flag_file(manifest, experiment)
+        ],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            encoding='utf-8'
+        )
+    log(f"Launched incremental analyzer for experiment: {experiment.name}--{experiment.id}")
+    log(f"Analyzer_log: {analyzer_log}")
+    return process
+
+
+def run_experiment(platform, params, manifest, print_params_fn, suite_id, tracking_file, incremental_analysis=False,
+                   **kwargs):
     """
     Get configured experiment and run.
     Args:
+        incremental_analysis: if True, analyze the simulations as they succeed (see _launch_incremental_analysis)
+            instead of enqueueing the experiment for the analyzer queue manager once it is done
         kwargs: user inputs
     Returns:
         None
@@ -143,7 +193,12 @@ def run_experiment(platform, params, manifest, print_params_fn, suite_id, tracki
     if suite_id:
         experiment.parent_id = suite_id
     try:
-        experiment.run(wait_until_done=True, platform=platform)
+        if incremental_analysis:
+            experiment.run(wait_until_done=False, platform=platform)
+            analyzer_process = _launch_incremental_analysis(params, manifest, experiment)
+            experiment.wait(platform=platform)
+        else:
+            experiment.run(wait_until_done=True, platform=platform)
         # experiment = platform.get_item("cc510fbd-7b67-f011-9f17-b88303912b51", ItemType.EXPERIMENT)
         update_scenario_status_to_done(params.scenario_fname, params.scen_index)
 
@@ -152,7 +207,18 @@ def run_experiment(platform, params, manifest, print_params_fn, suite_id, tracki
         # _post_run: Analyzer is launched in background automatically after experiment is done.
         # post_run: For signaling to analyzer queue manager (another script runs analyzer in the background).
        # _post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs)
-        post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs)
+        if incremental_analysis and analyzer_process.poll() not in (None, 0):
+            # the incremental analyzer exited with an error; enqueue the experiment for the analyzer queue manager
+            log(f"Incremental analyzer exited with code {analyzer_process.returncode}")
+            post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs)
+        elif incremental_analysis:
+            # already being analyzed; only record the experiment in the tracking file
+            if experiment.succeeded:
+                suite = platform.get_item(suite_id, ItemType.SUITE, raw=True)
+                time_stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                update_suite_tracking(experiment, suite, params.experiment_type, tracking_file, time_stamp)
+        else:
+            post_run(params, manifest, experiment, suite_id, tracking_file, **kwargs)
 
     except Exception as e:
         log(f"Experiment run failed: {e}")
@@ -5,6 +5,7 @@ import emodpy_malaria.malaria_config as malaria_config
 from emodpy_malaria.malaria_config import configure_linear_spline, set_species_param, add_species
 from emod_api.interventions.common import change_individual_property_scheduled, change_individual_property_at_age
 import emod_api.config.default_from_schema_no_validation as dfs
+from snt.intervention_tables import admin_rows
 
 
 def update_basic_params(config, manifest, project_path):
@@ -166,7 +167,7 @@ def load_master_csv(project_path):
 
 
 def update_smc_access_ips(campaign, hfca, smc_df, use_same_access_ips_all_ages=False):
-    df = smc_df[smc_df['admin_name'] == hfca]
+    df = admin_rows(smc_df, hfca)
 
     if use_same_access_ips_all_ages:
         # Set IPs at the beginning of the simulation and then update individuals' IPs at their birthday.
@@ -0,0 +1,128 @@
+import os
+import pandas as pd
+
+
+class InterventionTable:
+    """
+    Intervention input table (e.g., the CM, ITN, IRS, or SMC csv of a scenario) indexed by admin, and by admin and
+    seed, so the rows of one admin are found with a dictionary lookup instead of filtering the country-wide table for
+    every simulation built. The add_* functions of helpers_add_interventions accept an InterventionTable wherever
+    they accept the intervention DataFrame.
+
+    The row positions of each admin (and of each admin and seed) are computed once per admin column, on the first
+    lookup by that column, and stored as read-only arrays. Each lookup returns a new DataFrame with the matching rows,
+    in the order and with the index labels they have in the table, as the boolean filtering it replaces did.
+
+    Example:
+        smc_table = InterventionTable(pd.read_csv(smc_fname))
+        add_hfca_smc(campaign, smc_table, hfca, seed_index=seed_index)
+    """
+
+    def __init__(self, df, seed_column='seed'):
+        """
+        Args:
+            df: intervention DataFrame
+            seed_column: column with the seed the rows apply to; ignored if df does not have it
+        """
+        self.frame = df.frame if isinstance(df, InterventionTable) else df
+        self.seed_column = seed_column
+        self._indexes = {}
+
+    @classmethod
+    def read_csv(cls, path, **kwargs):
+        """
+        Load an intervention csv as a table, or an empty table if the file cannot be read.
+        """
+        try:
+            return cls(pd.read_csv(path), **kwargs)
+        except IOError:
+            print(f"WARNING: Cannot read intervention file: {os.path.basename(path)}.")
+            return cls(pd.DataFrame(), **kwargs)
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getstate__(self):
+        # indexes are rebuilt on first use, so pickled tables (e.g., in sweep functions) stay small
+        return {'frame': self.frame, 'seed_column': self.seed_column, '_indexes': {}}
+
+    @staticmethod
+    def _positions(frame, keys):
+        positions = frame.groupby(keys, sort=False, dropna=True).indices
+        for pos in positions.values():
+            pos.flags.writeable = False
+        return positions
+
+    def _index(self, column, case_sensitive):
+        key = (column, case_sensitive)
+        if key not in self._indexes:
+            admins = self.frame[column]
+            if not case_sensitive:
+                admins = admins.str.upper()
+            by_admin = self._positions(self.frame, admins)
+            by_seed = self._positions(self.frame, [admins, self.frame[self.seed_column]]) \
+                if self.seed_column in self.frame.columns else None
+            self._indexes[key] = (by_admin, by_seed)
+        return self._indexes[key]
+
+    def rows(self, admin, seed_index=None, column='admin_name', case_sensitive=True):
+        """
+        Rows of an admin, optionally only those of a seed.
+        Args:
+            admin: admin name
+            seed_index: seed of the rows, if the table has a seed column; None for the rows of all seeds
+            column: column with the admin names (e.g., 'admin_name', 'LGA', or 'repDS')
+            case_sensitive: False to match admin names regardless of case
+
+        Returns:
+            DataFrame with the matching rows (empty if there are none)
+        """
+        if self.frame.empty or column not in self.frame.columns:
+            return self.frame.iloc[0:0]
+        by_admin, by_seed = self._index(column, case_sensitive)
+        admin = admin if case_sensitive else admin.upper()
+        if seed_index is None or by_seed is None:
+            positions = by_admin.get(admin)
+        else:
+            positions = by_seed.get((admin, seed_index))
+        if positions is None:
+            return self.frame.iloc[0:0]
+        return self.frame.take(positions)
+
+    def admins(self, column='admin_name'):
+        """
+        Admin names with rows in the table.
+        """
+        by_admin, _ = self._index(column, True)
+        return list(by_admin)
+
+
+def as_frame(df):
+    """
+    DataFrame of an intervention input given as a DataFrame or an InterventionTable.
+    """
+    return df.frame if isinstance(df, InterventionTable) else df
+
+
+def admin_rows(df, admin, seed_index=None, column='admin_name', case_sensitive=True):
+    """
+    Rows of an admin (and seed, if seed_index is given and there is a seed column) in an intervention input given as
+    a DataFrame or an InterventionTable. DataFrames are filtered as before; InterventionTables are looked up.
+    """
+    if isinstance(df, InterventionTable):
+        return df.rows(admin, seed_index=seed_index, column=column, case_sensitive=case_sensitive)
+    if case_sensitive:
+        df = df[df[column] == admin]
+    else:
+        df = df[df[column].str.upper() == admin.upper()]
+    if seed_index is not None and 'seed' in df.columns.values:
+        df = df[df['seed'] == seed_index]
+    return df
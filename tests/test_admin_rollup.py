@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from snt.analyzers.admin_rollup import AdminRollup, COUNTRY
+
+ADMIN_POP = pd.DataFrame({'admin_name': ['A', 'B', 'C'], 'State': ['S1', 'S1', 'S2'],
+                          'pop_size': [1000.0, 3000.0, 2000.0]})
+
+
+def output_df():
+    rng = np.random.default_rng(0)
+    adf = pd.DataFrame([{'admin_name': admin, 'Run_Number': rn, 'year': year}
+                        for admin in ['A', 'B', 'C', 'D'] for rn in range(2) for year in (2020, 2021)])
+    adf['cases'] = rng.random(len(adf)) * 100
+    adf['Pop'] = 100 + rng.random(len(adf)) * 20
+    adf['PfPR'] = rng.random(len(adf))
+    return adf
+
+
+def reference_rollup(adf, level, by, sim_population):
+    # merge and group-by on names, leaving out admins without a true population
+    adf = adf.merge(ADMIN_POP, on='admin_name', how='inner')
+    scale = adf['pop_size'] / sim_population
+    adf = adf.assign(cases=adf['cases'] * scale, Pop=adf['Pop'] * scale, weighted=adf['PfPR'] * adf['Pop'] * scale)
+    keys = ([] if level == COUNTRY else [level]) + by
+    result = adf.groupby(keys)[['cases', 'Pop', 'weighted']].sum().reset_index()
+    result['PfPR'] = result.pop('weighted') / result['Pop']
+    return result[keys + ['cases', 'PfPR', 'Pop']]
+
+
+def test_rollup_matches_group_by():
+    adf = output_df()
+    rollup = AdminRollup(ADMIN_POP)
+    for level in ('admin_name', 'State', COUNTRY):
+        result = rollup.rollup(adf, level, by=['Run_Number', 'year'], counts=['cases'], population='Pop',
+                               rates=['PfPR'], sim_population=110.0)
+        pd.testing.assert_frame_equal(result, reference_rollup(adf, level, ['Run_Number', 'year'], 110.0),
+                                      check_dtype=False)
+
+
+def test_rollup_levels_and_row_scale():
+    adf = output_df()
+    rollup = AdminRollup(ADMIN_POP)
+    assert rollup.mapping('State') == {'A': 'S1', 'B': 'S1', 'C': 'S2'}
+    np.testing.assert_array_equal(rollup.admin_index(['C', 'D', 'A']), [2, -1, 0])
+    scale = rollup.row_scale(adf, 'Pop')
+    assert np.isnan(scale[adf['admin_name'] == 'D']).all()
+    np.testing.assert_allclose(scale[0], 1000 / adf['Pop'][0])
+
+    levels = rollup.rollup_levels(adf, by=['Run_Number'], counts=['cases'])
+    assert list(levels['State']['State'].unique()) == ['S1', 'S2']
+    assert list(levels[COUNTRY].columns) == ['Run_Number', 'cases']
+    np.testing.assert_allclose(levels[COUNTRY]['cases'].sum(), adf.loc[adf['admin_name'] != 'D', 'cases'].sum())
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+from snt.analyzers.aggregate_outputs import TABLE_SUMMARIES, across_runs, simulated_population, summarize_output
+from snt.analyzers.admin_rollup import AdminRollup
+
+ADMIN_POP = pd.DataFrame({'admin_name': ['A', 'B'], 'State': ['S1', 'S1'], 'pop_size': [1000.0, 3000.0]})
+SWEEP_VARIABLES = ['Run_Number', 'admin_name']
+QUANTILES = (0.25, 0.75)
+
+
+def u5_output(num_runs=3):
+    rng = np.random.default_rng(0)
+    adf = pd.DataFrame([{'admin_name': admin, 'Run_Number': rn, 'year': year, 'month': month}
+                        for admin in ('A', 'B') for rn in range(num_runs) for year in (2020, 2021)
+                        for month in range(1, 13)])
+    adf['PfPR U5'] = rng.random(len(adf))
+    adf['Cases U5'] = rng.random(len(adf)) * 2
+    adf['Severe cases U5'] = rng.random(len(adf)) * 0.1
+    adf['Pop U5'] = 100.0
+    return adf
+
+
+def test_across_runs_by_group():
+    adf = pd.DataFrame({'admin_name': ['A', 'A', 'A', 'B', 'B', 'B'], 'Run_Number': [0, 1, 2] * 2,
+                        'cases': [1.0, 2.0, 6.0, 10.0, 20.0, 30.0]})
+    result = across_runs(adf, ['cases'], QUANTILES)
+    assert list(result.columns) == ['admin_name', 'cases_mean', 'cases_median', 'cases_q25', 'cases_q75']
+    np.testing.assert_allclose(result['cases_mean'], [3, 20])
+    np.testing.assert_allclose(result['cases_median'], [2, 20])
+    np.testing.assert_allclose(result['cases_q75'], [4, 25])
+
+
+def test_across_runs_without_other_columns():
+    adf = pd.DataFrame({'Run_Number': [0, 1, 2], 'cases': [1.0, 2.0, 6.0], 'Pop': [10.0, 10.0, 13.0]})
+    result = across_runs(adf, ['cases', 'Pop'], QUANTILES)
+    assert len(result) == 1
+    assert list(result.columns) == ['cases_mean', 'cases_median', 'cases_q25', 'cases_q75',
+                                    'Pop_mean', 'Pop_median', 'Pop_q25', 'Pop_q75']
+    np.testing.assert_allclose(result.iloc[0][['cases_mean', 'cases_median', 'Pop_mean']], [3, 2, 11])
+
+
+def test_summarize_output_admin_totals():
+    adf = u5_output()
+    summaries = summarize_output(adf, TABLE_SUMMARIES['U5_PfPR_ClinicalIncidence.csv'], SWEEP_VARIABLES, 2020, 2021,
+                                 levels=['admin'], seed_summary=False)
+    cumulative = summaries[('cumulative', 'admin')]
+    assert len(cumulative) == 6
+    expected = adf.groupby(['Run_Number', 'admin_name'])['PfPR U5'].mean()
+    result = cumulative.set_index(['Run_Number', 'admin_name'])['PfPR U5']
+    pd.testing.assert_series_equal(result.sort_index(), expected.sort_index(), check_names=False)
+    assert sorted(summaries[('annual', 'admin')]['year'].unique()) == [2020, 2021]
+
+
+def test_summarize_output_cumulative_country_level():
+    # a cumulative country total of an output without AgeGroup has only Run_Number besides the values
+    adf = u5_output()
+    sim_pop = simulated_population(adf, SWEEP_VARIABLES, 'Pop U5')
+    summaries = summarize_output(adf, TABLE_SUMMARIES['U5_PfPR_ClinicalIncidence.csv'], SWEEP_VARIABLES, 2020, 2021,
+                                 periods=['cumulative'], levels=['country', 'state'], sim_pop=sim_pop,
+                                 admin_pop=AdminRollup(ADMIN_POP), quantiles=QUANTILES)
+    country = summaries[('cumulative', 'country')]
+    assert len(country) == 1
+    np.testing.assert_allclose(country['Pop U5_mean'], 4000)
+    # rates are weighted by the rescaled population
+    run_totals = adf.assign(weight=adf['admin_name'].map({'A': 1000.0, 'B': 3000.0}))
+    expected = run_totals.groupby('Run_Number').apply(
+        lambda rdf: np.average(rdf['PfPR U5'], weights=rdf['weight']), include_groups=False)
+    np.testing.assert_allclose(country['PfPR U5_mean'], expected.mean())
+    pd.testing.assert_frame_equal(summaries[('cumulative', 'state')].drop(columns='State'), country)
@@ -0,0 +1,131 @@
+import threading
+import time
+from types import SimpleNamespace
+import pandas as pd
+import pytest
+from snt.analyzers.analysis_runner import AnalysisRunner, ExperimentAnalysis, FAILED, SUCCEEDED
+
+
+class FakeWorkItem:
+
+    def __init__(self, name, polls_to_finish, succeeded):
+        self.id = 'wi-%s' % name
+        self.polls_left = polls_to_finish
+        self.succeeded = succeeded
+        self.done = False
+        self.status = SimpleNamespace(name='FAILED')
+
+
+class FakePlatform:
+    """
+    Platform whose work items finish after a number of status refreshes, tracking how many run at a time.
+    """
+
+    def __init__(self):
+        self.running = set()
+        self.max_running = 0
+        self.downloaded = []
+
+    def refresh_status(self, work_item):
+        work_item.polls_left -= 1
+        if work_item.polls_left <= 0:
+            work_item.done = True
+            self.running.discard(work_item.id)
+
+    def get_files_by_id(self, item_id, item_type, files, output):
+        self.downloaded.append((item_id, list(files), output))
+
+
+def ssmt_runner(monkeypatch, platform, state_file, fail=(), max_parallel=2):
+    submitted = []
+
+    def submit(self, analysis):
+        submitted.append(analysis.name)
+        if analysis.name == 'broken':
+            raise ConnectionError('no connection')
+        work_item = FakeWorkItem(analysis.name, polls_to_finish=1 + len(submitted) % 3,
+                                 succeeded=analysis.name not in fail)
+        platform.running.add(work_item.id)
+        platform.max_running = max(platform.max_running, len(platform.running))
+        return work_item
+
+    monkeypatch.setattr(AnalysisRunner, '_submit', submit)
+    return AnalysisRunner(platform, max_parallel=max_parallel, poll_interval=0, state_file=state_file), submitted
+
+
+def analyses(names):
+    return [ExperimentAnalysis(name, 'id-%s' % name, [], download_filenames=['%s/out.csv' % name]) for name in names]
+
+
+def test_ssmt_analyses_are_capped_and_tracked(tmp_path, monkeypatch):
+    platform = FakePlatform()
+    state_file = str(tmp_path / 'state' / 'analysis_state.csv')
+    runner, submitted = ssmt_runner(monkeypatch, platform, state_file, fail=['e3'])
+    states = runner.run(analyses(['e1', 'e2', 'e3', 'e4', 'e5', 'broken']))
+
+    assert sorted(submitted) == ['broken', 'e1', 'e2', 'e3', 'e4', 'e5']
+    assert platform.max_running == 2
+    assert sorted(item_id for item_id, _, _ in platform.downloaded) == ['wi-e1', 'wi-e2', 'wi-e4', 'wi-e5']
+    assert ('wi-e1', ['e1/out.csv'], 'ssmt_e1') in platform.downloaded
+    saved = pd.read_csv(state_file, dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(saved, states.astype(str))
+    result = dict(zip(saved['name'], saved['state']))
+    assert result == {'e1': SUCCEEDED, 'e2': SUCCEEDED, 'e3': FAILED, 'e4': SUCCEEDED, 'e5': SUCCEEDED,
+                      'broken': FAILED}
+    messages = dict(zip(saved['name'], saved['message']))
+    assert messages['e3'] == 'work item failed' and 'no connection' in messages['broken']
+    assert (saved.loc[saved['state'] == SUCCEEDED, 'work_item_id'] != '').all()
+
+
+def test_rerun_skips_succeeded_analyses(tmp_path, monkeypatch):
+    state_file = str(tmp_path / 'analysis_state.csv')
+    runner, _ = ssmt_runner(monkeypatch, FakePlatform(), state_file, fail=['e2'])
+    runner.run(analyses(['e1', 'e2', 'other']))
+
+    runner, submitted = ssmt_runner(monkeypatch, FakePlatform(), state_file)
+    rerun = analyses(['e1', 'e2', 'e3'])
+    # a new experiment under the same name is analyzed again
+    rerun[0].exp_id = 'id-e1-new'
+    states = runner.run(rerun)
+    assert sorted(submitted) == ['e1', 'e2', 'e3']
+    assert (states['state'] == SUCCEEDED).all()
+
+    runner, submitted = ssmt_runner(monkeypatch, FakePlatform(), state_file)
+    runner.run(rerun)
+    assert submitted == []
+    # analyses of earlier runs that are not part of this run are kept
+    saved = pd.read_csv(state_file, dtype=str, keep_default_na=False)
+    assert sorted(saved['name']) == ['e1', 'e2', 'e3', 'other']
+
+
+def test_local_analyses_are_capped(monkeypatch):
+    lock = threading.Lock()
+    running = []
+    max_running = []
+    completed = []
+
+    def analyze_locally(self, analysis):
+        with lock:
+            running.append(analysis.name)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(analysis.name)
+        if analysis.name == 'e2':
+            raise RuntimeError('AnalyzeManager did not complete the analysis of e2')
+        completed.append(analysis.name)
+
+    monkeypatch.setattr(AnalysisRunner, '_analyze_locally', analyze_locally)
+    runner = AnalysisRunner(None, max_parallel=3, mode='local', poll_interval=0.01)
+    states = runner.run(analyses(['e%d' % ii for ii in range(7)]))
+    assert max(max_running) == 3
+    assert sorted(completed) == ['e0', 'e1', 'e3', 'e4', 'e5', 'e6']
+    failed = states[states['state'] == FAILED]
+    assert failed['name'].tolist() == ['e2'] and 'did not complete' in failed['message'].iloc[0]
+
+
+def test_analysis_names_must_be_unique():
+    with pytest.raises(ValueError):
+        AnalysisRunner(None, mode='local').run(analyses(['e1', 'e1']))
+    with pytest.raises(ValueError):
+        AnalysisRunner(None, mode='remote')
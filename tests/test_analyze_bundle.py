@@ -0,0 +1,73 @@
+import json
+from idmtools.entities import IAnalyzer
+from idmtools.utils.file_parser import FileParser
+from snt.analyzers.analyze_bundle import AnalyzerBundle
+from snt.analyzers.local_analysis import LocalSimulation, run_local_analysis
+from snt.analyzers.map_cache import CachedAnalyzer, MapResultCache
+
+INSET = 'output/InsetChart.json'
+EVENTS = 'output/ReportEventCounter.json'
+
+
+class RecordingAnalyzer(IAnalyzer):
+
+    def __init__(self, filenames, parse=True, working_dir='.'):
+        super(RecordingAnalyzer, self).__init__(working_dir=working_dir, parse=parse, filenames=filenames)
+        self.reduced = None
+        self.destroyed = False
+
+    def map(self, data, simulation):
+        return {fname: (type(value).__name__, value['name'] if isinstance(value, dict) else json.loads(value)['name'])
+                for fname, value in data.items()}
+
+    def reduce(self, all_data):
+        self.reduced = {str(simulation.id): result for simulation, result in all_data.items()}
+
+    def destroy(self):
+        self.destroyed = True
+
+
+def write_simulations(tmp_path, sim_ids):
+    simulations = []
+    for sim_id in sim_ids:
+        (tmp_path / sim_id / 'output').mkdir(parents=True)
+        for fname in (INSET, EVENTS):
+            (tmp_path / sim_id / fname).write_text(json.dumps({'name': '%s-%s' % (sim_id, fname)}))
+        simulations.append(LocalSimulation(sim_id, {}, str(tmp_path / sim_id)))
+    return simulations
+
+
+def test_each_file_is_parsed_once(tmp_path, monkeypatch):
+    parsed = []
+    parse = FileParser.parse
+
+    def counting_parse(fname, content):
+        parsed.append(fname)
+        return parse(fname, content)
+
+    monkeypatch.setattr(FileParser, 'parse', counting_parse)
+    parsed_analyzer = RecordingAnalyzer([INSET, EVENTS])
+    raw_analyzer = RecordingAnalyzer([EVENTS], parse=False)
+    bundle = AnalyzerBundle([parsed_analyzer, raw_analyzer])
+    assert bundle.filenames == [INSET, EVENTS] and not bundle.parse
+    run_local_analysis([bundle], write_simulations(tmp_path, ['a', 'b']), max_workers=1)
+
+    assert sorted(parsed) == sorted([INSET, EVENTS] * 2)
+    assert parsed_analyzer.reduced['a'] == {INSET: ('dict', 'a-%s' % INSET), EVENTS: ('dict', 'a-%s' % EVENTS)}
+    assert raw_analyzer.reduced['b'] == {EVENTS: ('bytes', 'b-%s' % EVENTS)}
+    assert parsed_analyzer.destroyed and raw_analyzer.destroyed
+
+
+def test_cached_analyzer_in_bundle(tmp_path):
+    simulations = write_simulations(tmp_path / 'sims', ['a', 'b'])
+
+    def run():
+        analyzer = RecordingAnalyzer([INSET])
+        cached = CachedAnalyzer(analyzer, MapResultCache(str(tmp_path / 'cache')), namespace='exp')
+        run_local_analysis([AnalyzerBundle([cached, RecordingAnalyzer([EVENTS], parse=False)])], simulations,
+                           max_workers=1)
+        return analyzer
+
+    assert sorted(run().reduced) == ['a', 'b']
+    # the cached results reach the wrapped analyzer's reduce through the bundle
+    assert run().reduced == {'a': {INSET: ('dict', 'a-%s' % INSET)}, 'b': {INSET: ('dict', 'b-%s' % INSET)}}
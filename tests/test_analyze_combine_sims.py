@@ -0,0 +1,94 @@
+import os
+import pandas as pd
+import pytest
+from snt.analyzers.analyze_combine_sims import combineSimOutputAnalyzer, manifest_filenames, read_sim_table
+from snt.analyzers.local_analysis import LocalSimulation, run_local_analysis
+
+U5 = 'output/U5_PfPR_ClinicalIncidence.csv'
+AGES = 'output/newInfections_PfPR_cases_monthly_byAgeGroup.csv'
+
+
+def sim_tables(admin, run_number):
+    value = ord(admin) + run_number
+    return {U5: pd.DataFrame({'year': [2020, 2021], 'month': [1, 1], 'date': ['2020-01-01', '2021-01-01'],
+                              'PfPR U5': [value / 100, value / 200], 'Cases U5': [value, value + 1]}),
+            AGES: pd.DataFrame({'year': [2020] * 2, 'AgeGroup': ['0-5', '5-15'], 'Pop': [value * 10.0, value * 5.0]})}
+
+
+def write_simulations(tmp_path):
+    simulations = []
+    for admin in ('A', 'B'):
+        for run_number in range(2):
+            sim_id = '%s%d' % (admin, run_number)
+            (tmp_path / sim_id / 'output').mkdir(parents=True)
+            for fname, adf in sim_tables(admin, run_number).items():
+                adf.to_csv(str(tmp_path / sim_id / fname), index=False)
+            simulations.append(LocalSimulation(sim_id, {'admin_name': admin, 'Run_Number': run_number, 'x': 1},
+                                               str(tmp_path / sim_id)))
+    return simulations
+
+
+def expected_table(fname):
+    tables = []
+    for admin in ('A', 'B'):
+        for run_number in range(2):
+            tables.append(sim_tables(admin, run_number)[fname].assign(Run_Number=run_number, admin_name=admin))
+    return pd.concat(tables, ignore_index=True)
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'parquet'])
+def test_combine_appends_part_files(tmp_path, output_format):
+    analyzer = combineSimOutputAnalyzer('expt', filenames=[U5, AGES], sweep_variables=['Run_Number', 'admin_name'],
+                                        working_dir=str(tmp_path / 'out'), output_format=output_format)
+    run_local_analysis([analyzer], write_simulations(tmp_path / 'sims'), max_workers=1)
+
+    output_dir = str(tmp_path / 'out' / 'expt')
+    # the part files are removed after reduce
+    assert sorted(os.listdir(output_dir)) == sorted([os.path.basename(fname).replace('.csv', '.' + output_format)
+                                                     for fname in [U5, AGES]])
+    for fname in [U5, AGES]:
+        path = os.path.join(output_dir, os.path.basename(fname).replace('.csv', '.' + output_format))
+        result = pd.read_parquet(path) if output_format == 'parquet' else pd.read_csv(path)
+        result = result.sort_values(['admin_name', 'Run_Number'], kind='stable').reset_index(drop=True)
+        expected = expected_table(fname)
+        for column in expected.columns:
+            assert result[column].astype(str).tolist() == expected[column].astype(str).tolist()
+
+
+def test_combine_replaces_previous_output(tmp_path):
+    simulations = write_simulations(tmp_path / 'sims')
+    for _ in range(2):
+        analyzer = combineSimOutputAnalyzer('expt', filenames=[U5], working_dir=str(tmp_path / 'out'))
+        run_local_analysis([analyzer], simulations, max_workers=1)
+    result = pd.read_csv(str(tmp_path / 'out' / 'expt' / os.path.basename(U5)))
+    assert len(result) == 4 * 2
+    assert list(result.columns) == list(expected_table(U5).columns[:-1])
+
+
+def test_read_sim_table_dtypes():
+    content = b'year, month, date, AgeGroup, PfPR\n2020, 1, 2020-01-01, 0-5, 0.5\n2020, 2, 2020-02-01, 5-15, 1\n'
+    adf = read_sim_table('output/table.csv', content)
+    assert list(adf.columns) == ['year', 'month', 'date', 'AgeGroup', 'PfPR']
+    assert adf['year'].dtype == 'int64' and adf['month'].dtype == 'int64'
+    assert adf['date'].tolist() == ['2020-01-01', '2020-02-01']
+    assert isinstance(adf['AgeGroup'].dtype, pd.CategoricalDtype)
+    assert adf['PfPR'].dtype == 'float64'
+
+    # dtypes are only applied to the columns present
+    adf = read_sim_table('output/table.csv', b'month,Cases\n1,3\n', dtypes={'year': 'int64', 'Cases': 'float64'})
+    assert adf['month'].dtype == 'int64' and adf['Cases'].dtype == 'float64'
+
+
+def test_read_sim_table_parquet(tmp_path):
+    expected = pd.DataFrame({'year': [2020], 'PfPR': [0.5]})
+    expected.to_parquet(str(tmp_path / 'table.parquet'), index=False)
+    with open(str(tmp_path / 'table.parquet'), 'rb') as f:
+        pd.testing.assert_frame_equal(read_sim_table('output/table.parquet', f.read()), expected)
+
+
+def test_manifest_filenames(tmp_path):
+    manifest = {'tables': [{'file': 'U5_PfPR_ClinicalIncidence.csv'}, {'file': 'All_Age_monthly_Cases.parquet'}]}
+    assert manifest_filenames(manifest) == ['output/U5_PfPR_ClinicalIncidence.csv',
+                                            'output/All_Age_monthly_Cases.parquet']
+    pd.Series(manifest).to_json(str(tmp_path / 'manifest.json'))
+    assert manifest_filenames(str(tmp_path / 'manifest.json')) == manifest_filenames(manifest)
@@ -0,0 +1,31 @@
+import json
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from snt.analyzers.analyze_helpers import monthlyPrevalenceAnalyzer
+
+
+def channel_report(channels, num_days):
+    return json.dumps({'Header': {'Timesteps': num_days},
+                       'Channels': {channel: {'Units': '', 'Data': [float(value)] * num_days}
+                                    for channel, value in channels.items()}}).encode('utf-8')
+
+
+def test_monthly_prevalence_analyzer(tmp_path):
+    analyzer = monthlyPrevalenceAnalyzer('expt', working_dir=str(tmp_path), start_year=2020)
+    report = channel_report({'Statistical Population': 1000, 'New Clinical Cases': 2, 'New Severe Cases': 1,
+                             'True Parasite Prevalence': 0.3, 'PCR Parasite Prevalence': 0.25,
+                             'Blood Smear Parasite Prevalence': 0.2, 'PfHRP2 Prevalence': 0.22}, num_days=365)
+    all_data = {}
+    for run_number in range(2):
+        simulation = SimpleNamespace(tags={'admin_name': 'A', 'Run_Number': run_number})
+        all_data[run_number] = analyzer.map({analyzer.filenames[0]: report}, simulation)
+    analyzer.reduce(all_data)
+
+    adf = pd.read_csv(os.path.join(str(tmp_path), 'expt', 'All_Age_monthly_prevalence.csv'))
+    assert len(adf) == 24
+    january = adf[adf['date'] == '2020-01-01']
+    np.testing.assert_allclose(january['New Clinical Cases'], 62)
+    np.testing.assert_allclose(january['New Severe Cases'], 31)
+    np.testing.assert_allclose(january['True Parasite Prevalence'], 0.3)
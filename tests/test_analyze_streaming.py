@@ -0,0 +1,80 @@
+import os
+import pandas as pd
+import pyarrow.parquet as pq
+from snt.analyzers.analyze_helpers import monthlyEventAnalyzer
+from snt.analyzers.analyze_streaming import StreamingReduceAnalyzer, append_csv, append_parquet, iter_partitions, \
+    write_partitions
+from snt.analyzers.local_analysis import LocalSimulation, run_local_analysis
+from tests.test_analyze_helpers import channel_report
+
+CHANNELS = ['Received_Treatment', 'Received_Severe_Treatment']
+OUTPUT = 'monthly_Event_Count.csv'
+
+
+def test_partitions_round_trip(tmp_path):
+    dataset_dir = str(tmp_path / 'dataset')
+    write_partitions(pd.DataFrame({'admin_name': ['A', 'B/C', 'A'], 'x': [1, 2, 3]}), dataset_dir, 'admin_name', 's1')
+    write_partitions(pd.DataFrame({'admin_name': ['A'], 'x': [4]}), dataset_dir, 'admin_name', 's2')
+    partitions = dict(iter_partitions(dataset_dir))
+    assert sorted(partitions) == ['admin_name=A', 'admin_name=B%2FC']
+    assert partitions['admin_name=A']['x'].tolist() == [1, 3, 4]
+    assert partitions['admin_name=B%2FC']['admin_name'].tolist() == ['B/C']
+
+    # data frames without the partition column go to one partition
+    write_partitions(pd.DataFrame({'x': [5]}), str(tmp_path / 'other'), 'admin_name', 's1')
+    assert [name for name, _ in iter_partitions(str(tmp_path / 'other'))] == ['admin_name=']
+
+
+def test_append_csv(tmp_path):
+    dst = str(tmp_path / 'out.csv')
+    pd.DataFrame({'a': [1], 'b': [2]}).to_csv(str(tmp_path / 'src1.csv'), index=False)
+    pd.DataFrame({'a': [3], 'b': [4]}).to_csv(str(tmp_path / 'src2.csv'), index=False)
+    # different column order, with a column dst does not have
+    pd.DataFrame({'b': [6], 'c': [7], 'a': [5]}).to_csv(str(tmp_path / 'src3.csv'), index=False)
+    for name in ('src1.csv', 'src2.csv', 'src3.csv'):
+        append_csv(str(tmp_path / name), dst, chunksize=1)
+    pd.testing.assert_frame_equal(pd.read_csv(dst), pd.DataFrame({'a': [1, 3, 5], 'b': [2, 4, 6]}))
+
+
+def test_append_parquet(tmp_path):
+    dst = str(tmp_path / 'out.parquet')
+    pd.DataFrame({'a': [1.0], 'b': ['x']}).to_parquet(str(tmp_path / 'src1.parquet'), index=False)
+    pd.DataFrame({'a': [2], 'b': ['y']}).to_parquet(str(tmp_path / 'src2.parquet'), index=False)
+    writers = {}
+    for name in ('src1.parquet', 'src2.parquet'):
+        append_parquet(str(tmp_path / name), dst, writers)
+    writers[dst].close()
+    # rows are cast to the schema of the first file
+    pd.testing.assert_frame_equal(pq.read_table(dst).to_pandas(), pd.DataFrame({'a': [1.0, 2.0], 'b': ['x', 'y']}))
+
+
+def write_simulations(tmp_path):
+    simulations = []
+    for admin in ('A', 'B', 'C'):
+        for run_number in range(2):
+            sim_id = '%s%d' % (admin, run_number)
+            (tmp_path / sim_id / 'output').mkdir(parents=True)
+            report = channel_report({channel: ii + run_number + ord(admin) for ii, channel in enumerate(CHANNELS)},
+                                    num_days=365)
+            (tmp_path / sim_id / 'output' / 'ReportEventCounter.json').write_bytes(report)
+            simulations.append(LocalSimulation(sim_id, {'admin_name': admin, 'Run_Number': run_number},
+                                               str(tmp_path / sim_id)))
+    return simulations
+
+
+def test_streaming_reduce_matches_reduce(tmp_path):
+    simulations = write_simulations(tmp_path / 'sims')
+    run_local_analysis([monthlyEventAnalyzer('expt', channels=CHANNELS, working_dir=str(tmp_path / 'direct'),
+                                             start_year=2020)], simulations, max_workers=1)
+    streamed = StreamingReduceAnalyzer(monthlyEventAnalyzer('expt', channels=CHANNELS,
+                                                            working_dir=str(tmp_path / 'streamed'), start_year=2020))
+    # the wrapped analyzer reads raw files, so the wrapper does not request parsed ones
+    assert not streamed.parse
+    run_local_analysis([streamed], simulations, max_workers=1)
+
+    expected = pd.read_csv(str(tmp_path / 'direct' / 'expt' / OUTPUT))
+    result = pd.read_csv(str(tmp_path / 'streamed' / 'expt' / OUTPUT))
+    assert len(result) == 3 * 2 * 12
+    pd.testing.assert_frame_equal(result, expected)
+    # the partitioned dataset is removed after reduce
+    assert os.listdir(str(tmp_path / 'streamed')) == ['expt']
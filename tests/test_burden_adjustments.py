@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from snt.analyzers.burden_adjustments import AGE_GROUPS, adjust_for_mip, adjust_for_mortality, \
+    indirect_death_probability
+
+YEARS = (2020, 2021)
+POP = 1000.0
+NEW_INFECTIONS = 30.0
+PFPR = 0.2
+MIP_PARAMS = {'pm_LBW_iptp': [0.2, 0.15, 0.1, 0.05], 'pm_still_iptp': [0.1, 0.08, 0.06, 0.04], 'd0': 0.05,
+              'd1': 0.15, 'births_per_person_per_month': 0.003, 'non_mal_stillbirth_fraction': 0.02,
+              'frac_preg_under_30': 0.6, 'frac_first_second_birth': 0.4}
+
+
+def monthly_rows(**columns):
+    return pd.DataFrame([dict(admin_name='A', Run_Number=0, year=year, month=month, **columns)
+                         for year in YEARS for month in range(1, 13)])
+
+
+def infections_df():
+    return pd.concat([monthly_rows(AgeGroup=age_group, **{'Pop': POP, 'New Infections': NEW_INFECTIONS,
+                                                          'PfPR': PFPR})
+                      for age_group in AGE_GROUPS], ignore_index=True)
+
+
+def all_age_df():
+    return monthly_rows(**{'New Clinical Cases': 100.0, 'New Severe Cases': 4.0, 'Received_Severe_Treatment': 1.0})
+
+
+def iptp_coverage_df(coverage):
+    return pd.DataFrame({'admin_name': ['a'], 'X2020': [coverage], 'X2021': [coverage]})
+
+
+def mip_adjusted(coverage=0.0):
+    return adjust_for_mip(all_age_df(), infections_df(), iptp_coverage_df(coverage), [1], [0], [0], [2020, 2021],
+                          **MIP_PARAMS)
+
+
+def test_mip_numbers_without_iptp():
+    adf = mip_adjusted()
+    assert adf.loc[(adf['year'] == 2020), 'MiP_stillbirths'].isna().all()
+    september = adf[(adf['year'] == 2021) & (adf['month'] == 9)].iloc[0]
+
+    # January-September 2021 are 30-day months with the same risk of infection
+    prob_infected = 1 - (1 - NEW_INFECTIONS / 30 / (POP * (1 - PFPR))) ** (30 * 9)
+    total_preg = 4 * POP * MIP_PARAMS['births_per_person_per_month']
+    preg_woNM = total_preg * (1 - MIP_PARAMS['non_mal_stillbirth_fraction'])
+    stillbirths = preg_woNM * prob_infected * MIP_PARAMS['pm_still_iptp'][0]
+    mLBW_births = ((preg_woNM - stillbirths) * MIP_PARAMS['frac_first_second_birth'] * prob_infected
+                   * MIP_PARAMS['pm_LBW_iptp'][0])
+    severe_maternal = total_preg * MIP_PARAMS['frac_first_second_birth'] * prob_infected * 0.57
+    np.testing.assert_allclose(september['num_all_births'], total_preg)
+    np.testing.assert_allclose(september['MiP_stillbirths'], stillbirths)
+    np.testing.assert_allclose(september['MiP_stillbirths_noIPTp'], stillbirths)
+    np.testing.assert_allclose(september['mLBW_births'], mLBW_births)
+    np.testing.assert_allclose(september['mLBW_deaths'], mLBW_births * 0.1)
+    np.testing.assert_allclose(september['severe_total'], severe_maternal + 4)
+    np.testing.assert_allclose(september['severe_total_treated'], severe_maternal * 0.5 + 1)
+    np.testing.assert_allclose(september['PfPR_MiP_adjusted'], PFPR)
+
+
+def test_iptp_reduces_mip_outcomes():
+    without = mip_adjusted(coverage=0.0).dropna(subset=['MiP_stillbirths'])
+    with_iptp = mip_adjusted(coverage=0.8).dropna(subset=['MiP_stillbirths'])
+    assert (with_iptp['MiP_stillbirths'] < without['MiP_stillbirths']).all()
+    assert (with_iptp['severe_maternal'] < without['severe_maternal']).all()
+    assert (with_iptp['PfPR_MiP_adjusted'] < without['PfPR_MiP_adjusted']).all()
+    np.testing.assert_allclose(with_iptp['MiP_stillbirths_noIPTp'], without['MiP_stillbirths_noIPTp'])
+
+
+def test_mip_requires_severe_columns():
+    with pytest.raises(ValueError, match='Received_Severe_Treatment'):
+        adjust_for_mip(all_age_df().drop(columns='Received_Severe_Treatment'), infections_df(),
+                       iptp_coverage_df(0.0), [1], [0], [0], [2020, 2021], **MIP_PARAMS)
+
+
+def test_mortality_converts_annual_incidence_to_monthly_counts():
+    # monthlyU5PfPRAnalyzer writes the annualized per-person incidence of the summary report
+    u5_df = monthly_rows(**{'PfPR U5': 0.3, 'Cases U5': 1.5, 'Severe cases U5': 0.073, 'Pop U5': 200.0,
+                            'Num_U5_Received_Severe_Treatment': 0.5})
+    adf = adjust_for_mortality(mip_adjusted(), u5_df)
+    row = adf[(adf['year'] == 2021) & (adf['month'] == 9)].iloc[0]
+
+    cases = 1.5 * 200 * 30 / 365
+    severe = 0.073 * 200 * 30 / 365
+    np.testing.assert_allclose(row['New_clinical_cases_U5'], cases)
+    np.testing.assert_allclose(row['Severe_cases_U5'], severe)
+    np.testing.assert_allclose(row['direct_mortality_nonMiP_U5_1'], 0.5 * 0.097 + (severe - 0.5) * 0.539)
+    np.testing.assert_allclose(row['indirect_mortality_nonMiP_U5_2'],
+                               cases * indirect_death_probability(0.01, 0.117, 0, 5))
+    np.testing.assert_allclose(row['total_mortality_U5_mean'],
+                               (row['total_mortality_U5_1'] + row['total_mortality_U5_2']) / 2)
+
+    counts = adjust_for_mortality(mip_adjusted(), u5_df, cases_are_rates=False)
+    np.testing.assert_allclose(counts['New_clinical_cases_U5'], 1.5)
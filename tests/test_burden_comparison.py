@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from snt.analyzers.burden_comparison import BURDEN_FILENAME, BurdenComparison
+
+ADMIN_POP = pd.DataFrame({'admin_name': ['A', 'B', 'C'], 'State': ['S1', 'S1', 'S2'],
+                          'pop_size': [1000.0, 3000.0, 2000.0]})
+COUNT_COLUMNS = ['New_Clinical_Cases', 'New_clinical_cases_U5', 'severe_total', 'Severe_cases_U5',
+                 'direct_mortality_nonMiP_1', 'direct_mortality_nonMiP_2', 'total_mortality_1', 'total_mortality_2',
+                 'direct_mortality_nonMiP_U5_1', 'direct_mortality_nonMiP_U5_2', 'total_mortality_U5_1',
+                 'total_mortality_U5_2', 'mLBW_births', 'MiP_stillbirths']
+
+
+def burden_output(seed):
+    rng = np.random.default_rng(seed)
+    # admin D is not in the admin population and is left out
+    adf = pd.DataFrame([{'admin_name': admin, 'Run_Number': rn, 'year': year, 'month': month}
+                        for admin in ['A', 'B', 'C', 'D'] for rn in range(3) for year in (2020, 2021, 2022)
+                        for month in range(1, 13)])
+    adf['Statistical_Population'] = 900 + rng.random(len(adf)) * 200
+    adf['Pop_U5'] = adf['Statistical_Population'] * (0.15 + rng.random(len(adf)) * 0.05)
+    adf['PfPR_MiP_adjusted'] = rng.random(len(adf))
+    adf['PfPR_U5'] = rng.random(len(adf))
+    for column in COUNT_COLUMNS:
+        adf[column] = rng.random(len(adf)) * 50
+    return adf
+
+
+def reference_cumulative_burden(adf, start_year, end_year, cur_admins='all', by=()):
+    # pandas transcription of get_cumulative_burden(_by_state) in process_sim_output_functions.R
+    df = adf[(adf['year'] <= end_year) & (adf['year'] >= start_year)].merge(ADMIN_POP, on='admin_name')
+    if cur_admins != 'all':
+        df = df[df['admin_name'].isin(cur_admins)]
+    scale = df['pop_size'] / df['Statistical_Population']
+    df = df.assign(pop_size_U5=df['pop_size'] * df['Pop_U5'] / df['Statistical_Population'])
+    sums = pd.DataFrame({'Run_Number': df['Run_Number'], 'State': df['State'],
+                         'pop_all_sum': df['pop_size'], 'pop_U5_sum': df['pop_size_U5'],
+                         'cases_all_sum': df['New_Clinical_Cases'] * scale,
+                         'cases_U5_sum': df['New_clinical_cases_U5'] * df['pop_size_U5'] / df['Pop_U5'],
+                         'positives_all_sum': df['PfPR_MiP_adjusted'] * df['pop_size'],
+                         'positives_U5_sum': df['PfPR_U5'] * df['pop_size_U5'],
+                         'direct_deaths_1_all_sum': df['direct_mortality_nonMiP_1'] * scale,
+                         'direct_deaths_2_all_sum': df['direct_mortality_nonMiP_2'] * scale,
+                         'all_deaths_1_U5_sum': df['total_mortality_U5_1'] * df['pop_size_U5'] / df['Pop_U5'],
+                         'all_deaths_2_U5_sum': df['total_mortality_U5_2'] * df['pop_size_U5'] / df['Pop_U5'],
+                         'mLBW_sum': df['mLBW_births'] * scale})
+    agg = sums.groupby(['Run_Number'] + list(by)).sum(numeric_only=True).reset_index()
+    agg['incidence_all'] = agg['cases_all_sum'] / (agg['pop_all_sum'] / 12) * 1000
+    agg['incidence_U5'] = agg['cases_U5_sum'] / (agg['pop_U5_sum'] / 12) * 1000
+    agg['direct_death_rate_1_all'] = agg['direct_deaths_1_all_sum'] / (agg['pop_all_sum'] / 12) * 1000
+    agg['direct_death_rate_2_all'] = agg['direct_deaths_2_all_sum'] / (agg['pop_all_sum'] / 12) * 1000
+    agg['direct_death_rate_mean_all'] = (agg['direct_death_rate_1_all'] + agg['direct_death_rate_2_all']) / 2
+    agg['all_death_rate_1_U5'] = agg['all_deaths_1_U5_sum'] / (agg['pop_U5_sum'] / 12) * 1000
+    agg['all_death_rate_mean_U5'] = (agg['all_death_rate_1_U5'] +
+                                     agg['all_deaths_2_U5_sum'] / (agg['pop_U5_sum'] / 12) * 1000) / 2
+    agg['average_PfPR_all'] = agg['positives_all_sum'] / agg['pop_all_sum']
+    agg['average_PfPR_U5'] = agg['positives_U5_sum'] / agg['pop_U5_sum']
+    agg['annual_num_mLBW'] = agg['mLBW_sum'] / (end_year - start_year + 1)
+    return agg.drop(columns=[column for column in agg.columns if column.startswith(('pop_', 'positives_'))])
+
+
+METRICS = ['cases_all_sum', 'cases_U5_sum', 'incidence_all', 'incidence_U5', 'direct_death_rate_1_all',
+           'direct_death_rate_mean_all', 'all_death_rate_1_U5', 'all_death_rate_mean_U5', 'average_PfPR_all',
+           'average_PfPR_U5', 'mLBW_sum', 'annual_num_mLBW']
+
+
+@pytest.fixture
+def comparison(tmp_path):
+    for ee, experiment_name in enumerate(['baseline', 'itn', 'smc']):
+        (tmp_path / experiment_name).mkdir()
+        burden_output(ee).to_csv(str(tmp_path / experiment_name / BURDEN_FILENAME), index=False)
+    return BurdenComparison(str(tmp_path), ADMIN_POP)
+
+
+def reference_output(comparison, experiment_name):
+    return pd.read_csv(comparison.experiment_path(experiment_name))
+
+
+@pytest.mark.parametrize('cur_admins', ['all', ['B', 'C']])
+def test_cumulative_burden_matches_r(comparison, cur_admins):
+    result = comparison.cumulative_burden(['baseline', 'itn'], 2021, 2022, level='all', cur_admins=cur_admins)
+    for experiment_name in ['baseline', 'itn']:
+        expected = reference_cumulative_burden(reference_output(comparison, experiment_name), 2021, 2022, cur_admins)
+        rows = result[result['experiment'] == experiment_name].reset_index(drop=True)
+        assert rows['Run_Number'].tolist() == expected['Run_Number'].tolist()
+        pd.testing.assert_frame_equal(rows[METRICS], expected[METRICS], check_dtype=False)
+
+
+def test_cumulative_burden_by_state(comparison):
+    result = comparison.cumulative_burden(['smc'], 2020, 2020, level='state')
+    expected = reference_cumulative_burden(reference_output(comparison, 'smc'), 2020, 2020, by=['State'])
+    result = result.sort_values(['State', 'Run_Number']).reset_index(drop=True)
+    expected = expected.sort_values(['State', 'Run_Number']).reset_index(drop=True)
+    assert result['State'].tolist() == expected['State'].tolist()
+    pd.testing.assert_frame_equal(result[METRICS], expected[METRICS], check_dtype=False)
+
+
+@pytest.mark.parametrize('comparison_type', ['relative', 'difference'])
+@pytest.mark.parametrize('align_seeds', [True, False])
+def test_compare_matches_r(comparison, comparison_type, align_seeds):
+    references = ['baseline', 'itn']
+    scenarios = ['itn', 'smc']
+    result = comparison.compare(references, scenarios, 2020, 2022, comparison_type, level='all',
+                                align_seeds=align_seeds)
+    assert len(result) == len(references) * len(scenarios) * (3 if align_seeds else 1)
+    for reference in references:
+        reference_df = reference_cumulative_burden(reference_output(comparison, reference), 2020, 2022)[METRICS]
+        for scenario in scenarios:
+            # as get_relative_burden and get_difference_burden
+            comparison_df = reference_cumulative_burden(reference_output(comparison, scenario), 2020, 2022)[METRICS]
+            if not align_seeds:
+                reference_df, comparison_df = reference_df.mean().to_frame().T, comparison_df.mean().to_frame().T
+            expected = reference_df - comparison_df
+            if comparison_type == 'relative':
+                expected = expected / reference_df
+            rows = result[(result['reference'] == reference) & (result['scenario'] == scenario)]
+            pd.testing.assert_frame_equal(rows[METRICS].reset_index(drop=True), expected, check_dtype=False)
+    if comparison_type == 'relative':
+        assert (result[(result['reference'] == 'itn') & (result['scenario'] == 'itn')][METRICS] == 0).all().all()
+
+
+def test_changed_output_is_read_again(comparison):
+    before = comparison.cumulative_burden(['itn'], 2020, 2022, level='all')
+    assert comparison.cumulative_burden(['itn'], 2020, 2022, level='all').equals(before)
+    adf = reference_output(comparison, 'itn')
+    adf['New_Clinical_Cases'] *= 2
+    adf.to_csv(comparison.experiment_path('itn'), index=False)
+    mtime = os.path.getmtime(comparison.experiment_path('itn')) + 10
+    os.utime(comparison.experiment_path('itn'), (mtime, mtime))
+    after = comparison.cumulative_burden(['itn'], 2020, 2022, level='all')
+    np.testing.assert_allclose(after['cases_all_sum'], before['cases_all_sum'] * 2)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from snt.analyzers.download_cache import CachedDownloadPlatform, FileDownloadCache
+from tests.test_simulation_prefilter import FakeCOMPSSimulation
+
+OUTPUT = 'output/InsetChart.json'
+
+
+class FakePlatform:
+    """
+    Platform serving the contents of FakeCOMPSSimulation outputs, counting the files downloaded.
+    """
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.downloaded = []
+
+    def get_item(self, item_id, item_type, raw=False):
+        return self.simulation
+
+    def get_files(self, item, files, output=None, **kwargs):
+        self.downloaded.extend(files)
+        return {fname: self.contents[fname] for fname in files}
+
+
+def test_version_mismatch(tmp_path):
+    cache = FileDownloadCache(str(tmp_path))
+    cache.put('sim', OUTPUT, b'first', version='5:abc')
+    assert cache.get('sim', OUTPUT, version='5:abc') == b'first'
+    assert cache.get('sim', OUTPUT, version='6:def') is None
+    assert cache.get('sim', OUTPUT) == b'first'
+    assert cache.get('other', OUTPUT) is None
+    cache.invalidate(['sim'])
+    assert cache.get('sim', OUTPUT) is None
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = FileDownloadCache(str(tmp_path))
+    for ii, content in enumerate([b'a' * 10, b'b' * 10, b'c' * 10]):
+        cache.put('sim', 'output/%d.json' % ii, content)
+        blob_path = cache._blob_path(hashlib.sha256(content).hexdigest())
+        os.utime(blob_path, (1000 + ii, 1000 + ii))
+    # reading the first file makes it the most recently used
+    assert cache.get('sim', 'output/0.json') == b'a' * 10
+    cache.max_bytes = 25
+    cache.evict()
+    assert cache.get('sim', 'output/1.json') is None
+    assert cache.get('sim', 'output/0.json') == b'a' * 10
+    assert cache.get('sim', 'output/2.json') == b'c' * 10
+
+
+def test_put_evicts_when_over_budget(tmp_path):
+    cache = FileDownloadCache(str(tmp_path), max_bytes=25)
+    for ii in range(5):
+        cache.put('sim', 'output/%d.json' % ii, bytes([ii]) * 10)
+    sizes = [os.path.getsize(os.path.join(root, fname))
+             for root, _, files in os.walk(str(tmp_path / 'blobs')) for fname in files]
+    assert sum(sizes) <= 25
+    assert cache.get('sim', 'output/4.json') == bytes([4]) * 10
+
+
+def put_files(cache_dir, worker):
+    cache = FileDownloadCache(cache_dir)
+    for ii in range(20):
+        # every process writes the same shared file and files of its own
+        cache.put('sim', 'output/shared.json', b'shared content')
+        cache.put('sim', 'output/%d_%d.json' % (worker, ii), b'%d-%d' % (worker, ii))
+    return worker
+
+
+def test_concurrent_put(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        assert sorted(executor.map(put_files, [cache_dir] * 4, range(4))) == [0, 1, 2, 3]
+    cache = FileDownloadCache(cache_dir)
+    assert cache.get('sim', 'output/shared.json') == b'shared content'
+    for worker in range(4):
+        for ii in range(20):
+            assert cache.get('sim', 'output/%d_%d.json' % (worker, ii)) == b'%d-%d' % (worker, ii)
+    assert not [fname for _, _, files in os.walk(cache_dir) for fname in files if fname.endswith('.tmp')]
+
+
+def test_platform_downloads_changed_outputs_again(tmp_path):
+    simulation = FakeCOMPSSimulation('sim', {OUTPUT: 5})
+    platform = FakePlatform({OUTPUT: b'first'})
+    cached = CachedDownloadPlatform(platform, str(tmp_path))
+    assert cached.get_files(simulation, [OUTPUT]) == {OUTPUT: b'first'}
+    assert cached.get_files(simulation, [OUTPUT]) == {OUTPUT: b'first'}
+    assert platform.downloaded == [OUTPUT]
+
+    # the simulation is rerun and its output replaced
+    simulation.outputs = {OUTPUT: 6}
+    platform.contents = {OUTPUT: b'second'}
+    assert cached.get_files(simulation, [OUTPUT]) == {OUTPUT: b'second'}
+    assert platform.downloaded == [OUTPUT, OUTPUT]
+
+
+def test_get_files_by_id_saves_cached_files(tmp_path):
+    platform = FakePlatform({'expt/U5_PfPR_ClinicalIncidence.csv': b'a,b\n1,2\n'})
+    platform.simulation = FakeCOMPSSimulation('wi', {'expt/U5_PfPR_ClinicalIncidence.csv': 8})
+    cached = CachedDownloadPlatform(platform, str(tmp_path / 'cache'))
+    for _ in range(2):
+        cached.get_files_by_id('wi', None, ['expt/U5_PfPR_ClinicalIncidence.csv'], str(tmp_path / 'out'))
+    assert platform.downloaded == ['expt/U5_PfPR_ClinicalIncidence.csv']
+    with open(str(tmp_path / 'out' / 'wi' / 'expt' / 'U5_PfPR_ClinicalIncidence.csv'), 'rb') as f:
+        assert f.read() == b'a,b\n1,2\n'
+
+
+def test_platform_without_output_listing_is_not_cached(tmp_path):
+    class Item:
+        id = 'sim'
+
+    platform = FakePlatform({OUTPUT: b'first'})
+    cached = CachedDownloadPlatform(platform, str(tmp_path))
+    for _ in range(2):
+        assert cached.get_files(Item(), [OUTPUT]) == {OUTPUT: b'first'}
+    assert platform.downloaded == [OUTPUT, OUTPUT]
@@ -0,0 +1,151 @@
+import json
+import os
+import sys
+import pandas as pd
+import pytest
+
+# dtk_post_process runs on the compute node next to dtk_get_burden_functions, which it imports as a top-level module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'snt', 'dtk_post_processing'))
+import dtk_post_process  # noqa: E402
+import dtk_get_burden_functions  # noqa: E402
+
+AGE_BINS = [1, 5, 15, 30, 50, 125]
+SUMMARY_CHANNELS = ['Average Population by Age Bin', 'New Infections by Age Bin', 'PfPR by Age Bin',
+                    'PfPR by Age Bin-HRP2', 'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin']
+EVENT_CHANNELS = ['Received_Treatment', 'Received_Severe_Treatment', 'Bednet_Using']
+FILTERED_CHANNELS = ['Statistical Population', 'New Clinical Cases', 'New Severe Cases', 'PfHRP2 Prevalence',
+                     'Blood Smear Parasite Prevalence', 'Adult Vectors']
+
+
+def write_json(path, content):
+    with open(path, 'w') as f:
+        json.dump(content, f)
+
+
+def write_simulation(sim_dir, config, custom_reports, years=(2020,), event_recorder=False):
+    output_path = os.path.join(str(sim_dir), 'output')
+    os.makedirs(output_path)
+    write_json(os.path.join(str(sim_dir), 'config.json'), {'parameters': config})
+    write_json(os.path.join(str(sim_dir), 'custom_reports.json'), custom_reports)
+    for year in years:
+        write_json(os.path.join(output_path, 'MalariaSummaryReport_Monthly%d.json' % year),
+                   {'Metadata': {'Age Bins': AGE_BINS},
+                    'DataByTimeAndAgeBins': {channel: [[0.1] * len(AGE_BINS)] * 13 for channel in SUMMARY_CHANNELS}})
+    num_days = 365 * len(years)
+    for fname, channels in (('ReportEventCounter.json', EVENT_CHANNELS),
+                            ('ReportMalariaFiltered.json', FILTERED_CHANNELS)):
+        write_json(os.path.join(output_path, fname),
+                   {'Channels': {channel: {'Data': [1.0] * num_days} for channel in channels}})
+    if event_recorder:
+        pd.DataFrame({'Time': [10, 40], 'Age': [365.0, 3650.0],
+                      'Event_Name': ['Received_Severe_Treatment'] * 2}).to_csv(
+            os.path.join(output_path, 'ReportEventRecorder.csv'), index=False)
+    return output_path
+
+
+CUSTOM_REPORTS = {'Reports': [{'class': 'ReportEventCounter'}, {'class': 'ReportMalariaFiltered'},
+                              {'class': 'MalariaSummaryReport', 'Filename_Suffix': 'Monthly2020'}]}
+
+
+def test_configured_reports(tmp_path):
+    write_simulation(tmp_path, {'Report_Event_Recorder': 1, 'Enable_Default_Reporting': 0}, CUSTOM_REPORTS)
+    assert dtk_post_process.configured_reports(str(tmp_path)) == {'ReportEventRecorder', 'ReportEventCounter',
+                                                                  'ReportMalariaFiltered', 'MalariaSummaryReport'}
+    assert dtk_post_process.configured_reports(str(tmp_path / 'missing')) is None
+    assert dtk_post_process.report_name('output/MalariaSummaryReport_Monthly2020.json') == 'MalariaSummaryReport'
+
+
+def test_application_writes_tables(tmp_path):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 1}, CUSTOM_REPORTS, event_recorder=True)
+    manifest = dtk_post_process.application(output_path)
+    names = [table['name'] for table in manifest['tables']]
+    assert 'U5_PfPR_ClinicalIncidence_severeTreatment' in names
+    assert 'newInfections_PfPR_cases_monthly_byAgeGroup_withU1U5' in names
+    severe = pd.read_csv(os.path.join(output_path, 'Treated_Severe_Monthly_Cases_By_Age.csv'))
+    assert severe['Num_all_ages_Received_Severe_Treatment'].sum() == 2
+    assert not pd.read_csv(os.path.join(output_path, 'U5_PfPR_ClinicalIncidence.csv')).isna().any().any()
+
+
+def test_application_skips_reports_that_are_not_configured(tmp_path):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 0}, CUSTOM_REPORTS)
+    manifest = dtk_post_process.application(output_path)
+    names = [table['name'] for table in manifest['tables']]
+    assert 'U5_PfPR_ClinicalIncidence' in names
+    assert 'Treated_Severe_Monthly_Cases_By_Age' not in names
+
+
+def test_application_raises_for_missing_configured_report(tmp_path):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 1}, CUSTOM_REPORTS)
+    with pytest.raises(FileNotFoundError):
+        dtk_post_process.application(output_path)
+
+
+def test_application_raises_for_missing_report_without_configuration(tmp_path):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 0}, CUSTOM_REPORTS)
+    os.remove(os.path.join(str(tmp_path), 'config.json'))
+    with pytest.raises(FileNotFoundError):
+        dtk_post_process.application(output_path)
+
+
+def test_each_report_is_read_once(tmp_path, monkeypatch):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 0}, CUSTOM_REPORTS, years=(2020, 2021, 2022))
+    loaded = []
+    load = json.load
+
+    def counting_load(f):
+        # the reports, not the simulation's configuration files
+        if os.path.dirname(f.name) == output_path:
+            loaded.append(os.path.basename(f.name))
+        return load(f)
+
+    monkeypatch.setattr(dtk_get_burden_functions.json, 'load', counting_load)
+    dtk_post_process.application(output_path)
+    assert sorted(loaded) == ['MalariaSummaryReport_Monthly2020.json', 'MalariaSummaryReport_Monthly2021.json',
+                              'MalariaSummaryReport_Monthly2022.json', 'ReportEventCounter.json',
+                              'ReportMalariaFiltered.json']
+
+
+@pytest.mark.parametrize('output_format', ['csv', 'parquet'])
+def test_manifest_lists_written_tables(tmp_path, output_format):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 1}, CUSTOM_REPORTS, years=(2020, 2021),
+                                   event_recorder=True)
+    manifest = dtk_post_process.application(output_path, output_format=output_format)
+    assert manifest['start_year'] == 2020 and manifest['end_year'] == 2021 and manifest['format'] == output_format
+    with open(os.path.join(output_path, dtk_post_process.MANIFEST_FILENAME)) as f:
+        assert json.load(f) == manifest
+    for table in manifest['tables']:
+        assert table['file'] == table['name'] + '.' + output_format
+        path = os.path.join(output_path, table['file'])
+        adf = pd.read_parquet(path) if output_format == 'parquet' else pd.read_csv(path)
+        assert len(adf) == table['rows'] and list(adf.columns) == table['columns']
+    # the tables are written in the order they were created, the severe treatment tables last
+    assert manifest['tables'][0]['name'] == 'U1_PfPR_ClinicalIncidence'
+    assert manifest['tables'][-1]['name'] == 'U5_PfPR_ClinicalIncidence_severeTreatment'
+
+
+def test_severe_treatment_tables_merge_tables_in_memory(tmp_path):
+    output_path = write_simulation(tmp_path, {'Report_Event_Recorder': 1}, CUSTOM_REPORTS, event_recorder=True)
+    dtk_post_process.application(output_path)
+    incidence = pd.read_csv(os.path.join(output_path, 'U1_PfPR_ClinicalIncidence.csv'))
+    merged = pd.read_csv(os.path.join(output_path, 'U1_PfPR_ClinicalIncidence_severeTreatment.csv'))
+    pd.testing.assert_frame_equal(merged[incidence.columns], incidence)
+    # neither event is of a child under 1 (the ages are 1 and 10 years)
+    assert merged['Num_U1_Received_Severe_Treatment'].sum() == 0
+    severe = pd.read_csv(os.path.join(output_path, 'Treated_Severe_Monthly_Cases_By_Age.csv'))
+    assert severe[['year', 'month']].values.tolist() == [[2020, 1], [2020, 2]]
+
+
+def test_simulation_outputs_context(tmp_path):
+    output_path = write_simulation(tmp_path, {}, CUSTOM_REPORTS, years=(2020, 2021))
+    outputs = dtk_get_burden_functions.SimulationOutputs(output_path, 2020, 2021)
+    arrays = outputs.summary_report_arrays(['PfPR by Age Bin'])
+    assert arrays['PfPR by Age Bin'].shape == (2, 13, len(AGE_BINS))
+    assert outputs.age_bins().tolist() == AGE_BINS
+    channels = outputs.report_channels('ReportEventCounter.json', ['Received_Treatment', 'Received_Vaccine'])
+    assert list(channels) == ['Received_Treatment'] and len(channels['Received_Treatment']) == 2 * 365
+
+    outputs.add_table(pd.DataFrame({'a': [1]}), 'second.csv')
+    outputs.add_table(pd.DataFrame({'b': [2.5]}), 'first.csv')
+    assert outputs.table('first.csv')['b'].tolist() == [2.5]
+    assert [table['file'] for table in outputs.write()] == ['second.csv', 'first.csv']
+    assert pd.read_csv(os.path.join(output_path, 'first.csv'))['b'].tolist() == [2.5]
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from snt.analyzers.analyze_helpers import monthlySevereTreatedByAgeAnalyzer
+from snt.analyzers.event_recorder import count_events_by_month_and_age, iter_event_chunks
+from snt.analyzers.sim_calendar import month_of_day
+from snt.dtk_post_processing import dtk_get_burden_functions
+
+EVENT = 'Received_Severe_Treatment'
+AGE_GROUPS = {'U1': (0, 1), 'U5': (0.25, 5), 'all_ages': (0, 200)}
+
+
+def event_recorder(num_rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Time': np.sort(rng.integers(0, 3 * 365, num_rows)).astype(float),
+                         'Node_ID': 1,
+                         'Event_Name': rng.choice([EVENT, 'Received_Treatment', 'Births'], num_rows),
+                         'Individual_ID': np.arange(num_rows),
+                         'Age': rng.random(num_rows) * 365 * 30,
+                         'Gender': rng.choice(['M', 'F'], num_rows)})
+
+
+def csv_bytes(adf):
+    # ReportEventRecorder.csv separates the columns with ', '
+    return adf.to_csv(index=False).replace(',', ', ').encode('utf-8')
+
+
+def reference_counts(adf, start_year):
+    # count with a group-by of the filtered events, as monthlySevereTreatedByAgeAnalyzer did before
+    events = adf[adf['Event_Name'] == EVENT].copy()
+    events['month'] = month_of_day(events['Time'] % 365)
+    events['year'] = events['Time'] // 365 + start_year
+    events['age in years'] = events['Age'] / 365
+    counts = {}
+    for label, (agemin, agemax) in AGE_GROUPS.items():
+        in_group = events[(events['age in years'] < agemax) & (events['age in years'] > agemin)]
+        counts[label] = in_group.groupby(['year', 'month']).size()
+    return pd.DataFrame(counts).fillna(0).astype(int)
+
+
+@pytest.mark.parametrize('chunksize', [7, 500000])
+@pytest.mark.parametrize('source_type', ['bytes', 'str', 'path', 'frame'])
+def test_counts_match_group_by(tmp_path, chunksize, source_type):
+    adf = event_recorder()
+    content = csv_bytes(adf)
+    (tmp_path / 'ReportEventRecorder.csv').write_bytes(content)
+    source = {'bytes': content, 'str': content.decode('utf-8'), 'path': str(tmp_path / 'ReportEventRecorder.csv'),
+              'frame': adf}[source_type]
+    years, months, counts = count_events_by_month_and_age(source, EVENT, 2020, AGE_GROUPS, chunksize=chunksize)
+
+    expected = reference_counts(adf, 2020)
+    # one entry per month up to the month of the last event
+    assert len(years) == len(months) == len(counts['all_ages'])
+    assert (years[-1], months[-1]) == expected.index[-1]
+    result = pd.DataFrame(counts, index=pd.MultiIndex.from_arrays([years, months], names=['year', 'month']))
+    result = result[(result > 0).any(axis=1)]
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+
+def test_events_are_filtered_in_chunks():
+    chunks = list(iter_event_chunks(csv_bytes(event_recorder(num_rows=20)), EVENT, chunksize=5))
+    assert 1 < len(chunks) <= 4
+    assert all(time.dtype == np.float64 and age.dtype == np.float64 for time, age in chunks)
+    assert sum(len(time) for time, _ in chunks) == (event_recorder(num_rows=20)['Event_Name'] == EVENT).sum()
+
+
+def test_no_events():
+    years, months, counts = count_events_by_month_and_age(csv_bytes(event_recorder()), 'Received_Vaccine', 2020,
+                                                          AGE_GROUPS)
+    assert len(years) == len(months) == 0
+    assert {label: len(values) for label, values in counts.items()} == {'U1': 0, 'U5': 0, 'all_ages': 0}
+
+
+def test_post_processing_copy_matches(tmp_path):
+    (tmp_path / 'ReportEventRecorder.csv').write_bytes(csv_bytes(event_recorder()))
+    counts = dtk_get_burden_functions.count_events_by_month_and_age(str(tmp_path / 'ReportEventRecorder.csv'), EVENT,
+                                                                    AGE_GROUPS, chunksize=50)
+    _, _, expected = count_events_by_month_and_age(str(tmp_path / 'ReportEventRecorder.csv'), EVENT, 2020,
+                                                   AGE_GROUPS)
+    assert list(counts) == list(expected)
+    for label in expected:
+        np.testing.assert_array_equal(counts[label], expected[label])
+
+
+def test_severe_treated_analyzer_map():
+    adf = event_recorder()
+    analyzer = monthlySevereTreatedByAgeAnalyzer('expt', start_year=2020)
+    simdata = analyzer.map({analyzer.filenames[0]: csv_bytes(adf)},
+                           SimpleNamespace(tags={'admin_name': 'A', 'Run_Number': 2}))
+
+    expected = reference_counts(adf, 2020).reset_index()
+    assert simdata['year'].tolist() == expected['year'].tolist()
+    assert simdata['month'].tolist() == expected['month'].tolist()
+    for label in AGE_GROUPS:
+        assert simdata['Num_%s_Received_Severe_Treatment' % label].tolist() == expected[label].tolist()
+    assert (simdata['admin_name'] == 'A').all() and (simdata['Run_Number'] == 2).all()
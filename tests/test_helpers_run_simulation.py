@@ -0,0 +1,71 @@
+import os
+from types import SimpleNamespace
+import pytest
+from snt import helpers_run_simulation
+
+
+class FakeExperiment:
+
+    def __init__(self):
+        self.id = 'exp-1'
+        self.name = 'future_baseline'
+        self.succeeded = True
+        self.parent_id = None
+        self.calls = []
+
+    def run(self, wait_until_done, platform):
+        self.calls.append(('run', wait_until_done))
+
+    def wait(self, platform):
+        self.calls.append(('wait',))
+
+
+class FakeProcess:
+
+    def __init__(self, returncode):
+        self.returncode = returncode
+
+    def poll(self):
+        return self.returncode
+
+
+def run_experiment(tmp_path, monkeypatch, returncode, incremental_analysis=True):
+    experiment = FakeExperiment()
+    tracked = []
+    monkeypatch.setattr(helpers_run_simulation, '_config_experiment', lambda params, manifest, **kwargs: experiment)
+    monkeypatch.setattr(helpers_run_simulation, '_pre_run', lambda experiment, **kwargs: None)
+    monkeypatch.setattr(helpers_run_simulation, '_launch_incremental_analysis',
+                        lambda params, manifest, experiment: FakeProcess(returncode))
+    monkeypatch.setattr(helpers_run_simulation, 'update_scenario_status_to_done', lambda fname, index: None)
+    monkeypatch.setattr(helpers_run_simulation, 'update_suite_tracking',
+                        lambda experiment, suite, experiment_type, tracking_file, time_stamp: tracked.append(suite))
+    platform = SimpleNamespace(get_item=lambda item_id, item_type, raw=False: 'suite')
+    params = SimpleNamespace(experiment_type='future', scenario_fname='scenarios.csv', scen_index=0)
+    manifest = SimpleNamespace(TRACKING_DIR=str(tmp_path / 'tracking'))
+    os.makedirs(manifest.TRACKING_DIR)
+    helpers_run_simulation.run_experiment(platform, params, manifest, lambda: None, 'suite-1', 'tracking.csv',
+                                          incremental_analysis=incremental_analysis)
+    return experiment, tracked, helpers_run_simulation._ready_flag_file(manifest, experiment)
+
+
+@pytest.mark.parametrize('returncode', [None, 0])
+def test_incremental_analysis_is_not_enqueued(tmp_path, monkeypatch, returncode):
+    # the incremental analyzer is still running or has finished the analysis
+    experiment, tracked, flag_file = run_experiment(tmp_path, monkeypatch, returncode)
+    assert experiment.calls == [('run', False), ('wait',)]
+    assert tracked == ['suite']
+    assert not os.path.exists(flag_file)
+
+
+def test_failed_incremental_analysis_is_enqueued(tmp_path, monkeypatch):
+    experiment, tracked, flag_file = run_experiment(tmp_path, monkeypatch, returncode=1)
+    assert tracked == ['suite']
+    with open(flag_file) as f:
+        assert f.read() == 'exp-1,future_baseline,future\n'
+
+
+def test_experiment_is_enqueued_without_incremental_analysis(tmp_path, monkeypatch):
+    experiment, _, flag_file = run_experiment(tmp_path, monkeypatch, returncode=None, incremental_analysis=False)
+    assert experiment.calls == [('run', True)]
+    assert os.path.exists(flag_file)
+    assert not os.path.exists(os.path.join(str(tmp_path / 'tracking'), 'failed_experiments.log'))
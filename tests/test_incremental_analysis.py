@@ -0,0 +1,85 @@
+import pytest
+from idmtools.entities import IAnalyzer
+from snt.analyzers import incremental_analysis
+from snt.analyzers.incremental_analysis import IncrementalAnalysis
+from tests.test_simulation_prefilter import FakeCOMPSSimulation
+
+OUTPUT = 'output/InsetChart.json'
+
+
+class FileAnalyzer(IAnalyzer):
+
+    def __init__(self, working_dir='.'):
+        super(FileAnalyzer, self).__init__(working_dir=working_dir, filenames=[OUTPUT])
+
+    def map(self, data, simulation):
+        return None
+
+    def reduce(self, all_data):
+        return None
+
+
+class PollingPlatform:
+    """
+    Platform returning the next (status, has output) state of each simulation at each poll.
+    """
+
+    def __init__(self, polls):
+        self.polls = list(polls)
+        self.num_polls = 0
+
+    def get_children(self, item_id, item_type, force=False):
+        states = self.polls[min(self.num_polls, len(self.polls) - 1)]
+        self.num_polls += 1
+        return [FakeCOMPSSimulation(sim_id, {OUTPUT: 10} if has_output else {}, status=status)
+                for sim_id, (status, has_output) in states.items()]
+
+
+def run_incremental(tmp_path, monkeypatch, polls, fail_provisional=False):
+    passes = []
+
+    def analyze_pass(self, exclude_ids, provisional):
+        passes.append((sorted(exclude_ids), provisional))
+        if provisional and fail_provisional:
+            raise ConnectionError('lost connection')
+        return True
+
+    monkeypatch.setattr(IncrementalAnalysis, 'analyze_pass', analyze_pass)
+    monkeypatch.setattr(incremental_analysis.time, 'sleep', lambda seconds: None)
+    platform = PollingPlatform(polls)
+    analysis = IncrementalAnalysis(platform, 'exp', [FileAnalyzer(str(tmp_path))], str(tmp_path / 'cache'),
+                                   poll_interval=0)
+    return analysis.run(), passes, platform
+
+
+def test_passes_while_the_experiment_runs(tmp_path, monkeypatch):
+    polls = [
+        # the first simulation to finish is missing its output while the others run
+        {'a': ('SUCCEEDED', False), 'b': ('RUNNING', False), 'c': ('RUNNING', False)},
+        {'a': ('SUCCEEDED', False), 'b': ('SUCCEEDED', True), 'c': ('RUNNING', False)},
+        {'a': ('SUCCEEDED', False), 'b': ('SUCCEEDED', True), 'c': ('RUNNING', False)},
+        {'a': ('SUCCEEDED', False), 'b': ('SUCCEEDED', True), 'c': ('SUCCEEDED', True)},
+    ]
+    result, passes, platform = run_incremental(tmp_path, monkeypatch, polls)
+    assert platform.num_polls == 4
+    # one provisional pass when b succeeds (not again while nothing new succeeds), then the final pass
+    assert passes == [(['a', 'c'], True), (['a'], False)]
+    assert sorted(result.included) == ['b', 'c']
+
+
+def test_failed_provisional_pass_is_retried(tmp_path, monkeypatch):
+    polls = [
+        {'a': ('SUCCEEDED', True), 'b': ('RUNNING', False)},
+        {'a': ('SUCCEEDED', True), 'b': ('RUNNING', False)},
+        {'a': ('SUCCEEDED', True), 'b': ('FAILED', False)},
+    ]
+    result, passes, _ = run_incremental(tmp_path, monkeypatch, polls, fail_provisional=True)
+    assert passes == [(['b'], True), (['b'], True), (['b'], False)]
+    assert result.included == ['a']
+
+
+def test_final_pass_requires_simulations_to_analyze(tmp_path, monkeypatch):
+    polls = [{'a': ('SUCCEEDED', False), 'b': ('RUNNING', False)},
+             {'a': ('SUCCEEDED', False), 'b': ('SUCCEEDED', False)}]
+    with pytest.raises(RuntimeError, match='All 2 succeeded simulations'):
+        run_incremental(tmp_path, monkeypatch, polls)
@@ -0,0 +1,63 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from snt.intervention_tables import InterventionTable, admin_rows, as_frame
+
+
+def intervention_df():
+    return pd.DataFrame({'admin_name': ['Kano', 'KANO', 'Lagos', 'Kano', 'Oyo', 'Lagos', np.nan],
+                         'seed': [1, 1, 1, 2, 1, 2, 1],
+                         'coverage': [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7]},
+                        index=[10, 11, 12, 13, 14, 15, 16])
+
+
+@pytest.mark.parametrize('admin', ['Kano', 'kano', 'Lagos', 'Oyo', 'Abuja'])
+@pytest.mark.parametrize('seed_index', [None, 1, 2, 3])
+@pytest.mark.parametrize('case_sensitive', [True, False])
+def test_lookup_matches_filter(admin, seed_index, case_sensitive):
+    df = intervention_df()
+    expected = admin_rows(df, admin, seed_index=seed_index, case_sensitive=case_sensitive)
+    result = admin_rows(InterventionTable(df), admin, seed_index=seed_index, case_sensitive=case_sensitive)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('seed_index', [None, 1])
+def test_lookup_without_seed_column(seed_index):
+    df = intervention_df().drop(columns='seed')
+    pd.testing.assert_frame_equal(admin_rows(InterventionTable(df), 'Kano', seed_index=seed_index),
+                                  admin_rows(df, 'Kano', seed_index=seed_index))
+    assert len(admin_rows(df, 'Kano', seed_index=seed_index)) == 2
+
+
+def test_lookup_by_other_column():
+    df = intervention_df().rename(columns={'admin_name': 'LGA'})
+    table = InterventionTable(df)
+    pd.testing.assert_frame_equal(table.rows('Lagos', column='LGA'), admin_rows(df, 'Lagos', column='LGA'))
+    assert table.rows('Lagos').empty
+
+
+def test_empty_table(tmp_path):
+    table = InterventionTable.read_csv(str(tmp_path / 'missing.csv'))
+    assert table.empty and len(table) == 0
+    assert table.rows('Kano', seed_index=1).empty
+
+
+def test_lookups_do_not_alias_the_table():
+    df = intervention_df()
+    table = InterventionTable(df)
+    rows = table.rows('Kano')
+    rows['coverage'] = 1.0
+    assert df.loc[10, 'coverage'] == 0.1
+    np.testing.assert_allclose(table.rows('Kano')['coverage'], [0.1, 0.4])
+
+
+def test_pickled_table_rebuilds_indexes():
+    table = InterventionTable(intervention_df())
+    table.rows('Kano', seed_index=1)
+    assert table._indexes
+    copy = pickle.loads(pickle.dumps(table))
+    assert copy._indexes == {}
+    pd.testing.assert_frame_equal(copy.rows('Kano', seed_index=1), table.rows('Kano', seed_index=1))
+    assert as_frame(copy).equals(as_frame(table))
+    assert sorted(table.admins()) == ['KANO', 'Kano', 'Lagos', 'Oyo']
@@ -0,0 +1,103 @@
+import json
+import os
+import pandas as pd
+import pytest
+from idmtools.entities import IAnalyzer
+from snt.analyzers.local_analysis import discover_simulations, run_local_analysis
+
+OUTPUT = 'output/InsetChart.json'
+
+
+class TagAnalyzer(IAnalyzer):
+    """
+    Map each simulation to its tags and output, leaving out simulations tagged skip.
+    """
+
+    def __init__(self, parse=True):
+        super(TagAnalyzer, self).__init__(parse=parse, filenames=[OUTPUT])
+        self.reduced = None
+
+    def filter(self, simulation):
+        return not simulation.tags.get('skip', False)
+
+    def map(self, data, simulation):
+        value = data[OUTPUT]['value'] if self.parse else json.loads(data[OUTPUT])['value']
+        return simulation.tags['admin_name'], value, os.getpid()
+
+    def reduce(self, all_data):
+        self.reduced = {simulation.id: result for simulation, result in all_data.items()}
+
+
+def write_experiment(tmp_path, num_sims=6):
+    for ii in range(num_sims):
+        (tmp_path / ('sim%d' % ii) / 'output').mkdir(parents=True)
+        (tmp_path / ('sim%d' % ii) / OUTPUT).write_text(json.dumps({'value': ii * 10}))
+    return str(tmp_path)
+
+
+def test_discover_simulations_from_sidecar_files(tmp_path):
+    experiment_dir = write_experiment(tmp_path, num_sims=2)
+    (tmp_path / 'sim1' / 'tags.json').write_text(json.dumps({'admin_name': 'B', 'Run_Number': 1}))
+    # a directory with only tags, and directories and files that are not simulations
+    (tmp_path / 'sim2').mkdir()
+    (tmp_path / 'sim2' / 'tags.json').write_text(json.dumps({'admin_name': 'C'}))
+    (tmp_path / 'logs').mkdir()
+    (tmp_path / 'notes.txt').write_text('')
+
+    simulations = discover_simulations(experiment_dir)
+    assert [simulation.id for simulation in simulations] == ['sim0', 'sim1', 'sim2']
+    assert [simulation.tags for simulation in simulations] == [{}, {'admin_name': 'B', 'Run_Number': 1},
+                                                               {'admin_name': 'C'}]
+    assert simulations[1].sim_dir == os.path.join(experiment_dir, 'sim1')
+
+
+def test_discover_simulations_from_tags_csv(tmp_path):
+    experiment_dir = write_experiment(tmp_path, num_sims=2)
+    tag_df = pd.DataFrame({'simid': ['id0', 'id1'], 'outpath': ['sim0', str(tmp_path / 'sim1')],
+                           'admin_name': ['A', 'B'], 'Run_Number': [0, 1]})
+    tag_df.to_csv(str(tmp_path / 'tags.csv'), index=False)
+
+    simulations = discover_simulations(experiment_dir, tags_csv=str(tmp_path / 'tags.csv'))
+    assert [simulation.id for simulation in simulations] == ['id0', 'id1']
+    assert [simulation.tags for simulation in simulations] == [{'admin_name': 'A', 'Run_Number': 0},
+                                                               {'admin_name': 'B', 'Run_Number': 1}]
+    # relative paths are joined to experiment_dir
+    assert [simulation.sim_dir for simulation in simulations] == [os.path.join(experiment_dir, 'sim0'),
+                                                                  str(tmp_path / 'sim1')]
+
+    # without an id column, the simulation directory name is the id
+    simulations = discover_simulations(experiment_dir, tags_csv=tag_df.drop(columns='simid'))
+    assert [simulation.id for simulation in simulations] == ['sim0', 'sim1']
+
+
+@pytest.mark.parametrize('parse', [True, False])
+def test_process_pool_matches_in_process_map(tmp_path, parse):
+    experiment_dir = write_experiment(tmp_path)
+    tag_df = pd.DataFrame({'outpath': ['sim%d' % ii for ii in range(6)], 'admin_name': list('AABBCC'),
+                           'skip': [False] * 5 + [True]})
+    simulations = discover_simulations(experiment_dir, tags_csv=tag_df)
+
+    in_process = TagAnalyzer(parse=parse)
+    run_local_analysis([in_process], simulations, max_workers=1)
+    pooled = TagAnalyzer(parse=parse)
+    run_local_analysis([pooled], simulations, max_workers=2, chunksize=2)
+
+    expected = {'sim%d' % ii: (admin, ii * 10) for ii, admin in enumerate('AABBC')}
+    assert {sim_id: result[:2] for sim_id, result in in_process.reduced.items()} == expected
+    assert {sim_id: result[:2] for sim_id, result in pooled.reduced.items()} == expected
+    assert {result[2] for result in in_process.reduced.values()} == {os.getpid()}
+    assert os.getpid() not in {result[2] for result in pooled.reduced.values()}
+
+
+def test_missing_outputs(tmp_path):
+    experiment_dir = write_experiment(tmp_path, num_sims=3)
+    os.remove(str(tmp_path / 'sim1' / OUTPUT))
+    simulations = discover_simulations(experiment_dir)
+    for simulation in simulations:
+        simulation.tags['admin_name'] = 'A'
+
+    analyzer = TagAnalyzer()
+    run_local_analysis([analyzer], simulations, max_workers=1)
+    assert sorted(analyzer.reduced) == ['sim0', 'sim2']
+    with pytest.raises(FileNotFoundError):
+        run_local_analysis([TagAnalyzer()], simulations, max_workers=1, skip_missing=False)
@@ -0,0 +1,78 @@
+from idmtools.entities import IAnalyzer
+from snt.analyzers.local_analysis import LocalSimulation, run_local_analysis
+from snt.analyzers.map_cache import CachedAnalyzer, MapResultCache, input_fingerprint
+from tests.test_simulation_prefilter import FakeCOMPSSimulation
+
+OUTPUT = 'output/out.txt'
+
+
+class ContentAnalyzer(IAnalyzer):
+
+    def __init__(self, working_dir='.'):
+        super(ContentAnalyzer, self).__init__(working_dir=working_dir, parse=False, filenames=[OUTPUT])
+        self.mapped = []
+        self.reduced = None
+
+    def map(self, data, simulation):
+        self.mapped.append(str(simulation.id))
+        return data[OUTPUT].decode('utf-8')
+
+    def reduce(self, all_data):
+        self.reduced = {str(simulation.id): result for simulation, result in all_data.items()}
+        return self.reduced
+
+
+def write_simulations(tmp_path, contents):
+    simulations = []
+    for sim_id, content in contents.items():
+        (tmp_path / sim_id / 'output').mkdir(parents=True, exist_ok=True)
+        (tmp_path / sim_id / OUTPUT).write_text(content)
+        simulations.append(LocalSimulation(sim_id, {}, str(tmp_path / sim_id)))
+    return simulations
+
+
+def run_cached(simulations, cache_dir):
+    analyzer = ContentAnalyzer()
+    run_local_analysis([CachedAnalyzer(analyzer, MapResultCache(cache_dir), namespace='exp')], simulations,
+                       max_workers=1)
+    return analyzer
+
+
+def test_cached_results_are_reused(tmp_path):
+    simulations = write_simulations(tmp_path / 'sims', {'a': '1', 'b': '2', 'c': '3'})
+    assert sorted(run_cached(simulations, tmp_path / 'cache').mapped) == ['a', 'b', 'c']
+    analyzer = run_cached(simulations, tmp_path / 'cache')
+    assert analyzer.mapped == []
+    assert analyzer.reduced == {'a': '1', 'b': '2', 'c': '3'}
+
+
+def test_changed_outputs_are_mapped_again(tmp_path):
+    simulations = write_simulations(tmp_path / 'sims', {'a': '1', 'b': '2'})
+    run_cached(simulations, tmp_path / 'cache')
+    write_simulations(tmp_path / 'sims', {'b': '22'})
+    analyzer = run_cached(simulations, tmp_path / 'cache')
+    assert analyzer.mapped == ['b']
+    assert analyzer.reduced == {'a': '1', 'b': '22'}
+
+
+def test_reduce_only_includes_analyzed_simulations(tmp_path):
+    # cached results of simulations left out of an analysis (e.g., by exclude_ids) are not reduced
+    simulations = write_simulations(tmp_path / 'sims', {'a': '1', 'b': '2', 'c': '3'})
+    run_cached(simulations, tmp_path / 'cache')
+    analyzer = run_cached(simulations[:2], tmp_path / 'cache')
+    assert analyzer.reduced == {'a': '1', 'b': '2'}
+
+
+def test_platform_fingerprint_uses_output_metadata():
+    simulation = FakeCOMPSSimulation('a', {OUTPUT: 10})
+    fingerprint = input_fingerprint(simulation, [OUTPUT])
+    assert fingerprint == [(OUTPUT, 10, 'md5-%s' % OUTPUT)]
+    simulation.outputs = {OUTPUT: 12}
+    assert input_fingerprint(simulation, [OUTPUT]) != fingerprint
+    assert input_fingerprint(FakeCOMPSSimulation('b', {}), [OUTPUT]) == [(OUTPUT, None, None)]
+
+
+def test_no_fingerprint_is_never_current(tmp_path):
+    cache = MapResultCache(str(tmp_path))
+    cache.put('exp', 'key', 'a', None, 'result')
+    assert not cache.is_current('exp', 'key', 'a', None)
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from snt.analyzers.analyze_helpers import monthlyEventAnalyzer
+from snt.analyzers.analyze_streaming import StreamingReduceAnalyzer
+from snt.analyzers.local_analysis import run_local_analysis
+from snt.analyzers.output_files import output_path, read_output, typed_output_frame, write_output
+from tests.test_analyze_streaming import CHANNELS, write_simulations
+
+
+def output_df():
+    return pd.DataFrame({'admin_name': ['A', 'B', 'A'], 'AgeGroup': ['0-5', '0-5', '5-15'],
+                         'year': [2020.0, 2020.0, 2021.0], 'month': [1, 2, 3], 'Run_Number': [0.0, 1.5, np.nan],
+                         'date': ['2020-01-01', '2020-02-01', '2021-03-01'], 'PfPR': [0.25, 0.5, 0.125],
+                         'cases': [1, 2, 3]})
+
+
+def test_output_path():
+    assert output_path('out/U5_PfPR.csv') == 'out/U5_PfPR.csv'
+    assert output_path('out/U5_PfPR.csv', 'parquet') == 'out/U5_PfPR.parquet'
+    with pytest.raises(ValueError):
+        output_path('out/U5_PfPR.csv', 'feather')
+
+
+def test_typed_output_frame():
+    adf = output_df()
+    typed = typed_output_frame(adf)
+    assert isinstance(typed['admin_name'].dtype, pd.CategoricalDtype)
+    assert isinstance(typed['AgeGroup'].dtype, pd.CategoricalDtype)
+    assert typed['year'].dtype == np.int32 and typed['month'].dtype == np.int32
+    # run numbers with missing or fractional values are kept as they are
+    assert typed['Run_Number'].dtype == np.float64
+    assert typed['PfPR'].dtype == np.float32 and typed['cases'].dtype == adf['cases'].dtype
+    assert typed['date'].tolist() == adf['date'].tolist()
+    # the input is not changed
+    assert adf['year'].dtype == np.float64
+
+
+def test_write_and_read_output(tmp_path):
+    adf = output_df()
+    path = str(tmp_path / 'U5_PfPR.csv')
+    assert write_output(adf, path) == path
+    pd.testing.assert_frame_equal(read_output(path), pd.read_csv(path))
+
+    parquet_path = write_output(adf, str(tmp_path / 'U1_PfPR.csv'), 'parquet')
+    assert parquet_path == str(tmp_path / 'U1_PfPR.parquet')
+    assert pq.ParquetFile(parquet_path).metadata.row_group(0).column(0).compression == 'ZSTD'
+    # downstream code keeps using the csv name
+    result = read_output(str(tmp_path / 'U1_PfPR.csv'))
+    pd.testing.assert_frame_equal(result, typed_output_frame(adf))
+    assert result['admin_name'].tolist() == ['A', 'B', 'A']
+    # and a .parquet name finds a csv output
+    pd.testing.assert_frame_equal(read_output(str(tmp_path / 'U5_PfPR.parquet')), pd.read_csv(path))
+
+
+def assert_same_values(parquet_df, csv_df):
+    assert list(parquet_df.columns) == list(csv_df.columns)
+    for col in csv_df.columns:
+        if pd.api.types.is_float_dtype(csv_df[col]):
+            np.testing.assert_allclose(parquet_df[col].astype(np.float64), csv_df[col], rtol=1e-6)
+        else:
+            assert parquet_df[col].astype(str).tolist() == csv_df[col].astype(str).tolist()
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_parquet_output_matches_csv(tmp_path, streaming):
+    simulations = write_simulations(tmp_path / 'sims')
+    outputs = {}
+    for output_format in ['csv', 'parquet']:
+        analyzer = monthlyEventAnalyzer('expt', channels=CHANNELS, working_dir=str(tmp_path / output_format),
+                                        start_year=2020, output_format=output_format)
+        run_local_analysis([StreamingReduceAnalyzer(analyzer) if streaming else analyzer], simulations,
+                           max_workers=1)
+        outputs[output_format] = read_output(str(tmp_path / output_format / 'expt' / 'monthly_Event_Count.csv'))
+    assert os.listdir(str(tmp_path / 'parquet' / 'expt')) == ['monthly_Event_Count.parquet']
+    assert isinstance(outputs['parquet']['admin_name'].dtype, pd.CategoricalDtype)
+    sort_cols = ['admin_name', 'Run_Number', 'date']
+    assert_same_values(outputs['parquet'].sort_values(sort_cols).reset_index(drop=True),
+                       outputs['csv'].sort_values(sort_cols).reset_index(drop=True))
@@ -0,0 +1,66 @@
+import json
+import numpy as np
+import pytest
+from snt.analyzers.report_channels import read_report_channels
+
+
+def report(channels, indent=None):
+    return json.dumps({'Header': {'Channels': len(channels), 'Report_Type': 'InsetChart'}, 'Channels': channels},
+                      indent=indent).encode('utf-8')
+
+
+def expected_channels(content, channels):
+    parsed = json.loads(content)['Channels']
+    return {channel: np.asarray(parsed[channel]['Data'], dtype=np.float64) for channel in channels}
+
+
+def assert_channels_equal(result, expected):
+    assert list(result) == list(expected)
+    for channel in expected:
+        np.testing.assert_array_equal(result[channel], expected[channel])
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_raw_report_matches_json(indent):
+    rng = np.random.default_rng(0)
+    channels = {'Statistical Population': {'Data': rng.random(400).tolist(), 'Units': ''},
+                # Data after another key, and a units string that looks like a key
+                'New Clinical Cases': {'Units': '"Data": [1]', 'Data': rng.integers(0, 50, 400).tolist()},
+                'PfHRP2 Prevalence': {'Data': [], 'Units': 'Fraction'},
+                'Blood Smear Parasite Prevalence': {'Data': [1e-320, -2.5e10, 3.0], 'Units': ''}}
+    content = report(channels, indent=indent)
+    selected = ['New Clinical Cases', 'Statistical Population', 'PfHRP2 Prevalence', 'Blood Smear Parasite Prevalence']
+    assert_channels_equal(read_report_channels(content, selected), expected_channels(content, selected))
+    assert_channels_equal(read_report_channels(content.decode('utf-8'), selected[:1]),
+                          expected_channels(content, selected[:1]))
+
+
+def test_nan_and_infinity_fall_back_to_json():
+    content = report({'Adult Vectors': {'Data': [1.0, float('nan'), float('inf'), -float('inf')], 'Units': ''}})
+    assert b'NaN' in content and b'Infinity' in content
+    result = read_report_channels(content, ['Adult Vectors'])['Adult Vectors']
+    np.testing.assert_array_equal(result, expected_channels(content, ['Adult Vectors'])['Adult Vectors'])
+
+
+def test_missing_channel():
+    content = report({'Statistical Population': {'Data': [1.0]}})
+    with pytest.raises(KeyError):
+        read_report_channels(content, ['Adult Vectors'])
+    assert list(read_report_channels(content, ['Adult Vectors', 'Statistical Population'], missing_ok=True)) == \
+        ['Statistical Population']
+
+
+def test_channel_without_data():
+    # the next channel's Data is not taken for a channel without its own
+    content = report({'Bednet_Using': {'Units': ''}, 'Received_IRS': {'Data': [4.0, 5.0]}})
+    with pytest.raises(KeyError, match='Bednet_Using'):
+        read_report_channels(content, ['Bednet_Using'])
+    result = read_report_channels(content, ['Bednet_Using', 'Received_IRS'], missing_ok=True)
+    assert list(result) == ['Received_IRS']
+    parsed = read_report_channels(json.loads(content), ['Bednet_Using', 'Received_IRS'], missing_ok=True)
+    assert list(parsed) == ['Received_IRS']
+
+
+def test_report_without_channels():
+    with pytest.raises(ValueError):
+        read_report_channels(b'{"Header": {}}', ['Adult Vectors'])
@@ -0,0 +1,102 @@
+import json
+import numpy as np
+import pandas as pd
+from snt.analyzers.local_analysis import LocalSimulation, run_local_analysis
+from snt.analyzers.map_cache import CachedAnalyzer, MapResultCache
+from snt.analyzers.result_tensor import LabeledArray, ResultTensorStore, SummaryReportTensorAnalyzer
+
+AGE_BINS = [5, 15, 30, 50, 125]
+CHANNELS = ['Average Population by Age Bin', 'New Infections by Age Bin', 'PfPR by Age Bin',
+            'Annual Clinical Incidence by Age Bin', 'Annual Severe Incidence by Age Bin']
+OUTPUT = 'newInfections_PfPR_cases_monthly_byAgeGroup.csv'
+
+
+def labeled_array():
+    data = np.arange(24, dtype=np.float64).reshape(2, 3, 4)
+    data[1, 2, 3] = np.nan
+    return LabeledArray(data, ('admin_name', 'year', 'channel'),
+                        {'admin_name': ['A', 'B'], 'year': [2020, 2021, 2022], 'channel': ['w', 'x', 'y', 'z']})
+
+
+def test_sel():
+    array = labeled_array()
+    selected = array.sel(year=[2021, 2022], channel='x')
+    assert selected.dims == ('admin_name', 'year')
+    assert selected.coords == {'admin_name': ['A', 'B'], 'year': [2021, 2022]}
+    np.testing.assert_array_equal(selected.data, [[5, 9], [17, 21]])
+    assert np.shares_memory(selected.data, array.data)
+    np.testing.assert_array_equal(array.sel(channel=['z', 'w'], admin_name='A').data[0], [3, 0])
+
+
+def test_reductions_skip_missing_values():
+    array = labeled_array()
+    np.testing.assert_array_equal(array.sum('year').sel(admin_name='B').data, [48, 51, 54, 34])
+    np.testing.assert_array_equal(array.mean(['admin_name', 'year']).sel(channel='z').data, (3 + 7 + 11 + 15 + 19) / 5)
+    quantiles = array.quantile([0.5, 1], 'year')
+    assert quantiles.dims == ('quantile', 'admin_name', 'channel')
+    np.testing.assert_array_equal(quantiles.sel(quantile=0.5, admin_name='A').data, [4, 5, 6, 7])
+    np.testing.assert_array_equal(quantiles.sel(quantile=1, admin_name='B', channel='z').data, 19)
+
+
+def test_rollup():
+    rolled = labeled_array().rollup('admin_name', {'A': 'S1', 'B': 'S1'})
+    assert rolled.coords['admin_name'] == ['S1']
+    np.testing.assert_array_equal(rolled.sel(admin_name='S1', year=2022).data, [28, 30, 32, 11])
+    assert labeled_array().rollup('admin_name', {'B': 'S2'}).shape == (1, 3, 4)
+
+
+def test_to_frame():
+    adf = labeled_array().to_frame()
+    assert list(adf.columns) == ['admin_name', 'year', 'w', 'x', 'y', 'z']
+    assert adf[['admin_name', 'year']].values.tolist() == [['A', 2020], ['A', 2021], ['A', 2022], ['B', 2020],
+                                                           ['B', 2021], ['B', 2022]]
+    array = labeled_array()
+    array.data[0, 1] = np.nan
+    assert len(array.to_frame()) == 5 and len(array.to_frame(dropna=False)) == 6
+
+
+def test_store_is_kept_when_coords_match(tmp_path):
+    store = ResultTensorStore.create(str(tmp_path), ['A'], [0], [2020], ['Under15'])
+    store.data[0, 0, 0, 0, 0, 0] = 1
+    store.data.flush()
+    del store
+    store = ResultTensorStore.open_or_create(str(tmp_path), ['A'], [0], [2020], ['Under15'])
+    assert store.data[0, 0, 0, 0, 0, 0] == 1
+    del store
+    store = ResultTensorStore.open_or_create(str(tmp_path), ['A', 'B'], [0], [2020], ['Under15'])
+    assert store.shape[0] == 2 and np.isnan(store.data).all()
+
+
+def write_simulations(tmp_path, admins, years):
+    simulations = []
+    for rr, admin in enumerate(admins):
+        sim_dir = tmp_path / 'sims' / admin
+        (sim_dir / 'output').mkdir(parents=True)
+        for year in years:
+            report = {'Metadata': {'Age Bins': AGE_BINS},
+                      'DataByTimeAndAgeBins': {channel: [[(rr + 1) * 10.0] * len(AGE_BINS)] * 13
+                                               for channel in CHANNELS}}
+            (sim_dir / 'output' / ('MalariaSummaryReport_Monthly%d.json' % year)).write_text(json.dumps(report))
+        simulations.append(LocalSimulation(admin, {'admin_name': admin, 'Run_Number': 0}, str(sim_dir)))
+    return simulations
+
+
+def run_cached(tmp_path, simulations, admins):
+    analyzer = SummaryReportTensorAnalyzer('expt', admins, [0], working_dir=str(tmp_path), start_year=2020,
+                                           end_year=2021)
+    run_local_analysis([CachedAnalyzer(analyzer, MapResultCache(str(tmp_path / 'cache')), namespace='expt')],
+                       simulations, max_workers=1)
+    return pd.read_csv(str(tmp_path / 'expt' / OUTPUT))
+
+
+def test_cached_analysis_keeps_store(tmp_path):
+    admins = ['A', 'B', 'C']
+    simulations = write_simulations(tmp_path, admins, [2020, 2021])
+    first = run_cached(tmp_path, simulations, admins)
+    # 3 simulations x 2 years x 12 months x 4 age groups
+    assert len(first) == 288
+    second = run_cached(tmp_path, simulations, admins)
+    pd.testing.assert_frame_equal(second, first)
+    # simulations left out of an analysis are not exported from their earlier slices
+    third = run_cached(tmp_path, simulations[:2], admins)
+    assert sorted(third['admin_name'].unique()) == ['A', 'B']
@@ -0,0 +1,55 @@
+import os
+import pandas as pd
+from snt.analyzers.results_store import ResultsStore
+
+
+def write_outputs(output_dir, scale):
+    os.makedirs(os.path.join(str(output_dir), 'summaries'))
+    pd.DataFrame({'admin_name': ['A', 'A', 'B', 'B'], 'Run_Number': [0, 0, 0, 0], 'year': [2020, 2021, 2020, 2021],
+                  'month': [1, 1, 1, 1], 'Cases U5': [1.0 * scale, 2.0 * scale, 3.0 * scale, 4.0 * scale]}).to_csv(
+        os.path.join(str(output_dir), 'U5_PfPR_ClinicalIncidence.csv'), index=False)
+    pd.DataFrame({'admin_name': ['A'], 'date': ['2020-03-01'], 'Received_Treatment': [5.0]}).to_csv(
+        os.path.join(str(output_dir), 'monthly_Event_Count.csv'), index=False)
+    pd.DataFrame({'State': ['S1'], 'Cases U5_mean': [2.5 * scale]}).to_csv(
+        os.path.join(str(output_dir), 'summaries', 'U5_PfPR_ClinicalIncidence_annual_byState.csv'), index=False)
+
+
+def test_ingest_and_query(tmp_path):
+    write_outputs(tmp_path / 'exp1', 1)
+    write_outputs(tmp_path / 'exp2', 10)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        assert store.ingest('exp1', str(tmp_path / 'exp1'), metadata={'scenario': 'BAU'}) == \
+            ['U5_PfPR_ClinicalIncidence', 'monthly_Event_Count', 'U5_PfPR_ClinicalIncidence_annual_byState']
+        store.ingest('exp2', str(tmp_path / 'exp2'), metadata={'scenario': 'PAAR'})
+        assert store.tables() == ['U5_PfPR_ClinicalIncidence', 'U5_PfPR_ClinicalIncidence_annual_byState',
+                                  'monthly_Event_Count']
+
+        rows = store.query('U5_PfPR_ClinicalIncidence.csv', columns=['Cases U5'], admins=['B'], years=[2021],
+                           metadata={'scenario': 'PAAR'})
+        assert rows.to_dict('records') == [{'experiment': 'exp2', 'Cases U5': 40.0}]
+        events = store.query('monthly_Event_Count', with_metadata=True, months=3)
+        assert list(events['year']) == [2020, 2020] and list(events['scenario']) == ['BAU', 'PAAR']
+
+
+def test_ingest_replaces_experiment_rows(tmp_path):
+    write_outputs(tmp_path / 'exp1', 1)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        store.ingest('exp1', str(tmp_path / 'exp1'), filenames=['U5_PfPR_ClinicalIncidence.csv'])
+        store.ingest('exp1', str(tmp_path / 'exp1'), filenames=['U5_PfPR_ClinicalIncidence.csv'])
+        assert store.tables() == ['U5_PfPR_ClinicalIncidence']
+        assert len(store.query('U5_PfPR_ClinicalIncidence')) == 4
+        store.remove('exp1')
+        assert store.query('U5_PfPR_ClinicalIncidence').empty
+        assert store.experiments().empty
+
+
+def test_ingest_tracking(tmp_path):
+    write_outputs(tmp_path / 'outputs' / 'exp1', 1)
+    pd.DataFrame({'experiment_name': ['exp1', 'exp2'], 'experiment_id': ['id1', 'id2']}).to_csv(
+        str(tmp_path / 'tracking.csv'), index=False)
+    with ResultsStore(str(tmp_path / 'results.db')) as store:
+        assert store.ingest_tracking(str(tmp_path / 'tracking.csv'), str(tmp_path / 'outputs')) == ['exp1']
+        assert store.experiments()['experiment_id'].tolist() == ['id1']
+        total = store.sql('SELECT SUM("Cases U5") AS total FROM U5_PfPR_ClinicalIncidence WHERE experiment = ?',
+                          ['exp1'])
+        assert total['total'][0] == 10
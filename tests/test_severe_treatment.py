@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from snt.analyzers.severe_treatment import reconcile_severe_treatment
+
+TREATED = 'Num_U5_Received_Severe_Treatment'
+SEVERE = 'num severe cases U5'
+START_YEAR = 2020
+
+
+def reference_reconcile(merged_df, start_year):
+    # row-by-row reconciliation of monthlySevereTreatedByAgeAnalyzer.reduce before it was vectorized
+    merged_df['excess'] = merged_df[TREATED] - merged_df[SEVERE]
+    for (rn, admin_name), rdf in merged_df.groupby(['Run_Number', 'admin_name']):
+        for r, row in rdf.iterrows():
+            if row['excess'] < 1:
+                continue
+            start = (merged_df['year'] == start_year) & (merged_df['month'] == 1) & \
+                    (merged_df['Run_Number'] == rn) & (merged_df['admin_name'] == admin_name)
+            if row['year'] == start_year and row['month'] == 1:
+                merged_df.loc[start, TREATED] = np.sum(merged_df[start][SEVERE])
+            else:
+                excess = row['excess']
+                merged_df.loc[start, TREATED] = merged_df.loc[start, TREATED] - excess
+                merged_df.loc[start, TREATED] = merged_df.loc[start, TREATED] + excess
+    merged_df['excess'] = merged_df[TREATED] - merged_df[SEVERE]
+    merged_df.loc[merged_df['excess'] > 0.5, TREATED] = merged_df.loc[merged_df['excess'] > 0.5, SEVERE]
+    del merged_df['excess']
+    return merged_df
+
+
+def synthetic_merged_df(seed=0, num_runs=3, admins=('A', 'B', 'C'), years=(2020, 2021)):
+    rng = np.random.default_rng(seed)
+    adf = pd.DataFrame([{'Run_Number': rn, 'admin_name': admin, 'year': year, 'month': month}
+                        for rn in range(num_runs) for admin in admins for year in years for month in range(1, 13)])
+    adf[SEVERE] = rng.random(len(adf)) * 5
+    # about half of the months have more treated than severe cases
+    adf[TREATED] = np.round(adf[SEVERE] + rng.normal(0, 2, len(adf)))
+    return adf
+
+
+def test_reconcile_matches_reference():
+    adf = synthetic_merged_df()
+    expected = reference_reconcile(adf.copy(), START_YEAR)
+    result = reconcile_severe_treatment(adf.copy(), TREATED, SEVERE, START_YEAR,
+                                        group_cols=['Run_Number', 'admin_name'])
+    assert (expected[TREATED] != adf[TREATED]).any()
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_reconcile_matches_reference_with_duplicate_rows():
+    # duplicated (Run_Number, admin_name, year, month) rows share the start-of-simulation total
+    adf = synthetic_merged_df(seed=1, num_runs=2, admins=('A', 'B'))
+    adf = pd.concat([adf, adf[adf['admin_name'] == 'A']]).reset_index(drop=True)
+    adf[TREATED] = adf[TREATED] + (adf['year'] == START_YEAR) * (adf['month'] == 1) * 10
+    expected = reference_reconcile(adf.copy(), START_YEAR)
+    result = reconcile_severe_treatment(adf.copy(), TREATED, SEVERE, START_YEAR,
+                                        group_cols=['Run_Number', 'admin_name'])
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_reconcile_single_simulation():
+    adf = synthetic_merged_df(seed=2, num_runs=1, admins=('A',))
+    expected = reference_reconcile(adf.copy(), START_YEAR)
+    result = reconcile_severe_treatment(adf.copy(), TREATED, SEVERE, START_YEAR)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
@@ -0,0 +1,118 @@
+import datetime
+import json
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from snt.analyzers.analyze_helpers import monthlyTreatedCasesAnalyzer
+from snt.analyzers.sim_calendar import SimCalendar, add_calendar_columns, month_of_day, month_start_dates, \
+    monthly_channel_frame
+
+
+def monthparser(x):
+    # the per-row month lookup the analyzers used before the calendar
+    if x == 0:
+        return 12
+    else:
+        return datetime.datetime.strptime(str(x), '%j').month
+
+
+def daily_frame(channel_data, start_year, first_time=0):
+    # daily rows with the calendar columns as the analyzers computed them before the calendar
+    num_days = min(len(values) for values in channel_data.values())
+    simdata = pd.DataFrame({channel: values[:num_days] for channel, values in channel_data.items()})
+    simdata['Time'] = simdata.index + first_time
+    simdata['Day'] = simdata['Time'] % 365
+    simdata['month'] = simdata['Day'].apply(lambda x: monthparser((x + 1) % 365))
+    simdata['year'] = simdata['Time'].apply(lambda x: int(x / 365) + start_year)
+    return simdata
+
+
+def test_month_of_day_matches_monthparser():
+    days = np.arange(3 * 365)
+    assert month_of_day(days).tolist() == [monthparser((day + 1) % 365) for day in days % 365]
+    assert month_of_day(364) == 12 and month_of_day(365) == 1
+
+
+def test_add_calendar_columns():
+    simdata = pd.DataFrame({'Time': np.arange(800), 'x': 1.0})
+    expected = daily_frame({'x': [1.0] * 800}, 2020)
+    result = add_calendar_columns(simdata, 2020)
+    for col in ['Day', 'month', 'year']:
+        assert result[col].tolist() == expected[col].tolist()
+
+
+def test_month_start_dates():
+    years = [2021, 2020, 2021, 2020]
+    months = [12, 1, 12, 2]
+    assert month_start_dates(years, months).tolist() == [datetime.date(year, month, 1)
+                                                          for year, month in zip(years, months)]
+
+
+@pytest.mark.parametrize('num_days, first_time', [(730, 0), (400, 0), (100, 340), (0, 0)])
+def test_monthly_channel_frame_matches_daily_group_by(num_days, first_time):
+    rng = np.random.default_rng(num_days)
+    channel_data = {'cases': rng.integers(0, 10, num_days).tolist(), 'pop': (1000 + rng.random(num_days)).tolist(),
+                    # only the days present in every channel are used
+                    'prevalence': rng.random(num_days + 5).tolist()}
+    result = monthly_channel_frame(channel_data, 2020, sum_channels=['cases'], mean_channels=['pop', 'prevalence'],
+                                   first_time=first_time)
+    expected = daily_frame(channel_data, 2020, first_time)
+    sums = expected.groupby(['year', 'month'], sort=False)[['cases']].sum()
+    means = expected.groupby(['year', 'month'], sort=False)[['pop', 'prevalence']].mean()
+    expected = pd.concat([sums, means], axis=1).reset_index()
+    assert result['year'].tolist() == expected['year'].tolist()
+    assert result['month'].tolist() == expected['month'].tolist()
+    for col in ['cases', 'pop', 'prevalence']:
+        np.testing.assert_allclose(result[col], expected[col])
+
+
+def test_calendar_month_boundaries():
+    calendar = SimCalendar(2020, num_days=365 + 31)
+    assert calendar.days_per_month.tolist() == [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31, 31]
+    assert calendar.month_years.tolist() == [2020] * 12 + [2021]
+    assert calendar.month_dates()[-1] == datetime.date(2021, 1, 1)
+
+
+def report(channels):
+    return json.dumps({'Header': {}, 'Channels': {channel: {'Units': '', 'Data': values}
+                                                  for channel, values in channels.items()}}).encode('utf-8')
+
+
+def test_treated_cases_analyzer_matches_daily_reduce(tmp_path):
+    rng = np.random.default_rng(0)
+    num_days = 2 * 365
+    analyzer = monthlyTreatedCasesAnalyzer('expt', channels=['Received_Treatment', 'Received_Vaccine'],
+                                           working_dir=str(tmp_path), start_year=2020)
+    all_data = {}
+    daily = []
+    for admin in ['A', 'B']:
+        for run_number in range(2):
+            events = {'Received_Treatment': rng.integers(0, 5, num_days).tolist()}
+            inset = {'Statistical Population': (1000 + rng.random(num_days) * 10).tolist(),
+                     'New Clinical Cases': rng.integers(0, 20, num_days).tolist(),
+                     'New Severe Cases': rng.integers(0, 3, num_days).tolist(),
+                     'PfHRP2 Prevalence': rng.random(num_days).tolist()}
+            simulation = SimpleNamespace(tags={'admin_name': admin, 'Run_Number': run_number})
+            all_data[(admin, run_number)] = analyzer.map({analyzer.filenames[0]: report(events),
+                                                          analyzer.filenames[1]: report(inset)}, simulation)
+            # the daily rows map used to return, with the missing event channel filled with 0
+            daily.append(daily_frame({**events, **inset}, 2020).assign(Received_Vaccine=0, admin_name=admin,
+                                                                        Run_Number=run_number))
+    analyzer.reduce(all_data)
+
+    # the reduce of the analyzer applied to the daily rows
+    adf = pd.concat(daily).reset_index(drop=True)
+    adf['date'] = adf.apply(lambda x: datetime.date(x['year'], x['month'], 1), axis=1)
+    sum_channels = ['Received_Treatment', 'Received_Vaccine', 'New Clinical Cases', 'New Severe Cases']
+    mean_channels = ['Statistical Population', 'PfHRP2 Prevalence']
+    df = adf.groupby(['admin_name', 'date', 'Run_Number'])[sum_channels].agg('sum').reset_index()
+    pdf = adf.groupby(['admin_name', 'date', 'Run_Number'])[mean_channels].agg('mean').reset_index()
+    expected = pd.merge(left=pdf, right=df, on=['admin_name', 'date', 'Run_Number'])
+    expected['date'] = expected['date'].astype(str)
+
+    result = pd.read_csv(os.path.join(str(tmp_path), 'expt', 'All_Age_monthly_Cases.csv'))
+    assert list(result.columns) == list(expected.columns)
+    assert len(result) == 2 * 2 * 24
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
@@ -0,0 +1,85 @@
+import os
+from collections import namedtuple
+from types import SimpleNamespace
+import pytest
+from snt.analyzers.local_analysis import LocalSimulation
+from snt.analyzers.simulation_prefilter import SimulationPrefilter, output_file_info
+
+FILENAMES = ['output/InsetChart.json', 'output/ReportEventCounter.json']
+# fields of COMPS OutputFileMetadata
+OutputFileMetadata = namedtuple('OutputFileMetadata',
+                                ['length', 'friendly_name', 'md5_checksum', 'path_from_root', 'url'])
+
+
+class FakeCOMPSSimulation:
+    """
+    Simulation with COMPS-style output file metadata; its assets (input files) are not outputs.
+    """
+
+    def __init__(self, id, outputs, status='SUCCEEDED'):
+        self.id = id
+        self.status = SimpleNamespace(name=status)
+        self.outputs = outputs
+        self.requests = 0
+
+    def retrieve_output_file_info(self, paths):
+        self.requests += 1
+        return [OutputFileMetadata(size, os.path.basename(path), 'md5-%s' % path, os.path.dirname(path), '')
+                for path, size in self.outputs.items()]
+
+
+def local_simulation(tmp_path, name, filenames):
+    sim_dir = tmp_path / name
+    (sim_dir / 'output').mkdir(parents=True)
+    for fname in filenames:
+        (sim_dir / fname).write_text('{}')
+    return LocalSimulation(name, {}, str(sim_dir))
+
+
+def test_output_file_info_on_disk(tmp_path):
+    simulation = local_simulation(tmp_path, 'sim1', FILENAMES[:1])
+    info = output_file_info(simulation, FILENAMES)
+    assert list(info) == FILENAMES[:1]
+    assert info[FILENAMES[0]][0] == 2
+
+
+def test_output_file_info_from_platform_outputs():
+    simulation = FakeCOMPSSimulation('sim1', {'output/InsetChart.json': 10, 'output/ReportEventCounter.json': 20,
+                                              'stdout.txt': 5})
+    info = output_file_info(simulation, FILENAMES + ['output/MalariaSummaryReport.json'])
+    assert info == {'output/InsetChart.json': (10, 'md5-output/InsetChart.json'),
+                    'output/ReportEventCounter.json': (20, 'md5-output/ReportEventCounter.json')}
+    assert simulation.requests == 1
+
+
+def test_check_includes_platform_simulations_with_outputs():
+    simulations = [FakeCOMPSSimulation('a', {fname: 1 for fname in FILENAMES}),
+                   FakeCOMPSSimulation('b', {FILENAMES[0]: 1}),
+                   FakeCOMPSSimulation('c', {}, status='FAILED')]
+    result = SimulationPrefilter().check(simulations, FILENAMES)
+    assert result.included == ['a']
+    assert sorted(result.exclude_ids) == ['b', 'c']
+    assert dict(zip(result.skipped['simid'], result.skipped['reason'])) == {'b': 'missing output files',
+                                                                            'c': 'not succeeded'}
+
+
+def test_check_caches_complete_listings(tmp_path):
+    simulations = [local_simulation(tmp_path, 'sim%d' % ii, FILENAMES) for ii in range(3)]
+    prefilter = SimulationPrefilter(cache_dir=str(tmp_path / 'cache'))
+    assert prefilter.check(simulations, FILENAMES, namespace='exp').included == ['sim0', 'sim1', 'sim2']
+    os.remove(os.path.join(simulations[0].sim_dir, FILENAMES[0]))
+    # cached listings of succeeded simulations are reused
+    assert len(prefilter.check(simulations, FILENAMES, namespace='exp').included) == 3
+    prefilter.invalidate('exp')
+    assert prefilter.check(simulations, FILENAMES, namespace='exp').included == ['sim1', 'sim2']
+
+
+def test_check_refuses_to_exclude_every_succeeded_simulation():
+    simulations = [FakeCOMPSSimulation('a', {'input/config.json': 1}), FakeCOMPSSimulation('b', {})]
+    with pytest.raises(RuntimeError, match='All 2 succeeded simulations'):
+        SimulationPrefilter().check(simulations, FILENAMES)
+
+
+def test_check_without_succeeded_simulations():
+    result = SimulationPrefilter().check([FakeCOMPSSimulation('a', {}, status='RUNNING')], FILENAMES)
+    assert result.included == [] and result.exclude_ids == ['a']
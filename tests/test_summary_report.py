@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from snt.analyzers.analyze_helpers import MonthlyNewInfectionsAnalyzer_withU5
+from snt.analyzers.summary_report import AGE_GROUPS_UNDER15, AGE_GROUPS_WITH_U1U5, AGE_GROUPS_WITH_U5, \
+    AgeGroupAggregator, age_group_channels, drop_final_interval, fold_final_interval, monthly_counts, \
+    pop_weighted_mean, sum_bins
+from snt.dtk_post_processing import dtk_get_burden_functions
+
+
+def test_pop_weighted_mean():
+    values = np.array([[[0.2, 0.4, 0.9]]])
+    pop = np.array([[[100.0, 300.0, 50.0]]])
+    np.testing.assert_allclose(pop_weighted_mean(values, pop, [0, 1]), [[0.35]])
+    np.testing.assert_allclose(pop_weighted_mean(values, pop, [2]), [[0.9]])
+
+
+def test_pop_weighted_mean_without_population():
+    # age bins without population fall back to the unweighted average instead of 0/0
+    values = np.array([[[0.2, 0.4], [0.2, 0.4]]])
+    pop = np.array([[[0.0, 0.0], [100.0, 300.0]]])
+    for weighted_mean in (pop_weighted_mean, dtk_get_burden_functions.pop_weighted_mean):
+        result = weighted_mean(values, pop, [0, 1])
+        assert not np.isnan(result).any()
+        np.testing.assert_allclose(result, [[0.3, 0.35]])
+
+
+def test_aggregator_weighted_mean_matches_pop_weighted_mean():
+    rng = np.random.default_rng(0)
+    age_bins = [1, 5, 15, 30, 50, 125]
+    values = rng.random((2, 12, len(age_bins)))
+    pop = rng.random((2, 12, len(age_bins))) * 100
+    pop[0, 3] = 0
+    aggregator = AgeGroupAggregator({'Under5': (0, 5), 'allAges': (0, 125)})
+    result = aggregator.weighted_mean(values, pop, age_bins)
+    np.testing.assert_allclose(result[..., 0], pop_weighted_mean(values, pop, [0, 1]))
+    np.testing.assert_allclose(result[..., 1], pop_weighted_mean(values, pop, list(range(len(age_bins)))))
+
+
+AGE_BINS = [1, 5, 15, 30, 50, 125]
+# the age bin indices the analyzers used for each age group before the groups were declared as age ranges
+BIN_INDICES = [(AGE_GROUPS_UNDER15, {'Under15': [0, 1, 2], '15to30': [3], '30to50': [4], '50plus': [5]}),
+               (AGE_GROUPS_WITH_U5, {'Under5': [0, 1], '5to15': [2], '15to30': [3], '30to50': [4], '50plus': [5],
+                                     'allAges': [0, 1, 2, 3, 4, 5]}),
+               (AGE_GROUPS_WITH_U1U5, {'Under1': [0], 'Under5': [0, 1], '5to15': [2], '15to30': [3], '30to50': [4],
+                                       '50plus': [5], 'allAges': [0, 1, 2, 3, 4, 5]})]
+
+
+def summary_arrays(num_years, seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (num_years, 13, len(AGE_BINS))
+    return {'Average Population by Age Bin': rng.random(shape) * 100,
+            'New Infections by Age Bin': rng.random(shape) * 10,
+            'PfPR by Age Bin': rng.random(shape),
+            'Annual Clinical Incidence by Age Bin': rng.random(shape) * 3,
+            'Annual Severe Incidence by Age Bin': rng.random(shape) * 0.1}
+
+
+@pytest.mark.parametrize('age_groups, bin_indices', BIN_INDICES)
+def test_age_ranges_match_bin_indices(age_groups, bin_indices):
+    weights = AgeGroupAggregator(age_groups).weights(AGE_BINS)
+    assert list(age_groups) == list(bin_indices)
+    for gg, bins in enumerate(bin_indices.values()):
+        assert np.flatnonzero(weights[:, gg]).tolist() == bins
+
+
+@pytest.mark.parametrize('age_groups, bin_indices', BIN_INDICES)
+def test_age_group_channels_match_per_group_sums(age_groups, bin_indices):
+    arrays = summary_arrays(num_years=2)
+    days_in_month = [30] * 11 + [35]
+    columns = age_group_channels(arrays, AGE_BINS, AgeGroupAggregator(age_groups), days_in_month=days_in_month)
+
+    pop = drop_final_interval(arrays['Average Population by Age Bin'])
+    expected = {'Pop': (pop, sum_bins),
+                'New Infections': (fold_final_interval(arrays['New Infections by Age Bin']), sum_bins),
+                'Clinical cases': (monthly_counts(drop_final_interval(arrays['Annual Clinical Incidence by Age Bin']),
+                                                  pop, days_in_month), sum_bins),
+                'Severe cases': (monthly_counts(drop_final_interval(arrays['Annual Severe Incidence by Age Bin']),
+                                                pop, days_in_month), sum_bins)}
+    assert sorted(columns) == sorted(list(expected) + ['PfPR'])
+    for col, (values, combine) in expected.items():
+        assert columns[col].shape == (2, 12, len(bin_indices))
+        for gg, bins in enumerate(bin_indices.values()):
+            np.testing.assert_allclose(columns[col][..., gg], combine(values, bins))
+    for gg, bins in enumerate(bin_indices.values()):
+        np.testing.assert_allclose(columns['PfPR'][..., gg],
+                                   pop_weighted_mean(drop_final_interval(arrays['PfPR by Age Bin']), pop, bins))
+
+
+def test_each_age_bin_is_its_own_group():
+    aggregator = AgeGroupAggregator()
+    assert aggregator.group_names(AGE_BINS) == AGE_BINS
+    np.testing.assert_array_equal(aggregator.weights(AGE_BINS), np.eye(len(AGE_BINS)))
+    # the weights are built once for each set of age bins
+    assert aggregator.weights(list(AGE_BINS)) is aggregator.weights(AGE_BINS)
+    assert aggregator.weights([5, 125]).shape == (2, 2)
+
+
+def test_age_group_without_age_bins():
+    aggregator = AgeGroupAggregator({'Under5': (0, 5), '5to10': (5, 10)})
+    with pytest.raises(ValueError, match='5to10'):
+        aggregator.weights(AGE_BINS)
+
+
+def test_analyzer_with_custom_age_groups():
+    age_groups = {'Under15': (0, 15), 'Over15': (15, np.inf)}
+    analyzer = MonthlyNewInfectionsAnalyzer_withU5('expt', start_year=2020, end_year=2021, age_groups=age_groups)
+    arrays = summary_arrays(num_years=2)
+    data = {fname: {'Metadata': {'Age Bins': AGE_BINS},
+                    'DataByTimeAndAgeBins': {channel: values[yy].tolist() for channel, values in arrays.items()}}
+            for yy, fname in enumerate(analyzer.filenames)}
+    adf = analyzer.map(data, SimpleNamespace(tags={'Run_Number': 3}))
+
+    assert len(adf) == 2 * 2 * 12
+    assert adf['AgeGroup'].unique().tolist() == ['Under15', 'Over15']
+    assert (adf['Run_Number'] == 3).all()
+    pop = drop_final_interval(arrays['Average Population by Age Bin'])
+    over15 = adf[(adf['AgeGroup'] == 'Over15') & (adf['year'] == 2021)]
+    np.testing.assert_allclose(over15['Pop'], sum_bins(pop, [3, 4, 5])[1])
+    np.testing.assert_allclose(over15['PfPR'],
+                               pop_weighted_mean(drop_final_interval(arrays['PfPR by Age Bin']), pop, [3, 4, 5])[1])